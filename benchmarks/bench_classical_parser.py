@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the classical assembly parser.
+Usage: PYTHONPATH=. python benchmarks/bench_classical_parser.py [num_blocks]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.generators import classical_program
+from src.frontend.classical_parser import ClassicalAssemblyParser
+
+generate_program = classical_program
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    num_blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = generate_program(num_blocks)
+    nlines = text.count("\n")
+    parser = ClassicalAssemblyParser()
+
+    fd, path = tempfile.mkstemp(suffix=".asm")
+    with os.fdopen(fd, "w") as f:
+        f.write(text)
+    try:
+        results = {
+            "parse_text": _best_of(lambda: parser.parse_text(text)),
+            "parse_stream(StringIO)": _best_of(lambda: parser.parse_stream(io.StringIO(text))),
+            "parse_file": _best_of(lambda: parser.parse_file(path)),
+        }
+    finally:
+        os.unlink(path)
+
+    print(f"Classical parser throughput ({nlines} lines, best of 5)")
+    for name, secs in results.items():
+        print(f"  {name:<24} {secs * 1e3:8.1f} ms  {nlines / secs / 1e6:6.2f} Mlines/s")
+
+
+if __name__ == "__main__":
+    main()
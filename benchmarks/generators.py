@@ -0,0 +1,157 @@
+"""
+Synthetic workload generators for the benchmark suite.
+
+Every generator is deterministic for a given seed and returns source text:
+OpenQASM 2 (qelib1 gates only) for circuits, and program text for the
+classical assembler and the NASM frontend.
+"""
+import math
+import random
+
+_HEADER = 'OPENQASM 2.0;\ninclude "qelib1.inc";\nqreg q[{n}];\ncreg c[{n}];\n'
+
+
+def _finish(lines, n, measure=True):
+    if measure:
+        lines.extend(f"measure q[{i}] -> c[{i}];" for i in range(n))
+    return _HEADER.format(n=n) + "\n".join(lines) + "\n"
+
+
+def clifford_t(n, depth, seed=0):
+    """Random Clifford+T circuit: each layer applies a random 1q gate per qubit, then random CXs."""
+    rng = random.Random(seed)
+    one_qubit = ("h", "s", "sdg", "t", "tdg", "x", "z")
+    lines = []
+    for _ in range(depth):
+        for q in range(n):
+            lines.append(f"{rng.choice(one_qubit)} q[{q}];")
+        order = list(range(n))
+        rng.shuffle(order)
+        for a, b in zip(order[::2], order[1::2]):
+            lines.append(f"cx q[{a}],q[{b}];")
+    return _finish(lines, n)
+
+
+def _cphase(lines, theta, control, target):
+    """Controlled phase as rz/cx (equal up to global phase)"""
+    lines.append(f"rz({theta / 2!r}) q[{control}];")
+    lines.append(f"cx q[{control}],q[{target}];")
+    lines.append(f"rz({-theta / 2!r}) q[{target}];")
+    lines.append(f"cx q[{control}],q[{target}];")
+    lines.append(f"rz({theta / 2!r}) q[{target}];")
+
+
+def qft(n):
+    """Textbook QFT with controlled phases lowered to rz/cx, plus the final swaps."""
+    lines = []
+    for j in range(n):
+        lines.append(f"h q[{j}];")
+        for k in range(j + 1, n):
+            _cphase(lines, math.pi / 2 ** (k - j), k, j)
+    for j in range(n // 2):
+        a, b = j, n - 1 - j
+        lines.extend((f"cx q[{a}],q[{b}];", f"cx q[{b}],q[{a}];", f"cx q[{a}],q[{b}];"))
+    return _finish(lines, n)
+
+
+def _mcz(lines, controls, target, ancillas):
+    """Multi-controlled Z via a Toffoli ladder on clean ancillas (len(controls) - 1 of them)"""
+    lines.append(f"h q[{target}];")
+    if len(controls) == 1:
+        lines.append(f"cx q[{controls[0]}],q[{target}];")
+    else:
+        ladder = [(controls[0], controls[1], ancillas[0])]
+        for i, c in enumerate(controls[2:]):
+            ladder.append((c, ancillas[i], ancillas[i + 1]))
+        for a, b, t in ladder:
+            lines.append(f"ccx q[{a}],q[{b}],q[{t}];")
+        lines.append(f"cx q[{ladder[-1][2]}],q[{target}];")
+        for a, b, t in reversed(ladder):
+            lines.append(f"ccx q[{a}],q[{b}],q[{t}];")
+    lines.append(f"h q[{target}];")
+
+
+def grover(n, iterations=None, marked=None):
+    """Grover search over n data qubits (n >= 2) with n - 2 ancillas for the oracle/diffuser."""
+    marked = (1 << n) - 1 if marked is None else marked
+    iterations = iterations or max(1, int(math.pi / 4 * math.sqrt(2 ** n)))
+    data = list(range(n))
+    ancillas = list(range(n, n + max(0, n - 2)))
+    total = n + len(ancillas)
+    lines = [f"h q[{q}];" for q in data]
+    for _ in range(iterations):
+        flips = [q for q in data if not (marked >> q) & 1]
+        lines.extend(f"x q[{q}];" for q in flips)
+        _mcz(lines, data[:-1], data[-1], ancillas)
+        lines.extend(f"x q[{q}];" for q in flips)
+        lines.extend(f"h q[{q}];" for q in data)
+        lines.extend(f"x q[{q}];" for q in data)
+        _mcz(lines, data[:-1], data[-1], ancillas)
+        lines.extend(f"x q[{q}];" for q in data)
+        lines.extend(f"h q[{q}];" for q in data)
+    lines.extend(f"measure q[{q}] -> c[{q}];" for q in data)
+    return _finish(lines, total, measure=False)
+
+
+def brickwork(n, depth, seed=0):
+    """Layered brickwork: random rx/rz on every qubit, then CX on alternating neighbour pairs."""
+    rng = random.Random(seed)
+    lines = []
+    for layer in range(depth):
+        for q in range(n):
+            lines.append(f"rx({rng.uniform(0, 2 * math.pi)!r}) q[{q}];")
+            lines.append(f"rz({rng.uniform(0, 2 * math.pi)!r}) q[{q}];")
+        for a in range(layer % 2, n - 1, 2):
+            lines.append(f"cx q[{a}],q[{a + 1}];")
+    return _finish(lines, n)
+
+
+_CLASSICAL_BLOCK = """L{i} MOVER AREG, X{i}
+ADD AREG, Y{i}   ; accumulate
+MULT AREG, Y{i}
+MOVEM AREG, R{i}
+COMP AREG, X{i}
+BC ANY, L{i}
+"""
+
+_CLASSICAL_DATA = """X{i} DC {i}
+Y{i} DC 3
+R{i} DS 1
+"""
+
+
+def classical_program(num_blocks):
+    """Classical assembly with 9 source lines per block."""
+    parts = ["START 100\n"]
+    parts.extend(_CLASSICAL_BLOCK.format(i=i) for i in range(num_blocks))
+    parts.append("STOP\n")
+    parts.extend(_CLASSICAL_DATA.format(i=i) for i in range(num_blocks))
+    parts.append("END\n")
+    return "".join(parts)
+
+
+def nasm_program(num_arrays, length=64, seed=0):
+    """NASM program summing and scaling `num_arrays` dword arrays in indexed loops."""
+    rng = random.Random(seed)
+    data = ["section .data"]
+    bss = ["section .bss"]
+    text = ["section .text", "    global _start", "_start:"]
+    for a in range(num_arrays):
+        values = ", ".join(str(rng.randint(-1000, 1000)) for _ in range(length))
+        data.append(f"    arr{a} dd {values}")
+        data.append(f"    arr{a}_len equ ($ - arr{a}) / 4")
+        bss.append(f"    out{a} resd {length}")
+        text.extend([
+            "    xor rcx, rcx",
+            "    xor rax, rax",
+            f"loop{a}:",
+            f"    mov edx, [arr{a} + rcx*4]",
+            "    add eax, edx",
+            "    imul edx, edx, 3",
+            f"    mov [out{a} + rcx*4], edx",
+            "    inc rcx",
+            f"    cmp rcx, arr{a}_len",
+            f"    jl loop{a}",
+        ])
+    text.extend(["    mov rax, 60", "    xor rdi, rdi", "    syscall"])
+    return "\n".join(data + bss + text) + "\n"
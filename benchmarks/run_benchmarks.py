@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the compiler and simulator hot paths.
+
+Times every pipeline stage (parse, passes, verify, QIR build, Qiskit
+conversion, emission, simulation) on synthetic circuits, with simulation
+also timed through the JIT-compiled QIR module (execute_qir), plus the classical
+and NASM compilers on synthetic programs. Results are written as JSON and can
+be checked against a stored baseline:
+
+    PYTHONPATH=. python benchmarks/run_benchmarks.py --output base.json
+    PYTHONPATH=. python benchmarks/run_benchmarks.py --baseline base.json --threshold 0.2
+
+A stage regresses when its best time exceeds the baseline by more than
+`threshold` (relative) and `--min-delta` (absolute, to ignore timer noise);
+the exit status is 1 if any stage regressed.
+"""
+import argparse
+import copy
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks import generators
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_results.json")
+
+# name -> (generator, kwargs, simulate?)
+SUITES = {
+    "quick": {
+        "clifford_t-16x50": (generators.clifford_t, {"n": 16, "depth": 50}, True),
+        "qft-16": (generators.qft, {"n": 16}, True),
+        "grover-5": (generators.grover, {"n": 5}, True),
+        "brickwork-16x40": (generators.brickwork, {"n": 16, "depth": 40}, True),
+        "classical-2000": (generators.classical_program, {"num_blocks": 2000}, False),
+        "nasm-20": (generators.nasm_program, {"num_arrays": 20}, False),
+    },
+    "full": {
+        "clifford_t-64x1000": (generators.clifford_t, {"n": 64, "depth": 1000}, False),
+        "qft-64": (generators.qft, {"n": 64}, False),
+        "grover-8": (generators.grover, {"n": 8}, True),
+        "brickwork-20x200": (generators.brickwork, {"n": 20, "depth": 200}, True),
+        "brickwork-64x500": (generators.brickwork, {"n": 64, "depth": 500}, False),
+        "classical-20000": (generators.classical_program, {"num_blocks": 20000}, False),
+        "nasm-200": (generators.nasm_program, {"num_arrays": 200}, False),
+    },
+}
+
+
+def measure(fn, repeat, setup=None):
+    """Run fn(setup()) `repeat` times; returns (timings, last result)."""
+    timings, result = [], None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        result = fn(arg) if setup else fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def _record(results, key, timings, **info):
+    results[key] = dict(info, best_s=min(timings), median_s=statistics.median(timings),
+                        repeat=len(timings))
+
+
+def build_qir(ast):
+    from src.ir.qir_builder import QIRBuilder
+    qir = QIRBuilder()
+    for q in ast.qubit_indices():
+        qir.allocate_qubit(f"q{q}")
+    try:
+        qir.add_program(ast)
+    except ValueError:
+        pass  # gate without a QIR intrinsic: no JIT comparison for this workload
+    return qir, qir.get_ir()
+
+
+def bench_quantum(name, source, simulate, repeat, workdir, results, executor, qir_runtime):
+    from src.frontend.parser import parse_qasm_file
+    from src.ir.passes import superposition_opt, entanglement_aware_pass
+    from src.ir.verifier import verify_ast
+    from src.backend.transpiler import ast_to_qiskit_circuit
+    from src.backend.emitter import emit_outputs
+
+    path = os.path.join(workdir, f"{name}.qasm")
+    with open(path, "w") as f:
+        f.write(source)
+
+    t, ast = measure(lambda: parse_qasm_file(path), repeat)
+    size = {"nodes": len(ast.nodes)}
+    _record(results, f"{name}/parse", t, **size)
+    t, ast = measure(superposition_opt, repeat, setup=lambda: copy.deepcopy(ast))
+    _record(results, f"{name}/pass:superposition_opt", t, **size)
+    t, _ = measure(lambda: entanglement_aware_pass(ast), repeat)
+    _record(results, f"{name}/pass:entanglement_aware_pass", t, **size)
+    t, _ = measure(lambda: verify_ast(ast), repeat)
+    _record(results, f"{name}/verify", t, **size)
+    t, (qir, ir_text) = measure(lambda: build_qir(ast), repeat)
+    _record(results, f"{name}/qir_build", t, **size)
+    t, qc = measure(lambda: ast_to_qiskit_circuit(ast), repeat)
+    _record(results, f"{name}/to_qiskit", t, **size)
+    prefix = os.path.join(workdir, name)
+    t, _ = measure(lambda: emit_outputs(ir_text, None, outfile_prefix=prefix, ast=ast), repeat)
+    _record(results, f"{name}/emit", t, **size)
+    if simulate:
+        t, _ = measure(lambda: executor().run(qc), repeat)
+        _record(results, f"{name}/execute", t, qubits=qc.num_qubits, **size)
+        if "@\"main\"" in ir_text:
+            # same shots through the JIT-compiled QIR module on the NumPy runtime
+            runtime = qir_runtime()
+            t, run = measure(lambda: runtime.run(ir_text, shots=executor().shots), repeat)
+            _record(results, f"{name}/execute_qir", t, qubits=qc.num_qubits, mode=run["mode"], **size)
+
+
+def bench_classical(name, source, repeat, results):
+    from src.ir.classical_ir_builder import compile_classical_assembly
+    from src.ir.classical_passes import ClassicalOptimizer
+
+    lines = source.count("\n")
+    t, _ = measure(lambda: compile_classical_assembly(source), repeat)
+    _record(results, f"{name}/compile", t, lines=lines)
+    t, _ = measure(lambda: compile_classical_assembly(source, passes=[ClassicalOptimizer()]), repeat)
+    _record(results, f"{name}/compile_optimized", t, lines=lines)
+
+
+def bench_nasm(name, source, repeat, results):
+    from src.frontend.nasm_parser import NASMToLLVMCompiler
+
+    lines = source.count("\n")
+
+    def parse():
+        compiler = NASMToLLVMCompiler()
+        compiler.parse_text(source)
+        return compiler
+
+    t, compiler = measure(parse, repeat)
+    _record(results, f"{name}/parse", t, lines=lines)
+    t, _ = measure(compiler.generate_llvm_ir, repeat)
+    _record(results, f"{name}/lower", t, lines=lines)
+
+
+def run_suite(suite, repeat=3, only=None, shots=256):
+    results = {}
+    executors = {}
+
+    def executor():
+        if "aer" not in executors:
+            from src.execution.hybrid_executor import HybridExecutor
+            executors["aer"] = HybridExecutor(shots=shots)
+        return executors["aer"]
+
+    def qir_runtime():
+        if "qir" not in executors:
+            from src.execution.qir_runtime import QIRRuntime
+            executors["qir"] = QIRRuntime(seed=0)
+        return executors["qir"]
+
+    with tempfile.TemporaryDirectory(prefix="qllvm-bench-") as workdir:
+        for name, (generator, kwargs, simulate) in SUITES[suite].items():
+            if only and not fnmatch.fnmatch(name, only):
+                continue
+            print(f"⏱️  {name}", file=sys.stderr)
+            source = generator(**kwargs)
+            if name.startswith("classical"):
+                bench_classical(name, source, repeat, results)
+            elif name.startswith("nasm"):
+                bench_nasm(name, source, repeat, results)
+            else:
+                bench_quantum(name, source, simulate, repeat, workdir, results, executor, qir_runtime)
+    return results
+
+
+def environment():
+    info = {"python": platform.python_version(), "machine": platform.machine(),
+            "processor": platform.processor(), "cpus": os.cpu_count()}
+    for module in ("qiskit", "qiskit_aer", "llvmlite", "numpy"):
+        try:
+            info[module] = __import__(module).__version__
+        except Exception:
+            info[module] = None
+    return info
+
+
+def compare(current, baseline, threshold, min_delta):
+    """Rows of (key, baseline_s, current_s, ratio, status) for keys in both runs."""
+    rows = []
+    for key, cur in current.items():
+        base = baseline.get(key)
+        if base is None:
+            rows.append((key, None, cur["best_s"], None, "new"))
+            continue
+        ratio = cur["best_s"] / base["best_s"] if base["best_s"] else float("inf")
+        delta = cur["best_s"] - base["best_s"]
+        if ratio > 1 + threshold and delta > min_delta:
+            status = "REGRESSION"
+        elif ratio < 1 - threshold and -delta > min_delta:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((key, base["best_s"], cur["best_s"], ratio, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compiler/simulator benchmark suite")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", metavar="GLOB", help="run only workloads matching GLOB")
+    parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT,
+                        help="results JSON to write (default benchmarks/benchmark_results.json)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown that counts as a regression (default 0.2)")
+    parser.add_argument("--min-delta", type=float, default=0.002,
+                        help="ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.suite, args.repeat, args.only)
+    payload = {"suite": args.suite, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "environment": environment(), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(payload, f, indent=2)
+
+    print(f"{'benchmark':<44} {'best ms':>10} {'median ms':>10}")
+    for key, r in results.items():
+        print(f"{key:<44} {r['best_s'] * 1e3:>10.2f} {r['median_s'] * 1e3:>10.2f}")
+    print(f"\n📄 Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    rows = compare(results, baseline, args.threshold, args.min_delta)
+    print(f"\n{'benchmark':<44} {'base ms':>10} {'now ms':>10} {'ratio':>7}  status")
+    for key, base, cur, ratio, status in rows:
+        base_ms = f"{base * 1e3:.2f}" if base is not None else "-"
+        ratio_s = f"{ratio:.2f}" if ratio is not None else "-"
+        print(f"{key:<44} {base_ms:>10} {cur * 1e3:>10.2f} {ratio_s:>7}  {status}")
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    print("\n✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,8 +20,9 @@ from pathlib import Path
 # Add src to Python path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
-from scripts.run_quantum_compiler import main as quantum_main
-from scripts.classical_compiler_final import main as classical_main
+# Heavy dependencies (Qiskit, Aer, llvmlite) are imported inside the mode that
+# needs them, so --list-examples and classical compiles start fast.
+HEAVY_MODULES = ('qiskit', 'qiskit_aer', 'llvmlite')
 
 def print_banner():
     """Print the project banner."""
@@ -48,23 +49,66 @@ Examples:
   %(prog)s classical examples/assembly/working_demo.asm # Compile assembly
   %(prog)s --list-examples                              # Show available examples
   %(prog)s --demo                                       # Run demonstration
+  %(prog)s serve --socket /tmp/qllvm.sock               # Run a warm compile server
+  %(prog)s quantum grover.qasm --server /tmp/qllvm.sock # Compile via the server if running
         """
     )
     
-    parser.add_argument('mode', choices=['quantum', 'classical'], nargs='?',
-                       help='Compilation mode')
+    parser.add_argument('mode', choices=['quantum', 'classical', 'serve'], nargs='?',
+                       help='Compilation mode, or serve to run a compile server')
     parser.add_argument('input_file', nargs='?',
                        help='Input file to compile')
     parser.add_argument('--output', '-o', 
                        help='Output file name (default: auto-generated)')
     parser.add_argument('--verbose', '-v', action='store_true',
                        help='Enable verbose output')
+    parser.add_argument('--optimize', '-O', action='store_true',
+                       help='Run the classical dataflow optimizer before lowering')
     parser.add_argument('--list-examples', action='store_true',
                        help='List available example files')
     parser.add_argument('--demo', action='store_true',
                        help='Run interactive demonstration')
+    parser.add_argument('--import-profile', action='store_true',
+                       help='Re-run under -X importtime and print the slowest imports')
+    parser.add_argument('--trace', metavar='PATH',
+                       help='Write a Chrome trace of the pipeline stages and print a summary')
+    parser.add_argument('--memprofile', action='store_true',
+                       help='Report peak/retained memory and top allocation sites per stage')
+    parser.add_argument('--stats', action='store_true',
+                       help='quantum: print circuit metrics (depth, gate counts, critical path, idle time, memory)')
+    parser.add_argument('--basis', metavar='GATES',
+                       help='quantum: translate into this comma-separated gate set, e.g. rz,sx,x,cx')
+    parser.add_argument('--zx', action='store_true',
+                       help='quantum: also run the ZX-calculus simplification pass')
+    parser.add_argument('--consolidate', action='store_true',
+                       help='quantum: resynthesize two-qubit blocks with the fewest cx gates')
+    parser.add_argument('--phase-poly', action='store_true',
+                       help='quantum: resynthesize CNOT + phase regions from their phase polynomial')
+    parser.add_argument('--verify-passes', action='store_true',
+                       help='quantum: check that each optimization pass preserves the circuit '
+                            '(runs in-process, not on a server)')
+    parser.add_argument('--allow-unverified', action='store_true',
+                       help='quantum: with --verify-passes, continue past passes the checker '
+                            'cannot decide')
+    parser.add_argument('--memory-cap', metavar='SIZE',
+                       help='Simulator memory cap, e.g. 8G (default: $QLLVM_MEMORY_CAP or none)')
+    parser.add_argument('--socket', metavar='PATH',
+                       help='serve: listen on this Unix socket instead of stdin/stdout')
+    parser.add_argument('--workers', type=int,
+                       help='serve: size of the compile worker pool (default: CPU count)')
+    parser.add_argument('--server', nargs='?', const='', metavar='PATH',
+                       help='Send the compile to a running server (default socket if no PATH), '
+                            'falling back to in-process compilation; not with --trace, '
+                            '--memprofile or --memory-cap')
     
-    args = parser.parse_args()
+    args = parser.parse_intermixed_args()
+    
+    if args.import_profile:
+        return profile_imports([a for a in sys.argv[1:] if a != '--import-profile'])
+    
+    if args.mode == 'serve':
+        # stdout carries the protocol in stdio mode, so no banner
+        return serve(args.socket, args.workers)
     
     print_banner()
     
@@ -81,6 +125,13 @@ Examples:
         
     if args.mode and not args.input_file:
         parser.error("Input file is required when specifying a compilation mode")
+
+    if args.server is not None and not args.verify_passes:
+        # these measure or limit this process, not the server that does the compile
+        local = [flag for flag, value in (('--trace', args.trace), ('--memprofile', args.memprofile),
+                                          ('--memory-cap', args.memory_cap)) if value]
+        if local:
+            parser.error(f"--server cannot be combined with {', '.join(local)}")
         
     if not os.path.exists(args.input_file):
         print(f"❌ Error: Input file '{args.input_file}' not found")
@@ -89,10 +140,43 @@ Examples:
     print(f"🚀 Starting {args.mode} compilation...")
     print(f"📁 Input: {args.input_file}")
     
+    if args.server is not None and not args.verify_passes:
+        return compile_via_server(args)
+    
+    if args.memory_cap:
+        from src.utils import config
+        from src.utils.helpers import parse_size
+        config.SIMULATOR_MEMORY_CAP = parse_size(args.memory_cap)
+    
     if args.mode == 'quantum':
-        return compile_quantum(args.input_file, args.output, args.verbose)
+        run = lambda: compile_quantum(args.input_file, args.output, args.verbose, args.stats,
+                                          args.basis, args.zx, args.consolidate, args.phase_poly,
+                                          args.verify_passes, args.allow_unverified)
+    else:
+        run = lambda: compile_classical(args.input_file, args.output, args.verbose, args.optimize)
+    if not (args.trace or args.memprofile):
+        return run()
+    return run_profiled(run, args.trace, args.memprofile)
+
+def run_profiled(run, trace=None, memprofile=False):
+    """Run a compile under the span tracer (and memory profiler) and report per stage."""
+    if memprofile:
+        from src.utils.memprofile import MemoryProfiler
+        profiler = MemoryProfiler()
     else:
-        return compile_classical(args.input_file, args.output, args.verbose)
+        from src.utils.tracing import Tracer
+        profiler = Tracer(track_memory=True)
+    with profiler.activate():
+        status = run()
+    print("\n⏱️  Stage summary")
+    print(profiler.format_summary())
+    if trace:
+        profiler.write_chrome_trace(trace)
+        print(f"   ✓ Chrome trace: {trace}")
+    if memprofile:
+        print("\n🧠 Memory profile")
+        print(profiler.format_report())
+    return status
 
 def list_examples():
     """List available example files."""
@@ -182,7 +266,9 @@ def demo_hybrid():
     # Implementation would go here
     print("✨ Demo completed!")
 
-def compile_quantum(input_file, output_file, verbose):
+def compile_quantum(input_file, output_file, verbose, stats=False, basis=None, zx=False,
+                    consolidate=False, phase_poly=False, verify_passes=False,
+                    allow_unverified=False):
     """Compile quantum circuit."""
     try:
         print(f"🔬 Compiling quantum circuit: {input_file}")
@@ -197,6 +283,20 @@ def compile_quantum(input_file, output_file, verbose):
             sys.argv.extend(["-o", output_file])
         if verbose:
             sys.argv.append("-v")
+        if stats:
+            sys.argv.append("--stats")
+        if basis:
+            sys.argv.extend(["--basis", basis])
+        if zx:
+            sys.argv.append("--zx")
+        if consolidate:
+            sys.argv.append("--consolidate")
+        if phase_poly:
+            sys.argv.append("--phase-poly")
+        if verify_passes:
+            sys.argv.append("--verify-passes")
+        if allow_unverified:
+            sys.argv.append("--allow-unverified")
             
         result = qmain()
         sys.argv = original_argv
@@ -208,31 +308,135 @@ def compile_quantum(input_file, output_file, verbose):
         print(f"❌ Quantum compilation failed: {e}")
         return 1
 
-def compile_classical(input_file, output_file, verbose):
+def compile_classical(input_file, output_file, verbose, optimize=False):
     """Compile classical assembly."""
     try:
         print(f"⚙️  Compiling assembly: {input_file}")
+        from src.utils.tracing import span
         
-        # Import and run classical compiler
-        from scripts.classical_compiler_final import main as cmain
+        with open(input_file, 'r') as f:
+            source = f.read()
+        
+        from src.frontend.nasm_parser import is_nasm_source
+        if is_nasm_source(source):
+            # x86_64 NASM sources have their own frontend
+            from src.frontend.nasm_parser import compile_nasm_to_llvm
+            with span("compile_nasm"):
+                ir_code = compile_nasm_to_llvm(input_file)
+        else:
+            # Shared parse -> passes -> lowering pipeline
+            from src.ir.classical_ir_builder import compile_classical_assembly
+            passes = []
+            if optimize:
+                from src.ir.classical_passes import ClassicalOptimizer
+                passes.append(ClassicalOptimizer())
+            with span("compile") as sp:
+                result = compile_classical_assembly(source, passes=passes)
+                sp.set(nodes=result.stats['instructions'])
+            ir_code = result.ir
+            print(f"   ✓ Instructions: {result.stats['instructions']}")
+            print(f"   ✓ Data definitions: {result.stats['data_definitions']}")
+            print(f"   ✓ Labels: {result.stats['labels']}")
+            if optimize:
+                print(f"   ✓ Optimized: {result.stats['instructions']} → "
+                      f"{result.stats['optimized_instructions']} instructions")
+        
+        output_file = output_file or "output_final_classical.ll"
+        with open(output_file, "w") as f:
+            f.write(ir_code)
+        print(f"   ✓ Created: {output_file}")
         
-        # Set up arguments for classical compiler
-        original_argv = sys.argv
-        sys.argv = ["classical_compiler", input_file]
-        if output_file:
-            sys.argv.extend(["-o", output_file])
         if verbose:
-            sys.argv.append("-v")
-            
-        result = cmain()
-        sys.argv = original_argv
+            print("\n📋 Generated LLVM IR:")
+            print(ir_code)
         
         print("✅ Classical compilation completed successfully!")
-        return result
+        return 0
         
     except Exception as e:
         print(f"❌ Classical compilation failed: {e}")
         return 1
 
+def serve(socket_path, workers):
+    """Run the warm compile server on a Unix socket, or on stdin/stdout."""
+    from src.execution.compile_server import CompileService, serve_stream, serve_unix, DEFAULT_WORKERS
+    service = CompileService().warm_up()
+    workers = workers or DEFAULT_WORKERS
+    if socket_path:
+        serve_unix(service, socket_path, workers)
+    else:
+        serve_stream(service, workers=workers)
+    return 0
+
+def compile_via_server(args):
+    """Thin client: compile through a running server, or in-process if none is up."""
+    from src.execution.compile_server import compile_with_fallback, DEFAULT_SOCKET, _default_prefix
+    request = {"op": "compile", "mode": args.mode, "input": os.path.abspath(args.input_file),
+               "optimize": args.optimize}
+    # the server runs in its own cwd: default outputs are named here, like in-process ones
+    if args.output:
+        request["output"] = os.path.abspath(args.output)
+    elif args.mode == 'quantum':
+        request["output"] = os.path.abspath(_default_prefix(args.input_file))
+    else:
+        request["output"] = os.path.abspath("output_final_classical.ll")
+    if args.basis:
+        request["basis"] = args.basis.split(",")
+    if args.zx:
+        request["zx"] = True
+    if args.consolidate:
+        request["consolidate"] = True
+    if args.phase_poly:
+        request["phase_poly"] = True
+    try:
+        response, served = compile_with_fallback(request, args.server or DEFAULT_SOCKET)
+    except OSError as e:
+        print(f"❌ Compile server error: {e}")
+        return 1
+    print(f"   ✓ Compiled {'by server' if served else 'in-process (no server running)'}")
+    if not response["ok"]:
+        print(f"❌ Compilation failed: {response['error']}")
+        return 1
+    for path in response["result"]["paths"]:
+        print(f"   ✓ Created: {path}")
+    if args.stats and args.mode == 'quantum':
+        from scripts.run_quantum_compiler import format_metrics
+        print("📈 Circuit metrics")
+        for line in format_metrics(response["result"]["stats"]):
+            print(f"   {line}")
+    print(f"✅ {args.mode.capitalize()} compilation completed successfully!")
+    return 0
+
+def parse_importtime(text):
+    """Split `-X importtime` stderr into (module, self_us, cumulative_us, depth) rows and other lines."""
+    rows, other = [], []
+    for line in text.splitlines(keepends=True):
+        if not line.startswith('import time:') or 'self [us]' in line:
+            if not line.startswith('import time:'):
+                other.append(line)
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name.rstrip('\n')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows, ''.join(other)
+
+def profile_imports(argv, top=15):
+    """Run the CLI with `argv` under `-X importtime` and print an import breakdown."""
+    import subprocess
+    cmd = [sys.executable, '-X', 'importtime', str(Path(__file__).resolve()), *argv]
+    proc = subprocess.run(cmd, stderr=subprocess.PIPE, text=True)
+    rows, other = parse_importtime(proc.stderr)
+    sys.stderr.write(other)
+    
+    total_us = sum(cumulative for _, _, cumulative, depth in rows if depth == 0)
+    heavy = sorted({name.split('.')[0] for name, *_ in rows} & set(HEAVY_MODULES))
+    print(f"\n📦 Import profile: {len(rows)} modules, {total_us / 1000:.1f} ms total")
+    print(f"   Heavy packages loaded: {', '.join(heavy) if heavy else 'none'}")
+    print(f"   {'cumulative ms':>13}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:top]:
+        print(f"   {cumulative_us / 1000:13.1f}  {self_us / 1000:8.1f}  {'  ' * depth}{name}")
+    return proc.returncode
+
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -1,29 +1,23 @@
 #!/usr/bin/env python3
 """
-Enhanced Classical Assembly Compiler with Basic Optimizations
-Demonstrates dead code elimination and constant folding
+Enhanced Classical Assembly Compiler with Dataflow Optimizations
+Demonstrates constant propagation, dead store and dead code elimination
 """
 
 import sys
 import os
 from src.frontend.classical_parser import parse_classical_assembly
 from llvmlite import ir
+from src.ir.classical_ir_builder import ClassicalIRBuilder
+from src.ir.classical_passes import ClassicalOptimizer
 
 def optimize_ast(ast):
-    """Apply basic optimizations to the AST"""
-    optimized_instructions = []
-    
-    for i, instr in enumerate(ast.instructions):
-        # Dead code elimination: Remove instructions after STOP
-        if instr.opcode == 'STOP':
-            optimized_instructions.append(instr)
-            break
-        
-        # Constant folding: If we move a constant then immediately add another constant,
-        # we could potentially fold these operations
-        optimized_instructions.append(instr)
-    
-    ast.instructions = optimized_instructions
+    """Apply constant propagation, dead store/code elimination and unreachable block removal"""
+    optimizer = ClassicalOptimizer()
+    ast = optimizer.run(ast)
+    for key in ('constants_folded', 'branches_folded', 'dead_stores', 'dead_instructions', 'unreachable_removed'):
+        if optimizer.stats[key]:
+            print(f"   ✓ {key.replace('_', ' ').capitalize()}: {optimizer.stats[key]}")
     return ast
 
 def analyze_program_flow(ast):
@@ -47,144 +41,11 @@ def analyze_program_flow(ast):
     return stats
 
 def enhanced_ir_generator(ast):
-    """Enhanced IR generator with better optimization"""
-    
-    # Create module
-    module = ir.Module(name="optimized_classical_module")
-    
-    # Add module-level metadata
+    """Enhanced IR generator (delegates to the shared classical lowering engine)"""
+    module = ClassicalIRBuilder("optimized_classical_module").build_module(ast)
     module.add_metadata([ir.MetaDataString(module, "Classical Assembly to LLVM IR")])
-    
-    # Create main function
-    func_type = ir.FunctionType(ir.IntType(32), [])
-    main_func = ir.Function(module, func_type, name="main")
-    
-    # Create entry block
-    entry_block = main_func.append_basic_block(name="entry")
-    builder = ir.IRBuilder(entry_block)
-    
-    # Create global variables for data definitions with comments
-    variables = {}
-    for name, data_def in ast.data_definitions.items():
-        var_type = ir.IntType(32)
-        global_var = ir.GlobalVariable(module, var_type, name=name)
-        global_var.linkage = 'internal'
-        if data_def.directive == 'DC':
-            global_var.initializer = ir.Constant(var_type, data_def.value)
-        else:
-            global_var.initializer = ir.Constant(var_type, 0)
-        variables[name] = global_var
-    
-    # Allocate AREG register with debug info
-    areg = builder.alloca(ir.IntType(32), name="AREG")
-    zero = ir.Constant(ir.IntType(32), 0)
-    builder.store(zero, areg)
-    
-    # Create basic blocks for labels
-    blocks = {}
-    for label in ast.labels.keys():
-        block = main_func.append_basic_block(name=f"label_{label}")
-        blocks[label] = block
-    
-    exit_block = main_func.append_basic_block(name="exit")
-    blocks['exit'] = exit_block
-    
-    # Generate instructions with optimizations
-    for instr in ast.instructions:
-        # Handle label jumps
-        if instr.label and instr.label in blocks:
-            builder.branch(blocks[instr.label])
-            builder = ir.IRBuilder(blocks[instr.label])
-        
-        # Generate optimized instruction IR
-        if instr.opcode == 'MOVER':
-            _generate_optimized_mover(builder, instr, variables, areg)
-        elif instr.opcode == 'ADD':
-            _generate_optimized_arithmetic(builder, instr, variables, areg, 'add')
-        elif instr.opcode == 'SUB':
-            _generate_optimized_arithmetic(builder, instr, variables, areg, 'sub')
-        elif instr.opcode == 'MULT':
-            _generate_optimized_arithmetic(builder, instr, variables, areg, 'mul')
-        elif instr.opcode == 'MOVEM':
-            _generate_optimized_movem(builder, instr, variables, areg)
-        elif instr.opcode == 'COMP':
-            _generate_optimized_comp(builder, instr, variables, areg)
-        elif instr.opcode == 'BC':
-            _generate_optimized_branch(builder, instr, blocks)
-        elif instr.opcode == 'STOP':
-            builder.branch(exit_block)
-    
-    # Switch to exit block and add return
-    builder = ir.IRBuilder(exit_block)
-    ret_val = ir.Constant(ir.IntType(32), 0)
-    builder.ret(ret_val)
-    
     return str(module)
 
-def _generate_optimized_mover(builder, instr, variables, areg):
-    """Generate optimized MOVER instruction"""
-    if len(instr.operands) >= 2 and instr.operands[0] == 'AREG':
-        source = instr.operands[1]
-        if source in variables:
-            value = builder.load(variables[source], name=f"load_{source}")
-            builder.store(value, areg)
-        else:
-            try:
-                imm_val = ir.Constant(ir.IntType(32), int(source))
-                builder.store(imm_val, areg)
-            except ValueError:
-                pass
-
-def _generate_optimized_arithmetic(builder, instr, variables, areg, operation):
-    """Generate optimized arithmetic instructions"""
-    if len(instr.operands) >= 2 and instr.operands[0] == 'AREG':
-        areg_val = builder.load(areg, name="areg_val")
-        source = instr.operands[1]
-        
-        if source in variables:
-            source_val = builder.load(variables[source], name=f"load_{source}")
-        else:
-            source_val = ir.Constant(ir.IntType(32), int(source) if source.isdigit() else 0)
-        
-        # Generate appropriate arithmetic operation
-        if operation == 'add':
-            result = builder.add(areg_val, source_val, name="add_result")
-        elif operation == 'sub':
-            result = builder.sub(areg_val, source_val, name="sub_result")
-        elif operation == 'mul':
-            result = builder.mul(areg_val, source_val, name="mult_result")
-        
-        builder.store(result, areg)
-
-def _generate_optimized_movem(builder, instr, variables, areg):
-    """Generate optimized MOVEM instruction"""
-    if len(instr.operands) >= 2 and instr.operands[0] == 'AREG':
-        dest = instr.operands[1]
-        if dest in variables:
-            areg_val = builder.load(areg, name="areg_val")
-            builder.store(areg_val, variables[dest])
-
-def _generate_optimized_comp(builder, instr, variables, areg):
-    """Generate optimized COMP instruction"""
-    if len(instr.operands) >= 2 and instr.operands[0] == 'AREG':
-        areg_val = builder.load(areg, name="areg_val")
-        operand = instr.operands[1]
-        
-        if operand in variables:
-            cmp_val = builder.load(variables[operand], name=f"load_{operand}")
-        else:
-            cmp_val = ir.Constant(ir.IntType(32), int(operand) if operand.isdigit() else 0)
-        
-        # Generate comparison
-        builder.icmp_signed('>=', areg_val, cmp_val, name="cmp_result")
-
-def _generate_optimized_branch(builder, instr, blocks):
-    """Generate optimized branch instruction"""
-    if len(instr.operands) >= 2:
-        target_label = instr.operands[1]
-        if target_label in blocks:
-            builder.branch(blocks[target_label])
-
 def run_enhanced_classical_compiler(assembly_text):
     """Run the enhanced classical assembly compilation pipeline."""
     print("🚀 Running Enhanced Classical Assembly Compiler")
@@ -3,48 +3,163 @@
 Simple runner script for the quantum-llvm-compiler project.
 Usage: python run_quantum_compiler.py [qasm_file]
 """
+import copy
+import json
 import sys
 import os
 from src.frontend.parser import parse_qasm_file
-from src.ir.passes import superposition_opt, entanglement_aware_pass
+from src.ir.passes import (superposition_opt, entanglement_aware_pass, zx_simplify, consolidate_blocks,
+                           phase_polynomial_opt)
 from src.ir.qir_builder import QIRBuilder
 from src.ir.verifier import verify_ast
+from src.ir.equivalence import check_equivalence
 from src.backend.llvm_integration import qir_to_qiskit
+from src.backend.decompositions import translate_ast
 from src.backend.emitter import emit_outputs
-from src.execution.hybrid_executor import HybridExecutor
+from src.backend.metrics import collect_metrics
+from src.backend.scheduler import TimingScheduler
 from src.utils.logger import get_logger
+from src.utils.tracing import span
+from src.utils.helpers import format_size
 
 logger = get_logger("quantum_compiler")
 
-def run_quantum_compiler(qasm_file):
-    """Run the complete quantum compilation pipeline."""
+def format_metrics(metrics):
+    """Human-readable lines for a backend.metrics result"""
+    def hist(counts):
+        return ", ".join(f"{name}={n}" for name, n in sorted(counts.items(), key=lambda kv: -kv[1]))
+    idle = metrics["idle_fraction"]
+    lines = [f"depth {metrics['depth']} (two-qubit {metrics['two_qubit_depth']}), "
+             f"{metrics['size']} operations on {metrics['num_qubits']} qubits",
+             f"gates: {hist(metrics['gate_counts']) or 'none'}",
+             f"critical path: {metrics['critical_path']['length']} ops "
+             f"({hist(metrics['critical_path']['gate_counts']) or 'empty'})"]
+    if idle["per_qubit"]:
+        worst = max(range(len(idle["per_qubit"])), key=idle["per_qubit"].__getitem__)
+        lines.append(f"idle: mean {idle['mean']:.1%}, max {idle['per_qubit'][worst]:.1%} on q{worst}")
+    lines.append("statevector memory: "
+                 f"{format_size(metrics['simulation_memory']['statevector_bytes'])}")
+    return lines
+
+def check_pass(name, before, ast, allow_unverified=False, windows=()):
+    """--verify-passes: compare the AST before and after a pass; False if they differ,
+    or if the checker cannot decide and `allow_unverified` is not set. `windows` are
+    the regions the pass reported rewriting, checked one by one."""
+    with span(f"verify:{name}") as sp:
+        result = check_equivalence(before, ast, windows=windows)
+        sp.set(methods=",".join(result["methods"]))
+    if result["equivalent"] is None:
+        if not allow_unverified:
+            print(f"   ❌ Could not verify {name}: {result['reason']} "
+                  "(--allow-unverified continues anyway)")
+            return False
+        print(f"   ⚠️  Could not verify {name}: {result['reason']}")
+    elif result["equivalent"]:
+        print(f"   🔎 {name} preserves the circuit ({', '.join(result['methods'])}, "
+              f"{result['elapsed']:.2f}s)")
+    else:
+        print(f"   ❌ {name} changed the circuit on qubits {result['qubits']}: {result['reason']}")
+        return False
+    return True
+
+def run_quantum_compiler(qasm_file, stats=False, basis=None, zx=False, consolidate=False,
+                         phase_poly=False, verify_passes=False, allow_unverified=False):
+    """Run the complete quantum compilation pipeline; `stats` prints the circuit metrics,
+    `basis` (gate names) translates the circuit into that gate set after optimization,
+    `zx` adds the ZX-calculus simplification pass, `phase_poly` the phase-polynomial
+    resynthesis and `consolidate` the two-qubit block resynthesis. `verify_passes`
+    checks after each of these passes that the circuit is unchanged up to global phase;
+    a pass the checker cannot decide fails the compile unless `allow_unverified`."""
     print(f"🚀 Running quantum compiler on: {qasm_file}")
     print("=" * 50)
     
     # 1. Parse QASM to AST
     print("1. Parsing QASM file...")
-    ast = parse_qasm_file(qasm_file)
+    with span("parse") as sp:
+        ast = parse_qasm_file(qasm_file)
+        sp.set(nodes=len(ast.nodes))
     print(f"   ✓ Parsed {len(ast.nodes)} AST nodes")
     
     # 2. Run optimization passes
     print("2. Running optimization passes...")
     original_nodes = len(ast.nodes)
-    ast = superposition_opt(ast)
+    snapshot = (lambda: copy.deepcopy(ast)) if verify_passes else (lambda: None)  # passes edit in place
+    recorder = list if verify_passes else (lambda: None)  # rewritten windows, for check_pass
+    before_ast = snapshot()
+    with span("pass:superposition_opt") as sp:
+        ast = superposition_opt(ast)
+        sp.set(nodes=len(ast.nodes))
     optimized_nodes = len(ast.nodes)
     if optimized_nodes < original_nodes:
         print(f"   ✓ Superposition optimization: {original_nodes} → {optimized_nodes} nodes")
     else:
         print("   ✓ Superposition optimization: no changes")
+    if verify_passes and not check_pass("superposition_opt", before_ast, ast, allow_unverified):
+        return False
+    
+    if zx:
+        before_ast = snapshot()
+        with span("pass:zx_simplify") as sp:
+            before = collect_metrics(ast)
+            ast = zx_simplify(ast)
+            after = collect_metrics(ast)
+            sp.set(nodes=len(ast.nodes))
+        print(f"   ✓ ZX simplification: {before['size']} → {after['size']} gates, "
+              f"depth {before['depth']} → {after['depth']}")
+        if verify_passes and not check_pass("zx_simplify", before_ast, ast, allow_unverified):
+            return False
     
-    ent_map = entanglement_aware_pass(ast)
+    if phase_poly:
+        before_ast = snapshot()
+        with span("pass:phase_polynomial_opt") as sp:
+            before = collect_metrics(ast)
+            windows = recorder()
+            ast = phase_polynomial_opt(ast, windows=windows)
+            after = collect_metrics(ast)
+            sp.set(nodes=len(ast.nodes))
+        print(f"   ✓ Phase-polynomial resynthesis: {before['size']} → {after['size']} gates, "
+              f"two-qubit depth {before['two_qubit_depth']} → {after['two_qubit_depth']}")
+        if verify_passes and not check_pass("phase_polynomial_opt", before_ast, ast, allow_unverified,
+                                            windows):
+            return False
+    
+    if consolidate:
+        before_ast = snapshot()
+        with span("pass:consolidate_blocks") as sp:
+            before = collect_metrics(ast)
+            windows = recorder()
+            ast = consolidate_blocks(ast, windows=windows)
+            after = collect_metrics(ast)
+            sp.set(nodes=len(ast.nodes))
+        print(f"   ✓ Two-qubit block resynthesis: {before['size']} → {after['size']} gates, "
+              f"two-qubit depth {before['two_qubit_depth']} → {after['two_qubit_depth']}")
+        if verify_passes and not check_pass("consolidate_blocks", before_ast, ast, allow_unverified,
+                                            windows):
+            return False
+    
+    with span("pass:entanglement_aware_pass", nodes=len(ast.nodes)):
+        ent_map = entanglement_aware_pass(ast)
     if ent_map:
         print(f"   ✓ Entanglement analysis: {ent_map}")
     else:
         print("   ✓ Entanglement analysis: no entangled qubits")
     
+    if basis:
+        before_ast = snapshot()
+        with span("pass:basis_translation") as sp:
+            before = len(ast.nodes)
+            windows = recorder()
+            ast = translate_ast(ast, basis, windows=windows)
+            sp.set(nodes=len(ast.nodes))
+        print(f"   ✓ Basis translation to {{{', '.join(basis)}}}: {before} → {len(ast.nodes)} nodes")
+        if verify_passes and not check_pass("basis_translation", before_ast, ast, allow_unverified,
+                                            windows):
+            return False
+    
     # 3. Verify AST
     print("3. Verifying AST...")
-    ok, errors = verify_ast(ast)
+    with span("verify", nodes=len(ast.nodes)):
+        ok, errors = verify_ast(ast)
     if not ok:
         print(f"   ❌ Verification failed: {errors}")
         return False
@@ -52,37 +167,63 @@ def run_quantum_compiler(qasm_file):
     
     # 4. Build QIR (Quantum IR)
     print("4. Building Quantum IR...")
-    qir = QIRBuilder()
-    used_qubits = set()
-    for node in ast.nodes:
-        if hasattr(node, 'qubits'):
-            for q in node.qubits:
-                used_qubits.add(q)
-        if hasattr(node, 'qubit'):
-            used_qubits.add(node.qubit)
-    
-    for q in sorted(used_qubits):
-        qir.allocate_qubit(f"q{q}")
-    
-    ir_text = qir.get_ir()
+    with span("qir_build") as sp:
+        qir = QIRBuilder()
+        used_qubits = ast.qubit_indices()
+        for q in used_qubits:
+            qir.allocate_qubit(f"q{q}")
+        try:
+            qir.add_program(ast)
+        except ValueError as e:
+            print(f"   ⚠️  No executable QIR entry point: {e}")
+        
+        ir_text = qir.get_ir()
+        sp.set(qubits=len(used_qubits))
     print(f"   ✓ Generated IR with {len(used_qubits)} qubits")
     
     # 5. Convert to Qiskit circuit
     print("5. Converting to Qiskit circuit...")
-    qc = qir_to_qiskit(ast, qir)
+    with span("to_qiskit") as sp:
+        qc = qir_to_qiskit(ast, qir)
+        sp.set(gates=len(qc.data), qubits=qc.num_qubits)
     print(f"   ✓ Circuit: {qc.num_qubits} qubits, {qc.num_clbits} classical bits, depth={qc.depth()}")
     
     # 6. Emit output files
     print("6. Emitting output files...")
     base_name = os.path.splitext(os.path.basename(qasm_file))[0]
     outfile_prefix = f"output_{base_name}"
-    llf, qasmf, jsonf = emit_outputs(ir_text, qc, outfile_prefix=outfile_prefix)
+    with span("emit"):
+        llf, qasmf, jsonf = emit_outputs(ir_text, qc, outfile_prefix=outfile_prefix, ast=ast)
     print(f"   ✓ Generated: {os.path.basename(llf)}, {os.path.basename(qasmf)}, {os.path.basename(jsonf)}")
+    if stats:
+        with open(jsonf) as f:
+            metrics = json.load(f)  # written by the emit pass; no second sweep over the AST
+        print("📈 Circuit metrics")
+        for line in format_metrics(metrics):
+            print(f"   {line}")
+        try:
+            timing = TimingScheduler().schedule(ast, "alap")
+        except ValueError as e:
+            print(f"   schedule: not static ({e})")
+        else:
+            idle = timing["idle_ns"]
+            print(f"   schedule (ALAP): {timing['duration_ns']:.0f} ns in {timing['num_layers']} layers, "
+                  f"mean idle {sum(idle) / max(len(idle), 1):.0f} ns per qubit")
     
     # 7. Execute on simulator
     print("7. Executing on quantum simulator...")
+    from src.execution.hybrid_executor import HybridExecutor, SimulationMemoryError  # pulls in qiskit_aer
     executor = HybridExecutor(shots=1024)
-    result = executor.run(qc)
+    try:
+        plan = executor.plan(qc)
+    except SimulationMemoryError as e:
+        print(f"   ❌ Simulation refused: {e}")
+        return False
+    method = plan['method'] or 'automatic'
+    print(f"   ✓ Estimated simulator memory: {format_size(plan['estimate_bytes'])} ({method})")
+    with span("execute", qubits=qc.num_qubits, method=method) as sp:
+        result = executor.run(qc)
+        sp.set(shots=result['shots'])
     print(f"   ✓ Simulation complete: runtime={result['runtime']:.3f}s, shots={result['shots']}")
     print(f"   📊 Results: {result['counts']}")
     
@@ -91,8 +232,22 @@ def run_quantum_compiler(qasm_file):
     return True
 
 def main():
-    if len(sys.argv) > 1:
-        qasm_file = sys.argv[1]
+    stats = "--stats" in sys.argv
+    zx = "--zx" in sys.argv
+    consolidate = "--consolidate" in sys.argv
+    phase_poly = "--phase-poly" in sys.argv
+    verify_passes = "--verify-passes" in sys.argv
+    allow_unverified = "--allow-unverified" in sys.argv
+    args = [a for a in sys.argv[1:]
+            if a not in ("--stats", "--zx", "--consolidate", "--phase-poly", "--verify-passes",
+                         "--allow-unverified")]
+    basis = None
+    if "--basis" in args:
+        at = args.index("--basis")
+        basis = [g for g in args[at + 1].split(",") if g]
+        del args[at:at + 2]
+    if args:
+        qasm_file = args[0]
     else:
         # Default to teleport example
         qasm_file = "examples/teleport.qasm"
@@ -108,7 +263,10 @@ def main():
         return 1
     
     try:
-        success = run_quantum_compiler(qasm_file)
+        success = run_quantum_compiler(qasm_file, stats=stats, basis=basis, zx=zx,
+                                       consolidate=consolidate, phase_poly=phase_poly,
+                                       verify_passes=verify_passes,
+                                       allow_unverified=allow_unverified)
         return 0 if success else 1
     except Exception as e:
         print(f"❌ Error: {e}")
@@ -0,0 +1,299 @@
+"""
+Gate decomposition library and memoized basis translation.
+
+    translator = get_translator(('rz', 'sx', 'x', 'cx'))
+    translator.translate('cp', [0.5])   # ((gate, local qubits, params), ...) in the basis
+    ast = translate_ast(ast, ('h', 'cx', 'rz'))
+
+EQUIVALENCES maps a gate name to its arity, parameter count and alternative
+definitions in terms of other gates, each equal to the gate up to a global
+phase. For a target basis, BasisTranslator relaxes over the library once
+(shortest path, cost = number of basis gates), so every gate expands through
+its cheapest chain of definitions. The expansion is kept as a template over
+placeholder parameters; translate() only substitutes values, and memoizes the
+result per (gate, params) in an LRU of CACHE_SIZE entries, so distinct angles
+in a long-running process do not grow it without bound. Translators are
+cached per basis.
+"""
+import math
+from collections import OrderedDict
+from dataclasses import replace
+
+from ..frontend.ast_nodes import ForLoopNode, GateNode, IfNode, ParamExpr, QuantumAST, WhileLoopNode
+
+pi = math.pi
+
+# Operations that are never decomposed and belong to every basis
+PASSTHROUGH = frozenset({'measure', 'reset', 'barrier'})
+
+# name -> (num_qubits, num_params, [definition(params) -> [(gate, qubits, params)]])
+EQUIVALENCES = {}
+
+_TRANSLATORS = {}  # frozenset(basis) -> BasisTranslator
+
+CACHE_SIZE = 4096  # memoized translations per translator
+
+
+def register_equivalence(name, num_qubits, num_params, definition):
+    """Add an alternative definition of `name`: definition(params) -> [(gate, qubits, params)]"""
+    entry = EQUIVALENCES.setdefault(name, (num_qubits, num_params, []))
+    if entry[:2] != (num_qubits, num_params):
+        raise ValueError(f"gate '{name}' is registered with {entry[0]} qubits and {entry[1]} parameters")
+    entry[2].append(definition)
+    _TRANSLATORS.clear()
+
+
+def _define(name, num_qubits, num_params, *definitions):
+    for definition in definitions:
+        register_equivalence(name, num_qubits, num_params, definition)
+
+
+# -- single-qubit gates --------------------------------------------------------------
+_define('id', 1, 0, lambda p: [])
+_define('x', 1, 0,
+        lambda p: [('rx', (0,), (pi,))],
+        lambda p: [('sx', (0,), ()), ('sx', (0,), ())],
+        lambda p: [('h', (0,), ()), ('z', (0,), ()), ('h', (0,), ())],
+        lambda p: [('u3', (0,), (pi, 0.0, pi))])
+_define('y', 1, 0,
+        lambda p: [('ry', (0,), (pi,))],
+        lambda p: [('z', (0,), ()), ('x', (0,), ())],
+        lambda p: [('u3', (0,), (pi, pi / 2, pi / 2))])
+_define('z', 1, 0,
+        lambda p: [('rz', (0,), (pi,))],
+        lambda p: [('s', (0,), ()), ('s', (0,), ())],
+        lambda p: [('h', (0,), ()), ('x', (0,), ()), ('h', (0,), ())],
+        lambda p: [('p', (0,), (pi,))])
+_define('h', 1, 0,
+        lambda p: [('rz', (0,), (pi / 2,)), ('sx', (0,), ()), ('rz', (0,), (pi / 2,))],
+        lambda p: [('ry', (0,), (pi / 2,)), ('x', (0,), ())],
+        lambda p: [('u3', (0,), (pi / 2, 0.0, pi))])
+_define('s', 1, 0,
+        lambda p: [('rz', (0,), (pi / 2,))],
+        lambda p: [('t', (0,), ()), ('t', (0,), ())],
+        lambda p: [('p', (0,), (pi / 2,))])
+_define('sdg', 1, 0,
+        lambda p: [('rz', (0,), (-pi / 2,))],
+        lambda p: [('tdg', (0,), ()), ('tdg', (0,), ())],
+        lambda p: [('p', (0,), (-pi / 2,))])
+_define('t', 1, 0,
+        lambda p: [('rz', (0,), (pi / 4,))],
+        lambda p: [('p', (0,), (pi / 4,))])
+_define('tdg', 1, 0,
+        lambda p: [('rz', (0,), (-pi / 4,))],
+        lambda p: [('p', (0,), (-pi / 4,))])
+_define('sx', 1, 0,
+        lambda p: [('rx', (0,), (pi / 2,))],
+        lambda p: [('sdg', (0,), ()), ('h', (0,), ()), ('sdg', (0,), ())],
+        lambda p: [('u3', (0,), (pi / 2, -pi / 2, pi / 2))])
+_define('sxdg', 1, 0,
+        lambda p: [('rx', (0,), (-pi / 2,))],
+        lambda p: [('s', (0,), ()), ('h', (0,), ()), ('s', (0,), ())])
+_define('rx', 1, 1,
+        lambda p: [('h', (0,), ()), ('rz', (0,), (p[0],)), ('h', (0,), ())],
+        lambda p: [('rz', (0,), (pi / 2,)), ('ry', (0,), (p[0],)), ('rz', (0,), (-pi / 2,))],
+        lambda p: [('u3', (0,), (p[0], -pi / 2, pi / 2))])
+_define('ry', 1, 1,
+        lambda p: [('sx', (0,), ()), ('rz', (0,), (p[0],)), ('sxdg', (0,), ())],
+        lambda p: [('sdg', (0,), ()), ('rx', (0,), (p[0],)), ('s', (0,), ())],
+        lambda p: [('u3', (0,), (p[0], 0.0, 0.0))])
+_define('rz', 1, 1,
+        lambda p: [('p', (0,), (p[0],))],
+        lambda p: [('h', (0,), ()), ('rx', (0,), (p[0],)), ('h', (0,), ())],
+        lambda p: [('rx', (0,), (-pi / 2,)), ('ry', (0,), (p[0],)), ('rx', (0,), (pi / 2,))])
+_define('p', 1, 1,
+        lambda p: [('rz', (0,), (p[0],))],
+        lambda p: [('u1', (0,), (p[0],))],
+        lambda p: [('u3', (0,), (0.0, 0.0, p[0]))])
+_define('u1', 1, 1, lambda p: [('p', (0,), (p[0],))])
+_define('u2', 1, 2, lambda p: [('u3', (0,), (pi / 2, p[0], p[1]))])
+_define('u3', 1, 3,
+        # Euler forms: ZYZ, ZXZ and ZSX (operator order: the first entry acts first)
+        lambda p: [('rz', (0,), (p[2],)), ('ry', (0,), (p[0],)), ('rz', (0,), (p[1],))],
+        lambda p: [('rz', (0,), (p[2] - pi / 2,)), ('rx', (0,), (p[0],)),
+                   ('rz', (0,), (p[1] + pi / 2,))],
+        lambda p: [('rz', (0,), (p[2],)), ('sx', (0,), ()), ('rz', (0,), (p[0] + pi,)),
+                   ('sx', (0,), ()), ('rz', (0,), (p[1] + pi,))],
+        lambda p: [('u', (0,), tuple(p))])
+_define('u', 1, 3, lambda p: [('u3', (0,), tuple(p))])
+
+# -- two- and three-qubit gates --------------------------------------------------------
+_define('cx', 2, 0,
+        lambda p: [('h', (1,), ()), ('cz', (0, 1), ()), ('h', (1,), ())],
+        lambda p: [('ry', (0,), (pi / 2,)), ('rxx', (0, 1), (pi / 2,)), ('rx', (0,), (-pi / 2,)),
+                   ('rx', (1,), (-pi / 2,)), ('ry', (0,), (-pi / 2,))])
+_define('cz', 2, 0,
+        lambda p: [('h', (1,), ()), ('cx', (0, 1), ()), ('h', (1,), ())],
+        lambda p: [('cp', (0, 1), (pi,))])
+_define('cy', 2, 0,
+        lambda p: [('sdg', (1,), ()), ('cx', (0, 1), ()), ('s', (1,), ())])
+_define('ch', 2, 0,
+        lambda p: [('s', (1,), ()), ('h', (1,), ()), ('t', (1,), ()), ('cx', (0, 1), ()),
+                   ('tdg', (1,), ()), ('h', (1,), ()), ('sdg', (1,), ())])
+_define('swap', 2, 0,
+        lambda p: [('cx', (0, 1), ()), ('cx', (1, 0), ()), ('cx', (0, 1), ())])
+_define('iswap', 2, 0,
+        lambda p: [('s', (0,), ()), ('s', (1,), ()), ('h', (0,), ()), ('cx', (0, 1), ()),
+                   ('cx', (1, 0), ()), ('h', (1,), ())])
+_define('ecr', 2, 0,
+        lambda p: [('s', (0,), ()), ('sx', (1,), ()), ('cx', (0, 1), ()), ('x', (0,), ())])
+_define('cp', 2, 1,
+        lambda p: [('p', (0,), (p[0] / 2,)), ('cx', (0, 1), ()), ('p', (1,), (-p[0] / 2,)),
+                   ('cx', (0, 1), ()), ('p', (1,), (p[0] / 2,))])
+_define('cu1', 2, 1, lambda p: [('cp', (0, 1), (p[0],))])
+_define('crz', 2, 1,
+        lambda p: [('rz', (1,), (p[0] / 2,)), ('cx', (0, 1), ()), ('rz', (1,), (-p[0] / 2,)),
+                   ('cx', (0, 1), ())])
+_define('cry', 2, 1,
+        lambda p: [('ry', (1,), (p[0] / 2,)), ('cx', (0, 1), ()), ('ry', (1,), (-p[0] / 2,)),
+                   ('cx', (0, 1), ())])
+_define('crx', 2, 1,
+        lambda p: [('s', (1,), ()), ('cx', (0, 1), ()), ('ry', (1,), (-p[0] / 2,)),
+                   ('cx', (0, 1), ()), ('u3', (1,), (p[0] / 2, -pi / 2, 0.0))])
+_define('cu3', 2, 3,
+        lambda p: [('p', (0,), ((p[2] + p[1]) / 2,)), ('p', (1,), ((p[2] - p[1]) / 2,)),
+                   ('cx', (0, 1), ()), ('u3', (1,), (-p[0] / 2, 0.0, -(p[1] + p[2]) / 2)),
+                   ('cx', (0, 1), ()), ('u3', (1,), (p[0] / 2, p[1], 0.0))])
+_define('rzz', 2, 1,
+        lambda p: [('cx', (0, 1), ()), ('rz', (1,), (p[0],)), ('cx', (0, 1), ())],
+        lambda p: [('h', (0,), ()), ('h', (1,), ()), ('rxx', (0, 1), (p[0],)),
+                   ('h', (0,), ()), ('h', (1,), ())])
+_define('rxx', 2, 1,
+        lambda p: [('h', (0,), ()), ('h', (1,), ()), ('rzz', (0, 1), (p[0],)),
+                   ('h', (0,), ()), ('h', (1,), ())])
+_define('ryy', 2, 1,
+        lambda p: [('rx', (0,), (pi / 2,)), ('rx', (1,), (pi / 2,)), ('rzz', (0, 1), (p[0],)),
+                   ('rx', (0,), (-pi / 2,)), ('rx', (1,), (-pi / 2,))])
+_define('ccx', 3, 0,
+        lambda p: [('h', (2,), ()), ('cx', (1, 2), ()), ('tdg', (2,), ()), ('cx', (0, 2), ()),
+                   ('t', (2,), ()), ('cx', (1, 2), ()), ('tdg', (2,), ()), ('cx', (0, 2), ()),
+                   ('t', (1,), ()), ('t', (2,), ()), ('h', (2,), ()), ('cx', (0, 1), ()),
+                   ('t', (0,), ()), ('tdg', (1,), ()), ('cx', (0, 1), ())])
+_define('ccz', 3, 0,
+        lambda p: [('h', (2,), ()), ('ccx', (0, 1, 2), ()), ('h', (2,), ())])
+_define('cswap', 3, 0,
+        lambda p: [('cx', (2, 1), ()), ('ccx', (0, 1, 2), ()), ('cx', (2, 1), ())])
+
+
+# placeholder symbols the templates are expressed in
+_PLACEHOLDERS = tuple(ParamExpr.symbol(f"__p{k}") for k in range(4))
+
+
+def _substitute(value, values):
+    return value.substitute(values) if isinstance(value, ParamExpr) else value
+
+
+class BasisTranslator:
+    """Cheapest expansion of every library gate into `basis`, memoized per (gate, params)"""
+
+    def __init__(self, basis):
+        self.basis = frozenset(name.lower() for name in basis) | PASSTHROUGH
+        self._choice = self._search()
+        self._templates = {}
+        self._cache = OrderedDict()  # (gate, params) -> steps, least recently used first
+
+    def _search(self):
+        """Relax costs over the library until no gate finds a cheaper definition"""
+        cost = dict.fromkeys(self.basis, 1)
+        choice = {}
+        candidates = [(name, definition(_PLACEHOLDERS[:num_params]))
+                      for name, (_, num_params, definitions) in EQUIVALENCES.items()
+                      if name not in self.basis for definition in definitions]
+        changed = True
+        while changed:
+            changed = False
+            for name, steps in candidates:
+                if all(gate in cost for gate, _, _ in steps):
+                    total = sum(cost[gate] for gate, _, _ in steps)
+                    if total < cost.get(name, math.inf):
+                        cost[name], choice[name] = total, steps
+                        changed = True
+        return choice
+
+    def supports(self, name):
+        return name.lower() in self.basis or name.lower() in self._choice
+
+    def _template(self, name):
+        """Expansion of `name` over placeholder parameters, all gates in the basis"""
+        template = self._templates.get(name)
+        if template is None:
+            template = []
+            for gate, qubits, params in self._choice[name]:
+                if gate in self.basis:
+                    template.append((gate, qubits, tuple(params)))
+                    continue
+                values = {p.terms[0][0]: v for p, v in zip(_PLACEHOLDERS, params)}
+                for sub, sub_qubits, sub_params in self._template(gate):
+                    template.append((sub, tuple(qubits[q] for q in sub_qubits),
+                                     tuple(_substitute(v, values) for v in sub_params)))
+            template = self._templates[name] = tuple(template)
+        return template
+
+    def translate(self, name, params=()):
+        """((gate, local qubit indices, params), ...) equal to `name` up to global phase.
+
+        Local indices select from the gate's operands; None (basis gates) means all of them.
+        """
+        key = (name, tuple(params))
+        steps = self._cache.get(key)
+        if steps is not None:
+            self._cache.move_to_end(key)
+            return steps
+        gate = name.lower()
+        if gate in self.basis:
+            steps = ((gate, None, key[1]),)
+        elif gate in self._choice:
+            num_qubits, num_params, _ = EQUIVALENCES[gate]
+            if len(key[1]) != num_params:
+                raise ValueError(f"gate '{name}' takes {num_params} parameters, got {len(key[1])}")
+            values = {p.terms[0][0]: v for p, v in zip(_PLACEHOLDERS, key[1])}
+            steps = tuple((sub, qubits, tuple(_substitute(v, values) for v in sub_params))
+                          for sub, qubits, sub_params in self._template(gate))
+        elif gate in EQUIVALENCES:
+            raise ValueError(f"gate '{name}' cannot be expressed in basis {sorted(self.basis)}")
+        else:
+            raise ValueError(f"unknown gate '{name}'")
+        self._cache[key] = steps
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return steps
+
+
+def get_translator(basis):
+    """Shared BasisTranslator for `basis` (any iterable of gate names)"""
+    key = frozenset(name.lower() for name in basis)
+    translator = _TRANSLATORS.get(key)
+    if translator is None:
+        translator = _TRANSLATORS[key] = BasisTranslator(key)
+    return translator
+
+
+def translate_nodes(nodes, translator, windows=None):
+    out = []
+    append = out.append
+    for node in nodes:
+        if isinstance(node, GateNode):
+            qubits = node.qubits
+            steps = translator.translate(node.name, node.params)
+            start = len(out)
+            for gate, local, params in steps:
+                append(GateNode(gate, list(qubits) if local is None else [qubits[q] for q in local],
+                                list(params)))
+            if windows is not None and (len(steps) != 1 or steps[0][1] is not None):
+                windows.append(([node], out[start:]))
+        elif isinstance(node, (ForLoopNode, WhileLoopNode)):
+            append(replace(node, body=translate_nodes(node.body, translator, windows)))
+        elif isinstance(node, IfNode):
+            append(replace(node, then_body=translate_nodes(node.then_body, translator, windows),
+                               else_body=translate_nodes(node.else_body, translator, windows)))
+        else:
+            append(node)
+    return out
+
+
+def translate_ast(ast, basis, windows=None):
+    """New QuantumAST with every gate expanded into `basis`; ValueError if one cannot be.
+
+    `windows`, if a list, receives ([original node], expansion) for every gate that
+    was expanded (see passes.consolidate_blocks)."""
+    return QuantumAST(translate_nodes(ast.nodes, get_translator(basis), windows))
@@ -1,22 +1,152 @@
 """
 Emitter: write output artifacts: textual IR, QASM, and optional JSON profile.
+
+Supported `formats`:
+- 'll'           textual LLVM IR
+- 'bc'           LLVM bitcode (via llvmlite.binding)
+- 'qasm'         OpenQASM 2 text (OpenQASM 3 when the circuit has control flow
+                 or symbolic parameters)
+- 'json'         metadata, indented (depth, gate counts, two-qubit depth when
+                 emitting from a QuantumAST)
+- 'json-compact' metadata, no whitespace (same .json path as 'json')
+- 'qcb'          compact binary circuit (see write_circuit_binary)
+
+Every artifact is written buffered to a temp file and renamed into place.
 """
 import json
+import struct
+
+from ..utils.helpers import atomic_write
+
+DEFAULT_FORMATS = ('ll', 'qasm', 'json')
+
+_EXTENSIONS = {
+    'll': '.ll',
+    'bc': '.bc',
+    'qasm': '.qasm',
+    'json': '.json',
+    'json-compact': '.json',
+    'qcb': '.qcb',
+}
+
+# qcb layout (little endian):
+#   header  : magic, num_qubits, num_clbits, num_names, num_ops
+#   names   : num_names x (u16 length, utf-8 bytes)
+#   ops     : name index u16, nqubits u8, nclbits u8, nparams u8,
+#             then u32 qubits, u32 clbits, f64 params
+# QCB1 files (u8 name lengths) are still read.
+QCB_MAGIC = b"QCB2"
+_QCB1_MAGIC = b"QCB1"
+_QCB_HEADER = struct.Struct("<4sIIII")
+_QCB_OP = struct.Struct("<HBBB")
+
+
+def write_circuit_binary(qiskit_circuit) -> bytes:
+    """Serialize a QuantumCircuit into the compact qcb format; parameters must be bound."""
+    qindex = {q: i for i, q in enumerate(qiskit_circuit.qubits)}
+    cindex = {c: i for i, c in enumerate(qiskit_circuit.clbits)}
+    names = {}
+    body = bytearray()
+    nops = 0
+    for instr in qiskit_circuit.data:
+        op = instr.operation
+        name_idx = names.setdefault(op.name, len(names))
+        qubits = [qindex[q] for q in instr.qubits]
+        clbits = [cindex[c] for c in instr.clbits]
+        try:
+            params = [float(p) for p in op.params]
+        except (TypeError, ValueError):
+            raise ValueError(f"qcb cannot encode the parameters of '{op.name}' {op.params}: "
+                             "bind symbolic parameters first") from None
+        body += _QCB_OP.pack(name_idx, len(qubits), len(clbits), len(params))
+        body += struct.pack(f"<{len(qubits)}I{len(clbits)}I{len(params)}d", *qubits, *clbits, *params)
+        nops += 1
+
+    out = bytearray(_QCB_HEADER.pack(QCB_MAGIC, qiskit_circuit.num_qubits,
+                                     qiskit_circuit.num_clbits, len(names), nops))
+    for name in names:
+        raw = name.encode("utf-8")
+        out += struct.pack("<H", len(raw)) + raw
+    out += body
+    return bytes(out)
+
+
+def read_circuit_binary(data: bytes) -> dict:
+    """Decode a qcb blob into {'num_qubits', 'num_clbits', 'ops'}; ops are (name, qubits, clbits, params)."""
+    magic, nq, nc, nnames, nops = _QCB_HEADER.unpack_from(data, 0)
+    if magic not in (QCB_MAGIC, _QCB1_MAGIC):
+        raise ValueError("not a qcb circuit file")
+    width = 2 if magic == QCB_MAGIC else 1
+    pos = _QCB_HEADER.size
+    names = []
+    for _ in range(nnames):
+        length = int.from_bytes(data[pos:pos + width], "little")
+        names.append(data[pos + width:pos + width + length].decode("utf-8"))
+        pos += width + length
+    ops = []
+    for _ in range(nops):
+        name_idx, oq, oc, op = _QCB_OP.unpack_from(data, pos)
+        pos += _QCB_OP.size
+        fmt = f"<{oq}I{oc}I{op}d"
+        vals = struct.unpack_from(fmt, data, pos)
+        pos += struct.calcsize(fmt)
+        ops.append((names[name_idx], list(vals[:oq]), list(vals[oq:oq + oc]), list(vals[oq + oc:])))
+    return {"num_qubits": nq, "num_clbits": nc, "ops": ops}
+
+
+def emit_outputs(ir_text: str, qiskit_circuit, outfile_prefix="output", formats=DEFAULT_FORMATS, ast=None):
+    """Write the requested artifacts and return their paths in `formats` order.
+
+    With `ast`, 'qasm' and 'json' are streamed from the QuantumAST by
+    QASMWriter and `qiskit_circuit` may be None. The metrics come from the
+    same pass that writes the text.
+    """
+    unknown = [f for f in formats if f not in _EXTENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown output format(s): {unknown}")
+    if 'json' in formats and 'json-compact' in formats:
+        raise ValueError("'json' and 'json-compact' write the same file; pick one")
+    if qiskit_circuit is None and (ast is None or 'qcb' in formats):
+        raise ValueError("a qiskit circuit is required" + (" for 'qcb'" if ast is not None else ""))
 
-def emit_outputs(ir_text: str, qiskit_circuit, outfile_prefix="output"):
-    # Fix for newer Qiskit versions - use qasm() method from qiskit.qasm2
-    from qiskit import qasm2
-    qasm = qasm2.dumps(qiskit_circuit)
-    with open(f"{outfile_prefix}.ll", "w") as f:
-        f.write(ir_text)
-    with open(f"{outfile_prefix}.qasm", "w") as f:
-        f.write(qasm)
-    # simple metrics file
-    meta = {
-        "num_qubits": qiskit_circuit.num_qubits,
-        "num_clbits": qiskit_circuit.num_clbits,
-        "depth": qiskit_circuit.depth()
-    }
-    with open(f"{outfile_prefix}.json", "w") as f:
-        json.dump(meta, f, indent=2)
-    return f"{outfile_prefix}.ll", f"{outfile_prefix}.qasm", f"{outfile_prefix}.json"
+    paths = []
+    meta = None
+    for fmt in formats:
+        path = f"{outfile_prefix}{_EXTENSIONS[fmt]}"
+        if fmt == 'll':
+            atomic_write(path, ir_text)
+        elif fmt == 'bc':
+            from .llvm_integration import ir_to_bitcode
+            atomic_write(path, ir_to_bitcode(ir_text))
+        elif fmt == 'qasm' and ast is not None:
+            from .qasm_writer import QASMWriter
+            writer = QASMWriter(ast)
+            atomic_write(path, writer.chunks())
+            meta = writer.metrics.result()
+        elif fmt == 'qasm':
+            # Fix for newer Qiskit versions - use qasm() method from qiskit.qasm2
+            from qiskit import qasm2, qasm3
+            from qiskit.circuit import ControlFlowOp
+            if any(isinstance(instr.operation, ControlFlowOp) for instr in qiskit_circuit.data):
+                atomic_write(path, qasm3.dumps(qiskit_circuit))
+            else:
+                atomic_write(path, qasm2.dumps(qiskit_circuit))
+        elif fmt == 'qcb':
+            atomic_write(path, write_circuit_binary(qiskit_circuit))
+        else:
+            # simple metrics file
+            if meta is None and ast is not None:
+                from .metrics import collect_metrics
+                meta = collect_metrics(ast)
+            elif meta is None:
+                meta = {
+                    "num_qubits": qiskit_circuit.num_qubits,
+                    "num_clbits": qiskit_circuit.num_clbits,
+                    "depth": qiskit_circuit.depth()
+                }
+            if fmt == 'json':
+                atomic_write(path, json.dumps(meta, indent=2))
+            else:
+                atomic_write(path, json.dumps(meta, separators=(',', ':')))
+        paths.append(path)
+    return tuple(paths)
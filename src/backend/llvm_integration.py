@@ -5,6 +5,30 @@ For prototype: convert QIR metadata into a qiskit circuit via transpiler.
 from ..ir.qir_builder import QIRBuilder
 from ..backend.transpiler import ast_to_qiskit_circuit
 
+_LLVM_READY = False
+
 def qir_to_qiskit(ast, qir_builder=None):
     # Simplified path: AST -> qiskit circuit
     return ast_to_qiskit_circuit(ast)
+
+def init_llvm_binding():
+    """Initialize llvmlite.binding once per process and return the module."""
+    global _LLVM_READY
+    import llvmlite.binding as llvm
+    if not _LLVM_READY:
+        try:
+            llvm.initialize()
+        except RuntimeError:
+            # newer llvmlite initializes itself and rejects the explicit call
+            pass
+        llvm.initialize_native_target()
+        llvm.initialize_native_asmprinter()
+        _LLVM_READY = True
+    return llvm
+
+def ir_to_bitcode(ir_text: str) -> bytes:
+    """Parse and verify textual LLVM IR, returning the LLVM bitcode bytes."""
+    llvm = init_llvm_binding()
+    mod = llvm.parse_assembly(ir_text)
+    mod.verify()
+    return mod.as_bitcode()
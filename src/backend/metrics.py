@@ -0,0 +1,150 @@
+"""
+Single-pass circuit metrics over a QuantumAST.
+
+    metrics = collect_metrics(ast)   # or QASMWriter(ast).write(f), which fills the same dict
+
+One O(n) sweep keeps per-wire frontier arrays: the current layer, the
+two-qubit layer, the busy count, and the chain of operations on the longest
+path into the wire. It reports:
+
+- depth, two_qubit_depth, size and gate_counts, with the conventions of
+  QuantumCircuit.depth()/count_ops() on the circuit ast_to_qiskit_circuit
+  builds. Barriers do not count, and measurements occupy their classical bit.
+- critical_path: the length and gate histogram of one longest dependency chain
+- idle_fraction: per qubit, the share of the depth's layers with no
+  operation on that qubit
+- simulation_memory: the statevector size, using the HybridExecutor model
+  (complex128 amplitudes plus one working copy)
+
+For loops count once per iteration. A while loop or if/else is a single
+operation over every wire it touches, as in the qiskit conversion.
+"""
+from ..frontend.ast_nodes import (ForLoopNode, IfNode, MeasureNode, WhileLoopNode, index_bounds,
+                                  resolve, value_range)
+
+STATEVECTOR_BYTES_PER_AMPLITUDE = 2 * 16  # see hybrid_executor.estimate_simulation_memory
+
+
+class CircuitMetrics:
+    """Frontier arrays updated one operation at a time"""
+
+    def __init__(self, num_qubits, num_clbits):
+        wires = num_qubits + num_clbits  # clbit c is wire num_qubits + c
+        self.levels = [0] * wires
+        self.two_qubit_levels = [0] * wires
+        # (gate name, chain it extends): the longest path ending at each wire
+        self.chains = [None] * wires
+        self.busy = [0] * num_qubits
+        self.num_qubits = num_qubits
+        self.num_clbits = num_clbits
+        self.gate_counts = {}
+        self.size = 0
+
+    @classmethod
+    def for_ast(cls, ast):
+        """Sized like ast_to_qiskit_circuit's circuit (same classical bit numbering)"""
+        num_qubits = max(ast.qubit_indices(), default=-1) + 1
+        if ast.has_control_flow():
+            return cls(num_qubits, ast.num_clbits())
+        return cls(num_qubits, sum(isinstance(node, MeasureNode) for node in ast.nodes))
+
+    def add(self, name, qubits, clbits=()):
+        counts = self.gate_counts
+        counts[name] = counts.get(name, 0) + 1
+        if name == 'barrier':
+            return
+        self.size += 1
+        levels, two, chains, busy = self.levels, self.two_qubit_levels, self.chains, self.busy
+        if not clbits and len(qubits) == 1:
+            q = qubits[0]
+            levels[q] += 1
+            chains[q] = (name, chains[q])
+            busy[q] += 1
+            return
+        if not clbits and len(qubits) == 2:
+            a, b = qubits
+            deeper = a if levels[a] >= levels[b] else b
+            levels[a] = levels[b] = levels[deeper] + 1
+            chains[a] = chains[b] = (name, chains[deeper])
+            two[a] = two[b] = max(two[a], two[b]) + 1
+            busy[a] += 1
+            busy[b] += 1
+            return
+        wires = list(qubits) + [self.num_qubits + c for c in clbits]
+        deeper = max(wires, key=levels.__getitem__)
+        level = levels[deeper] + 1
+        link = (name, chains[deeper])
+        two_level = max(two[w] for w in wires) + (len(qubits) == 2)
+        for w in wires:
+            levels[w] = level
+            two[w] = two_level
+            chains[w] = link
+        for q in qubits:
+            busy[q] += 1
+
+    def add_node(self, node, env=None):
+        """Account a gate, measurement or control-flow node; `env` binds loop variables"""
+        env = env or {}
+        if isinstance(node, ForLoopNode):
+            for value in node.iterations():
+                inner = dict(env, **{node.var: value})
+                for child in node.body:
+                    self.add_node(child, inner)
+        elif isinstance(node, (WhileLoopNode, IfNode)):
+            qubits, clbits = set(), set()
+            for child, bounds in index_bounds([node]):
+                cbits = list(child.condition.cbits) if isinstance(child, (WhileLoopNode, IfNode)) else []
+                operands = list(getattr(child, 'qubits', ()))
+                if isinstance(child, MeasureNode):
+                    operands.append(child.qubit)
+                    cbits.append(child.cbit)
+                for q in operands:
+                    qubits.update(_span(q, env, bounds))
+                for c in cbits:
+                    clbits.update(_span(c, env, bounds))
+            name = 'while_loop' if isinstance(node, WhileLoopNode) else 'if_else'
+            self.add(name, sorted(qubits), sorted(clbits))
+        elif isinstance(node, MeasureNode):
+            self.add('measure', [int(resolve(node.qubit, env))], [int(resolve(node.cbit, env))])
+        else:
+            self.add(node.name, [int(resolve(q, env)) for q in node.qubits])
+
+    def result(self):
+        depth = max(self.levels, default=0)
+        path = {}
+        link = self.chains[self.levels.index(depth)] if depth else None
+        while link is not None:
+            name, link = link
+            path[name] = path.get(name, 0) + 1
+        idle = [round(1 - b / depth, 4) if depth else 0.0 for b in self.busy]
+        return {"num_qubits": self.num_qubits, "num_clbits": self.num_clbits,
+                "depth": depth,
+                "two_qubit_depth": max(self.two_qubit_levels, default=0),
+                "size": self.size, "gate_counts": dict(sorted(self.gate_counts.items())),
+                "critical_path": {"length": depth, "gate_counts": dict(sorted(path.items()))},
+                "idle_fraction": {"mean": round(sum(idle) / len(idle), 4) if idle else 0.0,
+                                  "per_qubit": idle},
+                "simulation_memory": {
+                    "statevector_bytes": STATEVECTOR_BYTES_PER_AMPLITUDE * 2 ** self.num_qubits}}
+
+
+def _span(value, env, bounds):
+    lo, hi = value_range(resolve(value, env), bounds)
+    return range(lo, hi + 1)
+
+
+def collect_metrics(ast):
+    """All metrics of `ast` in one sweep, without producing any text"""
+    metrics = CircuitMetrics.for_ast(ast)
+    if ast.has_control_flow():
+        for node in ast.nodes:
+            metrics.add_node(node)
+        return metrics.result()
+    add, clbit = metrics.add, 0
+    for node in ast.nodes:
+        if isinstance(node, MeasureNode):
+            add('measure', [node.qubit], [clbit])
+            clbit += 1
+        else:
+            add(node.name, node.qubits)
+    return metrics.result()
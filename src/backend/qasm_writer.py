@@ -0,0 +1,213 @@
+"""
+Streaming OpenQASM 2/3 writer straight from QuantumAST (no qiskit circuit).
+
+    writer = QASMWriter(ast)             # version=None: 3 if the AST needs it, else 2
+    with open("out.qasm", "w") as f:
+        metrics = writer.write(f)        # see backend.metrics for the fields
+
+Text is produced in chunks of CHUNK_LINES statements, so memory stays flat
+however large the circuit is. CircuitMetrics is fed in the same pass.
+
+Loops stay rolled in the QASM 3 text. QASM 2 output is only possible for
+ASTs without control flow or symbolic parameters.
+
+Gates outside the standard include (qelib1.inc or stdgates.inc) get a `gate`
+definition in the header, expanded into included gates by the decomposition
+library; a gate it does not know raises ValueError.
+"""
+from ..frontend.ast_nodes import (ForLoopNode, GateNode, IfNode, MeasureNode, ParamExpr, WhileLoopNode,
+                                  is_symbolic, walk)
+from .decompositions import PASSTHROUGH, get_translator
+from .metrics import CircuitMetrics
+
+CHUNK_LINES = 4096
+
+# gates the standard include files define. For qelib1.inc this is the OpenQASM 2
+# paper's set plus the extras qiskit's loader (QuantumCircuit.from_qasm_file, and
+# so parse_qasm_file) treats as builtins: redefining those shifts its gate names.
+INCLUDED_GATES = {
+    2: frozenset({'u3', 'u2', 'u1', 'cx', 'id', 'x', 'y', 'z', 'h', 's', 'sdg', 't', 'tdg',
+                  'rx', 'ry', 'rz', 'cz', 'cy', 'ch', 'ccx', 'crz', 'cu1', 'cu3',
+                  'u0', 'u', 'p', 'sx', 'sxdg', 'swap', 'cswap', 'crx', 'cry', 'cp', 'csx',
+                  'cu', 'rxx', 'rzz', 'rccx', 'rc3x', 'c3x', 'c3sqrtx', 'c4x'}),
+    3: frozenset({'p', 'x', 'y', 'z', 'h', 's', 'sdg', 't', 'tdg', 'sx', 'rx', 'ry', 'rz',
+                  'cx', 'cy', 'cz', 'cp', 'crx', 'cry', 'crz', 'ch', 'swap', 'ccx', 'cswap',
+                  'cu', 'phase', 'cphase', 'id', 'u1', 'u2', 'u3'}),
+}
+
+
+def _format_index(value):
+    """Integer index, possibly affine in loop variables: 2*i + 1"""
+    if not is_symbolic(value):
+        return str(int(value))
+    parts = []
+    for name, coeff in value.terms:
+        coeff = int(coeff)
+        term = name if abs(coeff) == 1 else f"{abs(coeff)}*{name}"
+        if parts:
+            parts.append(f"{'-' if coeff < 0 else '+'} {term}")
+        else:
+            parts.append(term if coeff > 0 else f"-{term}")
+    if value.const:
+        parts.append(f"{'-' if value.const < 0 else '+'} {abs(int(value.const))}")
+    return " ".join(parts)
+
+
+def _format_param(value):
+    return str(value) if is_symbolic(value) else repr(float(value))
+
+
+class QASMWriter:
+    """Serializes a QuantumAST as OpenQASM text, accumulating CircuitMetrics on the way."""
+
+    def __init__(self, ast, version=None, chunk_lines=CHUNK_LINES):
+        self.ast = ast
+        self.flow = ast.has_control_flow()
+        self.parameters = ast.parameters()
+        if version is None:
+            version = 3 if self.flow or self.parameters else 2
+        if version == 2 and (self.flow or self.parameters):
+            raise ValueError("OpenQASM 2 cannot represent control flow or symbolic parameters")
+        if version not in (2, 3):
+            raise ValueError(f"unsupported OpenQASM version {version}")
+        self.version = version
+        self.chunk_lines = chunk_lines
+        self.metrics = CircuitMetrics.for_ast(ast)
+        self.num_qubits = self.metrics.num_qubits
+        self.num_clbits = self.metrics.num_clbits
+
+    def write(self, fh):
+        """Write to a text file handle; returns the metrics dict"""
+        for chunk in self.chunks():
+            fh.write(chunk)
+        return self.metrics.result()
+
+    def text(self):
+        return "".join(self.chunks())
+
+    def chunks(self):
+        """Yield the program text in pieces; metrics are complete once exhausted"""
+        lines = self._header()
+        for line in self._body():
+            lines.append(line)
+            if len(lines) >= self.chunk_lines:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    def _definitions(self):
+        """`gate` definitions of the AST's gates that the include file lacks"""
+        included = INCLUDED_GATES[self.version]
+        translator = get_translator(included)
+        sep = "," if self.version == 2 else ", "
+        lines = []
+        seen = set()
+        for node in walk(self.ast.nodes):
+            if not isinstance(node, GateNode) or node.name in included or node.name in PASSTHROUGH:
+                continue
+            if node.name in seen:
+                continue
+            seen.add(node.name)
+            formals = [ParamExpr.symbol(f"p{k}") for k in range(len(node.params))]
+            operands = [f"a{k}" for k in range(len(node.qubits))]
+            body = []
+            for gate, local, params in translator.translate(node.name, formals):
+                args = sep.join(operands[k] for k in local)
+                params = f"({', '.join(_format_param(p) for p in params)})" if params else ""
+                body.append(f"{gate}{params} {args};")
+            head = f"({', '.join(str(p) for p in formals)})" if formals else ""
+            lines.append(f"gate {node.name}{head} {sep.join(operands)} {{ {' '.join(body)} }}")
+        return lines
+
+    def _header(self):
+        if self.version == 2:
+            lines = ['OPENQASM 2.0;', 'include "qelib1.inc";'] + self._definitions()
+            if self.num_qubits:
+                lines.append(f"qreg q[{self.num_qubits}];")
+            if self.num_clbits:
+                lines.append(f"creg c[{self.num_clbits}];")
+            return lines
+        lines = ['OPENQASM 3.0;', 'include "stdgates.inc";'] + self._definitions()
+        lines += [f"input float[64] {name};" for name in self.parameters]
+        if self.num_clbits:
+            lines.append(f"bit[{self.num_clbits}] c;")
+        if self.num_qubits:
+            lines.append(f"qubit[{self.num_qubits}] q;")
+        return lines
+
+    # -- statements ------------------------------------------------------------------
+
+    def _body(self):
+        metrics = self.metrics
+        sep = "," if self.version == 2 else ", "
+        measure = "measure q[{}] -> c[{}];" if self.version == 2 else "c[{1}] = measure q[{0}];"
+        templates = {}  # (name, arity) -> format string, for the flat fast path
+        clbit = 0
+        for node in self.ast.nodes:
+            if self.flow:
+                metrics.add_node(node)
+                yield from self._statement(node, "")
+            elif isinstance(node, MeasureNode):
+                metrics.add('measure', [node.qubit], [clbit])
+                yield measure.format(node.qubit, clbit)
+                clbit += 1
+            else:
+                key = (node.name, len(node.qubits))
+                template = templates.get(key)
+                if template is None:
+                    template = templates[key] = " " + sep.join(["q[{}]"] * key[1]) + ";"
+                metrics.add(node.name, node.qubits)
+                params = node.params
+                if params:
+                    params = f"({', '.join(_format_param(p) for p in params)})"
+                    yield node.name + params + template.format(*node.qubits)
+                else:
+                    yield node.name + template.format(*node.qubits)
+
+    def _statement(self, node, indent):
+        sep = "," if self.version == 2 else ", "
+        if isinstance(node, GateNode):
+            params = f"({', '.join(_format_param(p) for p in node.params)})" if node.params else ""
+            qubits = sep.join(f"q[{_format_index(q)}]" for q in node.qubits)
+            yield f"{indent}{node.name}{params} {qubits};"
+        elif isinstance(node, MeasureNode):
+            q, c = _format_index(node.qubit), _format_index(node.cbit)
+            yield (f"{indent}measure q[{q}] -> c[{c}];" if self.version == 2
+                   else f"{indent}c[{c}] = measure q[{q}];")
+        elif isinstance(node, ForLoopNode):
+            bounds = (f"{node.start}:{node.stop}" if node.step == 1
+                      else f"{node.start}:{node.step}:{node.stop}")
+            yield f"{indent}for int {node.var} in [{bounds}] {{"
+            yield from self._block(node.body, indent)
+        elif isinstance(node, WhileLoopNode):
+            yield f"{indent}while ({self._condition(node.condition)}) {{"
+            yield from self._block(node.body, indent)
+        elif isinstance(node, IfNode):
+            yield f"{indent}if ({self._condition(node.condition)}) {{"
+            yield from self._block(node.then_body, indent)
+            if node.else_body:
+                yield f"{indent}else {{"
+                yield from self._block(node.else_body, indent)
+        else:
+            raise ValueError(f"cannot write {type(node).__name__} as OpenQASM")
+
+    def _block(self, nodes, indent):
+        for child in nodes:
+            yield from self._statement(child, indent + "  ")
+        yield f"{indent}}}"
+
+    @staticmethod
+    def _condition(condition):
+        tests = [(_format_index(c), (condition.value >> k) & 1) for k, c in enumerate(condition.cbits)]
+        if len(tests) == 1:
+            (c, bit), = tests
+            return f"c[{c}] {'!=' if condition.negate else '=='} {bit}"
+        text = " && ".join(f"c[{c}] == {bit}" for c, bit in tests)
+        return f"!({text})" if condition.negate else text
+
+
+def write_qasm(ast, fh, version=None):
+    """Stream `ast` as OpenQASM to the text file handle `fh`; returns its metrics"""
+    return QASMWriter(ast, version).write(fh)
+
@@ -1,7 +1,11 @@
 """
 Noise-aware scheduler: a small heuristic to prefer lower-error qubits for single-qubit gates,
 and to choose connected pairs for 2-qubit gates based on topology.
+TimingScheduler places operations in time: ASAP/ALAP schedules with parallel
+layers, total duration and per-qubit idle time.
 """
+from ..execution.profiler import DEFAULT_GATE_TIMES_NS, MULTI_QUBIT_CX_PER_PAIR, VIRTUAL_GATES
+from ..frontend.ast_nodes import ForLoopNode, MeasureNode, resolve
 
 class NoiseAwareScheduler:
     def __init__(self, hardware_profile=None):
@@ -30,3 +34,123 @@ class NoiseAwareScheduler:
             return min(candidate_pairs, key=lambda p: self.error_rates.get(p[0], 1.0) + self.error_rates.get(p[1], 1.0))
         ranked.sort(key=lambda x: x[1])
         return ranked[0][0]
+
+
+class TimingScheduler:
+    """ASAP/ALAP schedules of a QuantumAST with gate durations from the hardware profile.
+
+    Durations follow FidelityEstimator: `gate_times_ns` may name a gate
+    ("cx": 250) and otherwise falls back to its "1q"/"2q"/"measure"/"reset"
+    entries; frame changes (rz, s, t, ...) take no time, and a gate on k > 2
+    qubits costs MULTI_QUBIT_CX_PER_PAIR two-qubit gates per qubit pair.
+    Barriers take no time but align their qubits.
+
+    schedule() is one pass over the operations with per-qubit ready-time and
+    layer arrays (plus one reverse pass for ALAP). It returns
+
+        {"method", "duration_ns", "num_layers",
+         "ops": [(name, qubits, start_ns, duration_ns)],   # program order
+         "layers": [[op index, ...], ...],                 # parallel layers
+         "busy_ns": [...], "idle_ns": [...]}               # per qubit
+
+    where a qubit's idle time runs from its first operation to the end of the
+    circuit, the window in which it decoheres.
+    """
+
+    def __init__(self, hardware_profile=None):
+        if hardware_profile is None:
+            from ..utils.config import DEFAULT_HW_PROFILE
+            hardware_profile = DEFAULT_HW_PROFILE
+        self.gate_times = dict(DEFAULT_GATE_TIMES_NS, **hardware_profile.get('gate_times_ns', {}))
+        self._durations = {}
+
+    def duration(self, name, num_qubits):
+        key = (name, num_qubits)
+        if key not in self._durations:
+            times = self.gate_times
+            if name in times:
+                value = times[name]
+            elif name == 'barrier' or name in VIRTUAL_GATES:
+                value = 0
+            elif num_qubits == 1:
+                value = times['1q']
+            elif num_qubits == 2:
+                value = times['2q']
+            else:
+                value = times['2q'] * MULTI_QUBIT_CX_PER_PAIR * num_qubits * (num_qubits - 1) // 2
+            self._durations[key] = float(value)
+        return self._durations[key]
+
+    def schedule(self, ast, method="asap"):
+        if method not in ("asap", "alap"):
+            raise ValueError(f"unknown scheduling method '{method}'")
+        if ast.has_control_flow():
+            ops = list(_operations(ast.nodes, {}))
+        else:
+            ops = [('measure', (node.qubit,)) if isinstance(node, MeasureNode)
+                   else (node.name, tuple(node.qubits)) for node in ast.nodes]
+        n = max(ast.qubit_indices(), default=-1) + 1
+        ready, layer, busy = [0.0] * n, [0] * n, [0.0] * n
+        first = [None] * n
+        durations, start_at, layer_of = [], [], []
+        known = self._durations
+        for name, qubits in ops:
+            duration = known.get((name, len(qubits)))
+            if duration is None:
+                duration = self.duration(name, len(qubits))
+            if len(qubits) == 1 and name != 'barrier':  # fast path
+                q = qubits[0]
+                start, level = ready[q], layer[q] + 1
+                ready[q], layer[q] = start + duration, level
+                busy[q] += duration
+                if first[q] is None:
+                    first[q] = start
+            else:
+                start = max(ready[q] for q in qubits)
+                level = max(layer[q] for q in qubits) + (name != 'barrier')
+                for q in qubits:
+                    ready[q], layer[q] = start + duration, level
+                    if name != 'barrier':
+                        busy[q] += duration
+                        if first[q] is None:
+                            first[q] = start
+            durations.append(duration)
+            start_at.append(start)
+            layer_of.append(level)
+        total = max(ready, default=0.0)
+        num_layers = max(layer, default=0)
+        if method == "alap":
+            # the same pass over the reversed program, mirrored in time
+            ready, layer = [0.0] * n, [0] * n
+            for j in range(len(ops) - 1, -1, -1):
+                name, qubits = ops[j]
+                duration = durations[j]
+                end = max(ready[q] for q in qubits)
+                level = max(layer[q] for q in qubits) + (name != 'barrier')
+                for q in qubits:
+                    ready[q], layer[q] = end + duration, level
+                start_at[j], layer_of[j] = total - end - duration, num_layers + 1 - level
+            first = [total - r if b else None for r, b in zip(ready, busy)]
+        layers = [[] for _ in range(num_layers)]
+        for j, (name, _) in enumerate(ops):
+            if name != 'barrier':
+                layers[layer_of[j] - 1].append(j)
+        idle = [0.0 if f is None else total - f - b for f, b in zip(first, busy)]
+        return {"method": method, "duration_ns": total, "num_layers": num_layers,
+                "ops": [(name, qubits, start, duration)
+                        for (name, qubits), start, duration in zip(ops, start_at, durations)],
+                "layers": layers, "busy_ns": busy, "idle_ns": idle}
+
+
+def _operations(nodes, env):
+    """(name, qubits) in program order with for loops unrolled"""
+    for node in nodes:
+        if isinstance(node, ForLoopNode):
+            for value in node.iterations():
+                yield from _operations(node.body, dict(env, **{node.var: value}))
+        elif isinstance(node, MeasureNode):
+            yield 'measure', (int(resolve(node.qubit, env)),)
+        elif hasattr(node, 'name'):
+            yield node.name, tuple(int(resolve(q, env)) for q in node.qubits)
+        else:
+            raise ValueError(f"cannot schedule {type(node).__name__} statically")
@@ -1,8 +1,19 @@
 """
 Transpiler: map gate names from AST to qiskit QuantumCircuit operations
-A small mapping for common gates.
+A small mapping for common gates, then any qiskit standard gate by name;
+unknown gates raise. With `basis`, gates are first expanded into that gate set
+through the memoized decomposition library (backend.decompositions).
+Symbolic ParamExpr parameters become qiskit Parameters (one per symbol name),
+so the circuit can be bound later.
+While loops and branches become qiskit control-flow blocks; for loops are
+unrolled because qiskit cannot index qubits by a loop parameter.
 """
 from qiskit import QuantumCircuit
+from qiskit.circuit import Parameter
+from qiskit.circuit.library import get_standard_gate_name_mapping
+
+from ..frontend.ast_nodes import ForLoopNode, IfNode, WhileLoopNode, is_symbolic, resolve
+from .decompositions import get_translator
 
 _GATE_MAP = {
     'h': lambda qc, qubits, params: qc.h(qubits[0]),
@@ -12,34 +23,96 @@ _GATE_MAP = {
     'z': lambda qc, qubits, params: qc.z(qubits[0]),
     'rz': lambda qc, qubits, params: qc.rz(params[0], qubits[0]),
     'rx': lambda qc, qubits, params: qc.rx(params[0], qubits[0]),
+    'ry': lambda qc, qubits, params: qc.ry(params[0], qubits[0]),
     'measure': lambda qc, qubits, params: qc.measure(qubits[0], params[0]),
+    'reset': lambda qc, qubits, params: qc.reset(qubits[0]),
+    'barrier': lambda qc, qubits, params: qc.barrier(*qubits),
 }
 
-def ast_to_qiskit_circuit(ast, num_qubits_hint=None):
-    # estimate num qubits
-    max_q = -1
-    for node in ast.nodes:
-        if hasattr(node, 'qubits'):
-            for q in node.qubits:
-                if isinstance(q, int) and q > max_q:
-                    max_q = q
-        if hasattr(node, 'qubit') and node.qubit > max_q:
-            max_q = node.qubit
-    num_qubits = max(num_qubits_hint or 0, max_q + 1)
-    # determine classical bits needed (simple: number of measure nodes)
-    nmeas = sum(1 for n in ast.nodes if n.__class__.__name__ == 'MeasureNode')
-    qc = QuantumCircuit(num_qubits, nmeas)
-    meas_idx = 0
-    for node in ast.nodes:
-        name = getattr(node, 'name', 'measure') if hasattr(node, 'name') else None
-        if node.__class__.__name__ == 'GateNode':
-            mapfn = _GATE_MAP.get(name.lower())
-            if mapfn:
-                mapfn(qc, node.qubits, node.params)
-            else:
-                # fallback: treat as unitary placeholder (no-op)
-                pass
+_STANDARD_GATES = {}  # name -> qiskit gate class, filled on first use
+
+def _append_gate(qc, name, qubits, params):
+    mapfn = _GATE_MAP.get(name)
+    if mapfn:
+        mapfn(qc, qubits, params)
+        return
+    if not _STANDARD_GATES:
+        _STANDARD_GATES.update((n, type(g)) for n, g in get_standard_gate_name_mapping().items())
+    gate_class = _STANDARD_GATES.get(name)
+    if gate_class is None:
+        raise ValueError(f"unknown gate '{name}'")
+    qc.append(gate_class(*params), qubits)
+
+def _to_qiskit_param(value, symbols):
+    if not is_symbolic(value):
+        return value
+    expr = value.const
+    for name, coeff in value.terms:
+        if name not in symbols:
+            symbols[name] = Parameter(name)
+        expr = expr + coeff * symbols[name]
+    return expr
+
+def _condition_expr(qc, condition, env):
+    """Condition -> qiskit classical expression over the tested clbits"""
+    from qiskit.circuit.classical import expr
+
+    test = None
+    for k, c in enumerate(condition.cbits):
+        bit = expr.lift(qc.clbits[int(resolve(c, env))])
+        term = bit if (condition.value >> k) & 1 else expr.logic_not(bit)
+        test = term if test is None else expr.logic_and(test, term)
+    return expr.logic_not(test) if condition.negate else test
+
+def _emit_nodes(qc, nodes, env, symbols, meas, translator=None):
+    """Append `nodes` to qc; `env` binds loop variables, `meas` counts measurements
+    (None: measure into node.cbit, as programs with classical control need) and
+    `translator` (a BasisTranslator or None) rewrites gates into its basis."""
+    for node in nodes:
+        if isinstance(node, ForLoopNode):
+            # qiskit cannot index qubits by a loop parameter, so for loops unroll here
+            for value in node.iterations():
+                _emit_nodes(qc, node.body, dict(env, **{node.var: value}), symbols, meas, translator)
+        elif isinstance(node, WhileLoopNode):
+            with qc.while_loop(_condition_expr(qc, node.condition, env)):
+                _emit_nodes(qc, node.body, env, symbols, meas, translator)
+        elif isinstance(node, IfNode):
+            with qc.if_test(_condition_expr(qc, node.condition, env)) as else_:
+                _emit_nodes(qc, node.then_body, env, symbols, meas, translator)
+            if node.else_body:
+                with else_:
+                    _emit_nodes(qc, node.else_body, env, symbols, meas, translator)
+        elif node.__class__.__name__ == 'GateNode':
+            qubits = [int(resolve(q, env)) for q in node.qubits]
+            params = [resolve(p, env) for p in node.params]
+            if translator is None:
+                _append_gate(qc, node.name.lower(), qubits,
+                             [_to_qiskit_param(p, symbols) for p in params])
+                continue
+            for name, local, sub_params in translator.translate(node.name, params):
+                _append_gate(qc, name, qubits if local is None else [qubits[q] for q in local],
+                             [_to_qiskit_param(p, symbols) for p in sub_params])
         elif node.__class__.__name__ == 'MeasureNode':
-            qc.measure(node.qubit, meas_idx)
-            meas_idx += 1
+            if meas is None:
+                qc.measure(int(resolve(node.qubit, env)), int(resolve(node.cbit, env)))
+            else:
+                qc.measure(int(resolve(node.qubit, env)), meas[0])
+                meas[0] += 1
+
+def ast_to_qiskit_circuit(ast, num_qubits_hint=None, basis=None):
+    """Build the qiskit circuit for `ast`; `basis` (gate names) restricts the gates it uses"""
+    # estimate num qubits
+    num_qubits = max(num_qubits_hint or 0, max(ast.qubit_indices(), default=-1) + 1)
+    if ast.has_control_flow():
+        # measured bits feed conditions, so classical bits keep their program numbering
+        qc = QuantumCircuit(num_qubits, ast.num_clbits())
+        meas = None
+    else:
+        # determine classical bits needed (simple: number of measure nodes)
+        nmeas = sum(1 for n in ast.nodes if n.__class__.__name__ == 'MeasureNode')
+        qc = QuantumCircuit(num_qubits, nmeas)
+        meas = [0]
+    symbols = {}  # ParamExpr symbol name -> qiskit Parameter
+    translator = get_translator(basis) if basis else None
+    _emit_nodes(qc, ast.nodes, {}, symbols, meas, translator)
     return qc
@@ -0,0 +1,362 @@
+"""
+CompileServer: keep the compilation pipeline warm across many requests.
+
+A cold `main.py` run pays for imports, AerSimulator construction and
+llvmlite target initialization on every compile. `CompileService` pays once
+and keeps an LRU of compiled results keyed by source hash and options.
+
+Protocol (JSON lines, over a Unix socket or stdin/stdout). Each request is
+one object per line and each response echoes its `id`. Responses may arrive
+out of order when several requests are in flight.
+
+    {"id": 1, "op": "compile", "mode": "quantum", "input": "grover.qasm",
+     "output": "out/grover", "formats": ["ll", "qasm"], "inline": false,
+     "basis": ["rz", "sx", "x", "cx"], "zx": true, "phase_poly": true,
+     "consolidate": true}
+    {"id": 2, "op": "compile", "mode": "classical", "input": "prog.asm", "optimize": true}
+    {"id": 3, "op": "execute", "input": "grover.qasm", "shots": 1024}
+    {"op": "ping"}   {"op": "stats"}   {"op": "shutdown"}
+
+    -> {"id": 1, "ok": true, "result": {...}}
+    -> {"id": 2, "ok": false, "error": "..."}
+"""
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..utils.helpers import atomic_write
+from ..utils.logger import get_logger
+
+logger = get_logger("compile_server")
+
+DEFAULT_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp",
+                              f"qllvm-compile-{os.getuid()}.sock")
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+
+class CompileService:
+    """Stateful request handler: warm imports, shared simulators, result cache."""
+
+    def __init__(self, cache_size=256):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executors = {}  # shots -> HybridExecutor
+        self.stats = {"requests": 0, "errors": 0, "cache_hits": 0}
+
+    def warm_up(self, quantum=True):
+        """Pay the one-time import and initialization costs up front."""
+        from ..backend.llvm_integration import init_llvm_binding
+        from ..ir.classical_ir_builder import compile_classical_assembly  # noqa: F401
+        init_llvm_binding()
+        if quantum:
+            self._executor(1024)
+        return self
+
+    def handle(self, request):
+        """Process one request dict and return its response dict."""
+        req_id = request.get("id")
+        op = request.get("op", "compile")
+        with self._lock:
+            self.stats["requests"] += 1
+        try:
+            if op == "ping":
+                result = {"pong": True, "pid": os.getpid()}
+            elif op == "stats":
+                with self._lock:
+                    result = dict(self.stats, cached=len(self._cache))
+            elif op == "compile":
+                result = self._compile(request)
+            elif op == "execute":
+                result = self._execute(request)
+            else:
+                raise ValueError(f"unknown op '{op}'")
+            return {"id": req_id, "ok": True, "result": result}
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            return {"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    # -- pipeline ------------------------------------------------------------
+
+    def _compile(self, request):
+        mode = request.get("mode", "quantum")
+        path = request["input"]
+        started = time.perf_counter()
+        if mode == "quantum":
+            formats = tuple(request.get("formats", ("ll", "qasm", "json")))
+            basis = tuple(request.get("basis") or ())
+            passes = (bool(request.get("zx")), bool(request.get("consolidate")),
+                      bool(request.get("phase_poly")))
+            ir_text, ast, stats, hit = self._cached(("quantum", path, basis, passes), path,
+                                                    lambda p: self._build_quantum(p, basis, *passes))
+            if request.get("inline"):
+                artifacts = {"ll": ir_text}
+                if "qasm" in formats:
+                    from ..backend.qasm_writer import QASMWriter
+                    artifacts["qasm"] = QASMWriter(ast).text()
+                result = {"artifacts": artifacts}
+            else:
+                from ..backend.emitter import emit_outputs
+                prefix = request.get("output") or _default_prefix(path)
+                # only the binary circuit format needs a qiskit circuit
+                qc = self._circuit(path, basis, *passes)[0] if "qcb" in formats else None
+                result = {"paths": list(emit_outputs(ir_text, qc, outfile_prefix=prefix,
+                                                     formats=formats, ast=ast))}
+        elif mode == "classical":
+            optimize = bool(request.get("optimize"))
+            ir_text, stats, hit = self._cached(("classical", path, optimize), path,
+                                               lambda p: self._build_classical(p, optimize))
+            if request.get("inline"):
+                result = {"artifacts": {"ll": ir_text}}
+            else:
+                output = request.get("output") or "output_final_classical.ll"
+                result = {"paths": [atomic_write(output, ir_text)]}
+        else:
+            raise ValueError(f"unknown mode '{mode}'")
+        result.update(stats=stats, cached=hit, elapsed=time.perf_counter() - started)
+        return result
+
+    def _execute(self, request):
+        path = request["input"]
+        shots = int(request.get("shots", 1024))
+        qc, hit = self._circuit(path)
+        result = self._executor(shots).run(qc)
+        result["cached"] = hit
+        return result
+
+    def _build_quantum(self, path, basis=(), zx=False, consolidate=False, phase_poly=False):
+        from ..backend.decompositions import translate_ast
+        from ..frontend.parser import parse_qasm_file
+        from ..ir.passes import (consolidate_blocks, phase_polynomial_opt, superposition_opt,
+                                 zx_simplify)
+        from ..ir.qir_builder import QIRBuilder
+        from ..ir.verifier import verify_ast
+        from ..backend.metrics import collect_metrics
+
+        ast = superposition_opt(parse_qasm_file(path))
+        if zx:
+            ast = zx_simplify(ast)
+        if phase_poly:
+            ast = phase_polynomial_opt(ast)
+        if consolidate:
+            ast = consolidate_blocks(ast)
+        if basis:
+            ast = translate_ast(ast, basis)
+        ok, errors = verify_ast(ast)
+        if not ok:
+            raise ValueError(f"AST verification failed: {errors}")
+        qir = QIRBuilder()
+        for q in ast.qubit_indices():
+            qir.allocate_qubit(f"q{q}")
+        try:
+            qir.add_program(ast)
+        except ValueError as e:
+            logger.warning(f"{path}: no executable QIR entry point: {e}")
+        stats = dict(nodes=len(ast.nodes), **collect_metrics(ast))
+        return qir.get_ir(), ast, stats
+
+    def _circuit(self, path, basis=(), zx=False, consolidate=False, phase_poly=False):
+        """(qiskit circuit, cached) for execution, built from the cached AST"""
+        from ..backend.llvm_integration import qir_to_qiskit
+
+        passes = (zx, consolidate, phase_poly)
+
+        def build(p):
+            ast = self._cached(("quantum", p, basis, passes), p,
+                               lambda p: self._build_quantum(p, basis, *passes))[1]
+            return (qir_to_qiskit(ast),)
+        return self._cached(("circuit", path, basis, passes), path, build)
+
+    def _build_classical(self, path, optimize):
+        from ..frontend.nasm_parser import is_nasm_source, NASMToLLVMCompiler
+        from ..ir.classical_ir_builder import compile_classical_assembly
+
+        with open(path, "r") as f:
+            source = f.read()
+        if is_nasm_source(source):
+            compiler = NASMToLLVMCompiler()
+            compiler.parse_text(source)
+            return compiler.generate_llvm_ir(), {"frontend": "nasm"}
+        passes = []
+        if optimize:
+            from ..ir.classical_passes import ClassicalOptimizer
+            passes.append(ClassicalOptimizer())
+        compiled = compile_classical_assembly(source, passes=passes)
+        return compiled.ir, dict(compiled.stats, frontend="classical")
+
+    # -- warm state ------------------------------------------------------------
+
+    def _cached(self, key, path, build):
+        """Return build(path) + (hit,), memoized on the file's content hash."""
+        with open(path, "rb") as f:
+            key = key + (hashlib.sha256(f.read()).hexdigest(),)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return self._cache[key] + (True,)
+        value = build(path)
+        with self._lock:
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value + (False,)
+
+    def _executor(self, shots):
+        with self._lock:
+            if shots not in self._executors:
+                from .hybrid_executor import HybridExecutor
+                self._executors[shots] = HybridExecutor(shots=shots)
+            return self._executors[shots]
+
+
+def _default_prefix(path):
+    return f"output_{os.path.splitext(os.path.basename(path))[0]}"
+
+
+class _Dispatcher:
+    """Bounded worker pool shared by every connection.
+
+    At most `max_pending` requests are queued or running; readers block
+    beyond that, which pushes back on clients instead of growing memory.
+    """
+
+    def __init__(self, service, workers=DEFAULT_WORKERS):
+        self.service = service
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compile")
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.stopping = threading.Event()
+
+    def submit(self, line, reply):
+        """Parse one request line and reply(response) when it completes."""
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply({"id": None, "ok": False, "error": f"invalid JSON: {e}"})
+            return
+        if request.get("op") == "shutdown":
+            # acknowledged by close(), once in-flight requests have drained
+            self._shutdown_reply = (reply, request.get("id"))
+            self.stopping.set()
+            return
+        refused = {"id": request.get("id"), "ok": False, "error": "server is shutting down"}
+        if self.stopping.is_set():
+            reply(refused)
+            return
+        self.slots.acquire()
+
+        def run():
+            try:
+                reply(self.service.handle(request))
+            finally:
+                self.slots.release()
+        try:
+            self.pool.submit(run)
+        except RuntimeError:
+            # close() shut the pool down after the check above
+            self.slots.release()
+            reply(refused)
+
+    def close(self):
+        """Drain in-flight requests, then acknowledge a pending shutdown."""
+        self.pool.shutdown(wait=True)
+        pending, self._shutdown_reply = getattr(self, "_shutdown_reply", None), None
+        if pending:
+            reply, req_id = pending
+            reply({"id": req_id, "ok": True, "result": {"shutdown": True}})
+
+
+def serve_stream(service, infile=None, outfile=None, workers=DEFAULT_WORKERS):
+    """Serve JSON-lines requests from `infile` (stdin) until EOF or shutdown."""
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    write_lock = threading.Lock()
+
+    def reply(response):
+        with write_lock:
+            outfile.write(json.dumps(response) + "\n")
+            outfile.flush()
+
+    dispatcher = _Dispatcher(service, workers)
+    for line in infile:
+        if line.strip():
+            dispatcher.submit(line, reply)
+        if dispatcher.stopping.is_set():
+            break
+    dispatcher.close()
+
+
+def serve_unix(service, path=DEFAULT_SOCKET, workers=DEFAULT_WORKERS):
+    """Serve JSON-lines requests on a Unix socket until a shutdown request arrives."""
+    dispatcher = _Dispatcher(service, workers)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            write_lock = threading.Lock()
+
+            def reply(response):
+                with write_lock:
+                    try:
+                        self.wfile.write((json.dumps(response) + "\n").encode())
+                        self.wfile.flush()
+                    except OSError:
+                        pass  # client went away
+
+            for raw in self.rfile:
+                if raw.strip():
+                    dispatcher.submit(raw.decode(), reply)
+                if dispatcher.stopping.is_set():
+                    dispatcher.close()
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                    break
+
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a previous run
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    logger.info(f"compile server listening on {path} ({workers} workers)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        dispatcher.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def send_request(request, path=DEFAULT_SOCKET, timeout=None):
+    """Send one request to a running server and return its response.
+
+    Raises OSError (FileNotFoundError / ConnectionRefusedError) when no
+    server is listening on `path`.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps(request) + "\n").encode())
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("compile server closed the connection")
+    return json.loads(line)
+
+
+def compile_with_fallback(request, path=DEFAULT_SOCKET, timeout=None, service=None):
+    """Thin client: use the server at `path` if one is running, else compile in-process.
+
+    Returns (response, served) where `served` tells whether the server answered.
+    Only a missing socket or a refused connection falls back; other errors,
+    such as a timeout from a busy or hung server, are raised.
+    """
+    try:
+        return send_request(request, path, timeout), True
+    except (FileNotFoundError, ConnectionRefusedError):
+        return (service or CompileService()).handle(request), False
@@ -1,11 +1,94 @@
 """
 HybridExecutor: runs a qiskit QuantumCircuit either in simulator or via provider.
 For the prototype we use Aer qasm_simulator (if available).
+
+`run_async` / `run_many` serve asyncio callers: method planning,
+transpilation, job submission and the wait on the simulator job run in an
+single executor-pool call, an asyncio.Semaphore caps how many circuits are in
+flight, and cancelling (or timing out) the awaiting task cancels the Aer job,
+or keeps it from being submitted if planning has not finished yet.
+close() (or `async with HybridExecutor() as executor:`) shuts the pool down.
 """
 from qiskit_aer import AerSimulator
 from qiskit import transpile
 
+import asyncio
+import os
+import threading
 import time
+import weakref
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from ..utils import config
+from ..utils.helpers import format_size
+
+# Gates the stabilizer method simulates exactly
+CLIFFORD_GATES = frozenset({'id', 'x', 'y', 'z', 'h', 's', 'sdg', 'sx', 'sxdg', 'cx', 'cy', 'cz',
+                            'swap', 'measure', 'reset', 'barrier'})
+
+_AMPLITUDE_BYTES = 16  # complex128
+_WORKSPACE = 2  # Aer keeps roughly one extra copy of the state while applying gates
+
+
+class SimulationMemoryError(MemoryError):
+    """The circuit cannot be simulated exactly within the configured memory cap."""
+
+
+def estimate_simulation_memory(qc, method='statevector'):
+    """Upper-bound estimate in bytes of the simulator state for `qc` under `method`."""
+    n = qc.num_qubits
+    if method == 'statevector':
+        return _WORKSPACE * _AMPLITUDE_BYTES * 2 ** n
+    if method == 'density_matrix':
+        return _WORKSPACE * _AMPLITUDE_BYTES * 4 ** n
+    if method == 'stabilizer':
+        return _WORKSPACE * (2 * n) * (2 * n + 1)  # tableau bits stored as bytes
+    if method == 'matrix_product_state':
+        bonds = _mps_bond_bounds(qc)
+        return _WORKSPACE * _AMPLITUDE_BYTES * sum(
+            2 * left * right for left, right in zip([1] + bonds, bonds + [1]))
+    raise ValueError(f"no memory model for method '{method}'")
+
+
+def _mps_bond_bounds(qc):
+    """Exact upper bound on the bond dimension at each cut of the linear qubit chain.
+
+    A cut between qubits i and i+1 has Schmidt rank at most 2**min(i+1, n-i-1),
+    and every two-qubit gate straddling it can multiply the rank by at most its
+    operator Schmidt rank (2 for controlled gates, 4 otherwise).
+    """
+    n = qc.num_qubits
+    log_bonds = [0] * max(n - 1, 0)
+    for instr in qc.data:
+        if len(instr.qubits) < 2 or instr.operation.name in ('measure', 'barrier'):
+            continue
+        idx = sorted(qc.find_bit(q).index for q in instr.qubits)
+        growth = 1 if instr.operation.name.startswith('c') and len(idx) == 2 else 2 * (len(idx) - 1)
+        for cut in range(idx[0], idx[-1]):
+            log_bonds[cut] += growth
+    return [2 ** min(b, i + 1, n - i - 1) for i, b in enumerate(log_bonds)]
+
+
+def plan_simulation(qc, memory_cap=None):
+    """Choose an exact Aer method that fits `memory_cap`.
+
+    Returns {'method', 'estimate_bytes'}; method None means Aer's default
+    (automatic) choice. Raises SimulationMemoryError when nothing fits.
+    """
+    estimate = estimate_simulation_memory(qc, 'statevector')
+    if memory_cap is None or estimate <= memory_cap:
+        return {'method': None, 'estimate_bytes': estimate}
+    candidates = []
+    if {instr.operation.name for instr in qc.data} <= CLIFFORD_GATES:
+        candidates.append('stabilizer')
+    candidates.append('matrix_product_state')
+    for method in candidates:
+        needed = estimate_simulation_memory(qc, method)
+        if needed <= memory_cap:
+            return {'method': method, 'estimate_bytes': needed}
+    raise SimulationMemoryError(
+        f"{qc.num_qubits}-qubit circuit needs ~{format_size(estimate)} as a statevector and no "
+        f"exact method fits the {format_size(memory_cap)} memory cap")
 
 # class HybridExecutor:
 #     def __init__(self, backend_name="aer_simulator", shots=1024):
@@ -25,16 +108,116 @@ import time
 #         runtime = end - start
 #         return {"counts": counts, "runtime": runtime, "shots": self.shots}
 class HybridExecutor:
-    def __init__(self, shots=1024):
+    def __init__(self, shots=1024, max_concurrency=None, executor=None, memory_cap=None):
         self.backend = AerSimulator()
         self.shots = shots
+        # bytes; above it run() switches to an exact cheaper method or refuses
+        self.memory_cap = memory_cap if memory_cap is not None else config.SIMULATOR_MEMORY_CAP
+        self._backends = {None: self.backend}  # method -> AerSimulator
+        # async API: at most max_concurrency circuits in flight per event loop
+        self.max_concurrency = max_concurrency or os.cpu_count() or 4
+        self._executor = executor
+        self._owns_executor = False  # close() only shuts down a pool _pool() created
+        self._semaphores = weakref.WeakKeyDictionary()  # loop -> asyncio.Semaphore
+
+    def plan(self, qc):
+        """Simulation method and memory estimate run() would use for `qc`."""
+        return plan_simulation(qc, self.memory_cap)
 
     def run(self, qc):
         start = time.time()
-        tqc = transpile(qc, self.backend)
-        result = self.backend.run(tqc, shots=self.shots).result()
+        backend = self._backend_for(qc)
+        tqc = transpile(qc, backend)
+        result = backend.run(tqc, shots=self.shots).result()
         end = time.time()
         counts = result.get_counts()
         runtime = end - start
         return {"counts": counts, "runtime": runtime, "shots": self.shots}
 
+    def estimate(self, qc, observables):
+        """Exact Pauli expectation values from the final state; no shots are sampled.
+
+        `observables` is a list of labels ("ZZI"), a {label: coeff} dict or
+        (label, coeff) pairs. Returns {"expectations", "value", "groups", "runtime"}.
+        """
+        from .estimator import estimate
+        return estimate(qc, observables, self.memory_cap)
+
+    def _backend_for(self, qc):
+        method = self.plan(qc)['method']
+        if method not in self._backends:
+            self._backends[method] = AerSimulator(method=method)
+        return self._backends[method]
+
+    async def run_async(self, qc, timeout=None):
+        """Awaitable run(): same result dict, without blocking the event loop.
+
+        Waits for a concurrency slot first (backpressure). `timeout` covers
+        transpilation and simulation and raises asyncio.TimeoutError; on
+        timeout or cancellation the Aer job is cancelled.
+        """
+        async with self._semaphore():
+            if timeout is None:
+                return await self._run_in_pool(qc)
+            return await asyncio.wait_for(self._run_in_pool(qc), timeout)
+
+    async def run_many(self, circuits, timeout=None, return_exceptions=False):
+        """Run circuits concurrently (bounded by max_concurrency); results keep input order.
+
+        With return_exceptions=True a failed or timed-out circuit yields its
+        exception instead of cancelling the rest.
+        """
+        tasks = [self.run_async(qc, timeout) for qc in circuits]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    async def _run_in_pool(self, qc):
+        loop = asyncio.get_running_loop()
+        start = time.time()
+        lock, cancelled, handle = threading.Lock(), threading.Event(), {}
+
+        def submit_and_wait():
+            # plan_simulation walks the whole circuit: keep it off the event loop too
+            backend = self._backend_for(qc)
+            tqc = transpile(qc, backend)
+            with lock:
+                # a cancel that lands during planning must stop the job from ever starting
+                if cancelled.is_set():
+                    raise CancelledError()
+                job = handle["job"] = backend.run(tqc, shots=self.shots)
+            return job.result()
+        try:
+            result = await loop.run_in_executor(self._pool(), submit_and_wait)
+        except asyncio.CancelledError:
+            with lock:
+                cancelled.set()
+                if "job" in handle:
+                    handle["job"].cancel()
+            raise
+        return {"counts": result.get_counts(), "runtime": time.time() - start, "shots": self.shots}
+
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                thread_name_prefix="hybrid-exec")
+            self._owns_executor = True
+        return self._executor
+
+    def close(self):
+        """Shut down the async API's thread pool (a pool passed in as `executor` is left running)"""
+        executor, self._executor = self._executor, None
+        if executor is not None and self._owns_executor:
+            executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
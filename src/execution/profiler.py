@@ -1,6 +1,252 @@
+"""
+Gate-level fidelity and runtime estimator.
+
+Scores a circuit against a hardware profile (see DEFAULT_HW_PROFILE):
+
+- every gate multiplies in its success probability (1 - error). Single-qubit
+  gates use `error_rates`, two-qubit gates use `edge_error_rates`, and
+  measurements use `readout_errors`.
+- a two-qubit gate between non-adjacent physical qubits is charged as a SWAP
+  chain along the most reliable path. Each extra hop costs 3 CX in error and
+  in time.
+- durations come from `gate_times_ns`. The circuit is scheduled ASAP to get
+  the critical path, and every qubit's idle time from its first operation to
+  the end of the circuit decays as exp(-t * (1/T1 + 1/T2) / 2). With
+  schedule="alap" operations start as late as possible instead (as
+  backend.scheduler.TimingScheduler places them), which shortens the idle
+  windows of qubits that are only needed late.
+
+The circuit is walked once into a compact op list. `score_layouts` then
+evaluates many logical->physical layouts at once with NumPy, so layout and
+routing search can use the estimate as an objective.
+"""
+import math
+
+import numpy as np
+
+# fallbacks when the profile omits calibration data
+DEFAULT_GATE_ERROR = 0.001
+DEFAULT_GATE_TIMES_NS = {"1q": 35, "2q": 300, "measure": 1000, "reset": 1000}
+DEFAULT_T1_NS = 100e3
+DEFAULT_T2_NS = 100e3
+# frame changes: implemented in software, no duration and no error
+VIRTUAL_GATES = frozenset({"rz", "z", "s", "sdg", "t", "tdg", "p", "u1", "id"})
+# two-qubit gates charged per qubit pair for gates on 3+ qubits (Toffoli = 6 CX)
+MULTI_QUBIT_CX_PER_PAIR = 2
+
+_GATE, _TWO, _MEASURE, _BARRIER = range(4)
+
+
+def _per_qubit(table, n, default):
+    table = table or {}
+    return np.array([float(table.get(q, default)) for q in range(n)])
+
+
+class FidelityEstimator:
+    """Precomputes hardware tables from a profile dict and scores circuits on it."""
+
+    def __init__(self, hardware_profile=None):
+        if hardware_profile is None:
+            from ..utils.config import DEFAULT_HW_PROFILE
+            hardware_profile = DEFAULT_HW_PROFILE
+        self.hw = hardware_profile
+        topology = [tuple(e) for e in self.hw.get('topology', [])]
+        n = self.hw.get('num_qubits') or (max((max(e) for e in topology), default=-1) + 1)
+        self.num_qubits = n
+        self.error_rates = _per_qubit(self.hw.get('error_rates'), n, DEFAULT_GATE_ERROR)
+        readout = self.hw.get('readout_errors')
+        self.readout_errors = (_per_qubit(readout, n, DEFAULT_GATE_ERROR) if readout
+                               else self.error_rates.copy())
+        times = dict(DEFAULT_GATE_TIMES_NS, **self.hw.get('gate_times_ns', {}))
+        self.gate_times = times
+        t1 = _per_qubit(self.hw.get('t1_ns'), n, DEFAULT_T1_NS)
+        t2 = _per_qubit(self.hw.get('t2_ns'), n, DEFAULT_T2_NS)
+        self.idle_rates = (1 / t1 + 1 / t2) / 2  # per ns
+
+        # most reliable path between every pair: Floyd-Warshall on -log(success)
+        edge_errors = {tuple(sorted(e)): v for e, v in self.hw.get('edge_error_rates', {}).items()}
+        cost = np.full((n, n), np.inf)
+        hops = np.full((n, n), np.inf)
+        np.fill_diagonal(cost, 0.0)
+        np.fill_diagonal(hops, 0.0)
+        for a, b in topology:
+            err = edge_errors.get(tuple(sorted((a, b))), self.error_rates[a] + self.error_rates[b])
+            cost[a, b] = cost[b, a] = -math.log1p(-min(err, 1.0 - 1e-12))
+            hops[a, b] = hops[b, a] = 1
+        for k in range(n):
+            via = cost[:, k, None] + cost[None, k, :]
+            better = via < cost
+            cost = np.where(better, via, cost)
+            hops = np.where(better, hops[:, k, None] + hops[None, k, :], hops)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # SWAP along the first hops-1 edges (3 CX each) then the gate itself;
+            # the last hop is priced at the path's mean edge cost
+            routed = 3 * cost - 2 * cost / hops
+        np.fill_diagonal(routed, np.inf)  # a two-qubit gate on one physical qubit is invalid
+        self.log_two_qubit = -routed
+        self.two_qubit_times = times['2q'] * (3 * (hops - 1) + 1)
+        self.distance = hops
+
+    # -- circuit summary ---------------------------------------------------------
+
+    def summarize(self, qc):
+        """One walk over `qc`: returns the op list and per-qubit gate counts."""
+        index = {bit: i for i, bit in enumerate(qc.qubits)}
+        ops = []  # (kind, qubits, duration_ns or pair id, instruction index)
+        pairs = {}
+        n = qc.num_qubits
+        one_qubit = np.zeros(n)
+        measures = np.zeros(n)
+
+        def two(a, b, i):
+            key = (a, b) if a < b else (b, a)
+            pid = pairs.setdefault(key, len(pairs))
+            ops.append((_TWO, key, pid, i))
+
+        for i, instr in enumerate(qc.data):
+            name = instr.operation.name
+            qs = tuple(index[q] for q in instr.qubits)
+            if name == 'barrier':
+                ops.append((_BARRIER, qs, 0.0, i))
+            elif name in ('measure', 'reset'):
+                if name == 'measure':
+                    measures[qs[0]] += 1
+                ops.append((_MEASURE, qs, float(self.gate_times[name]), i))
+            elif name in VIRTUAL_GATES or name == 'delay' or not qs:
+                continue
+            elif len(qs) == 1:
+                one_qubit[qs[0]] += 1
+                ops.append((_GATE, qs, float(self.gate_times['1q']), i))
+            elif len(qs) == 2:
+                two(qs[0], qs[1], i)
+            else:
+                for x in range(len(qs)):
+                    for y in range(x + 1, len(qs)):
+                        for _ in range(MULTI_QUBIT_CX_PER_PAIR):
+                            two(qs[x], qs[y], i)
+        pair_list = sorted(pairs, key=pairs.get)
+        counts = np.zeros(len(pair_list))
+        for kind, _, pid, _ in ops:
+            if kind == _TWO:
+                counts[pid] += 1
+        return {"num_qubits": n, "ops": ops, "one_qubit": one_qubit, "measures": measures,
+                "pairs": np.array(pair_list, dtype=int).reshape(-1, 2), "pair_counts": counts}
+
+    # -- scoring -----------------------------------------------------------------
+
+    def score_layouts(self, qc, layouts, summary=None, schedule="asap"):
+        """Score K layouts at once; `layouts` is (K, num_logical) physical qubit indices.
+
+        Returns a dict of (K,) arrays: fidelity, gate_fidelity,
+        readout_fidelity, idle_fidelity and duration_ns.
+        """
+        summary = summary or self.summarize(qc)
+        layouts = self._check_layouts(layouts, summary["num_qubits"])
+        scores, _ = self._score(summary, layouts, track_path=False, schedule=schedule)
+        return scores
+
+    def estimate(self, qc, layout=None, schedule="asap"):
+        """Fidelity, duration and critical path of `qc` under one layout (identity by default)."""
+        if layout is None:
+            if qc.num_qubits > self.num_qubits:
+                raise ValueError(f"circuit needs {qc.num_qubits} qubits, device has {self.num_qubits}")
+            layout = list(range(qc.num_qubits))
+        summary = self.summarize(qc)
+        layouts = self._check_layouts([layout], summary["num_qubits"])
+        scores, path = self._score(summary, layouts, track_path=True, schedule=schedule)
+        result = {key: float(value[0]) for key, value in scores.items()}
+        result.update(critical_path=path, layout=list(layout))
+        return result
+
+    def _check_layouts(self, layouts, n_logical):
+        layouts = np.atleast_2d(np.asarray(layouts, dtype=int))
+        if layouts.shape[1] != n_logical:
+            raise ValueError(f"layouts map {layouts.shape[1]} qubits, circuit has {n_logical}")
+        if layouts.size and (layouts.min() < 0 or layouts.max() >= self.num_qubits):
+            raise ValueError(f"layout uses a qubit outside the {self.num_qubits}-qubit device")
+        if n_logical > 1 and (np.diff(np.sort(layouts, axis=1), axis=1) == 0).any():
+            raise ValueError("layout maps two logical qubits to the same physical qubit")
+        return layouts
+
+    def _score(self, summary, layouts, track_path, schedule="asap"):
+        if schedule not in ("asap", "alap"):
+            raise ValueError(f"unknown scheduling method '{schedule}'")
+        K = layouts.shape[0]
+        pairs, pair_counts = summary["pairs"], summary["pair_counts"]
+        log_gates = (np.log1p(-self.error_rates)[layouts] * summary["one_qubit"]).sum(axis=1)
+        if len(pairs):
+            phys_a, phys_b = layouts[:, pairs[:, 0]], layouts[:, pairs[:, 1]]
+            log_gates += (self.log_two_qubit[phys_a, phys_b] * pair_counts).sum(axis=1)
+            pair_times = self.two_qubit_times[phys_a, phys_b]  # (K, num_pairs)
+        log_readout = (np.log1p(-self.readout_errors)[layouts] * summary["measures"]).sum(axis=1)
+
+        # ASAP schedule over all layouts at once
+        n = summary["num_qubits"]
+        finish = np.zeros((K, n))
+        first = np.full((K, n), np.inf)
+        busy = np.zeros((K, n))
+        last_op = [-1] * n
+        pred = []
+        for j, (kind, qs, arg, _) in enumerate(summary["ops"]):
+            qs = list(qs)
+            if track_path:
+                binding = max(qs, key=lambda q: finish[0, q])
+                pred.append(last_op[binding])
+            if kind == _BARRIER:
+                finish[:, qs] = finish[:, qs].max(axis=1, keepdims=True)
+                if track_path:
+                    for q in qs:
+                        last_op[q] = pred[-1]
+                continue
+            duration = pair_times[:, arg] if kind == _TWO else arg
+            start = finish[:, qs].max(axis=1)
+            end = start + duration
+            for q in qs:
+                first[:, q] = np.minimum(first[:, q], start)
+                finish[:, q] = end
+                busy[:, q] += duration
+                if track_path:
+                    last_op[q] = j
+        makespan = finish.max(axis=1) if n else np.zeros(K)
+        used = np.isfinite(first)
+        if schedule == "alap":
+            # reverse pass: `late[q]` is how long before the end q's first operation starts
+            late = np.zeros((K, n))
+            for kind, qs, arg, _ in reversed(summary["ops"]):
+                qs = list(qs)
+                end = late[:, qs].max(axis=1)
+                if kind != _BARRIER:
+                    end = end + (pair_times[:, arg] if kind == _TWO else arg)
+                late[:, qs] = end[:, None]
+            first = makespan[:, None] - late
+        idle = np.where(used, makespan[:, None] - np.where(used, first, 0.0) - busy, 0.0)
+        log_idle = -(np.clip(idle, 0.0, None) * self.idle_rates[layouts]).sum(axis=1)
+
+        with np.errstate(invalid='ignore'):
+            scores = {"gate_fidelity": np.exp(log_gates), "readout_fidelity": np.exp(log_readout),
+                      "idle_fidelity": np.exp(log_idle), "duration_ns": makespan}
+            scores["fidelity"] = np.nan_to_num(np.exp(log_gates + log_readout + log_idle))
+        path = []
+        if track_path and n:
+            j = last_op[int(np.argmax(finish[0]))]
+            while j >= 0:
+                instr = summary["ops"][j][3]
+                if not path or path[-1] != instr:
+                    path.append(instr)
+                j = pred[j]
+            path.reverse()
+        return scores, path
+
+
+def estimate_fidelity(qc, hardware_profile=None, layout=None):
+    """Convenience wrapper around FidelityEstimator(hardware_profile).estimate(qc, layout)"""
+    return FidelityEstimator(hardware_profile).estimate(qc, layout)
+
+
 def estimate_fidelity_simple(qc, error_rates):
-    # Very simple estimate: 1 - sum(error_rates for qubits used) scaled by count
-    used_qubits = set(range(qc.num_qubits))
-    total_error = sum(error_rates.get(q, 0.001) for q in used_qubits)
-    est = max(0.0, 1.0 - total_error)
-    return est
+    """Fidelity of `qc` from per-qubit gate error rates alone (no topology or timing)"""
+    n = max(qc.num_qubits, max(error_rates, default=-1) + 1)
+    profile = {"num_qubits": n, "error_rates": error_rates,
+               "topology": [(a, b) for a in range(n) for b in range(a + 1, n)],
+               "t1_ns": dict.fromkeys(range(n), math.inf), "t2_ns": dict.fromkeys(range(n), math.inf)}
+    return estimate_fidelity(qc, profile)["fidelity"]
@@ -0,0 +1,351 @@
+"""
+QIR runtime: JIT-compile QIR modules with llvmlite and execute them against an
+in-process NumPy statevector.
+
+Every `__quantum__qis__*` intrinsic that QIRBuilder.add_program emits, plus
+the legacy `qop.<gate>(i32...)` declarations, is registered once per process
+with llvmlite.binding.add_symbol as a ctypes callback. The compiled `main`
+runs as native code, and only gate kernels cross into Python.
+
+Shots: `main` first runs once with measurements deferred. If no qubit is
+touched after being measured (terminal measurements), every shot is sampled
+from that single final state. Otherwise `main` runs once per shot, and
+measurements collapse the state. Modules that read results
+(`__quantum__qis__read_result__body`, i.e. branches and while loops on
+measured bits) always run per shot, since a deferred read cannot steer them.
+
+    runtime = QIRRuntime(seed=1)
+    runtime.run(qir.get_ir(), shots=1024)  # {"counts", "runtime", "shots", "mode"}
+"""
+import ctypes
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .sweep import apply_batched
+
+_S2 = 1 / np.sqrt(2)
+_FIXED = {
+    'h': np.array([[_S2, _S2], [_S2, -_S2]], dtype=complex),
+    'x': np.array([[0, 1], [1, 0]], dtype=complex),
+    'y': np.array([[0, -1j], [1j, 0]], dtype=complex),
+    'z': np.diag([1, -1]).astype(complex),
+    's': np.diag([1, 1j]),
+    'sdg': np.diag([1, -1j]),
+    't': np.diag([1, np.exp(0.25j * np.pi)]),
+    'tdg': np.diag([1, np.exp(-0.25j * np.pi)]),
+    # little-endian in (control, target) like qiskit
+    'cx': np.array([[1, 0, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0], [0, 1, 0, 0]], dtype=complex),
+    'cz': np.diag([1, 1, 1, -1]).astype(complex),
+    'swap': np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], dtype=complex),
+}
+_CCX = np.eye(8, dtype=complex)
+_CCX[[3, 7]] = _CCX[[7, 3]]
+_FIXED['ccx'] = _CCX
+
+
+def _rotation(axis, theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    if axis == 'rx':
+        return np.array([[c, -1j * s], [-1j * s, c]])
+    if axis == 'ry':
+        return np.array([[c, -s], [s, c]], dtype=complex)
+    return np.diag([np.exp(-0.5j * theta), np.exp(0.5j * theta)])
+
+
+class StatevectorState:
+    """Flat little-endian statevector that grows as higher qubit handles are used.
+
+    Kernels work on reshaped views of the amplitude array: single-qubit and
+    controlled gates touch only the affected halves in place, so a gate costs
+    a few vectorized passes and no axis shuffling.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.reset_all()
+
+    def reset_all(self, num_qubits=0):
+        self.state = np.zeros(1 << num_qubits, dtype=complex)
+        self.state[0] = 1.0
+        self.num_qubits = num_qubits
+        self.deferred = {}  # result id -> qubit, while measurements are deferred
+        self.results = {}  # result id -> bit
+        self.defer = False
+        self.dirty = False  # a deferred measurement could not stay deferred
+
+    def _ensure(self, qubits):
+        top = max(qubits)
+        if top >= self.num_qubits:
+            # new qubits are the most significant bits, all in |0>
+            grown = np.zeros(1 << (top + 1), dtype=complex)
+            grown[:len(self.state)] = self.state
+            self.state = grown
+            self.num_qubits = top + 1
+
+    def _halves(self, qubit):
+        v = self.state.reshape(-1, 2, 1 << qubit)
+        return v[:, 0, :], v[:, 1, :]
+
+    def _pair_view(self, a, b):
+        """View with axes (.., bit hi, .., bit lo, ..); returns (view, axis of a, axis of b)"""
+        hi, lo = max(a, b), min(a, b)
+        v = self.state.reshape(-1, 2, 1 << (hi - lo - 1), 2, 1 << lo)
+        return v, (1 if a == hi else 3), (1 if b == hi else 3)
+
+    def apply(self, matrix, qubits):
+        self._ensure(qubits)
+        if self.defer and any(q in self.deferred.values() for q in qubits):
+            self.dirty = True
+        if len(qubits) == 1:
+            a0, a1 = self._halves(qubits[0])
+            (m00, m01), (m10, m11) = matrix
+            if m01 == 0 and m10 == 0:
+                if m00 != 1:
+                    a0 *= m00
+                if m11 != 1:
+                    a1 *= m11
+            else:
+                new0 = m00 * a0 + m01 * a1
+                a1 *= m11
+                a1 += m10 * a0
+                a0[...] = new0
+        else:
+            tensor = self.state.reshape((1,) + (2,) * self.num_qubits)
+            self.state = apply_batched(tensor, matrix, qubits).reshape(-1)
+
+    def controlled(self, control, target, kind):
+        """CX / CZ / SWAP on the amplitude array in place"""
+        self._ensure([control, target])
+        if self.defer and (control in self.deferred.values() or target in self.deferred.values()):
+            self.dirty = True
+        v, ca, ta = self._pair_view(control, target)
+        def sl(c, t):
+            index = [slice(None)] * 5
+            index[ca], index[ta] = c, t
+            return tuple(index)
+        if kind == 'cx':
+            tmp = v[sl(1, 0)].copy()
+            v[sl(1, 0)] = v[sl(1, 1)]
+            v[sl(1, 1)] = tmp
+        elif kind == 'cz':
+            v[sl(1, 1)] *= -1
+        else:  # swap
+            tmp = v[sl(0, 1)].copy()
+            v[sl(0, 1)] = v[sl(1, 0)]
+            v[sl(1, 0)] = tmp
+
+    def _prob_one(self, qubit):
+        _, a1 = self._halves(qubit)
+        return float(np.vdot(a1, a1).real)
+
+    def _project(self, qubit, bit, prob):
+        halves = self._halves(qubit)
+        halves[1 - bit][...] = 0
+        self.state /= np.sqrt(prob)
+
+    def measure(self, qubit, result):
+        self._ensure([qubit])
+        if self.defer:
+            self.deferred[result] = qubit
+            return
+        p1 = self._prob_one(qubit)
+        bit = int(self.rng.random() < p1)
+        self._project(qubit, bit, p1 if bit else 1 - p1)
+        self.results[result] = bit
+
+    def reset(self, qubit):
+        self._ensure([qubit])
+        p1 = self._prob_one(qubit)
+        if self.defer and (qubit in self.deferred.values() or 1e-12 < p1 < 1 - 1e-12):
+            # a random collapse here would be shared by every sampled shot
+            self.dirty = True
+        if self.rng.random() < p1:
+            self._project(qubit, 1, p1)
+            a0, a1 = self._halves(qubit)
+            a0[...], a1[...] = a1, 0
+        else:
+            self._project(qubit, 0, 1 - p1)
+
+    def read_result(self, result):
+        if self.defer:
+            self.dirty = True  # classical feedback needs real measurement outcomes
+            return 0
+        return self.results.get(result, 0)
+
+
+# -- process-wide symbol registration --------------------------------------------
+
+FEEDBACK_INTRINSIC = '__quantum__qis__read_result__body'
+
+_LOCK = threading.RLock()
+_ACTIVE = None  # StatevectorState the callbacks act on
+_CALLBACKS = []  # keep ctypes thunks alive
+_REGISTERED = False
+
+_VOID_Q = ctypes.CFUNCTYPE(None, ctypes.c_void_p)
+_VOID_QQ = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p)
+_VOID_QQQ = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p)
+_VOID_DQ = ctypes.CFUNCTYPE(None, ctypes.c_double, ctypes.c_void_p)
+_BOOL_R = ctypes.CFUNCTYPE(ctypes.c_bool, ctypes.c_void_p)
+_INT_CALLBACKS = {1: ctypes.CFUNCTYPE(None, ctypes.c_int32),
+                  2: ctypes.CFUNCTYPE(None, ctypes.c_int32, ctypes.c_int32),
+                  3: ctypes.CFUNCTYPE(None, ctypes.c_int32, ctypes.c_int32, ctypes.c_int32)}
+
+
+def _h(ptr):
+    return ptr or 0  # ctypes passes the null handle (qubit 0) as None
+
+
+def _symbol_table():
+    """QIR symbol name -> ctypes callback"""
+    table = {}
+    for gate, qis in (('h', 'h__body'), ('x', 'x__body'), ('y', 'y__body'), ('z', 'z__body'),
+                      ('s', 's__body'), ('sdg', 's__adj'), ('t', 't__body'), ('tdg', 't__adj')):
+        table[f'__quantum__qis__{qis}'] = _VOID_Q(
+            lambda q, m=_FIXED[gate]: _ACTIVE.apply(m, [_h(q)]))
+    for gate, qis in (('cx', 'cnot__body'), ('cz', 'cz__body'), ('swap', 'swap__body')):
+        table[f'__quantum__qis__{qis}'] = _VOID_QQ(
+            lambda a, b, kind=gate: _ACTIVE.controlled(_h(a), _h(b), kind))
+    table['__quantum__qis__ccx__body'] = _VOID_QQQ(
+        lambda a, b, c: _ACTIVE.apply(_FIXED['ccx'], [_h(a), _h(b), _h(c)]))
+    for axis in ('rx', 'ry', 'rz'):
+        table[f'__quantum__qis__{axis}__body'] = _VOID_DQ(
+            lambda theta, q, axis=axis: _ACTIVE.apply(_rotation(axis, theta), [_h(q)]))
+    table['__quantum__qis__mz__body'] = _VOID_QQ(lambda q, r: _ACTIVE.measure(_h(q), _h(r)))
+    table['__quantum__qis__reset__body'] = _VOID_Q(lambda q: _ACTIVE.reset(_h(q)))
+    table[FEEDBACK_INTRINSIC] = _BOOL_R(lambda r: bool(_ACTIVE.read_result(_h(r))))
+    # legacy QIRBuilder.add_intrinsic_gate declarations: qop.<gate>(i32 qubit, ...)
+    for gate, matrix in _FIXED.items():
+        arity = int(np.log2(matrix.shape[0]))
+        if gate in ('cx', 'cz', 'swap'):
+            table[f'qop.{gate}'] = _INT_CALLBACKS[2](
+                lambda a, b, kind=gate: _ACTIVE.controlled(a, b, kind))
+        else:
+            table[f'qop.{gate}'] = _INT_CALLBACKS[arity](
+                lambda *qs, m=matrix: _ACTIVE.apply(m, list(qs)))
+    return table
+
+
+def register_symbols():
+    """Register the runtime's intrinsics with the JIT linker (idempotent); returns their names."""
+    global _REGISTERED
+    from ..backend.llvm_integration import init_llvm_binding
+    llvm = init_llvm_binding()
+    with _LOCK:
+        if not _REGISTERED:
+            for name, callback in _symbol_table().items():
+                _CALLBACKS.append((name, callback))
+                llvm.add_symbol(name, ctypes.cast(callback, ctypes.c_void_p).value)
+            _REGISTERED = True
+    return {name for name, _ in _CALLBACKS}
+
+
+class QIRRuntime:
+    """JIT-compiles QIR text and runs its entry point on a NumPy statevector."""
+
+    def __init__(self, seed=None, cache_size=16):
+        self.rng = np.random.default_rng(seed)
+        self.cache_size = cache_size
+        self._engines = OrderedDict()  # sha256(ir, entry) -> (engine, entry function)
+
+    def compile(self, ir_text, entry="main"):
+        """Return a ctypes callable for `entry`; compiled engines are cached by IR hash."""
+        key = hashlib.sha256(f"{entry}\0{ir_text}".encode()).hexdigest()
+        if key in self._engines:
+            self._engines.move_to_end(key)
+            return self._engines[key][1]
+        from ..backend.llvm_integration import init_llvm_binding
+        llvm = init_llvm_binding()
+        known = register_symbols()
+        mod = llvm.parse_assembly(ir_text)
+        mod.triple = llvm.get_process_triple()
+        mod.verify()
+        # an unresolved external aborts the process inside MCJIT, so check first
+        missing = [f.name for f in mod.functions if f.is_declaration and f.name not in known]
+        if missing:
+            raise ValueError(f"QIR runtime has no implementation for: {', '.join(missing)}")
+        target_machine = llvm.Target.from_default_triple().create_target_machine()
+        engine = llvm.create_mcjit_compiler(mod, target_machine)
+        engine.finalize_object()
+        address = engine.get_function_address(entry)
+        if not address:
+            raise ValueError(f"QIR module has no entry point '{entry}'")
+        fn = ctypes.CFUNCTYPE(None)(address)
+        self._engines[key] = (engine, fn)
+        if len(self._engines) > self.cache_size:
+            self._engines.popitem(last=False)
+        return fn
+
+    def run(self, ir_text, shots=1024, entry="main"):
+        """Execute `entry` for `shots` shots; returns HybridExecutor-style counts."""
+        global _ACTIVE
+        start = time.time()
+        fn = self.compile(ir_text, entry)
+        state = StatevectorState(self.rng)
+        feedback = FEEDBACK_INTRINSIC in ir_text
+        with _LOCK:
+            _ACTIVE = state
+            try:
+                if not feedback:
+                    state.defer = True
+                    fn()
+                if not feedback and not state.dirty:
+                    counts = self._sample(state, shots)
+                    mode = "sampled"
+                else:
+                    counts = {}
+                    num_qubits = state.num_qubits
+                    for _ in range(shots):
+                        state.reset_all(num_qubits)
+                        fn()
+                        key = _result_key(state.results)
+                        counts[key] = counts.get(key, 0) + 1
+                    mode = "per-shot"
+            finally:
+                _ACTIVE = None
+        return {"counts": counts, "runtime": time.time() - start, "shots": shots, "mode": mode}
+
+    def statevector(self, ir_text, entry="main"):
+        """Final state of `entry` (measurements deferred) as a 2**n vector, qiskit ordering"""
+        global _ACTIVE
+        if FEEDBACK_INTRINSIC in ir_text:
+            raise ValueError("module branches on measurement results; it has no single final state")
+        fn = self.compile(ir_text, entry)
+        state = StatevectorState(self.rng)
+        with _LOCK:
+            _ACTIVE = state
+            try:
+                state.defer = True
+                fn()
+            finally:
+                _ACTIVE = None
+        return state.state
+
+    def _sample(self, state, shots):
+        if not state.deferred:
+            return {}
+        n = state.num_qubits
+        probs = np.abs(state.state) ** 2
+        outcomes = self.rng.choice(len(probs), size=shots, p=probs / probs.sum())
+        width = max(state.deferred) + 1
+        keys = np.zeros(shots, dtype=np.int64)
+        for result, qubit in state.deferred.items():
+            keys |= ((outcomes >> qubit) & 1) << result
+        values, hits = np.unique(keys, return_counts=True)
+        return {format(int(k), f"0{width}b"): int(c) for k, c in zip(values, hits)} if n else {}
+
+
+def _result_key(results):
+    if not results:
+        return ""
+    width = max(results) + 1
+    return "".join(str(results.get(r, 0)) for r in reversed(range(width)))
+
+
+def run_qir(ir_text, shots=1024, entry="main", seed=None):
+    """One-off convenience wrapper around QIRRuntime(seed).run(...)"""
+    return QIRRuntime(seed).run(ir_text, shots, entry)
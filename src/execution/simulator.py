@@ -1,12 +1,352 @@
-# Additional simulator helpers (kept minimal)
-from qiskit import Aer, transpile
-from qiskit.providers.aer.noise import NoiseModel
-
-def simulate_with_noise(qc, noise_model=None, shots=1024):
-    backend = Aer.get_backend("qasm_simulator")
-    basis_gates = None
-    if noise_model:
-        basis_gates = noise_model.basis_gates
-    t_qc = transpile(qc, backend=backend)
-    job = backend.run(t_qc, shots=shots, noise_model=noise_model)
-    return job.result()
+"""
+Noisy simulation driven by our hardware profiles (see DEFAULT_HW_PROFILE).
+
+Every non-virtual gate is followed by a depolarizing channel. Its strength
+comes from the profile's `error_rates` (1q) or `edge_error_rates`
+(2q, routed like the fidelity estimator for non-adjacent pairs). Every
+measurement is subject to a readout bit flip from `readout_errors`. Gates
+on 3 or more qubits are decomposed first, so both methods charge them
+through the same 1q and 2q gates.
+
+Two methods:
+
+- "trajectory" (default): Monte Carlo over Pauli error patterns. Patterns
+  are drawn for all shots at once and grouped, so each distinct pattern is
+  simulated once. The error-free pattern usually covers most shots. Each
+  pattern restarts from a cached error-free prefix state, the patterns run
+  in a thread pool, and their outcome distributions stay in an LRU keyed by
+  (circuit, pattern). Re-running the same circuit with another noise scale,
+  readout error or shot count reuses them. Requires terminal measurements.
+- "aer": the same channels as a qiskit_aer NoiseModel on AerSimulator.
+"""
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .profiler import VIRTUAL_GATES, FidelityEstimator
+
+# memory budget for error-free prefix states shared between trajectories
+PREFIX_CACHE_BYTES = 256 << 20
+
+_PAULIS = (np.eye(2, dtype=complex),
+           np.array([[0, 1], [1, 0]], dtype=complex),
+           np.array([[0, -1j], [1j, 0]], dtype=complex),
+           np.array([[1, 0], [0, -1]], dtype=complex))
+
+
+class NoiseProfile:
+    """Per-location error probabilities for one circuit-to-device layout."""
+
+    def __init__(self, hardware_profile=None, noise_scale=1.0):
+        self.estimator = FidelityEstimator(hardware_profile)
+        self.noise_scale = noise_scale
+
+    def gate_error(self, physical):
+        """Probability of a non-identity Pauli after a gate on `physical` qubits"""
+        est = self.estimator
+        if len(physical) == 1:
+            p = est.error_rates[physical[0]]
+        else:
+            p = -math.expm1(est.log_two_qubit[physical[0], physical[1]])
+        return min(1.0, p * self.noise_scale)
+
+    def readout_error(self, physical):
+        return min(1.0, self.estimator.readout_errors[physical] * self.noise_scale)
+
+
+def decompose_wide_gates(qc):
+    """`qc` with gates on 3 or more qubits decomposed into 1q and 2q gates, which
+    are the only ones the profile charges errors for"""
+    while True:
+        wide = {i.operation.name for i in qc.data
+                if i.operation.num_qubits > 2 and i.operation.name != 'barrier'}
+        if not wide:
+            return qc
+        qc = qc.decompose(gates_to_decompose=sorted(wide))
+
+
+def build_aer_noise_model(qc, hardware_profile=None, noise_scale=1.0, layout=None):
+    """qiskit_aer NoiseModel with the profile's depolarizing and readout errors for `qc`.
+
+    Gates on 3 or more qubits get no error: run decompose_wide_gates(qc) first,
+    as simulate_with_noise does."""
+    from qiskit_aer.noise import NoiseModel, ReadoutError, depolarizing_error
+
+    noise = NoiseProfile(hardware_profile, noise_scale)
+    layout = _layout(qc, noise, layout)
+    model = NoiseModel()
+    seen = set()
+    for instr in qc.data:
+        name = instr.operation.name
+        qs = tuple(qc.find_bit(q).index for q in instr.qubits)
+        if (name, qs) in seen or name in VIRTUAL_GATES or name in ('barrier', 'delay', 'reset'):
+            continue
+        seen.add((name, qs))
+        if name == 'measure':
+            p = noise.readout_error(layout[qs[0]])
+            if p > 0:
+                model.add_readout_error(ReadoutError([[1 - p, p], [p, 1 - p]]), list(qs))
+        elif len(qs) <= 2:
+            p = noise.gate_error([layout[q] for q in qs])
+            dim = 4 ** len(qs)
+            if p > 0:
+                # depolarizing(lam) applies a non-identity Pauli with probability lam*(dim-1)/dim
+                lam = min(p * dim / (dim - 1), dim / (dim - 1))
+                model.add_quantum_error(depolarizing_error(lam, len(qs)), name, list(qs))
+    return model
+
+
+class NoisySimulator:
+    """Trajectory simulator with a cache of per-pattern outcome distributions."""
+
+    def __init__(self, hardware_profile=None, workers=None, cache_size=4096, seed=None):
+        self.hardware_profile = hardware_profile
+        self.workers = workers or os.cpu_count() or 4
+        self.cache_size = cache_size
+        self.rng = np.random.default_rng(seed)
+        self._cache = OrderedDict()  # (circuit key, pattern) -> outcome probabilities
+        self._matrices = {}
+        self.stats = {"trajectories": 0, "cache_hits": 0}
+
+    def run(self, qc, shots=1024, noise_scale=1.0, layout=None):
+        """Sample `shots` noisy shots; returns the HybridExecutor-style result dict."""
+        start = time.time()
+        qc = decompose_wide_gates(qc)
+        noise = NoiseProfile(self.hardware_profile, noise_scale)
+        layout = _layout(qc, noise, layout)
+        program = self._compile(qc, noise, layout)
+
+        patterns = self._sample_patterns(program["error_probs"], program["error_arity"], shots)
+        unique = sorted(patterns, key=lambda pat: (pat[0][0] if pat else -1, pat))
+        distributions = {}
+        for pat in unique:
+            key = (program["key"], pat)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                distributions[pat] = self._cache[key]
+        todo = [pat for pat in unique if pat not in distributions]
+        self.stats["trajectories"] += len(todo)
+        self.stats["cache_hits"] += len(distributions)
+        if todo:
+            snapshots = self._prefix_states(program, {pat[0][0] for pat in todo if pat})
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for pat, probs in zip(todo, pool.map(
+                        lambda pat: self._outcome_probs(program, snapshots, pat), todo)):
+                    distributions[pat] = probs
+                    self._remember((program["key"], pat), probs)
+
+        outcomes = []
+        for pat in unique:
+            probs = distributions[pat]
+            hits = self.rng.multinomial(patterns[pat], probs)
+            outcomes.append(np.repeat(np.arange(len(probs)), hits))
+        outcomes = np.concatenate(outcomes) if outcomes else np.zeros(0, dtype=int)
+        counts = self._readout(qc, program, noise, layout, outcomes)
+        return {"counts": counts, "runtime": time.time() - start, "shots": shots,
+                "trajectories": len(unique)}
+
+    # -- circuit preparation -----------------------------------------------------
+
+    def _compile(self, qc, noise, layout):
+        n = qc.num_qubits
+        ops, error_probs, error_arity, error_at = [], [], [], []
+        measured = {}  # clbit -> qubit
+        touched = set()
+        for instr in qc.data:
+            op = instr.operation
+            qs = tuple(qc.find_bit(q).index for q in instr.qubits)
+            if getattr(op, 'condition', None) is not None:
+                raise ValueError("trajectory simulation does not support classically controlled gates")
+            if op.name in ('barrier', 'delay'):
+                continue
+            if op.name == 'measure':
+                measured[qc.find_bit(instr.clbits[0]).index] = qs[0]
+                continue
+            if any(q in measured.values() for q in qs):
+                raise ValueError("trajectory simulation needs terminal measurements; use method='aer'")
+            if op.name == 'reset':
+                if qs[0] in touched:
+                    raise ValueError("trajectory simulation only supports resets on fresh qubits")
+                continue
+            touched.update(qs)
+            ops.append((self._matrix(op), qs))
+            if op.name not in VIRTUAL_GATES:
+                p = noise.gate_error([layout[q] for q in qs])
+                if p > 0:
+                    error_at.append(len(ops) - 1)
+                    error_probs.append(p)
+                    error_arity.append(len(qs))
+        fingerprint = hashlib.sha256(repr(
+            [(i.operation.name, [float(x) for x in i.operation.params],
+              [qc.find_bit(q).index for q in i.qubits], [qc.find_bit(c).index for c in i.clbits])
+             for i in qc.data] + [layout]).encode()).hexdigest()
+        return {"key": fingerprint, "num_qubits": n, "ops": ops, "error_at": error_at,
+                "error_probs": np.array(error_probs), "error_arity": np.array(error_arity, dtype=int),
+                "measured": measured, "measured_qubits": sorted(set(measured.values()))}
+
+    def _matrix(self, op):
+        key = (op.name, tuple(float(p) for p in op.params))
+        if key not in self._matrices:
+            from qiskit.quantum_info import Operator
+            self._matrices[key] = Operator(op).data
+        return self._matrices[key]
+
+    def _sample_patterns(self, probs, arity, shots):
+        """Draw every shot's error pattern; returns {pattern: shot count}.
+
+        A pattern is a tuple of (error location, Pauli index) pairs, where the
+        Pauli index enumerates the non-identity Paulis on the gate's qubits.
+        """
+        shot_ids, locations = [], []
+        for loc, p in enumerate(probs):
+            hits = self.rng.binomial(shots, p)
+            if hits:
+                shot_ids.append(self.rng.choice(shots, hits, replace=False))
+                locations.append(np.full(hits, loc))
+        if not shot_ids:
+            return {(): shots}
+        shot_ids = np.concatenate(shot_ids)
+        locations = np.concatenate(locations)
+        paulis = 1 + (self.rng.random(len(locations)) * (4 ** arity[locations] - 1)).astype(int)
+        order = np.lexsort((locations, shot_ids))
+        per_shot = {}
+        for s, loc, pauli in zip(shot_ids[order].tolist(), locations[order].tolist(),
+                                 paulis[order].tolist()):
+            per_shot.setdefault(s, []).append((loc, pauli))
+        patterns = {(): shots - len(per_shot)} if len(per_shot) < shots else {}
+        for pattern in per_shot.values():
+            pattern = tuple(pattern)
+            patterns[pattern] = patterns.get(pattern, 0) + 1
+        return patterns
+
+    # -- state evolution -----------------------------------------------------------
+
+    def _prefix_states(self, program, first_errors):
+        """Error-free states right after each op listed in `first_errors`'s locations"""
+        wanted = {program["error_at"][loc]: loc for loc in first_errors}
+        state = _zero_state(program["num_qubits"])
+        snapshots = {}
+        if not wanted or state.nbytes * len(wanted) > PREFIX_CACHE_BYTES:
+            return snapshots  # patterns then replay from |0...0>
+        last = max(wanted)
+        for j, (matrix, qs) in enumerate(program["ops"][:last + 1]):
+            state = _apply(state, matrix, qs)
+            if j in wanted:
+                snapshots[wanted[j]] = state
+        return snapshots
+
+    def _outcome_probs(self, program, snapshots, pattern):
+        ops, error_at = program["ops"], program["error_at"]
+        state, begin = _zero_state(program["num_qubits"]), 0
+        if pattern and pattern[0][0] in snapshots:
+            (first, pauli), pattern = pattern[0], pattern[1:]
+            begin = error_at[first]
+            state = _apply_pauli(snapshots[first], pauli, ops[begin][1])
+            begin += 1
+        errors = {error_at[loc]: pauli for loc, pauli in pattern}
+        for j in range(begin, len(ops)):
+            matrix, qs = ops[j]
+            state = _apply(state, matrix, qs)
+            if j in errors:
+                state = _apply_pauli(state, errors[j], qs)
+        return _marginal(state, program["num_qubits"], program["measured_qubits"])
+
+    def _remember(self, key, probs):
+        self._cache[key] = probs
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # -- measurement -----------------------------------------------------------------
+
+    def _readout(self, qc, program, noise, layout, outcomes):
+        measured, mq = program["measured"], program["measured_qubits"]
+        if not measured:
+            return {}
+        clbits = sorted(measured)
+        # qubit bits of each outcome index -> clbit bits, with independent readout flips
+        bits = np.stack([(outcomes >> mq.index(measured[c])) & 1 for c in clbits], axis=1)
+        flip_p = np.array([noise.readout_error(layout[measured[c]]) for c in clbits])
+        bits ^= (self.rng.random(bits.shape) < flip_p).astype(bits.dtype)
+        keys = (bits << np.array(clbits)).sum(axis=1)
+        values, hits = np.unique(keys, return_counts=True)
+        return {_format_key(qc, int(k)): int(c) for k, c in zip(values, hits)}
+
+
+def _layout(qc, noise, layout):
+    if layout is None:
+        layout = list(range(qc.num_qubits))
+    noise.estimator._check_layouts([layout], qc.num_qubits)
+    return list(layout)
+
+
+def _zero_state(n):
+    state = np.zeros((2,) * n, dtype=complex)
+    state[(0,) * n] = 1.0
+    return state
+
+
+def _apply(state, matrix, qs):
+    """Apply a 2^k x 2^k matrix (qiskit little-endian) to qubits `qs` of the state tensor"""
+    n, k = state.ndim, len(qs)
+    axes = [n - 1 - q for q in reversed(qs)]  # tensor axis 0 is the highest qubit
+    out = np.tensordot(matrix.reshape((2,) * (2 * k)), state, axes=(list(range(k, 2 * k)), axes))
+    return np.moveaxis(out, list(range(k)), axes)
+
+
+def _apply_pauli(state, index, qs):
+    matrix = _PAULIS[index % 4]
+    if len(qs) == 2:
+        matrix = np.kron(_PAULIS[index // 4], matrix)
+    return _apply(state, matrix, qs)
+
+
+def _marginal(state, n, measured_qubits):
+    """Outcome probabilities over `measured_qubits`; bit i of the index is measured_qubits[i]"""
+    probs = np.abs(state) ** 2
+    keep = [n - 1 - q for q in reversed(measured_qubits)]
+    probs = probs.sum(axis=tuple(a for a in range(n) if a not in keep))
+    probs = probs.reshape(-1)
+    return probs / probs.sum()
+
+
+def _format_key(qc, value):
+    """qiskit counts key: clbit 0 rightmost, classical registers separated by spaces"""
+    bits = format(value, f"0{qc.num_clbits}b")
+    if not qc.cregs:
+        return bits
+    parts, end = [], qc.num_clbits
+    for reg in qc.cregs:
+        parts.append(bits[end - reg.size:end])
+        end -= reg.size
+    return " ".join(reversed(parts))
+
+
+def simulate_with_noise(qc, noise_model=None, shots=1024, hardware_profile=None,
+                        method="trajectory", noise_scale=1.0, layout=None, seed=None):
+    """Run `qc` with noise from a hardware profile (DEFAULT_HW_PROFILE by default).
+
+    Passing a qiskit_aer `noise_model` runs that model on AerSimulator instead.
+    Returns {"counts", "runtime", "shots"} like HybridExecutor.run.
+    """
+    if noise_model is None and method == "trajectory":
+        return NoisySimulator(hardware_profile, seed=seed).run(qc, shots, noise_scale, layout)
+    if method not in ("trajectory", "aer"):
+        raise ValueError(f"unknown noisy simulation method '{method}'")
+    from qiskit import transpile
+    from qiskit_aer import AerSimulator
+
+    start = time.time()
+    if noise_model is None:
+        # charge 3+ qubit gates through their 1q/2q gates, like the trajectory method
+        qc = decompose_wide_gates(qc)
+        noise_model = build_aer_noise_model(qc, hardware_profile, noise_scale, layout)
+    backend = AerSimulator(noise_model=noise_model, seed_simulator=seed)
+    # keep the circuit's own gate names so per-gate errors still apply
+    tqc = transpile(qc, backend, optimization_level=0)
+    result = backend.run(tqc, shots=shots).result()
+    return {"counts": result.get_counts(), "runtime": time.time() - start, "shots": shots}
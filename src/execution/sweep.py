@@ -0,0 +1,222 @@
+"""
+ParameterSweep: compile a parametrized circuit once, evaluate many parameter vectors.
+
+    sweep = ParameterSweep(ast)                  # QuantumAST with ParamExpr params, or a
+                                                 # qiskit circuit with Parameters
+    probs = sweep.probabilities(values)          # values: (N, P) array or {name: (N,) array}
+    results = sweep.run(values, shots=1024)      # one HybridExecutor-style dict per point
+
+Parsing, passes and circuit construction happen once in the constructor.
+Evaluation then proceeds in batches:
+
+- engine="numpy": a statevector per batch with shape (B, 2, ..., 2).
+  Fixed gates are one matmul over the whole batch. Parametrized gates
+  build a (B, d, d) stack of matrices from the bound angles.
+- engine="aer": the circuit is transpiled once and each batch is a
+  single Aer job with parameter_binds.
+"""
+import copy
+import time
+
+import numpy as np
+
+from ..frontend.ast_nodes import QuantumAST, is_symbolic
+from ..utils import config
+
+DEFAULT_BATCH_SIZE = 256
+_BATCH_MEMORY = 1 << 30  # statevector bytes per batch when no SIMULATOR_MEMORY_CAP is set
+
+
+def _rx(t):
+    c, s = np.cos(t / 2), np.sin(t / 2)
+    return np.stack([np.stack([c, -1j * s], -1), np.stack([-1j * s, c], -1)], -2)
+
+
+def _ry(t):
+    c, s = np.cos(t / 2), np.sin(t / 2)
+    return np.stack([np.stack([c, -s], -1), np.stack([s, c], -1)], -2).astype(complex)
+
+
+def _rz(t):
+    zero = np.zeros_like(t, dtype=complex)
+    return np.stack([np.stack([np.exp(-0.5j * t), zero], -1),
+                     np.stack([zero, np.exp(0.5j * t)], -1)], -2)
+
+
+def _phase(t):
+    zero, one = np.zeros_like(t, dtype=complex), np.ones_like(t, dtype=complex)
+    return np.stack([np.stack([one, zero], -1), np.stack([zero, np.exp(1j * t)], -1)], -2)
+
+
+# gate name -> angles (B,) -> matrices (B, 2, 2)
+BATCHED_GATES = {'rx': _rx, 'ry': _ry, 'rz': _rz, 'p': _phase, 'u1': _phase}
+
+
+def apply_batched(state, matrix, qs):
+    """Apply `matrix` (d, d) or per-sample (B, d, d) to qubits `qs` of a (B, 2, ..., 2) state"""
+    n, k = state.ndim - 1, len(qs)
+    axes = [1 + n - 1 - q for q in reversed(qs)]  # matrix index is little-endian in qs
+    tail = list(range(n + 1 - k, n + 1))
+    moved = np.moveaxis(state, axes, tail)
+    flat = moved.reshape(moved.shape[0], -1, 2 ** k)
+    if matrix.ndim == 2:
+        out = flat @ matrix.T
+    else:
+        out = np.einsum('brj,bij->bri', flat, matrix)
+    return np.moveaxis(out.reshape(moved.shape), tail, axes)
+
+
+class ParameterSweep:
+    """Compile once, bind many parameter vectors."""
+
+    def __init__(self, program, engine="numpy", passes=None, batch_size=DEFAULT_BATCH_SIZE, seed=None):
+        from ..backend.transpiler import ast_to_qiskit_circuit
+        from ..frontend.parser import circuit_to_ast
+        from ..ir.passes import superposition_opt
+
+        if not isinstance(program, QuantumAST):
+            program = circuit_to_ast(program)
+        ast = copy.deepcopy(program)
+        for run_pass in (superposition_opt,) if passes is None else passes:
+            ast = run_pass(ast)
+        if engine not in ("numpy", "aer"):
+            raise ValueError(f"unknown sweep engine '{engine}'")
+        self.ast = ast
+        self.engine = engine
+        self.parameters = ast.parameters()
+        self.circuit = ast_to_qiskit_circuit(ast)
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        if engine == "numpy":
+            self._ops, self._measured = self._compile_numpy(self.circuit)
+            cap = config.SIMULATOR_MEMORY_CAP or _BATCH_MEMORY
+            per_state = 16 * 2 ** self.circuit.num_qubits * 2  # plus one temporary per gate
+            self.batch_size = max(1, min(batch_size, cap // per_state))
+        else:
+            from qiskit import transpile
+            from qiskit_aer import AerSimulator
+            self._backend = AerSimulator(seed_simulator=seed)
+            self._compiled = transpile(self.circuit, self._backend)
+            by_name = {p.name: p for p in self._compiled.parameters}
+            self._aer_params = [by_name[name] for name in self.parameters if name in by_name]
+
+    def _compile_numpy(self, qc):
+        from qiskit.quantum_info import Operator
+        from ..frontend.parser import convert_param
+
+        ops, measured = [], {}
+        for instr in qc.data:
+            op = instr.operation
+            qs = tuple(qc.find_bit(q).index for q in instr.qubits)
+            if op.name == 'barrier':
+                continue
+            if op.name == 'measure':
+                measured[qc.find_bit(instr.clbits[0]).index] = qs[0]
+                continue
+            if any(q in measured.values() for q in qs):
+                raise ValueError("the numpy sweep engine needs terminal measurements; use engine='aer'")
+            params = [convert_param(p) for p in op.params]
+            if any(is_symbolic(p) for p in params):
+                if op.name not in BATCHED_GATES:
+                    raise ValueError(f"no batched matrix for parametrized '{op.name}'; use engine='aer'")
+                ops.append((op.name, qs, params[0]))
+            else:
+                ops.append((None, qs, Operator(op).data))
+        return ops, measured
+
+    # -- evaluation ----------------------------------------------------------------
+
+    def bind_values(self, values):
+        """Normalize to ({name: (N,) float array}, N)"""
+        if isinstance(values, dict):
+            missing = [name for name in self.parameters if name not in values]
+            if missing:
+                raise KeyError(f"no values for parameters {missing}")
+            columns = {name: np.atleast_1d(np.asarray(values[name], dtype=float))
+                       for name in self.parameters}
+        else:
+            array = np.asarray(values, dtype=float)
+            if array.ndim == 1:
+                array = array[None, :]
+            if array.shape[1] != len(self.parameters):
+                raise ValueError(f"expected {len(self.parameters)} values per point "
+                                 f"({', '.join(self.parameters)}), got {array.shape[1]}")
+            columns = {name: array[:, i] for i, name in enumerate(self.parameters)}
+            if not columns:
+                return columns, len(array)  # (N, 0): N points of a parameterless circuit
+        sizes = {len(col) for col in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError("parameter columns have different lengths")
+        return columns, (sizes.pop() if sizes else 1)
+
+    def _batches(self, values):
+        columns, total = self.bind_values(values)
+        for start in range(0, total, self.batch_size):
+            stop = min(total, start + self.batch_size)
+            yield {name: col[start:stop] for name, col in columns.items()}, stop - start
+
+    def statevectors(self, values):
+        """(N, 2**num_qubits) final states before measurement (numpy engine)"""
+        if self.engine != "numpy":
+            raise ValueError("statevectors() needs engine='numpy'")
+        n = self.circuit.num_qubits
+        out = []
+        for batch, size in self._batches(values):
+            state = np.zeros((size,) + (2,) * n, dtype=complex)
+            state[(slice(None),) + (0,) * n] = 1.0
+            for name, qs, arg in self._ops:
+                if name is None:
+                    state = apply_batched(state, arg, qs)
+                else:
+                    angles = np.broadcast_to(arg.bind(batch), (size,))
+                    state = apply_batched(state, BATCHED_GATES[name](angles), qs)
+            out.append(state.reshape(size, -1))
+        return np.concatenate(out) if out else np.zeros((0, 2 ** n), dtype=complex)
+
+    def probabilities(self, values):
+        """(N, 2**num_clbits) outcome probabilities; index bit c is classical bit c"""
+        if self.engine != "numpy":
+            raise ValueError("probabilities() needs engine='numpy'")
+        states = self.statevectors(values)
+        n = self.circuit.num_qubits
+        measured = self._measured or {q: q for q in range(n)}
+        num_bits = max(measured) + 1
+        basis = np.arange(2 ** n)
+        # classical outcome of every basis state under the terminal measurements
+        keys = np.zeros_like(basis)
+        for c, q in measured.items():
+            keys |= ((basis >> q) & 1) << c
+        probs = np.abs(states) ** 2
+        out = np.zeros((len(states), 2 ** num_bits))
+        np.add.at(out.T, keys, probs.T)
+        return out
+
+    def run(self, values, shots=1024):
+        """Counts for every parameter point, in input order"""
+        from .simulator import _format_key
+
+        if not self.circuit.num_clbits:
+            raise ValueError("circuit has no measurements to sample")
+        start = time.time()
+        results = []
+        if self.engine == "numpy":
+            for probs in self.probabilities(values):
+                hits = self.rng.multinomial(shots, probs / probs.sum())
+                counts = {_format_key(self.circuit, int(k)): int(c)
+                          for k, c in zip(np.nonzero(hits)[0], hits[np.nonzero(hits)])}
+                results.append({"counts": counts, "shots": shots})
+        else:
+            for batch, size in self._batches(values):
+                if self._aer_params:
+                    binds = [{param: batch[param.name].tolist() for param in self._aer_params}]
+                    job = self._backend.run(self._compiled, shots=shots, parameter_binds=binds)
+                else:
+                    # nothing to bind: one copy of the circuit per point
+                    job = self._backend.run([self._compiled] * size, shots=shots)
+                result = job.result()
+                for i in range(size):
+                    results.append({"counts": result.get_counts(i), "shots": shots})
+        runtime = time.time() - start
+        for result in results:
+            result["runtime"] = runtime / len(results)
+        return results
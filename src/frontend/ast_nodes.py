@@ -1,5 +1,97 @@
+import numbers
 from dataclasses import dataclass, field
-from typing import List, Any
+from typing import Any, Dict, List, Tuple
+
+
+@dataclass(frozen=True)
+class ParamExpr:
+    """Symbolic gate parameter: const + sum(coeff * symbol), e.g. 2*theta - 0.5.
+
+    Supports the arithmetic passes need (adding rotation angles, scaling by
+    numbers). bind() takes scalars or NumPy arrays per symbol, so a whole batch
+    of parameter vectors is evaluated in one call.
+    """
+    terms: Tuple[Tuple[str, float], ...] = ()
+    const: float = 0.0
+
+    @classmethod
+    def symbol(cls, name: str) -> 'ParamExpr':
+        return cls(((name, 1.0),))
+
+    @property
+    def parameters(self) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self.terms)
+
+    def bind(self, values: Dict[str, Any]):
+        """Evaluate with values[name] (float or array); missing symbols raise KeyError"""
+        result = self.const
+        for name, coeff in self.terms:
+            result = result + coeff * values[name]
+        return result
+
+    def _combine(self, other, sign):
+        if isinstance(other, numbers.Real):
+            return ParamExpr(self.terms, self.const + sign * float(other))
+        if not isinstance(other, ParamExpr):
+            return NotImplemented
+        coeffs = dict(self.terms)
+        for name, coeff in other.terms:
+            coeffs[name] = coeffs.get(name, 0.0) + sign * coeff
+        terms = tuple((name, c) for name, c in coeffs.items() if c != 0.0)
+        result = ParamExpr(terms, self.const + sign * other.const)
+        return result if terms else result.const
+
+    def __add__(self, other):
+        return self._combine(other, 1.0)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._combine(other, -1.0)
+
+    def __rsub__(self, other):
+        return (-self)._combine(other, 1.0)
+
+    def __neg__(self):
+        return self * -1.0
+
+    def __mul__(self, other):
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        if other == 0:
+            return 0.0
+        return ParamExpr(tuple((n, c * other) for n, c in self.terms), self.const * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if not isinstance(other, numbers.Real):
+            return NotImplemented
+        return self * (1.0 / other)
+
+    def substitute(self, values: Dict[str, Any]):
+        """Replace the symbols present in `values`; a float once no symbols remain"""
+        result = self.const
+        for name, coeff in self.terms:
+            result = result + (coeff * values[name] if name in values else ParamExpr(((name, coeff),)))
+        return result
+
+    def __str__(self):
+        parts = [name if c == 1 else f"-{name}" if c == -1 else f"{c!r}*{name}"
+                 for name, c in self.terms]
+        if self.const:
+            parts.append(repr(self.const))
+        return " + ".join(parts).replace("+ -", "- ")
+
+
+def is_symbolic(value) -> bool:
+    return isinstance(value, ParamExpr)
+
+
+def resolve(value, env: Dict[str, Any]):
+    """Substitute loop variables / parameters in `env` into an index or angle"""
+    return value.substitute(env) if is_symbolic(value) else value
+
 
 @dataclass
 class ASTNode:
@@ -9,13 +101,94 @@ class ASTNode:
 class GateNode(ASTNode):
     name: str
     qubits: List[int]
-    params: List[Any] = field(default_factory=list)
+    params: List[Any] = field(default_factory=list)  # floats or ParamExpr
 
 @dataclass
 class MeasureNode(ASTNode):
     qubit: int
     cbit: int
 
+# -- classical control flow ---------------------------------------------------------
+# Qubit and bit indices inside loop bodies may be ParamExpr over the loop
+# variable (q[i + 1] -> ParamExpr((('i', 1.0),), 1.0)); they stay rolled until
+# a backend needs concrete indices.
+
+@dataclass
+class Condition:
+    """Test on measured bits: the bits read as a little-endian integer == value (!= if negate)"""
+    cbits: List[Any]
+    value: int = 1
+    negate: bool = False
+
+@dataclass
+class ForLoopNode(ASTNode):
+    var: str
+    start: int
+    stop: int  # inclusive, like OpenQASM 3 ranges [start:step:stop]
+    step: int = 1
+    body: List[ASTNode] = field(default_factory=list)
+
+    def iterations(self) -> range:
+        return range(self.start, self.stop + (1 if self.step > 0 else -1), self.step)
+
+@dataclass
+class WhileLoopNode(ASTNode):
+    condition: Condition
+    body: List[ASTNode] = field(default_factory=list)
+
+@dataclass
+class IfNode(ASTNode):
+    condition: Condition
+    then_body: List[ASTNode] = field(default_factory=list)
+    else_body: List[ASTNode] = field(default_factory=list)
+
+CONTROL_FLOW_NODES = (ForLoopNode, WhileLoopNode, IfNode)
+
+
+def child_blocks(node: ASTNode) -> List[List[ASTNode]]:
+    """Nested statement lists of a control-flow node (none for gates and measurements)"""
+    if isinstance(node, (ForLoopNode, WhileLoopNode)):
+        return [node.body]
+    if isinstance(node, IfNode):
+        return [node.then_body, node.else_body]
+    return []
+
+
+def walk(nodes: List[ASTNode]):
+    """Every node, depth first, including the bodies of loops and branches"""
+    for node in nodes:
+        yield node
+        for block in child_blocks(node):
+            yield from walk(block)
+
+
+def index_bounds(nodes: List[ASTNode], bounds: Dict[str, Tuple[int, int]] = None):
+    """Yield (node, {loop variable: (min, max)}) for every node in scope of its enclosing loops"""
+    bounds = bounds or {}
+    for node in nodes:
+        yield node, bounds
+        if isinstance(node, ForLoopNode):
+            values = node.iterations()
+            if not values:
+                continue
+            inner = dict(bounds)
+            inner[node.var] = (min(values[0], values[-1]), max(values[0], values[-1]))
+            yield from index_bounds(node.body, inner)
+        else:
+            for block in child_blocks(node):
+                yield from index_bounds(block, bounds)
+
+
+def value_range(value, bounds: Dict[str, Tuple[int, int]]) -> Tuple[int, int]:
+    """(min, max) an affine index takes over the loop bounds; KeyError for unbound symbols"""
+    if not is_symbolic(value):
+        return value, value
+    lo = hi = value.const
+    for name, coeff in value.terms:
+        a, b = coeff * bounds[name][0], coeff * bounds[name][1]
+        lo, hi = lo + min(a, b), hi + max(a, b)
+    return int(round(lo)), int(round(hi))
+
 @dataclass
 class QuantumAST:
     nodes: List[ASTNode] = field(default_factory=list)
@@ -23,5 +196,47 @@ class QuantumAST:
     def add_node(self, node: ASTNode):
         self.nodes.append(node)
 
+    def has_control_flow(self) -> bool:
+        return any(isinstance(node, CONTROL_FLOW_NODES) for node in self.nodes)
+
+    def _scoped_nodes(self):
+        """(node, loop bounds) pairs; flat programs skip the nested walk"""
+        if self.has_control_flow():
+            return index_bounds(self.nodes)
+        return ((node, {}) for node in self.nodes)
+
+    def parameters(self) -> List[str]:
+        """Symbolic parameter names in order of first use (loop variables excluded)"""
+        seen = {}
+        for node, bounds in self._scoped_nodes():
+            for p in getattr(node, 'params', ()):
+                if is_symbolic(p):
+                    seen.update(dict.fromkeys(n for n in p.parameters if n not in bounds))
+        return list(seen)
+
+    def qubit_indices(self) -> List[int]:
+        """Sorted qubit indices used anywhere; loop-indexed operands count their whole range"""
+        used = set()
+        for node, bounds in self._scoped_nodes():
+            operands = node.qubits if hasattr(node, 'qubits') else [getattr(node, 'qubit', None)]
+            for q in operands:
+                if isinstance(q, int):
+                    used.add(q)
+                elif q is not None:
+                    lo, hi = value_range(q, bounds)
+                    used.update(range(lo, hi + 1))
+        return sorted(used)
+
+    def num_clbits(self) -> int:
+        """1 + the highest classical bit measured or tested"""
+        top = -1
+        for node, bounds in index_bounds(self.nodes):
+            cbits = [node.cbit] if hasattr(node, 'cbit') else []
+            if isinstance(node, (WhileLoopNode, IfNode)):
+                cbits += node.condition.cbits
+            for c in cbits:
+                top = max(top, value_range(c, bounds)[1])
+        return top + 1
+
     def __repr__(self):
         return f"QuantumAST(nodes={self.nodes})"
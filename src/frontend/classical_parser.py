@@ -1,12 +1,61 @@
 """
 Classical Assembly Parser for generating LLVM IR
 Handles traditional assembly language instructions
+
+The parser is a single-pass, table-driven scanner: every source line is
+matched against one precompiled regex per line class (instruction, data
+definition, START, END, label-only), trying the instruction class first since
+it dominates real programs. Opcodes live in frozen sets so classification is
+a set lookup, not a list scan, and errors carry line/column spans.
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable, Tuple, TextIO
 import re
 
+# Mnemonics understood by the backends; STOP takes no operands
+OPCODES = frozenset({'MOVER', 'MOVEM', 'ADD', 'SUB', 'MULT', 'COMP', 'BC', 'STOP'})
+DATA_DIRECTIVES = frozenset({'DC', 'DS'})
+
+_IDENT = r'[A-Za-z_][\w.$]*'
+_COMMENT = r'\s*(?:;.*)?$'
+
+_START_RE = re.compile(r'\s*START(?:\s+(?P<addr>[^\s;]+))?' + _COMMENT)
+_END_RE = re.compile(r'\s*END' + _COMMENT)
+_LABEL_ONLY_RE = re.compile(rf'\s*(?P<label>{_IDENT}):' + _COMMENT)
+_DATA_RE = re.compile(rf'\s*(?P<name>{_IDENT})\s+(?P<directive>{"|".join(sorted(DATA_DIRECTIVES))})'
+                      r'\s+(?P<value>[^\s;]+)' + _COMMENT)
+_INT_RE = re.compile(r'[+-]?\d+')
+
+
+@lru_cache(maxsize=None)
+def _instruction_regex(opcodes: frozenset):
+    """Compile the instruction line regex for an opcode table.
+
+    A label is either `NAME:` or a bare leading word directly followed by a
+    known opcode (`AGAIN MULT AREG, D`). Instructions take at most two
+    operands, so both are captured directly instead of splitting afterwards.
+    The pattern is unanchored at the end and free of lazy quantifiers; the
+    caller checks that only a comment (or nothing) follows the match.
+    """
+    alternation = '|'.join(sorted(map(re.escape, opcodes), key=len, reverse=True))
+    return re.compile(
+        rf'\s*(?:(?P<label>{_IDENT})(?::\s*|\s+(?=(?:{alternation})\b)))?'
+        rf'(?P<opcode>{_IDENT})(?:\s+(?P<op1>[^\s,;]+)(?:\s*,\s*(?P<op2>[^\s,;]+))?)?\s*'
+    )
+
+
+class ClassicalParseError(ValueError):
+    """Raised for malformed assembly; carries the 1-based line and column span."""
+
+    def __init__(self, message: str, line: int, span: Tuple[int, int], source: str = ""):
+        self.line = line
+        self.span = span
+        self.source = source.rstrip('\n')
+        super().__init__(f"line {line}, col {span[0]}-{span[1]}: {message}")
+
+
 @dataclass
 class Instruction:
     """Represents a single assembly instruction"""
@@ -14,6 +63,12 @@ class Instruction:
     operands: List[str] = field(default_factory=list)
     label: Optional[str] = None
     line_number: int = 0
+    column: int = 0  # 1-based column of the opcode
+
+    @property
+    def span(self) -> Tuple[int, int]:
+        """1-based (start, end) columns of the opcode in its source line"""
+        return (self.column, self.column + len(self.opcode) - 1)
 
 @dataclass
 class DataDefinition:
@@ -33,121 +88,127 @@ class ClassicalAST:
 
 class ClassicalAssemblyParser:
     """Parser for classical assembly language"""
-    
-    def __init__(self):
+
+    def __init__(self, opcodes: Iterable[str] = OPCODES):
         self.ast = ClassicalAST()
         self.current_line = 0
-    
+        self.opcodes = frozenset(opcodes)
+        self._instr_re = _instruction_regex(self.opcodes)
+
     def parse_file(self, file_path: str) -> ClassicalAST:
         """Parse assembly file and return AST"""
         with open(file_path, 'r') as f:
-            lines = f.readlines()
-        
-        return self.parse_lines(lines)
-    
+            return self.parse_stream(f)
+
     def parse_text(self, text: str) -> ClassicalAST:
         """Parse assembly text and return AST"""
-        lines = text.strip().split('\n')
-        return self.parse_lines(lines)
-    
-    def parse_lines(self, lines: List[str]) -> ClassicalAST:
-        """Parse list of assembly lines"""
+        return self.parse_lines(text.splitlines())
+
+    def parse_stream(self, fileobj: TextIO) -> ClassicalAST:
+        """Parse an open text stream line by line without reading it into memory"""
+        return self.parse_lines(fileobj)
+
+    def parse_lines(self, lines: Iterable[str]) -> ClassicalAST:
+        """Parse an iterable of assembly lines in a single pass"""
         self.ast = ClassicalAST()
-        instruction_index = 0
-        
-        for i, line in enumerate(lines):
-            self.current_line = i + 1
-            line = line.strip()
-            
-            # Skip empty lines and comments
-            if not line or line.startswith(';'):
-                continue
-            
-            # Handle START directive
-            if line.startswith('START'):
-                parts = line.split()
-                if len(parts) > 1:
-                    self.ast.start_address = int(parts[1])
+        instructions = self.ast.instructions
+        opcodes = self.opcodes
+        instr_match = self._instr_re.match
+
+        lineno = 0
+        for lineno, line in enumerate(lines, 1):
+            # Fast path: one regex match classifies ordinary instruction lines
+            m = instr_match(line)
+            if m is not None:
+                label, opcode, op1, op2 = m.groups()
+                end = m.end()
+                if opcode in opcodes and (end == len(line) or line[end] == ';'):
+                    if label:
+                        self._add_label(label, len(instructions), lineno, m.start(1) + 1, line)
+                    if op2 is not None:
+                        operands = [op1, op2]
+                    elif op1 is not None and opcode != 'STOP':
+                        operands = [op1]
+                    else:
+                        operands = []
+                    instructions.append(Instruction(opcode, operands, label, lineno, m.start(2) + 1))
+                    continue
+
+            stripped = line.strip()
+            if not stripped or stripped[0] == ';':
                 continue
-            
-            # Handle END directive
-            if line == 'END':
+            self.current_line = lineno
+            if not self._parse_directive(line, lineno, m):
                 break
-            
-            # Check if line has a label
-            label = None
-            if ':' in line:
-                label, line = line.split(':', 1)
-                label = label.strip()
-                line = line.strip()
-                self.ast.labels[label] = instruction_index
-            elif ' ' in line and not line.split()[0] in ['MOVER', 'ADD', 'SUB', 'MULT', 'COMP', 'BC', 'MOVEM', 'STOP']:
-                # Check if first word might be a label
-                parts = line.split()
-                if len(parts) > 1 and parts[1] in ['MOVER', 'ADD', 'SUB', 'MULT', 'COMP', 'BC', 'MOVEM']:
-                    label = parts[0]
-                    line = ' '.join(parts[1:])
-                    self.ast.labels[label] = instruction_index
-            
-            # Parse data definitions
-            if self._is_data_definition(line):
-                self._parse_data_definition(line, label)
-                continue
-            
-            # Parse instructions
-            if line and line != 'STOP':
-                instruction = self._parse_instruction(line, label)
-                if instruction:
-                    self.ast.instructions.append(instruction)
-                    instruction_index += 1
-            elif line == 'STOP':
-                # Add STOP as final instruction
-                instruction = Instruction('STOP', [], label, self.current_line)
-                self.ast.instructions.append(instruction)
-                instruction_index += 1
-        
+
+        self.current_line = lineno
         return self.ast
-    
-    def _is_data_definition(self, line: str) -> bool:
-        """Check if line is a data definition"""
-        parts = line.split()
-        return len(parts) >= 3 and parts[1] in ['DC', 'DS']
-    
-    def _parse_data_definition(self, line: str, label: Optional[str]):
-        """Parse data definition line"""
-        parts = line.split()
-        if len(parts) >= 3:
-            name = parts[0]
-            directive = parts[1]
-            
-            if directive == 'DC':
-                value = int(parts[2]) if parts[2].isdigit() else parts[2]
-                size = 1
-            elif directive == 'DS':
-                size = int(parts[2]) if parts[2].isdigit() else 1
-                value = 0
-            
-            data_def = DataDefinition(name, directive, value, size)
-            self.ast.data_definitions[name] = data_def
-    
-    def _parse_instruction(self, line: str, label: Optional[str]) -> Optional[Instruction]:
-        """Parse a single instruction line"""
-        parts = line.split()
-        if not parts:
-            return None
-        
-        opcode = parts[0]
-        operands = []
-        
-        if len(parts) > 1:
-            # Handle operands separated by commas
-            operand_str = ' '.join(parts[1:])
-            operands = [op.strip() for op in operand_str.split(',')]
-        
-        return Instruction(opcode, operands, label, self.current_line)
+
+    def _parse_directive(self, line: str, lineno: int, instr_m) -> bool:
+        """Handle non-instruction lines; returns False when END is reached"""
+        m = _DATA_RE.match(line)
+        if m:
+            self._add_data_definition(m, lineno, line)
+            return True
+        m = _START_RE.match(line)
+        if m:
+            self._set_start(m, lineno, line)
+            return True
+        if _END_RE.match(line):
+            return False
+        m = _LABEL_ONLY_RE.match(line)
+        if m:
+            self._add_label(m.group('label'), len(self.ast.instructions), lineno,
+                            m.start('label') + 1, line)
+            return True
+        if instr_m is not None:
+            if instr_m.group('opcode') not in self.opcodes:
+                start, end = instr_m.span('opcode')
+                raise ClassicalParseError(f"unknown opcode '{instr_m.group('opcode')}'", lineno,
+                                          (start + 1, end), line)
+            text = line.rstrip()
+            raise ClassicalParseError("unexpected operand text", lineno,
+                                      (instr_m.end() + 1, len(text)), line)
+        text = line.rstrip()
+        indent = len(text) - len(text.lstrip())
+        raise ClassicalParseError("unrecognised statement", lineno, (indent + 1, len(text)), line)
+
+    def _add_label(self, label: str, index: int, lineno: int, col: int, line: str):
+        """Bind a label to the index of the next instruction"""
+        if label in self.ast.labels:
+            raise ClassicalParseError(f"duplicate label '{label}'", lineno,
+                                      (col, col + len(label) - 1), line)
+        self.ast.labels[label] = index
+
+    def _set_start(self, m, lineno: int, line: str):
+        """Handle the START directive"""
+        addr = m.group('addr')
+        if addr is None:
+            return
+        if not _INT_RE.fullmatch(addr):
+            start, end = m.span('addr')
+            raise ClassicalParseError(f"START address must be an integer, got '{addr}'", lineno,
+                                      (start + 1, end), line)
+        self.ast.start_address = int(addr)
+
+    def _add_data_definition(self, m, lineno: int, line: str):
+        """Handle a DC/DS line matched by the data regex"""
+        name, directive, raw = m.group('name', 'directive', 'value')
+        is_int = _INT_RE.fullmatch(raw) is not None
+        if directive == 'DC':
+            value = int(raw) if is_int else raw
+            size = 1
+        else:
+            if not is_int:
+                start, end = m.span('value')
+                raise ClassicalParseError(f"DS size must be an integer, got '{raw}'", lineno,
+                                          (start + 1, end), line)
+            value = 0
+            size = int(raw)
+        self.ast.data_definitions[name] = DataDefinition(name, directive, value, size)
 
 
 def parse_classical_assembly(text: str) -> ClassicalAST:
     """Convenience function to parse assembly text"""
     parser = ClassicalAssemblyParser()
-    return parser.parse_text(text)
\ No newline at end of file
+    return parser.parse_text(text)
@@ -1,5 +1,35 @@
-# Small lexer stub (kept for extensibility). We rely on qiskit.qasm3 for parsing,
-# but a custom lexer could be implemented here if needed.
+"""
+Tokenizer for OpenQASM source, used by the native QASM3 frontend (qasm3_parser).
+
+tokenize_qasm3 yields Token(kind, text, line), where kind is one of 'num',
+'id', 'str', 'op' or 'error' (a character no token starts with). Whitespace and
+// and /* */ comments are dropped.
+"""
+import re
+from collections import namedtuple
+
+Token = namedtuple('Token', 'kind text line')
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<num>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<id>[A-Za-z_πτ][\wπτ]*)
+  | (?P<str>"[^"\n]*")
+  | (?P<op>->|==|!=|<=|>=|&&|\|\||\*\*|[-+*/%()\[\]{};:,=<>!~&|^@$])
+  | (?P<error>.)
+''', re.X | re.S)
+
+
+def tokenize_qasm3(source: str):
+    line = 1
+    for m in _TOKEN_RE.finditer(source):
+        kind, text = m.lastgroup, m.group()
+        if kind not in ('ws', 'comment'):
+            yield Token(kind, text, line)
+        line += text.count('\n')
+
+
 def tokenize_qasm(source: str):
     # Extremely simple whitespace splitting; placeholder
     return source.replace('(', ' ( ').replace(')', ' ) ').split()
@@ -1,13 +1,82 @@
 """
 Extended NASM Assembly Parser for quantum-llvm-compiler
 Handles NASM x86_64 syntax and converts to LLVM IR
+
+Data directives become typed LLVM globals: `db`/`dw`/`dd`/`dq` values and
+strings are `[N x iW]` constant arrays, `.bss` `resb`/`resw`/`resd`/`resq`
+storage is zero-initialized, and `equ` constants (including `$ - label`
+lengths) are folded at parse time. Memory operands such as
+`[my_array + rbx*4]` are lowered to `getelementptr` loads and stores, and
+labels and jumps become basic blocks, so array loops reach LLVM as counted
+loops over typed arrays.
 """
 
+import ast as pyast
+import operator
 import re
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from llvmlite import ir
 
+I32 = ir.IntType(32)
+I64 = ir.IntType(64)
+
+# Element width in bytes of each data / reservation directive and size keyword
+DATA_DIRECTIVES = {'db': 1, 'dw': 2, 'dd': 4, 'dq': 8}
+RESERVE_DIRECTIVES = {'resb': 1, 'resw': 2, 'resd': 4, 'resq': 8}
+SIZE_KEYWORDS = {'byte': 1, 'word': 2, 'dword': 4, 'qword': 8}
+
+# Assembler directives with no code generation effect
+_IGNORED_DIRECTIVES = frozenset({'global', 'extern', 'bits', 'default', 'align', 'cpu'})
+
+
+def _register_table() -> Dict[str, Tuple[str, int]]:
+    """Map every general purpose register name to (64-bit base, width in bits)"""
+    table = {}
+    for base, dword, word, byte in (('rax', 'eax', 'ax', 'al'), ('rbx', 'ebx', 'bx', 'bl'),
+                                    ('rcx', 'ecx', 'cx', 'cl'), ('rdx', 'edx', 'dx', 'dl'),
+                                    ('rsi', 'esi', 'si', 'sil'), ('rdi', 'edi', 'di', 'dil'),
+                                    ('rbp', 'ebp', 'bp', 'bpl'), ('rsp', 'esp', 'sp', 'spl')):
+        table.update({base: (base, 64), dword: (base, 32), word: (base, 16), byte: (base, 8)})
+    for n in range(8, 16):
+        base = f'r{n}'
+        table.update({base: (base, 64), f'{base}d': (base, 32),
+                      f'{base}w': (base, 16), f'{base}b': (base, 8)})
+    return table
+
+
+REGISTERS = _register_table()
+
+# Condition code suffix (jCC / setCC / cmovCC) -> icmp on the last flag-setting
+# instruction; a trailing 'u' selects an unsigned comparison
+CONDITION_CODES = {
+    'e': '==', 'z': '==', 'ne': '!=', 'nz': '!=',
+    'l': '<', 'nge': '<', 'le': '<=', 'ng': '<=',
+    'g': '>', 'nle': '>', 'ge': '>=', 'nl': '>=',
+    'b': '<u', 'c': '<u', 'nae': '<u', 'be': '<=u', 'na': '<=u',
+    'a': '>u', 'nbe': '>u', 'ae': '>=u', 'nb': '>=u', 'nc': '>=u',
+    's': 's', 'ns': 'ns',
+}
+
+_NAME = r'[A-Za-z_.?][\w$#@~.?]*'
+_LABEL_RE = re.compile(rf'(?P<label>{_NAME}):\s*(?P<rest>.*)$')
+_DATA_RE = re.compile(
+    rf'(?P<name>{_NAME}):?\s+(?:times\s+(?P<times>\S+)\s+)?'
+    r'(?P<directive>d[bwdq]|res[bwdq]|equ)\b\s*(?P<args>.*)$', re.IGNORECASE)
+_SIZED_RE = re.compile(r'(?P<size>byte|word|dword|qword)\s+(?P<rest>.*)$', re.IGNORECASE)
+_HEX_SUFFIX_RE = re.compile(r'\b([0-9][0-9A-Fa-f]*)[hH]\b')
+_CHAR_RE = re.compile(r"'([^']*)'|\"([^\"]*)\"|`([^`]*)`")
+_SCALED_RE = re.compile(r'(?P<a>[^*]+?)\s*\*\s*(?P<b>[^*]+)$')
+
+
+class NASMParseError(ValueError):
+    """Raised for NASM source the frontend cannot parse or lower"""
+
+    def __init__(self, message: str, line: int = 0):
+        self.line = line
+        super().__init__(f"line {line}: {message}" if line else message)
+
+
 @dataclass
 class NASMInstruction:
     """Represents a NASM assembly instruction"""
@@ -15,6 +84,21 @@ class NASMInstruction:
     operands: List[str] = field(default_factory=list)
     label: Optional[str] = None
     section: Optional[str] = None
+    line: int = 0
+
+@dataclass
+class NASMData:
+    """A `dX` or `resX` symbol: `count` elements of `width` bytes"""
+    name: str
+    width: int
+    count: int
+    values: List[int] = field(default_factory=list)  # empty for resX storage
+    section: str = '.data'
+    offset: int = 0  # byte offset within its section, for `$` arithmetic
+
+    @property
+    def size(self) -> int:
+        return self.width * self.count
 
 @dataclass
 class NASMProgram:
@@ -22,253 +106,749 @@ class NASMProgram:
     data_section: Dict[str, Any] = field(default_factory=dict)
     text_instructions: List[NASMInstruction] = field(default_factory=list)
     bss_section: Dict[str, Any] = field(default_factory=dict)
+    constants: Dict[str, int] = field(default_factory=dict)  # folded `equ` values
+
+    def symbol(self, name: str) -> Optional[NASMData]:
+        return self.data_section.get(name) or self.bss_section.get(name)
+
+
+# -- constant expressions ----------------------------------------------------
+
+_MASK64 = (1 << 64) - 1
+
+
+def _signed64(value: int) -> int:
+    value &= _MASK64
+    return value - (1 << 64) if value >> 63 else value
+
+
+def _unsigned_div(a: int, b: int) -> int:
+    """NASM `/`: both operands as unsigned 64-bit"""
+    return (a & _MASK64) // (b & _MASK64)
+
+
+def _signed_div(a: int, b: int) -> int:
+    """NASM `//`: signed 64-bit, truncating toward zero"""
+    a, b = _signed64(a), _signed64(b)
+    quotient = abs(a) // abs(b)
+    return quotient if (a < 0) == (b < 0) else -quotient
+
+
+_BINARY_OPS = {
+    pyast.Add: operator.add, pyast.Sub: operator.sub, pyast.Mult: operator.mul,
+    pyast.Div: _unsigned_div, pyast.FloorDiv: _signed_div, pyast.Mod: operator.mod,
+    pyast.LShift: operator.lshift, pyast.RShift: operator.rshift,
+    pyast.BitAnd: operator.and_, pyast.BitOr: operator.or_, pyast.BitXor: operator.xor,
+}
+_UNARY_OPS = {pyast.USub: operator.neg, pyast.UAdd: operator.pos, pyast.Invert: operator.invert}
+
+
+def _char_value(text: str) -> int:
+    """NASM character constants are little-endian byte strings"""
+    return int.from_bytes(text.encode('latin-1'), 'little')
+
+
+def evaluate_expression(expr: str, symbols: Dict[str, int]) -> int:
+    """Fold a NASM constant expression; `$` and `$$` must be present in `symbols`"""
+    text = _CHAR_RE.sub(lambda m: str(_char_value(next(g for g in m.groups() if g is not None))), expr)
+    text = _HEX_SUFFIX_RE.sub(r'0x\1', text)
+    text = text.replace('$$', ' __section__ ').replace('$', ' __here__ ')
+    try:
+        tree = pyast.parse(text.strip(), mode='eval')
+    except SyntaxError:
+        raise NASMParseError(f"invalid expression '{expr}'") from None
+
+    def fold(node):
+        if isinstance(node, pyast.Expression):
+            return fold(node.body)
+        if isinstance(node, pyast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, pyast.Name):
+            key = {'__here__': '$', '__section__': '$$'}.get(node.id, node.id)
+            if key not in symbols:
+                raise NASMParseError(f"undefined symbol '{key}' in '{expr}'")
+            return symbols[key]
+        if isinstance(node, pyast.BinOp) and type(node.op) in _BINARY_OPS:
+            try:
+                return _BINARY_OPS[type(node.op)](fold(node.left), fold(node.right))
+            except ZeroDivisionError:
+                raise NASMParseError(f"division by zero in '{expr}'") from None
+        if isinstance(node, pyast.UnaryOp) and type(node.op) in _UNARY_OPS:
+            return _UNARY_OPS[type(node.op)](fold(node.operand))
+        raise NASMParseError(f"unsupported expression '{expr}'")
+
+    return fold(tree)
+
+
+def _split_top_level(text: str, separators: str) -> List[Tuple[str, str]]:
+    """Split on separator characters outside quotes/parentheses; returns (sep, piece) pairs"""
+    pieces, depth, quote, sep, start = [], 0, None, '', 0
+    for i, ch in enumerate(text):
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in '\'"`':
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch in separators and depth == 0 and text[start:i].strip():
+            pieces.append((sep, text[start:i].strip()))
+            sep, start = ch, i + 1
+        elif ch in separators and depth == 0 and not pieces and not text[start:i].strip():
+            # leading unary sign belongs to the first term
+            continue
+    pieces.append((sep, text[start:].strip()))
+    return pieces
+
+
+def _strip_comment(line: str) -> str:
+    """Drop a trailing `;` comment that is not inside a quoted string"""
+    quote = None
+    for i, ch in enumerate(line):
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in '\'"`':
+            quote = ch
+        elif ch == ';':
+            return line[:i]
+    return line
+
+
+# -- lowering dispatch ---------------------------------------------------------
+
+# opcode -> handler(compiler: NASMToLLVMCompiler, instr: NASMInstruction)
+NASM_HANDLERS: Dict[str, Callable[['NASMToLLVMCompiler', NASMInstruction], None]] = {}
+
+
+def register_nasm_opcode(*opcodes: str):
+    """Decorator registering a lowering handler for one or more NASM mnemonics"""
+    def decorator(fn):
+        for opcode in opcodes:
+            NASM_HANDLERS[opcode] = fn
+        return fn
+    return decorator
+
 
 class NASMToLLVMCompiler:
     """Compiles NASM x86_64 assembly to LLVM IR"""
-    
+
     def __init__(self):
         self.program = NASMProgram()
         self.current_section = None
+        self._offsets: Dict[str, int] = {}  # section -> current `$`
+        self._scope = ''  # last non-local label, qualifies `.local` labels
+
+    # -- parsing -----------------------------------------------------------
 
     def parse_nasm_file(self, filepath: str) -> NASMProgram:
         """Parse NASM assembly file"""
         with open(filepath, 'r') as f:
-            lines = f.readlines()
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith(';'):
+            return self.parse_text(f.read())
+
+    def parse_text(self, text: str) -> NASMProgram:
+        """Parse NASM assembly source text"""
+        in_macro = False
+        for lineno, raw in enumerate(text.splitlines(), 1):
+            line = _strip_comment(raw).strip()
+            if not line:
                 continue
-            
+
+            # The preprocessor is not modelled: macro bodies are skipped and
+            # their invocations are lowered as unsupported instructions
+            if line.startswith('%'):
+                directive = line.split(None, 1)[0].lower()
+                if directive in ('%macro', '%imacro'):
+                    in_macro = True
+                elif directive == '%endmacro':
+                    in_macro = False
+                continue
+            if in_macro:
+                continue
+
             # Handle sections
-            if line.startswith('section '):
+            keyword = line.split(None, 1)[0].lower()
+            if keyword in ('section', 'segment'):
                 self.current_section = line.split()[1]
                 continue
-            
-            # Handle data definitions
-            if self.current_section == '.data':
-                self._parse_data_line(line)
-            elif self.current_section == '.text':
-                self._parse_instruction_line(line)
-        
+            if keyword in _IGNORED_DIRECTIVES:
+                continue
+
+            # Data definitions and equates may appear in any section
+            m = _DATA_RE.match(line)
+            if m:
+                self._parse_data_line(m, lineno)
+            elif self.current_section in (None, '.text'):
+                self._parse_instruction_line(line, lineno)
+            else:
+                raise NASMParseError(f"unrecognised statement in {self.current_section}: '{line}'", lineno)
+
         return self.program
 
-    def _parse_data_line(self, line: str):
-        """Parse data section lines"""
-        # Skip comments and empty lines
-        if line.startswith(';') or not line.strip():
+    def _parse_data_line(self, m, lineno: int):
+        """Parse a `dX`, `resX` or `equ` definition"""
+        name = self._qualify(m.group('name'))
+        directive = m.group('directive').lower()
+        args = m.group('args').strip()
+        section = self.current_section or '.data'
+        here = self._offsets.get(section, 0)
+
+        if directive == 'equ':
+            symbols = self._symbols(section)
+            symbols['$'] = here
+            self.program.constants[name] = evaluate_expression(args, symbols)
             return
-            
-        # Handle equates (constants)
-        if 'equ' in line:
-            return  # Skip equates for now
-            
-        if ':' in line and ('db' in line or 'dw' in line or 'dd' in line or 'resb' in line):
-            parts = line.split(':', 1)
-            name = parts[0].strip()
-            definition = parts[1].strip()
-            
-            if 'db' in definition:
-                # Handle byte definitions
-                content = definition.replace('db', '').strip()
-                if content.startswith('"') and content.endswith('"'):
-                    # String literal
-                    self.program.data_section[name] = {
-                        'type': 'string',
-                        'value': content[1:-1]  # Remove quotes
-                    }
-                else:
-                    # Numeric values - handle mixed content
-                    values = []
-                    parts = content.split(',')
-                    for part in parts:
-                        part = part.strip()
-                        if part.isdigit():
-                            values.append(int(part))
-                        elif part == '10':  # newline
-                            values.append(10)
-                        elif part == '0':
-                            values.append(0)
-                        elif len(part) == 1 and ord(part) < 256:
-                            values.append(ord(part))
-                    
-                    if values:  # Only add if we have values
-                        self.program.data_section[name] = {
-                            'type': 'bytes',
-                            'value': values
-                        }
-            elif 'resb' in definition:
-                # Reserved bytes (BSS section)
-                size_str = definition.replace('resb', '').strip()
-                if size_str.isdigit():
-                    size = int(size_str)
-                    self.program.data_section[name] = {
-                        'type': 'reserved',
-                        'size': size
-                    }
-
-    def _parse_instruction_line(self, line: str):
+
+        times = 1
+        if m.group('times'):
+            times = self._evaluate(m.group('times'), lineno)
+        if directive in RESERVE_DIRECTIVES:
+            width = RESERVE_DIRECTIVES[directive]
+            count = times * self._evaluate(args, lineno)
+            data = NASMData(name, width, count, section=section, offset=here)
+        else:
+            width = DATA_DIRECTIVES[directive]
+            values = self._data_values(args, width, lineno) * times
+            data = NASMData(name, width, len(values), values, section, here)
+
+        self._offsets[section] = here + data.size
+        if section == '.bss' or directive in RESERVE_DIRECTIVES:
+            self.program.bss_section[name] = data
+        else:
+            self.program.data_section[name] = data
+
+    def _data_values(self, args: str, width: int, lineno: int) -> List[int]:
+        """Expand a `dX` operand list (numbers, expressions, strings) into elements"""
+        values = []
+        for _, item in _split_top_level(args, ','):
+            if not item:
+                continue
+            if len(item) >= 2 and item[0] in '\'"`' and item[-1] == item[0]:
+                # strings fill whole elements, zero padded to the element width
+                raw = item[1:-1].encode('latin-1')
+                raw += b'\0' * (-len(raw) % width)
+                values.extend(int.from_bytes(raw[i:i + width], 'little')
+                              for i in range(0, len(raw), width))
+            else:
+                values.append(self._evaluate(item, lineno))
+        return values
+
+    def _symbols(self, section: str) -> Dict[str, int]:
+        """Constants plus same-section data offsets, for `$ - label` arithmetic"""
+        symbols = {'$$': 0}
+        for table in (self.program.data_section, self.program.bss_section):
+            symbols.update({n: d.offset for n, d in table.items() if d.section == section})
+        symbols.update(self.program.constants)
+        return symbols
+
+    def _evaluate(self, expr: str, lineno: int = 0) -> int:
+        try:
+            return evaluate_expression(expr, dict(self.program.constants, **{'$$': 0}))
+        except NASMParseError as e:
+            raise NASMParseError(str(e), lineno) from None
+
+    def _qualify(self, name: str) -> str:
+        """Expand NASM `.local` labels to `scope.local`"""
+        return self._scope + name if name.startswith('.') else name
+
+    def _parse_instruction_line(self, line: str, lineno: int):
         """Parse instruction lines"""
-        # Handle labels
-        if ':' in line and not any(op in line for op in ['mov', 'add', 'sub', 'cmp', 'jmp']):
-            label = line.split(':')[0].strip()
-            remaining = line.split(':', 1)[1].strip() if ':' in line else ""
+        m = _LABEL_RE.match(line)
+        if m:
+            label = m.group('label')
+            if not label.startswith('.'):
+                self._scope = label
+            label = self._qualify(label)
+            remaining = m.group('rest').strip()
             if remaining:
                 # Label with instruction on same line
-                instr = self._parse_single_instruction(remaining)
+                instr = self._parse_single_instruction(remaining, lineno)
                 instr.label = label
                 self.program.text_instructions.append(instr)
             else:
                 # Label only
-                label_instr = NASMInstruction("LABEL", [label])
-                self.program.text_instructions.append(label_instr)
+                self.program.text_instructions.append(NASMInstruction("LABEL", [label], line=lineno))
         else:
             # Regular instruction
-            instr = self._parse_single_instruction(line)
-            self.program.text_instructions.append(instr)
+            self.program.text_instructions.append(self._parse_single_instruction(line, lineno))
 
-    def _parse_single_instruction(self, line: str) -> NASMInstruction:
+    def _parse_single_instruction(self, line: str, lineno: int = 0) -> NASMInstruction:
         """Parse a single instruction"""
-        parts = line.split()
+        parts = line.split(None, 1)
         if not parts:
-            return NASMInstruction("NOP")
-        
-        opcode = parts[0]
+            return NASMInstruction("NOP", line=lineno)
+
+        opcode = parts[0].lower()
         operands = []
-        
         if len(parts) > 1:
-            operand_str = ' '.join(parts[1:])
-            operands = [op.strip() for op in operand_str.split(',')]
-        
-        return NASMInstruction(opcode, operands)
+            operands = [self._qualify(op) for _, op in _split_top_level(parts[1], ',')]
+
+        return NASMInstruction(opcode, operands, section=self.current_section, line=lineno)
+
+    # -- code generation ---------------------------------------------------
 
     def generate_llvm_ir(self) -> str:
         """Generate LLVM IR from parsed NASM program"""
-        module = ir.Module(name="nasm_module")
-        
+        self.module = ir.Module(name="nasm_module")
+
         # Create main function
-        func_type = ir.FunctionType(ir.IntType(32), [])
-        main_func = ir.Function(module, func_type, name="main")
-        
-        # Create entry block
-        entry_block = main_func.append_basic_block(name="entry")
-        builder = ir.IRBuilder(entry_block)
-        
-        # Generate global variables for data section (simplified approach)
-        globals_map = {}
-        for name, data in self.program.data_section.items():
-            # Create a simple global variable as placeholder (like QIR builder does)
-            global_var = ir.GlobalVariable(module, ir.IntType(8), name=name)
-            global_var.linkage = 'internal'
-            global_var.initializer = ir.Constant(ir.IntType(8), 0)
-            globals_map[name] = global_var
-        
-        # Allocate virtual registers
-        registers = {}
-        for reg in ['rax', 'rbx', 'rcx', 'rdx', 'rdi', 'rsi']:
-            registers[reg] = builder.alloca(ir.IntType(64), name=reg)
-            # Initialize to 0
-            builder.store(ir.Constant(ir.IntType(64), 0), registers[reg])
-        
-        # Simple linear instruction generation (no control flow for now)
+        func_type = ir.FunctionType(I32, [])
+        self.function = ir.Function(self.module, func_type, name="main")
+        entry_block = self.function.append_basic_block(name="entry")
+        self.builder = ir.IRBuilder(entry_block)
+        self.current: Optional[NASMInstruction] = None
+
+        self._create_globals()
+        self._allocate_registers()
+        self._create_blocks()
+        exit_block = self.function.append_basic_block(name="exit")
+
         for instr in self.program.text_instructions:
-            # Skip labels for now
+            self.current = instr
+            label = instr.operands[0] if instr.opcode == "LABEL" else instr.label
+            if label:
+                self.enter_block(self.blocks[label])
             if instr.opcode == "LABEL":
                 continue
-            
-            # Translate x86_64 instructions to LLVM IR
-            if instr.opcode == 'mov':
-                self._generate_mov(builder, instr, registers, globals_map)
-            elif instr.opcode == 'add':
-                self._generate_add(builder, instr, registers)
-            elif instr.opcode == 'xor':
-                self._generate_xor(builder, instr, registers)
-            elif instr.opcode == 'inc':
-                self._generate_inc(builder, instr, registers)
-            # Skip complex control flow instructions for now
-            elif instr.opcode in ['cmp', 'jmp', 'jge', 'jl', 'je', 'jne', 'syscall']:
-                # Add as comment in IR
-                builder.comment(f"; {instr.opcode} {' '.join(instr.operands)}")
-        
-        # Add return
-        ret_val = ir.Constant(ir.IntType(32), 0)
-        builder.ret(ret_val)
-        
-        return str(module)
-
-    def _generate_mov(self, builder, instr, registers, globals_map):
-        """Generate LLVM IR for mov instruction"""
-        if len(instr.operands) >= 2:
-            dest = instr.operands[0]
-            src = instr.operands[1]
-            
-            # Handle register to register moves
-            if dest in registers and src in registers:
-                src_val = builder.load(registers[src], name=f"load_{src}")
-                builder.store(src_val, registers[dest])
-            elif dest in registers:
-                # Move immediate or global to register
-                if src.isdigit():
-                    imm_val = ir.Constant(ir.IntType(64), int(src))
-                    builder.store(imm_val, registers[dest])
-                elif src in globals_map:
-                    # Address of global
-                    addr = builder.gep(globals_map[src], [ir.Constant(ir.IntType(32), 0)], name=f"addr_{src}")
-                    builder.store(addr, registers[dest])
-
-    def _generate_add(self, builder, instr, registers):
-        """Generate LLVM IR for add instruction"""
-        if len(instr.operands) >= 2:
-            dest = instr.operands[0]
-            src = instr.operands[1]
-            
-            if dest in registers:
-                dest_val = builder.load(registers[dest], name=f"load_{dest}")
-                if src in registers:
-                    src_val = builder.load(registers[src], name=f"load_{src}")
+            if self.builder.block.is_terminated:
+                # code after an unconditional transfer only runs if something jumps here
+                self.enter_block(self.function.append_basic_block(name="cont"))
+            handler = NASM_HANDLERS.get(instr.opcode)
+            if handler is None:
+                # syscalls, calls and stack traffic have no IR equivalent here
+                self.builder.comment(f"unsupported: {instr.opcode} {', '.join(instr.operands)}")
+            else:
+                handler(self, instr)
+
+        if not self.builder.block.is_terminated:
+            self.builder.branch(exit_block)
+        ir.IRBuilder(exit_block).ret(ir.Constant(I32, 0))
+        return str(self.module)
+
+    def _create_globals(self):
+        """One typed `[N x iW]` global per data symbol; reserved storage is zeroed"""
+        self.globals: Dict[str, ir.GlobalVariable] = {}
+        for table in (self.program.data_section, self.program.bss_section):
+            for name, data in table.items():
+                elem = ir.IntType(data.width * 8)
+                array_ty = ir.ArrayType(elem, max(data.count, 1))
+                global_var = ir.GlobalVariable(self.module, array_ty, name=name)
+                global_var.linkage = 'internal'
+                global_var.global_constant = data.section == '.rodata'
+                global_var.align = data.width
+                if not data.values:
+                    global_var.initializer = ir.Constant(array_ty, None)
+                elif data.width == 1:
+                    global_var.initializer = ir.Constant(array_ty, bytearray(v & 0xFF for v in data.values))
                 else:
-                    src_val = ir.Constant(ir.IntType(64), int(src) if src.isdigit() else 0)
-                
-                result = builder.add(dest_val, src_val, name="add_result")
-                builder.store(result, registers[dest])
-
-    def _generate_xor(self, builder, instr, registers):
-        """Generate LLVM IR for xor instruction"""
-        if len(instr.operands) >= 2:
-            dest = instr.operands[0]
-            src = instr.operands[1]
-            
-            if dest in registers and dest == src:
-                # xor reg, reg = set to 0
-                zero = ir.Constant(ir.IntType(64), 0)
-                builder.store(zero, registers[dest])
-
-    def _generate_cmp(self, builder, instr, registers):
-        """Generate LLVM IR for cmp instruction"""
-        # Simplified: just store comparison result in a flag (not implemented fully)
-        pass
-
-    def _generate_jump(self, builder, instr, blocks):
-        """Generate LLVM IR for jump instructions"""
-        if len(instr.operands) >= 1:
-            target = instr.operands[0]
-            if target in blocks and not builder.block.is_terminated:
-                builder.branch(blocks[target])
-
-    def _generate_inc(self, builder, instr, registers):
-        """Generate LLVM IR for inc instruction"""
-        if len(instr.operands) >= 1:
-            reg = instr.operands[0]
-            if reg in registers:
-                reg_val = builder.load(registers[reg], name=f"load_{reg}")
-                one = ir.Constant(ir.IntType(64), 1)
-                result = builder.add(reg_val, one, name="inc_result")
-                builder.store(result, registers[reg])
-
-    def _generate_syscall(self, builder, registers):
-        """Generate LLVM IR for syscall (simplified)"""
-        # This is a placeholder - real syscall implementation would be more complex
-        pass
+                    bits = data.width * 8
+                    global_var.initializer = ir.Constant(
+                        array_ty, [ir.Constant(elem, _signed(v, bits)) for v in data.values])
+                self.globals[name] = global_var
+
+    def _allocate_registers(self):
+        """Allocate the 64-bit registers the program touches in the entry block, zeroed"""
+        used = set()
+        needs_flags = False
+        for instr in self.program.text_instructions:
+            for operand in instr.operands:
+                used.update(REGISTERS[w][0] for w in re.findall(r'\w+', operand.lower()) if w in REGISTERS)
+            needs_flags = needs_flags or _condition_suffix(instr.opcode) is not None
+            if instr.opcode in ('div', 'idiv', 'mul', 'cqo', 'cdq'):
+                used.update(('rax', 'rdx'))
+            elif instr.opcode == 'loop':
+                used.add('rcx')
+        self.registers: Dict[str, ir.AllocaInstr] = {}
+        for reg in sorted(used):
+            self.registers[reg] = self.builder.alloca(I64, name=reg)
+            self.builder.store(ir.Constant(I64, 0), self.registers[reg])
+        self.flags = None
+        if needs_flags:
+            self.flags = (self.builder.alloca(I64, name="cc_lhs"), self.builder.alloca(I64, name="cc_rhs"))
+
+    def _create_blocks(self):
+        """Create one basic block per text label"""
+        self.blocks: Dict[str, ir.Block] = {}
+        for instr in self.program.text_instructions:
+            label = instr.operands[0] if instr.opcode == "LABEL" else instr.label
+            if label:
+                self.blocks[label] = self.function.append_basic_block(name=label)
+
+    # -- helpers shared by handlers ----------------------------------------
+
+    def enter_block(self, block):
+        """Fall through into `block` and continue emitting there"""
+        if not self.builder.block.is_terminated:
+            self.builder.branch(block)
+        self.builder.position_at_end(block)
+
+    def error(self, message: str):
+        raise NASMParseError(message, self.current.line if self.current else 0)
+
+    def operand_width(self, operand: str) -> Optional[int]:
+        """Width in bits implied by a register or size keyword, None if unsized"""
+        reg = REGISTERS.get(operand.lower())
+        if reg:
+            return reg[1]
+        m = _SIZED_RE.match(operand)
+        if m:
+            return SIZE_KEYWORDS[m.group('size').lower()] * 8
+        memory = _memory_expression(operand)
+        if memory is not None:
+            symbol = self._address_terms(memory)[0]
+            if symbol is not None:
+                return self.program.symbol(symbol).width * 8
+        return None
+
+    def common_width(self, *operands: str) -> int:
+        for operand in operands:
+            width = self.operand_width(operand)
+            if width:
+                return width
+        return 64
+
+    def read(self, operand: str, bits: int):
+        """Value of a register, memory or immediate operand as an i`bits`"""
+        ty = ir.IntType(bits)
+        reg = REGISTERS.get(operand.lower())
+        if reg:
+            value = self.builder.load(self.registers[reg[0]], name=f"load_{operand.lower()}")
+            return self.resize(value, bits)
+        if _memory_expression(operand) is not None:
+            return self.builder.load(self.address(operand, bits), name="mem")
+
+        expr = _SIZED_RE.match(operand).group('rest') if _SIZED_RE.match(operand) else operand
+        symbol, base, index, _, disp = self._address_terms(expr)
+        if base or index:
+            self.error(f"register in immediate operand '{operand}'")
+        if symbol is None:
+            return ir.Constant(ty, _signed(disp, bits))
+        # a data label used as a value is its address
+        addr = self.builder.ptrtoint(self.globals[symbol], I64, name=f"addr_{symbol}")
+        if disp:
+            addr = self.builder.add(addr, ir.Constant(I64, disp))
+        return self.resize(addr, bits)
+
+    def write(self, operand: str, value):
+        """Store `value` to a register (x86 partial-register semantics) or memory"""
+        reg = REGISTERS.get(operand.lower())
+        if reg is None:
+            if _memory_expression(operand) is None:
+                self.error(f"cannot write to '{operand}'")
+            self.builder.store(value, self.address(operand, value.type.width))
+            return
+        base, bits = reg
+        slot = self.registers[base]
+        if bits >= 32:
+            # 32-bit writes zero-extend into the full register
+            self.builder.store(self.resize(value, 64), slot)
+            return
+        old = self.builder.load(slot)
+        keep = self.builder.and_(old, ir.Constant(I64, ~((1 << bits) - 1)))
+        self.builder.store(self.builder.or_(keep, self.builder.zext(value, I64)), slot)
+
+    def resize(self, value, bits: int, signed: bool = False):
+        """Truncate or extend an integer value to `bits`"""
+        width = value.type.width
+        if width == bits:
+            return value
+        if width > bits:
+            return self.builder.trunc(value, ir.IntType(bits))
+        return (self.builder.sext if signed else self.builder.zext)(value, ir.IntType(bits))
+
+    def address(self, operand: str, bits: int):
+        """Pointer to the i`bits` cell named by a `[ ... ]` memory operand"""
+        expr = _memory_expression(operand)
+        symbol, base, index, scale, disp = self._address_terms(expr)
+        if symbol is not None and base is None:
+            gv = self.globals[symbol]
+            elem_bytes = self.program.symbol(symbol).width
+            aligned = disp % elem_bytes == 0 and (not index or scale % elem_bytes == 0)
+            if bits == elem_bytes * 8 and aligned:
+                # element-aligned access: index straight into the typed array
+                idx = ir.Constant(I64, disp // elem_bytes)
+                if index:
+                    idx = self.read_index(index)
+                    if scale != elem_bytes:
+                        idx = self.builder.mul(idx, ir.Constant(I64, scale // elem_bytes))
+                    if disp:
+                        idx = self.builder.add(idx, ir.Constant(I64, disp // elem_bytes))
+                return self.builder.gep(gv, [ir.Constant(I64, 0), idx], inbounds=True, name=f"{symbol}_ptr")
+            raw = self.builder.bitcast(gv, ir.IntType(8).as_pointer())
+        else:
+            # register based address: byte offset from the pointer the register holds
+            base_val = self.builder.load(self.registers[REGISTERS[base][0]]) if base else ir.Constant(I64, 0)
+            if symbol is not None:
+                base_val = self.builder.add(base_val, self.builder.ptrtoint(self.globals[symbol], I64))
+            raw = self.builder.inttoptr(base_val, ir.IntType(8).as_pointer())
+        offset = ir.Constant(I64, disp)
+        if index:
+            scaled = self.builder.mul(self.read_index(index), ir.Constant(I64, scale))
+            offset = self.builder.add(scaled, offset) if disp else scaled
+        ptr = self.builder.gep(raw, [offset], name="byte_ptr")
+        return self.builder.bitcast(ptr, ir.IntType(bits).as_pointer())
+
+    def read_index(self, reg_name: str):
+        return self.resize(self.read(reg_name, REGISTERS[reg_name][1]), 64)
+
+    def _address_terms(self, expr: str):
+        """Split `sym + base + index*scale + disp` into its parts"""
+        symbol = base = index = None
+        scale, disp = 1, 0
+        constants = dict(self.program.constants, **{'$$': 0})
+        for sign, term in _split_top_level(expr, '+-'):
+            lowered = term.lower()
+            scaled = _SCALED_RE.match(lowered)
+            if lowered in REGISTERS and sign != '-':
+                if base is None:
+                    base = lowered
+                elif index is None:
+                    index = lowered
+                else:
+                    self.error(f"too many registers in '{expr}'")
+            elif scaled and (scaled.group('a') in REGISTERS or scaled.group('b') in REGISTERS):
+                reg, factor = ((scaled.group('a'), scaled.group('b')) if scaled.group('a') in REGISTERS
+                               else (scaled.group('b'), scaled.group('a')))
+                if index is not None:
+                    self.error(f"two scaled indexes in '{expr}'")
+                index, scale = reg, evaluate_expression(factor, constants)
+            elif self.program.symbol(term) is not None and sign != '-':
+                if symbol is not None:
+                    self.error(f"two data symbols in '{expr}'")
+                symbol = term
+            else:
+                value = evaluate_expression(term, constants) if term else 0
+                disp += -value if sign == '-' else value
+        return symbol, base, index, scale, disp
+
+    def set_flags(self, lhs, rhs):
+        """Record the operands a following jCC/setCC/cmovCC compares"""
+        if self.flags is None:
+            return
+        self.builder.store(self.resize(lhs, 64, signed=True), self.flags[0])
+        self.builder.store(self.resize(rhs, 64, signed=True), self.flags[1])
+
+    def condition(self, suffix: str):
+        """i1 value of condition code `suffix` against the recorded flags"""
+        lhs = self.builder.load(self.flags[0], name="cc_lhs")
+        rhs = self.builder.load(self.flags[1], name="cc_rhs")
+        op = CONDITION_CODES[suffix]
+        zero = ir.Constant(I64, 0)
+        if op in ('s', 'ns'):
+            diff = self.builder.sub(lhs, rhs)
+            return self.builder.icmp_signed('<' if op == 's' else '>=', diff, zero, name="cond")
+        if op.endswith('u'):
+            return self.builder.icmp_unsigned(op[:-1], lhs, rhs, name="cond")
+        return self.builder.icmp_signed(op, lhs, rhs, name="cond")
+
+
+def _signed(value: int, bits: int) -> int:
+    """Wrap `value` into the signed range of an i`bits`"""
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+
+def _memory_expression(operand: str) -> Optional[str]:
+    """Inner expression of `[...]` (optionally size-prefixed), else None"""
+    m = _SIZED_RE.match(operand)
+    text = (m.group('rest') if m else operand).strip()
+    if text.startswith('[') and text.endswith(']'):
+        inner = text[1:-1].strip()
+        return inner[4:].strip() if inner.lower().startswith('rel ') else inner
+    return None
+
+
+def _condition_suffix(opcode: str) -> Optional[str]:
+    for prefix in ('j', 'set', 'cmov'):
+        if opcode.startswith(prefix) and opcode[len(prefix):] in CONDITION_CODES:
+            return opcode[len(prefix):]
+    return None
+
+
+# -- handlers ------------------------------------------------------------------
+
+@register_nasm_opcode('mov')
+def _lower_mov(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    dest, src = _two_operands(c, instr)
+    c.write(dest, c.read(src, c.common_width(dest, src)))
+
+
+@register_nasm_opcode('movzx', 'movsx', 'movsxd')
+def _lower_move_extend(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    dest, src = _two_operands(c, instr)
+    src_bits = c.operand_width(src) or (32 if instr.opcode == 'movsxd' else 8)
+    value = c.read(src, src_bits)
+    c.write(dest, c.resize(value, c.common_width(dest), signed=instr.opcode != 'movzx'))
+
+
+@register_nasm_opcode('lea')
+def _lower_lea(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    dest, src = _two_operands(c, instr)
+    addr = c.builder.ptrtoint(c.address(src, 8), I64, name="lea")
+    c.write(dest, c.resize(addr, c.common_width(dest)))
+
+
+_BINARY = {
+    'add': 'add', 'sub': 'sub', 'and': 'and_', 'or': 'or_', 'xor': 'xor',
+    'imul': 'mul', 'shl': 'shl', 'sal': 'shl', 'shr': 'lshr', 'sar': 'ashr',
+}
+
+
+@register_nasm_opcode(*_BINARY)
+def _lower_binary(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    if instr.opcode == 'imul' and len(instr.operands) == 3:
+        dest, src, imm = instr.operands
+        bits = c.common_width(dest, src)
+        lhs, rhs = c.read(src, bits), c.read(imm, bits)
+    else:
+        dest, src = _two_operands(c, instr)
+        bits = c.common_width(dest, src)
+        lhs = c.read(dest, bits)
+        # shift counts come from cl or an immediate regardless of destination width
+        rhs = c.resize(c.read(src, c.common_width(src)), bits) if instr.opcode in ('shl', 'sal', 'shr', 'sar') \
+            else c.read(src, bits)
+    result = getattr(c.builder, _BINARY[instr.opcode])(lhs, rhs, name=f"{instr.opcode}_result")
+    c.write(dest, result)
+    if instr.opcode == 'sub':
+        c.set_flags(lhs, rhs)
+    else:
+        c.set_flags(result, ir.Constant(result.type, 0))
+
+
+@register_nasm_opcode('inc', 'dec', 'neg', 'not')
+def _lower_unary(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    if len(instr.operands) != 1:
+        c.error(f"{instr.opcode} expects one operand")
+    dest = instr.operands[0]
+    value = c.read(dest, c.common_width(dest))
+    one = ir.Constant(value.type, 1)
+    if instr.opcode == 'inc':
+        result = c.builder.add(value, one, name="inc_result")
+    elif instr.opcode == 'dec':
+        result = c.builder.sub(value, one, name="dec_result")
+    elif instr.opcode == 'neg':
+        result = c.builder.neg(value, name="neg_result")
+    else:
+        result = c.builder.not_(value, name="not_result")
+    c.write(dest, result)
+    if instr.opcode != 'not':
+        c.set_flags(result, ir.Constant(result.type, 0))
+
+
+@register_nasm_opcode('cmp', 'test')
+def _lower_compare(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    lhs_op, rhs_op = _two_operands(c, instr)
+    bits = c.common_width(lhs_op, rhs_op)
+    lhs, rhs = c.read(lhs_op, bits), c.read(rhs_op, bits)
+    if instr.opcode == 'test':
+        c.set_flags(c.builder.and_(lhs, rhs, name="test"), ir.Constant(lhs.type, 0))
+    else:
+        c.set_flags(lhs, rhs)
+
+
+@register_nasm_opcode('div', 'idiv', 'mul')
+def _lower_divide_multiply(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    if len(instr.operands) != 1:
+        c.error(f"{instr.opcode} expects one operand")
+    src = instr.operands[0]
+    bits = c.common_width(src)
+    if bits == 8:
+        c.builder.comment(f"unsupported: 8-bit {instr.opcode} {src}")
+        return
+    acc = {64: 'rax', 32: 'eax', 16: 'ax'}[bits]
+    high = {64: 'rdx', 32: 'edx', 16: 'dx'}[bits]
+    lhs, rhs = c.read(acc, bits), c.read(src, bits)
+    if instr.opcode == 'mul':
+        wide = ir.IntType(bits * 2)
+        product = c.builder.mul(c.builder.zext(lhs, wide), c.builder.zext(rhs, wide), name="mul_result")
+        c.write(acc, c.builder.trunc(product, lhs.type))
+        c.write(high, c.builder.trunc(c.builder.lshr(product, ir.Constant(wide, bits)), lhs.type))
+        return
+    # the high half of the dividend (rdx) is assumed to be the sign/zero fill
+    if instr.opcode == 'div':
+        quotient, remainder = c.builder.udiv(lhs, rhs), c.builder.urem(lhs, rhs)
+    else:
+        quotient, remainder = c.builder.sdiv(lhs, rhs), c.builder.srem(lhs, rhs)
+    c.write(acc, quotient)
+    c.write(high, remainder)
+
+
+@register_nasm_opcode('cqo', 'cdq')
+def _lower_sign_fill(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    bits = 64 if instr.opcode == 'cqo' else 32
+    acc, high = ('rax', 'rdx') if bits == 64 else ('eax', 'edx')
+    value = c.read(acc, bits)
+    c.write(high, c.builder.ashr(value, ir.Constant(value.type, bits - 1)))
+
+
+@register_nasm_opcode('jmp')
+def _lower_jmp(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    target = c.blocks.get(instr.operands[0]) if instr.operands else None
+    if target is None:
+        c.builder.comment(f"unsupported: jmp {', '.join(instr.operands)}")
+        return
+    c.builder.branch(target)
+
+
+@register_nasm_opcode('loop')
+def _lower_loop(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    count = c.builder.sub(c.read('rcx', 64), ir.Constant(I64, 1), name="loop_count")
+    c.write('rcx', count)
+    _branch_if(c, instr, c.builder.icmp_signed('!=', count, ir.Constant(I64, 0), name="cond"))
+
+
+@register_nasm_opcode('ret')
+def _lower_ret(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    value = c.read('eax', 32) if 'rax' in c.registers else ir.Constant(I32, 0)
+    c.builder.ret(value)
+
+
+@register_nasm_opcode('nop')
+def _lower_nop(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    pass
+
+
+def _lower_jcc(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    _branch_if(c, instr, c.condition(_condition_suffix(instr.opcode)))
+
+
+def _lower_setcc(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    cond = c.condition(_condition_suffix(instr.opcode))
+    c.write(instr.operands[0], c.builder.zext(cond, ir.IntType(8)))
+
+
+def _lower_cmovcc(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    dest, src = _two_operands(c, instr)
+    bits = c.common_width(dest, src)
+    cond = c.condition(_condition_suffix(instr.opcode))
+    c.write(dest, c.builder.select(cond, c.read(src, bits), c.read(dest, bits)))
+
+
+for _suffix in CONDITION_CODES:
+    NASM_HANDLERS['j' + _suffix] = _lower_jcc
+    NASM_HANDLERS['set' + _suffix] = _lower_setcc
+    NASM_HANDLERS['cmov' + _suffix] = _lower_cmovcc
+
+
+def _branch_if(c: NASMToLLVMCompiler, instr: NASMInstruction, cond):
+    target = c.blocks.get(instr.operands[0]) if instr.operands else None
+    if target is None:
+        c.builder.comment(f"unsupported: {instr.opcode} {', '.join(instr.operands)}")
+        return
+    fallthrough = c.function.append_basic_block(name="cont")
+    c.builder.cbranch(cond, target, fallthrough)
+    c.builder.position_at_end(fallthrough)
+
+
+def _two_operands(c: NASMToLLVMCompiler, instr: NASMInstruction):
+    if len(instr.operands) != 2:
+        c.error(f"{instr.opcode} expects two operands, got {len(instr.operands)}")
+    return instr.operands
+
+
+def is_nasm_source(source: str) -> bool:
+    """NASM programs declare sections; the classical ISA has no such directive"""
+    return any(line.strip().startswith(('section ', 'global ')) for line in source.splitlines())
 
 
 def compile_nasm_to_llvm(nasm_file: str) -> str:
@@ -281,4 +861,4 @@ def compile_nasm_to_llvm(nasm_file: str) -> str:
 # Example usage
 if __name__ == "__main__":
     print("NASM to LLVM IR Compiler Ready!")
-    print("This extends the quantum-llvm-compiler to handle x86_64 assembly!")
\ No newline at end of file
+    print("This extends the quantum-llvm-compiler to handle x86_64 assembly!")
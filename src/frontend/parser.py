@@ -1,4 +1,5 @@
-from .ast_nodes import QuantumAST, GateNode, MeasureNode
+from .ast_nodes import QuantumAST, GateNode, MeasureNode, ParamExpr
+from .qasm3_parser import QASM3ParseError, parse_qasm3
 from qiskit import QuantumCircuit
 
 # QASM3 loader
@@ -9,7 +10,11 @@ except ImportError:
 
 
 def parse_qasm_file(file_path: str) -> QuantumAST:
-    """Parse a QASM2 or QASM3 file into QuantumAST."""
+    """Parse a QASM2 or QASM3 file into QuantumAST.
+
+    QASM3 goes through the native frontend (loops and branches stay as AST
+    nodes); qiskit_qasm3_import is only used for syntax outside its subset.
+    """
 
     # detect version - look for first non-empty line
     with open(file_path, "r") as f:
@@ -23,21 +28,65 @@ def parse_qasm_file(file_path: str) -> QuantumAST:
     if first_line.startswith("OPENQASM 2"):
         circuit = QuantumCircuit.from_qasm_file(file_path)
     else:
-        if qasm3 is None:
-            raise ImportError("qiskit_qasm3_import is required for OpenQASM 3 files. Install with: pip install qiskit-qasm3-import")
+        with open(file_path, "r") as f:
+            source = f.read()
+        try:
+            return parse_qasm3(source)
+        except QASM3ParseError:
+            if qasm3 is None:
+                raise
         circuit = qasm3.load(file_path)
 
+    return circuit_to_ast(circuit)
+
+
+def circuit_to_ast(circuit) -> QuantumAST:
+    """Convert a qiskit QuantumCircuit into QuantumAST; unbound Parameters become ParamExpr.
+
+    Instructions that are not qiskit standard gates (e.g. user-defined QASM2
+    `gate` blocks) are inlined from their definition.
+    """
     ast = QuantumAST()
+    qubits = [circuit.find_bit(q).index for q in circuit.qubits]
+    clbits = [circuit.find_bit(c).index for c in circuit.clbits]
+    _append_instructions(ast, circuit, qubits, clbits)
+    return ast
+
+
+_DIRECTIVES = frozenset({"measure", "reset", "barrier"})
+
+
+def _append_instructions(ast, circuit, qubits, clbits):
+    """Add circuit's instructions to ast, with circuit qubit/clbit k mapped to qubits[k]/clbits[k]"""
+    from qiskit.circuit.library import get_standard_gate_name_mapping
+
+    standard = get_standard_gate_name_mapping()
     for instr, qargs, cargs in circuit.data:
         name = instr.name
         # Fix for newer Qiskit versions - use circuit.find_bit() to get indices
-        q_indices = [circuit.find_bit(q).index for q in qargs]
+        q_indices = [qubits[circuit.find_bit(q).index] for q in qargs]
         if name.lower() == "measure":
-            c_index = circuit.find_bit(cargs[0]).index if cargs else 0
+            c_index = clbits[circuit.find_bit(cargs[0]).index] if cargs else 0
             for qi, ci in zip(q_indices, [c_index] * len(q_indices)):
                 ast.add_node(MeasureNode(qi, ci))
+        elif name not in standard and name not in _DIRECTIVES and instr.definition is not None:
+            _append_instructions(ast, instr.definition, q_indices,
+                                 [clbits[circuit.find_bit(c).index] for c in cargs])
         else:
-            params = list(getattr(instr, "params", []))
+            params = [convert_param(p) for p in getattr(instr, "params", [])]
             ast.add_node(GateNode(name, q_indices, params))
 
-    return ast
+
+def convert_param(value):
+    """qiskit ParameterExpression -> ParamExpr (affine expressions only); numbers pass through"""
+    symbols = getattr(value, "parameters", None)
+    if not symbols:
+        return float(value) if hasattr(value, "parameters") else value
+    terms = []
+    for sym in sorted(symbols, key=lambda s: s.name):
+        coeff = value.gradient(sym)
+        if getattr(coeff, "parameters", None):
+            raise ValueError(f"gate parameter '{value}' is not affine in its symbols")
+        terms.append((sym.name, float(coeff)))
+    const = float(value.bind({sym: 0 for sym in symbols}))
+    return ParamExpr(tuple(terms), const)
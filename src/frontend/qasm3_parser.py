@@ -0,0 +1,537 @@
+"""
+Native OpenQASM 3 frontend for the subset the compiler can lower, with loops kept rolled.
+
+Supported:
+- `qubit[n] q;` / `bit[n] c;` (and the QASM2 `qreg` / `creg` forms)
+- `input float[64] theta;` for symbolic parameters (ParamExpr), and
+  `const int n = 4;` for compile-time constants
+- `gate` definitions, which are inlined at each call
+- standard gate calls, register broadcasts (`h q;`), `measure`, `reset` and `barrier`
+- `for int i in [a:b] {...}` / `[a:step:b]`, `while (cond) {...}` and
+  `if (cond) {...} else {...}`, where cond tests measured bits
+  (`c[0] == 1`, `c == 5`, `!c[1]`, `c[0] == 1 && c[2] == 0`, ...)
+
+A loop is one ForLoopNode whatever its trip count. Indices and angles that
+use the loop variable are stored as ParamExpr, so parse time and AST size
+follow the program text rather than the unrolled gate count; such indices are
+range checked against the register over the loop's iterations. Calls to
+undeclared gates and anything else raise QASM3ParseError; parser.parse_qasm_file
+then falls back to qiskit_qasm3_import when that package is installed.
+"""
+import math
+from typing import List
+
+from .ast_nodes import (Condition, ForLoopNode, GateNode, IfNode, MeasureNode, ParamExpr,
+                        QuantumAST, WhileLoopNode, is_symbolic, value_range)
+from .lexer import tokenize_qasm3
+
+# OpenQASM spellings that differ from the AST / qiskit gate names
+GATE_ALIASES = {'U': 'u', 'CX': 'cx', 'phase': 'p', 'cphase': 'cp'}
+
+CONSTANTS = {'pi': math.pi, 'π': math.pi, 'tau': math.tau, 'τ': math.tau, 'euler': math.e}
+FUNCTIONS = {'sin': math.sin, 'cos': math.cos, 'tan': math.tan, 'arcsin': math.asin,
+             'arccos': math.acos, 'arctan': math.atan, 'exp': math.exp, 'ln': math.log,
+             'sqrt': math.sqrt}
+
+_STANDARD_GATES = {}  # name -> (num_qubits, num_params), filled on first use
+
+_SCALAR_TYPES = frozenset({'int', 'uint', 'float', 'angle', 'bool'})
+_UNSUPPORTED = frozenset({'def', 'box', 'switch', 'break', 'continue', 'end', 'return',
+                          'defcal', 'cal', 'extern', 'output', 'let', 'ctrl', 'negctrl',
+                          'inv', 'pow', 'delay', 'duration', 'stretch'})
+
+
+class QASM3ParseError(ValueError):
+    """Raised for OpenQASM 3 source outside the supported subset"""
+
+    def __init__(self, message: str, line: int = 0):
+        self.line = line
+        super().__init__(f"line {line}: {message}" if line else message)
+
+
+class QASM3Parser:
+    """Recursive-descent parser producing a QuantumAST with control-flow nodes."""
+
+    def __init__(self):
+        self.tokens = []
+        self.pos = 0
+        self.scopes = [{}]  # name -> ('qreg'|'creg', offset, size), ('value', v) or ('gate', ...)
+        self.blocks = [[]]  # statement lists being filled, innermost last
+        self.num_qubits = 0
+        self.num_clbits = 0
+        self.loop_vars = set()
+        self.loop_bounds = {}  # loop variable -> (min, max) over its iterations
+
+    def parse(self, source: str) -> QuantumAST:
+        self.tokens = list(tokenize_qasm3(source))
+        self.pos = 0
+        while not self._at_end():
+            self._statement()
+        return QuantumAST(self.blocks[0])
+
+    # -- token helpers ---------------------------------------------------------------
+
+    def _at_end(self):
+        return self.pos >= len(self.tokens)
+
+    def _peek(self, offset=0):
+        i = self.pos + offset
+        return self.tokens[i] if i < len(self.tokens) else None
+
+    def _line(self):
+        tok = self._peek() or (self.tokens[-1] if self.tokens else None)
+        return tok.line if tok else 0
+
+    def _error(self, message):
+        return QASM3ParseError(message, self._line())
+
+    def _next(self):
+        tok = self._peek()
+        if tok is None:
+            raise self._error("unexpected end of input")
+        if tok.kind == 'error':
+            raise self._error(f"unexpected character '{tok.text}'")
+        self.pos += 1
+        return tok
+
+    def _check(self, text):
+        tok = self._peek()
+        return tok is not None and tok.text == text and tok.kind != 'str'
+
+    def _accept(self, text):
+        if self._check(text):
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, text):
+        tok = self._next()
+        if tok.text != text:
+            raise QASM3ParseError(f"expected '{text}', found '{tok.text}'", tok.line)
+        return tok
+
+    def _ident(self):
+        tok = self._next()
+        if tok.kind != 'id':
+            raise QASM3ParseError(f"expected an identifier, found '{tok.text}'", tok.line)
+        return tok.text
+
+    def _lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def _declare(self, name, entry):
+        if name in self.scopes[-1] or name in CONSTANTS:
+            raise self._error(f"'{name}' is already declared")
+        self.scopes[-1][name] = entry
+
+    def _emit(self, node):
+        self.blocks[-1].append(node)
+
+    # -- statements ------------------------------------------------------------------
+
+    def _statement(self):
+        tok = self._peek()
+        if tok.kind != 'id':
+            if self._accept('{'):
+                self._block_until_close()
+                return
+            raise self._error(f"unexpected '{tok.text}'")
+        word = tok.text
+        if word == 'OPENQASM':
+            self._skip_to_semicolon()
+        elif word == 'include':
+            self._next()
+            if self._next().kind != 'str':
+                raise self._error("include expects a file name string")
+            self._expect(';')
+        elif word in ('qubit', 'qreg', 'bit', 'creg'):
+            self._register_declaration()
+        elif word == 'input':
+            self._next()
+            self._scalar_type()
+            name = self._ident()
+            self._declare(name, ('value', ParamExpr.symbol(name)))
+            self._expect(';')
+        elif word == 'const':
+            self._next()
+            self._scalar_type()
+            name = self._ident()
+            self._expect('=')
+            value = self._expression()
+            if is_symbolic(value):
+                raise self._error(f"const '{name}' is not a compile-time value")
+            self._declare(name, ('value', value))
+            self._expect(';')
+        elif word == 'gate':
+            self._gate_definition()
+        elif word == 'measure':
+            self._next()
+            qubits = self._operand('qreg')
+            self._expect('->')
+            cbits = self._operand('creg')
+            self._expect(';')
+            self._emit_measures(qubits, cbits)
+        elif word in ('reset', 'barrier'):
+            self._next()
+            operands = [] if self._check(';') else self._operand_list()
+            self._expect(';')
+            if word == 'reset':
+                for qubits in operands:
+                    for q in qubits:
+                        self._emit(GateNode('reset', [q]))
+            else:
+                qubits = [q for group in operands for q in group] or list(range(self.num_qubits))
+                self._emit(GateNode('barrier', qubits))
+        elif word == 'for':
+            self._for_loop()
+        elif word == 'while':
+            self._next()
+            condition = self._condition()
+            body = self._body()
+            self._emit(WhileLoopNode(condition, body))
+        elif word == 'if':
+            self._next()
+            condition = self._condition()
+            then_body = self._body()
+            else_body = self._body() if self._accept('else') else []
+            self._emit(IfNode(condition, then_body, else_body))
+        elif word in _UNSUPPORTED or word in _SCALAR_TYPES:
+            raise self._error(f"'{word}' is not supported by the native QASM3 frontend")
+        elif self._peek(1) and self._peek(1).text in ('=', '['):
+            self._assignment()
+        else:
+            self._gate_call()
+
+    def _skip_to_semicolon(self):
+        while self._next().text != ';':
+            pass
+
+    def _block_until_close(self):
+        self.scopes.append({})
+        while not self._accept('}'):
+            if self._at_end():
+                raise self._error("missing '}'")
+            self._statement()
+        self.scopes.pop()
+
+    def _body(self) -> List:
+        """A braced block or a single statement, parsed into a new statement list"""
+        self.blocks.append([])
+        if self._accept('{'):
+            self._block_until_close()
+        else:
+            self.scopes.append({})
+            self._statement()
+            self.scopes.pop()
+        return self.blocks.pop()
+
+    def _scalar_type(self):
+        kind = self._ident()
+        if kind not in _SCALAR_TYPES:
+            raise self._error(f"unsupported classical type '{kind}'")
+        if self._accept('['):
+            self._int_expression()
+            self._expect(']')
+        return kind
+
+    def _register_declaration(self):
+        kind = self._ident()
+        size = None
+        if kind in ('qubit', 'bit') and self._accept('['):
+            size = self._int_expression()
+            self._expect(']')
+        name = self._ident()
+        if kind in ('qreg', 'creg'):
+            size = None
+            if self._accept('['):
+                size = self._int_expression()
+                self._expect(']')
+        if self._check('='):
+            raise self._error("initialized bit registers are not supported")
+        self._expect(';')
+        size = 1 if size is None else size
+        if kind in ('qubit', 'qreg'):
+            self._declare(name, ('qreg', self.num_qubits, size))
+            self.num_qubits += size
+        else:
+            self._declare(name, ('creg', self.num_clbits, size))
+            self.num_clbits += size
+
+    def _gate_definition(self):
+        self._next()
+        name = self._ident()
+        params = []
+        if self._accept('('):
+            while not self._accept(')'):
+                params.append(self._ident())
+                self._accept(',')
+        qargs = [self._ident()]
+        while self._accept(','):
+            qargs.append(self._ident())
+        self._expect('{')
+        start, depth = self.pos, 1
+        while depth:
+            tok = self._next()
+            depth += {'{': 1, '}': -1}.get(tok.text, 0)
+        self._declare(name, ('gate', params, qargs, self.tokens[start:self.pos - 1]))
+
+    def _assignment(self):
+        """`c[i] = measure q[j];`, the only assignment the subset has"""
+        cbits = self._operand('creg')
+        self._expect('=')
+        if not self._accept('measure'):
+            raise self._error("only measurement results can be assigned to bits")
+        qubits = self._operand('qreg')
+        self._expect(';')
+        self._emit_measures(qubits, cbits)
+
+    def _emit_measures(self, qubits, cbits):
+        if len(qubits) != len(cbits):
+            raise self._error(f"measuring {len(qubits)} qubits into {len(cbits)} bits")
+        for q, c in zip(qubits, cbits):
+            self._emit(MeasureNode(q, c))
+
+    def _gate_call(self):
+        name = self._ident()
+        params = []
+        if self._accept('('):
+            if not self._check(')'):
+                params.append(self._expression())
+                while self._accept(','):
+                    params.append(self._expression())
+            self._expect(')')
+        operands = self._operand_list()
+        self._expect(';')
+        width = max(len(group) for group in operands)
+        if any(len(group) not in (1, width) for group in operands):
+            raise self._error(f"register sizes do not match in call to '{name}'")
+        for k in range(width):
+            qubits = [group[k] if len(group) > 1 else group[0] for group in operands]
+            self._apply_gate(name, params, qubits)
+
+    def _apply_gate(self, name, params, qubits):
+        entry = self._lookup(name)
+        if entry is None or entry[0] != 'gate':
+            gate = GATE_ALIASES.get(name, name.lower())
+            shape = _standard_gates().get(gate)
+            if shape is None:
+                raise self._error(f"undefined gate '{name}'")
+            if shape != (len(qubits), len(params)):
+                raise self._error(f"gate '{name}' takes {shape[1]} parameters and {shape[0]} qubits")
+            self._emit(GateNode(gate, qubits, params))
+            return
+        _, formals, qargs, body = entry
+        if len(formals) != len(params) or len(qargs) != len(qubits):
+            raise self._error(f"gate '{name}' takes {len(formals)} parameters and {len(qargs)} qubits")
+        scope = {p: ('value', v) for p, v in zip(formals, params)}
+        scope.update({q: ('qreg', index, 1) for q, index in zip(qargs, qubits)})
+        saved = self.tokens, self.pos
+        self.tokens, self.pos = body, 0
+        self.scopes.append(scope)
+        try:
+            while not self._at_end():
+                self._statement()
+        finally:
+            self.scopes.pop()
+            self.tokens, self.pos = saved
+
+    def _for_loop(self):
+        self._next()
+        if self._peek(1) is not None and self._peek(1).text != 'in':
+            self._scalar_type()
+        name = self._ident()
+        self._expect('in')
+        self._expect('[')
+        bounds = [self._int_expression()]
+        while self._accept(':'):
+            bounds.append(self._int_expression())
+        self._expect(']')
+        if len(bounds) == 2:
+            start, step, stop = bounds[0], 1, bounds[1]
+        elif len(bounds) == 3:
+            start, step, stop = bounds
+        else:
+            raise self._error("for loops need a range [start:stop] or [start:step:stop]")
+        if is_symbolic(start) or is_symbolic(stop) or step == 0:
+            raise self._error("loop ranges must be constant with a non-zero step")
+        # loop variables are ParamExpr symbols; keep them distinct from inputs and outer loops
+        var = name
+        while var in self.loop_vars or self._lookup(var) is not None:
+            var += "_"
+        node = ForLoopNode(var, start, stop, step)
+        values = node.iterations()
+        self.loop_vars.add(var)
+        # an empty loop never runs its body, so its indices are not range checked
+        self.loop_bounds[var] = (min(values[0], values[-1]), max(values[0], values[-1])) if values else None
+        self.scopes.append({name: ('value', ParamExpr.symbol(var))})
+        node.body = self._body()
+        self.scopes.pop()
+        self.loop_vars.discard(var)
+        del self.loop_bounds[var]
+        self._emit(node)
+
+    def _condition(self) -> Condition:
+        """`(test)`, `(test && test ...)` or `(!(test && ...))` over measured bits"""
+        self._expect('(')
+        if self._check('!') and self._peek(1) is not None and self._peek(1).text == '(':
+            self._next()
+            condition = self._condition()
+            condition.negate = not condition.negate
+        else:
+            cbits, value, negate = self._bit_test()
+            while self._accept('&&'):
+                more, more_value, more_negate = self._bit_test()
+                if negate or more_negate:
+                    raise self._error("only '==' tests can be combined with '&&'")
+                value |= more_value << len(cbits)
+                cbits = cbits + more
+            condition = Condition(cbits, value, negate)
+        self._expect(')')
+        return condition
+
+    def _bit_test(self):
+        """`c[i]`, `!c[i]`, `c[i] == 1`, `c == 5`, ... -> (cbits, value, negate)"""
+        negate = self._accept('!')
+        cbits = self._operand('creg')
+        value = 1 if len(cbits) == 1 else None
+        if self._check('==') or self._check('!='):
+            negate ^= self._next().text == '!='
+            if self._accept('true') or self._accept('false'):
+                value = int(self.tokens[self.pos - 1].text == 'true')
+            else:
+                value = self._int_expression()
+        if value is None or is_symbolic(value):
+            raise self._error("conditions compare bits with a constant integer")
+        if len(cbits) == 1 and negate:
+            return cbits, 1 - value, False
+        return cbits, value, negate
+
+    # -- operands --------------------------------------------------------------------
+
+    def _operand_list(self):
+        operands = [self._operand('qreg')]
+        while self._accept(','):
+            operands.append(self._operand('qreg'))
+        return operands
+
+    def _operand(self, kind):
+        """Indices of `name` or `name[expr]` in the flat qubit or bit numbering"""
+        name = self._ident()
+        entry = self._lookup(name)
+        if entry is None or entry[0] != kind:
+            raise self._error(f"'{name}' is not a declared {'qubit' if kind == 'qreg' else 'bit'} register")
+        _, offset, size = entry
+        if not self._accept('['):
+            return [offset + k for k in range(size)]
+        index = self._int_expression()
+        self._expect(']')
+        if not is_symbolic(index):
+            if not 0 <= index < size:
+                raise self._error(f"index {index} out of range for '{name}[{size}]'")
+        elif all(self.loop_bounds.get(n) for n in index.parameters):
+            lo, hi = value_range(index, self.loop_bounds)
+            if lo < 0 or hi >= size:
+                raise self._error(f"index '{index}' takes values {lo}..{hi}, out of range for '{name}[{size}]'")
+        return [offset + index]
+
+    # -- expressions -----------------------------------------------------------------
+
+    def _int_expression(self):
+        value = self._expression()
+        if is_symbolic(value):
+            if any(c != int(c) for _, c in value.terms) or value.const != int(value.const):
+                raise self._error(f"index '{value}' is not an integer")
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if not isinstance(value, int):
+            raise self._error(f"expected an integer, got {value}")
+        return value
+
+    def _expression(self):
+        return self._binary(0)
+
+    _PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2, '%': 2}
+
+    def _binary(self, min_level):
+        left = self._unary()
+        while True:
+            tok = self._peek()
+            level = self._PRECEDENCE.get(tok.text) if tok and tok.kind == 'op' else None
+            if level is None or level < min_level:
+                return left
+            self._next()
+            right = self._binary(level + 1)
+            left = self._arith(tok.text, left, right)
+
+    def _unary(self):
+        if self._accept('-'):
+            return self._arith('*', -1, self._unary())
+        if self._accept('+'):
+            return self._unary()
+        base = self._primary()
+        if self._accept('**'):
+            return self._arith('**', base, self._unary())
+        return base
+
+    def _arith(self, op, a, b):
+        try:
+            if op == '+':
+                return a + b
+            if op == '-':
+                return a - b
+            if op == '*':
+                result = a * b
+            elif op == '/':
+                result = a // b if isinstance(a, int) and isinstance(b, int) and a % b == 0 else a / b
+            elif op == '%':
+                result = a % b
+            else:
+                result = a ** b
+        except TypeError:
+            result = NotImplemented
+        except ZeroDivisionError:
+            raise self._error("division by zero") from None
+        if result is NotImplemented:
+            raise self._error(f"'{a} {op} {b}' is not affine in the loop variables and inputs")
+        return result
+
+    def _primary(self):
+        tok = self._next()
+        if tok.kind == 'num':
+            return float(tok.text) if any(ch in tok.text for ch in '.eE') else int(tok.text)
+        if tok.text == '(':
+            value = self._expression()
+            self._expect(')')
+            return value
+        if tok.kind != 'id':
+            raise QASM3ParseError(f"unexpected '{tok.text}' in expression", tok.line)
+        if tok.text in FUNCTIONS and self._check('('):
+            self._next()
+            arg = self._expression()
+            self._expect(')')
+            if is_symbolic(arg):
+                raise QASM3ParseError(f"{tok.text}() of a symbolic value is not affine", tok.line)
+            return FUNCTIONS[tok.text](arg)
+        entry = self._lookup(tok.text)
+        if entry is not None and entry[0] == 'value':
+            return entry[1]
+        if tok.text in CONSTANTS:
+            return CONSTANTS[tok.text]
+        raise QASM3ParseError(f"undefined name '{tok.text}'", tok.line)
+
+
+def _standard_gates():
+    if not _STANDARD_GATES:
+        from qiskit.circuit.library import get_standard_gate_name_mapping
+        _STANDARD_GATES.update((name, (gate.num_qubits, len(gate.params)))
+                               for name, gate in get_standard_gate_name_mapping().items())
+    return _STANDARD_GATES
+
+
+def parse_qasm3(source: str) -> QuantumAST:
+    """Parse OpenQASM 3 source text into a QuantumAST (loops stay rolled)"""
+    return QASM3Parser().parse(source)
@@ -1,250 +1,296 @@
 """
 Classical IR Builder: Generate LLVM IR from classical assembly AST
 Converts traditional assembly instructions to LLVM IR
+
+This is the single lowering engine for classical assembly. Opcodes are
+lowered through the OPCODE_HANDLERS dispatch table; new opcodes are added
+with @register_opcode and are picked up by the parser as well when the
+program is compiled through compile_classical_assembly().
 """
 
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Any
 from llvmlite import ir
-from typing import Dict, List, Optional, Any
-from ..frontend.classical_parser import ClassicalAST, Instruction, DataDefinition
+from ..frontend.classical_parser import (
+    ClassicalAST, ClassicalAssemblyParser, Instruction, DataDefinition,
+)
+
+I32 = ir.IntType(32)
+
+# General purpose registers of the machine; only those a program uses are allocated
+REGISTERS = ('AREG', 'BREG', 'CREG', 'DREG')
+
+# BC condition codes -> signed icmp predicate applied to the last COMP
+BRANCH_CONDITIONS = {'LT': '<', 'LE': '<=', 'EQ': '==', 'GT': '>', 'GE': '>=', 'NE': '!='}
+
+# opcode -> handler(builder: ClassicalIRBuilder, instr: Instruction)
+OPCODE_HANDLERS: Dict[str, Callable[['ClassicalIRBuilder', Instruction], None]] = {}
+
+
+def register_opcode(*opcodes: str):
+    """Decorator registering a lowering handler for one or more opcodes"""
+    def decorator(fn):
+        for opcode in opcodes:
+            OPCODE_HANDLERS[opcode] = fn
+        return fn
+    return decorator
+
 
 class ClassicalIRBuilder:
     """Builds LLVM IR from classical assembly AST"""
-    
-    def __init__(self, module_name: str = "classical_module"):
+
+    def __init__(self, module_name: str = "classical_module",
+                 handlers: Optional[Dict[str, Callable]] = None):
         self.module = ir.Module(name=module_name)
+        self.handlers = dict(OPCODE_HANDLERS)
+        if handlers:
+            self.handlers.update(handlers)
         self.builder: Optional[ir.IRBuilder] = None
         self.variables: Dict[str, ir.GlobalVariable] = {}
         self.registers: Dict[str, Any] = {}  # ir.AllocaInst
         self.basic_blocks: Dict[str, Any] = {}  # ir.Block
         self.function: Optional[ir.Function] = None
-        self.last_cmp: Optional[Any] = None
-        
+        self.cmp_slots: Optional[tuple] = None  # (lhs, rhs) allocas written by COMP
+        self.current: Optional[Instruction] = None
+
         # Create main function
         self._create_main_function()
-    
+
     def _create_main_function(self):
         """Create the main function structure"""
         # Function signature: int main()
-        func_type = ir.FunctionType(ir.IntType(32), [])
+        func_type = ir.FunctionType(I32, [])
         self.function = ir.Function(self.module, func_type, name="main")
-        
-        # Create entry block
         entry_block = self.function.append_basic_block(name="entry")
         self.builder = ir.IRBuilder(entry_block)
-        
-        # Allocate AREG register (assuming 32-bit integer)
-        self.registers['AREG'] = self.builder.alloca(ir.IntType(32), name="AREG")
-        
-        # Initialize AREG to 0
-        zero = ir.Constant(ir.IntType(32), 0)
-        self.builder.store(zero, self.registers['AREG'])
-    
+
     def build_ir_from_ast(self, ast: ClassicalAST) -> str:
         """Generate LLVM IR from classical assembly AST"""
-        
-        # First pass: Create global variables for data definitions
+        self.build_module(ast)
+        return str(self.module)
+
+    def build_module(self, ast: ClassicalAST) -> ir.Module:
+        """Lower `ast` into self.module and return it"""
         self._create_global_variables(ast.data_definitions)
-        
-        # Second pass: Create basic blocks for labels
+        self._create_implicit_storage(ast.instructions)
+        self._allocate_registers(ast.instructions)
         self._create_basic_blocks(ast)
-        
-        # Third pass: Generate instructions
-        self._generate_instructions(ast.instructions)
-        
-        # Add return statement
-        ret_val = ir.Constant(ir.IntType(32), 0)
-        self.builder.ret(ret_val)
-        
-        return str(self.module)
-    
+        self._generate_instructions(ast)
+
+        if not self.builder.block.is_terminated:
+            self.builder.branch(self.basic_blocks['exit'])
+        ir.IRBuilder(self.basic_blocks['exit']).ret(ir.Constant(I32, 0))
+        return self.module
+
+    # -- setup -------------------------------------------------------------
+
     def _create_global_variables(self, data_defs: Dict[str, DataDefinition]):
-        """Create global variables for data definitions"""
+        """Create one i32 global per data definition (DC initialized, DS zeroed)"""
         for name, data_def in data_defs.items():
-            if data_def.directive == 'DC':  # Define Constant
-                var_type = ir.IntType(32)
-                initializer = ir.Constant(var_type, data_def.value)
-                global_var = ir.GlobalVariable(self.module, var_type, name=name)
-                global_var.initializer = initializer
-                global_var.linkage = 'internal'
-                self.variables[name] = global_var
-                
-            elif data_def.directive == 'DS':  # Define Storage
-                var_type = ir.IntType(32)
-                initializer = ir.Constant(var_type, 0)
-                global_var = ir.GlobalVariable(self.module, var_type, name=name)
-                global_var.initializer = initializer
-                global_var.linkage = 'internal'
-                self.variables[name] = global_var
-    
+            global_var = ir.GlobalVariable(self.module, I32, name=name)
+            global_var.linkage = 'internal'
+            value = _constant_value(data_def.value) if data_def.directive == 'DC' else 0
+            global_var.initializer = ir.Constant(I32, value)
+            self.variables[name] = global_var
+
+    def _create_implicit_storage(self, instructions: List[Instruction]):
+        """MOVEM to an undeclared symbol implicitly reserves it, like `NAME DS 1`"""
+        for instr in instructions:
+            if instr.opcode == 'MOVEM' and len(instr.operands) >= 2:
+                name = instr.operands[1]
+                if name not in self.variables:
+                    self._create_global_variables({name: DataDefinition(name, 'DS', 0)})
+
+    def _allocate_registers(self, instructions: List[Instruction]):
+        """Allocate the registers the program touches in the entry block, zeroed"""
+        used = {'AREG'}
+        needs_cmp = False
+        for instr in instructions:
+            used.update(op for op in instr.operands if op in REGISTERS)
+            needs_cmp = needs_cmp or instr.opcode == 'COMP'
+        zero = ir.Constant(I32, 0)
+        for reg in REGISTERS:
+            if reg in used:
+                self.registers[reg] = self.builder.alloca(I32, name=reg)
+                self.builder.store(zero, self.registers[reg])
+        if needs_cmp:
+            self.cmp_slots = (self.builder.alloca(I32, name="cc_lhs"),
+                              self.builder.alloca(I32, name="cc_rhs"))
+
     def _create_basic_blocks(self, ast: ClassicalAST):
-        """Create basic blocks for labels and control flow"""
-        current_block = self.builder.block
-        
-        # Create blocks for each label
-        for label, _ in ast.labels.items():
-            if label not in self.basic_blocks:
-                block = self.function.append_basic_block(name=f"label_{label}")
-                self.basic_blocks[label] = block
-        
-        # Create a block for instructions after loops
-        exit_block = self.function.append_basic_block(name="exit")
-        self.basic_blocks['exit'] = exit_block
-    
-    def _generate_instructions(self, instructions: List[Instruction]):
-        """Generate LLVM IR for each instruction"""
-        for i, instr in enumerate(instructions):
-            
-            # Handle labels - switch to appropriate basic block
-            if instr.label and instr.label in self.basic_blocks:
-                # Branch to the labeled block if not already there
-                if self.builder.block != self.basic_blocks[instr.label]:
-                    if not self.builder.block.is_terminated:
-                        self.builder.branch(self.basic_blocks[instr.label])
-                    self.builder = ir.IRBuilder(self.basic_blocks[instr.label])
-            
-            # Generate instruction
-            if instr.opcode == 'MOVER':
-                self._generate_mover(instr)
-            elif instr.opcode == 'ADD':
-                self._generate_add(instr)
-            elif instr.opcode == 'SUB':
-                self._generate_sub(instr)
-            elif instr.opcode == 'MULT':
-                self._generate_mult(instr)
-            elif instr.opcode == 'MOVEM':
-                self._generate_movem(instr)
-            elif instr.opcode == 'COMP':
-                self._generate_comp(instr, instructions, i)
-            elif instr.opcode == 'BC':
-                self._generate_branch(instr)
-            elif instr.opcode == 'STOP':
-                self._generate_stop()
-    
-    def _generate_mover(self, instr: Instruction):
-        """Generate IR for MOVER (move to register)"""
-        if len(instr.operands) >= 2:
-            dest_reg = instr.operands[0]
-            source = instr.operands[1]
-            
-            if dest_reg == 'AREG':
-                if source in self.variables:
-                    # Load from global variable
-                    value = self.builder.load(self.variables[source], name=f"load_{source}")
-                    self.builder.store(value, self.registers['AREG'])
-                else:
-                    # Immediate value
-                    try:
-                        imm_val = ir.Constant(ir.IntType(32), int(source))
-                        self.builder.store(imm_val, self.registers['AREG'])
-                    except ValueError:
-                        # Handle as variable name
-                        pass
-    
-    def _generate_add(self, instr: Instruction):
-        """Generate IR for ADD"""
-        if len(instr.operands) >= 2:
-            dest_reg = instr.operands[0]
-            source = instr.operands[1]
-            
-            if dest_reg == 'AREG':
-                areg_val = self.builder.load(self.registers['AREG'], name="areg_val")
-                
-                if source in self.variables:
-                    source_val = self.builder.load(self.variables[source], name=f"load_{source}")
-                else:
-                    source_val = ir.Constant(ir.IntType(32), int(source))
-                
-                result = self.builder.add(areg_val, source_val, name="add_result")
-                self.builder.store(result, self.registers['AREG'])
-    
-    def _generate_sub(self, instr: Instruction):
-        """Generate IR for SUB"""
-        if len(instr.operands) >= 2:
-            dest_reg = instr.operands[0]
-            source = instr.operands[1]
-            
-            if dest_reg == 'AREG':
-                areg_val = self.builder.load(self.registers['AREG'], name="areg_val")
-                
-                if source in self.variables:
-                    source_val = self.builder.load(self.variables[source], name=f"load_{source}")
-                else:
-                    source_val = ir.Constant(ir.IntType(32), int(source))
-                
-                result = self.builder.sub(areg_val, source_val, name="sub_result")
-                self.builder.store(result, self.registers['AREG'])
-    
-    def _generate_mult(self, instr: Instruction):
-        """Generate IR for MULT"""
-        if len(instr.operands) >= 2:
-            dest_reg = instr.operands[0]
-            source = instr.operands[1]
-            
-            if dest_reg == 'AREG':
-                areg_val = self.builder.load(self.registers['AREG'], name="areg_val")
-                
-                if source in self.variables:
-                    source_val = self.builder.load(self.variables[source], name=f"load_{source}")
-                else:
-                    source_val = ir.Constant(ir.IntType(32), int(source))
-                
-                result = self.builder.mul(areg_val, source_val, name="mult_result")
-                self.builder.store(result, self.registers['AREG'])
-    
-    def _generate_movem(self, instr: Instruction):
-        """Generate IR for MOVEM (move from register to memory)"""
-        if len(instr.operands) >= 2:
-            source_reg = instr.operands[0]
-            dest = instr.operands[1]
-            
-            if source_reg == 'AREG' and dest in self.variables:
-                areg_val = self.builder.load(self.registers['AREG'], name="areg_val")
-                self.builder.store(areg_val, self.variables[dest])
-    
-    def _generate_comp(self, instr: Instruction, instructions: List[Instruction], current_index: int):
-        """Generate IR for COMP (compare)"""
-        if len(instr.operands) >= 2:
-            reg = instr.operands[0]
-            operand = instr.operands[1]
-            
-            if reg == 'AREG':
-                areg_val = self.builder.load(self.registers['AREG'], name="areg_val")
-                
-                if operand in self.variables:
-                    cmp_val = self.builder.load(self.variables[operand], name=f"load_{operand}")
-                else:
-                    cmp_val = ir.Constant(ir.IntType(32), int(operand))
-                
-                # Store comparison result for next BC instruction
-                # For simplicity, we'll use a simple comparison
-                self.last_cmp = self.builder.icmp_signed('<', areg_val, cmp_val, name="cmp_result")
-    
-    def _generate_branch(self, instr: Instruction):
-        """Generate IR for BC (branch conditional)"""
-        if len(instr.operands) >= 2:
-            condition = instr.operands[0]  # ANY, etc.
-            target_label = instr.operands[1]
-            
-            if target_label in self.basic_blocks:
-                if hasattr(self, 'last_cmp'):
-                    # Conditional branch based on last comparison
-                    self.builder.cbranch(self.last_cmp, 
-                                       self.basic_blocks[target_label], 
-                                       self.basic_blocks['exit'])
-                else:
-                    # Unconditional branch
-                    self.builder.branch(self.basic_blocks[target_label])
-    
-    def _generate_stop(self):
-        """Generate IR for STOP"""
+        """Create one basic block per label plus the shared exit block"""
+        for label in ast.labels:
+            self.basic_blocks[label] = self.function.append_basic_block(name=f"label_{label}")
+        self.basic_blocks['exit'] = self.function.append_basic_block(name="exit")
+
+    # -- lowering ----------------------------------------------------------
+
+    def _generate_instructions(self, ast: ClassicalAST):
+        """Walk instructions once, switching blocks at labels and dispatching by opcode"""
+        labels_at: Dict[int, List[str]] = {}
+        for label, index in ast.labels.items():
+            labels_at.setdefault(index, []).append(label)
+
+        for i, instr in enumerate(ast.instructions):
+            for label in labels_at.get(i, ()):
+                self.enter_block(self.basic_blocks[label])
+            if self.builder.block.is_terminated:
+                # code after an unconditional transfer only runs if something jumps here
+                self.enter_block(self.function.append_basic_block(name="cont"))
+            self.current = instr
+            handler = self.handlers.get(instr.opcode)
+            if handler is None:
+                raise self.error(f"no lowering for opcode '{instr.opcode}'")
+            handler(self, instr)
+
+        for label in labels_at.get(len(ast.instructions), ()):
+            self.enter_block(self.basic_blocks[label])
+
+    def enter_block(self, block):
+        """Fall through from the current block (if open) into `block`"""
         if not self.builder.block.is_terminated:
-            self.builder.branch(self.basic_blocks['exit'])
-        
-        # Switch to exit block
-        self.builder = ir.IRBuilder(self.basic_blocks['exit'])
+            self.builder.branch(block)
+        self.builder = ir.IRBuilder(block)
+
+    def error(self, message: str) -> ValueError:
+        line = self.current.line_number if self.current else 0
+        return ValueError(f"line {line}: {message}")
+
+    def register(self, name: str):
+        """Return the alloca backing register `name`"""
+        if name not in self.registers:
+            raise self.error(f"unknown register '{name}'")
+        return self.registers[name]
+
+    def operand_value(self, operand: str, name: Optional[str] = None):
+        """Load a memory operand or materialize an integer literal"""
+        if operand in self.variables:
+            return self.builder.load(self.variables[operand], name=name or f"load_{operand}")
+        if operand in self.registers:
+            return self.builder.load(self.registers[operand], name=f"{operand.lower()}_val")
+        try:
+            return ir.Constant(I32, _constant_value(operand))
+        except ValueError:
+            raise self.error(f"undefined symbol '{operand}'") from None
+
+    def block_for(self, label: str):
+        if label not in self.basic_blocks:
+            raise self.error(f"unknown branch target '{label}'")
+        return self.basic_blocks[label]
+
+
+def _constant_value(value) -> int:
+    """DC operands are integers, optionally quoted ('5')"""
+    if isinstance(value, int):
+        return value
+    return int(str(value).strip("'\""))
+
+
+def _expect_operands(b: ClassicalIRBuilder, instr: Instruction, count: int):
+    if len(instr.operands) < count:
+        raise b.error(f"{instr.opcode} expects {count} operands, got {len(instr.operands)}")
+
+
+@register_opcode('MOVER')
+def _lower_mover(b: ClassicalIRBuilder, instr: Instruction):
+    """MOVER reg, mem: reg = mem"""
+    _expect_operands(b, instr, 2)
+    reg = b.register(instr.operands[0])
+    b.builder.store(b.operand_value(instr.operands[1]), reg)
+
+
+@register_opcode('MOVEM')
+def _lower_movem(b: ClassicalIRBuilder, instr: Instruction):
+    """MOVEM reg, mem: mem = reg"""
+    _expect_operands(b, instr, 2)
+    reg, dest = instr.operands[0], instr.operands[1]
+    if dest not in b.variables:
+        raise b.error(f"MOVEM target '{dest}' is not a data definition")
+    value = b.builder.load(b.register(reg), name=f"{reg.lower()}_val")
+    b.builder.store(value, b.variables[dest])
+
 
+_ARITHMETIC = {'ADD': ('add', 'add_result'), 'SUB': ('sub', 'sub_result'), 'MULT': ('mul', 'mult_result')}
 
-def generate_classical_ir(ast: ClassicalAST) -> str:
+
+@register_opcode(*_ARITHMETIC)
+def _lower_arithmetic(b: ClassicalIRBuilder, instr: Instruction):
+    """ADD/SUB/MULT reg, mem: reg = reg <op> mem"""
+    _expect_operands(b, instr, 2)
+    method, result_name = _ARITHMETIC[instr.opcode]
+    reg_name = instr.operands[0]
+    reg = b.register(reg_name)
+    lhs = b.builder.load(reg, name=f"{reg_name.lower()}_val")
+    rhs = b.operand_value(instr.operands[1])
+    b.builder.store(getattr(b.builder, method)(lhs, rhs, name=result_name), reg)
+
+
+@register_opcode('COMP')
+def _lower_comp(b: ClassicalIRBuilder, instr: Instruction):
+    """COMP reg, mem: latch both sides for the next BC"""
+    _expect_operands(b, instr, 2)
+    reg_name = instr.operands[0]
+    lhs = b.builder.load(b.register(reg_name), name=f"{reg_name.lower()}_val")
+    rhs = b.operand_value(instr.operands[1])
+    b.builder.store(lhs, b.cmp_slots[0])
+    b.builder.store(rhs, b.cmp_slots[1])
+
+
+@register_opcode('BC')
+def _lower_bc(b: ClassicalIRBuilder, instr: Instruction):
+    """BC cond, label: ANY is unconditional, LT/LE/EQ/GT/GE/NE test the last COMP"""
+    _expect_operands(b, instr, 2)
+    cond, target = instr.operands[0], b.block_for(instr.operands[1])
+    if cond == 'ANY':
+        b.builder.branch(target)
+        return
+    if cond not in BRANCH_CONDITIONS:
+        raise b.error(f"unknown branch condition '{cond}'")
+    if b.cmp_slots is None:
+        raise b.error(f"BC {cond} without a preceding COMP")
+    lhs = b.builder.load(b.cmp_slots[0], name="cc_lhs_val")
+    rhs = b.builder.load(b.cmp_slots[1], name="cc_rhs_val")
+    taken = b.builder.icmp_signed(BRANCH_CONDITIONS[cond], lhs, rhs, name="cmp_result")
+    fallthrough = b.function.append_basic_block(name="cont")
+    b.builder.cbranch(taken, target, fallthrough)
+    b.builder = ir.IRBuilder(fallthrough)
+
+
+@register_opcode('STOP')
+def _lower_stop(b: ClassicalIRBuilder, instr: Instruction):
+    """STOP: leave through the exit block"""
+    b.builder.branch(b.basic_blocks['exit'])
+
+
+def generate_classical_ir(ast: ClassicalAST, module_name: str = "classical_module") -> str:
     """Convenience function to generate LLVM IR from classical AST"""
-    builder = ClassicalIRBuilder()
-    return builder.build_ir_from_ast(ast)
\ No newline at end of file
+    builder = ClassicalIRBuilder(module_name)
+    return builder.build_ir_from_ast(ast)
+
+
+@dataclass
+class ClassicalCompilation:
+    """Result of compile_classical_assembly"""
+    ast: ClassicalAST
+    ir: str
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+def compile_classical_assembly(text: str, module_name: str = "classical_module",
+                               passes: Iterable[Callable[[ClassicalAST], ClassicalAST]] = ()
+                               ) -> ClassicalCompilation:
+    """Parse -> AST passes -> lower. The one pipeline behind every classical entry point.
+
+    The parser accepts exactly the opcodes that have a registered handler.
+    """
+    parser = ClassicalAssemblyParser(opcodes=OPCODE_HANDLERS.keys())
+    ast = parser.parse_text(text)
+    stats = {
+        'instructions': len(ast.instructions),
+        'data_definitions': len(ast.data_definitions),
+        'labels': len(ast.labels),
+    }
+    for ast_pass in passes:
+        ast = ast_pass(ast)
+    stats['optimized_instructions'] = len(ast.instructions)
+    return ClassicalCompilation(ast, generate_classical_ir(ast, module_name), stats)
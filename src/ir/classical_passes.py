@@ -0,0 +1,358 @@
+"""
+Dataflow optimization passes over ClassicalAST.
+
+ClassicalOptimizer splits the program into basic blocks over the label CFG and
+iterates three transformations until nothing changes:
+- constant propagation: a forward analysis of the constants reaching each
+  instruction (registers start at 0, DC symbols at their value, DS at 0)
+  along executable edges only. It rewrites operands to immediates, folds
+  MOVER/ADD/SUB/MULT into `MOVER reg, const` and resolves BC on known COMPs.
+- dead code elimination: a backward liveness analysis removes register writes,
+  COMPs and MOVEM stores whose results are never read. Memory is live at
+  program exit and on every back edge, so programs that loop without reaching
+  STOP keep their stores; only stores overwritten on every path are dropped.
+- unreachable block removal and dropping `BC ANY` to the next instruction.
+"""
+
+import operator
+from dataclasses import replace
+from typing import Dict, List, Optional, Set
+
+from ..frontend.classical_parser import ClassicalAST, Instruction
+from .classical_ir_builder import REGISTERS
+
+_CC = '<cc>'  # condition code latched by COMP
+_EXIT = -1
+
+_ARITHMETIC = {'ADD': operator.add, 'SUB': operator.sub, 'MULT': operator.mul}
+_CONDITIONS = {'LT': operator.lt, 'LE': operator.le, 'EQ': operator.eq,
+               'GT': operator.gt, 'GE': operator.ge, 'NE': operator.ne}
+_PURE = frozenset({'MOVER', 'MOVEM', 'COMP', *_ARITHMETIC})
+_KNOWN = _PURE | {'BC', 'STOP'}
+
+
+def _wrap32(value: int) -> int:
+    """Match LLVM i32 wrap-around arithmetic"""
+    value &= 0xFFFFFFFF
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+def _literal(operand: str) -> Optional[int]:
+    try:
+        return int(operand.strip("'\""))
+    except ValueError:
+        return None
+
+
+def _effects(instr: Instruction):
+    """(defs, uses) of an instruction over registers, memory symbols and the CC"""
+    op, ops = instr.opcode, instr.operands
+    src = {ops[1]} if len(ops) > 1 and _literal(ops[1]) is None else set()
+    if op == 'MOVER':
+        return {ops[0]}, src
+    if op in _ARITHMETIC:
+        return {ops[0]}, {ops[0]} | src
+    if op == 'MOVEM':
+        return {ops[1]}, {ops[0]}
+    if op == 'COMP':
+        return {_CC}, {ops[0]} | src
+    if op == 'BC' and ops[0] != 'ANY':
+        return set(), {_CC}
+    return set(), set()
+
+
+class _Block:
+    __slots__ = ('instrs', 'labels', 'succs')
+
+    def __init__(self):
+        self.instrs: List[Instruction] = []
+        self.labels: List[str] = []
+        self.succs: List[int] = []
+
+
+class ClassicalOptimizer:
+    """Constant propagation + dead store/code elimination + unreachable block removal.
+
+    Usable as a pass: compile_classical_assembly(text, passes=[ClassicalOptimizer()]).
+    After a run, `stats` holds the per-transformation counts and the
+    instruction reduction.
+    """
+
+    def __init__(self, max_rounds: int = 10):
+        self.max_rounds = max_rounds
+        self.stats: Dict[str, int] = {}
+
+    def __call__(self, ast: ClassicalAST) -> ClassicalAST:
+        return self.run(ast)
+
+    def run(self, ast: ClassicalAST) -> ClassicalAST:
+        self.stats = dict.fromkeys(('constants_folded', 'branches_folded', 'dead_stores',
+                                    'dead_instructions', 'unreachable_removed'), 0)
+        self.stats['instructions_before'] = len(ast.instructions)
+        if any(i.opcode not in _KNOWN for i in ast.instructions):
+            # custom opcodes have unknown effects; leave the program alone
+            self.stats['instructions_after'] = len(ast.instructions)
+            return ast
+
+        self.memory = set(ast.data_definitions)
+        self.memory.update(i.operands[1] for i in ast.instructions
+                           if i.opcode == 'MOVEM' and len(i.operands) > 1)
+        self.entry_state = {reg: 0 for reg in REGISTERS}
+        for name in self.memory:
+            data_def = ast.data_definitions.get(name)
+            value = 0 if data_def is None or data_def.directive == 'DS' else _literal(str(data_def.value))
+            if value is not None:
+                self.entry_state[name] = value
+
+        blocks = self._build_blocks(ast)
+        for _ in range(self.max_rounds):
+            changed = self._propagate_constants(blocks)
+            changed |= self._remove_unreachable(blocks)
+            changed |= self._eliminate_dead_code(blocks)
+            if not changed:
+                break
+
+        result = self._rebuild(ast, blocks)
+        self.stats['instructions_after'] = len(result.instructions)
+        self.stats['instructions_removed'] = len(ast.instructions) - len(result.instructions)
+        return result
+
+    # -- CFG ---------------------------------------------------------------
+
+    def _build_blocks(self, ast: ClassicalAST) -> List[_Block]:
+        leaders = {0, *ast.labels.values()}
+        for i, instr in enumerate(ast.instructions):
+            if instr.opcode in ('BC', 'STOP'):
+                leaders.add(i + 1)
+        starts = sorted(i for i in leaders if i <= len(ast.instructions))
+        index_of = {start: n for n, start in enumerate(starts)}
+
+        blocks = [_Block() for _ in starts]
+        for n, start in enumerate(starts):
+            end = starts[n + 1] if n + 1 < len(starts) else len(ast.instructions)
+            blocks[n].instrs = list(ast.instructions[start:end])
+        for label, index in ast.labels.items():
+            blocks[index_of[index]].labels.append(label)
+
+        self.block_of_label = {label: index_of[index] for label, index in ast.labels.items()}
+        for n, block in enumerate(blocks):
+            block.succs = self._successors(n, block, len(blocks))
+        return blocks
+
+    def _successors(self, n: int, block: _Block, nblocks: int) -> List[int]:
+        fallthrough = n + 1 if n + 1 < nblocks else _EXIT
+        last = block.instrs[-1] if block.instrs else None
+        if last is None or last.opcode not in ('BC', 'STOP'):
+            return [fallthrough]
+        if last.opcode == 'STOP':
+            return [_EXIT]
+        target = self.block_of_label.get(last.operands[1])
+        if target is None:
+            raise ValueError(f"line {last.line_number}: unknown branch target '{last.operands[1]}'")
+        return [target] if last.operands[0] == 'ANY' else [target, fallthrough]
+
+    # -- constant propagation ----------------------------------------------
+
+    def _value(self, operand: str, state: Dict[str, int]):
+        literal = _literal(operand)
+        return literal if literal is not None else state.get(operand)
+
+    def _transfer(self, instr: Instruction, state: Dict[str, int]):
+        """Apply instr to a constant state in place (absent key = not a constant)"""
+        op, ops = instr.opcode, instr.operands
+        if op == 'MOVER':
+            value = self._value(ops[1], state)
+        elif op in _ARITHMETIC:
+            lhs, rhs = state.get(ops[0]), self._value(ops[1], state)
+            value = None if lhs is None or rhs is None else _wrap32(_ARITHMETIC[op](lhs, rhs))
+        elif op == 'MOVEM':
+            value = state.get(ops[0])
+            ops = ops[1:]
+        elif op == 'COMP':
+            lhs, rhs = state.get(ops[0]), self._value(ops[1], state)
+            value = None if lhs is None or rhs is None else (lhs, rhs)
+            ops = [_CC]
+        else:
+            return
+        if value is None:
+            state.pop(ops[0], None)
+        else:
+            state[ops[0]] = value
+
+    def _branch_taken(self, instr: Instruction, state) -> Optional[bool]:
+        """True/False when a conditional BC is decided by a known COMP, else None"""
+        cc = state.get(_CC)
+        if cc is None or instr.operands[0] not in _CONDITIONS:
+            return None
+        return _CONDITIONS[instr.operands[0]](*cc)
+
+    def _block_out(self, block: _Block, state: Dict[str, int]):
+        state = dict(state)
+        for instr in block.instrs:
+            self._transfer(instr, state)
+        succs = block.succs
+        last = block.instrs[-1] if block.instrs else None
+        if last is not None and last.opcode == 'BC' and len(succs) == 2:
+            taken = self._branch_taken(last, state)
+            if taken is not None:
+                succs = [succs[0] if taken else succs[1]]
+        return state, succs
+
+    def _analyze_constants(self, blocks: List[_Block]) -> Dict[int, Dict[str, int]]:
+        """Worklist over executable edges; returns the in-state of every reached block"""
+        preds: Dict[int, Set[int]] = {n: set() for n in range(len(blocks))}
+        outs: Dict[int, Dict[str, int]] = {}
+        ins: Dict[int, Dict[str, int]] = {}
+        worklist = [0]
+        while worklist:
+            n = worklist.pop()
+            states = [outs[p] for p in preds[n] if p in outs]
+            if n == 0:
+                states.append(self.entry_state)
+            state = dict(states[0])
+            for other in states[1:]:
+                state = {k: v for k, v in state.items() if other.get(k) == v}
+            ins[n] = state
+            out, succs = self._block_out(blocks[n], state)
+            changed = outs.get(n) != out
+            outs[n] = out
+            for s in succs:
+                if s == _EXIT:
+                    continue
+                if n not in preds[s] or changed:
+                    preds[s].add(n)
+                    worklist.append(s)
+        return ins
+
+    def _propagate_constants(self, blocks: List[_Block]) -> bool:
+        ins = self._analyze_constants(blocks)
+        changed = False
+        for n, block in enumerate(blocks):
+            if n not in ins:
+                continue
+            state = dict(ins[n])
+            rewritten = []
+            for instr in block.instrs:
+                new = self._fold(instr, state)
+                if new is not instr:
+                    changed = True
+                self._transfer(instr, state)
+                if new is not None:
+                    rewritten.append(new)
+            block.instrs = rewritten
+            if block.instrs and block.instrs[-1].opcode == 'BC' and block.instrs[-1].operands[0] == 'ANY':
+                block.succs = block.succs[:1]
+            elif not block.instrs or block.instrs[-1].opcode not in ('BC', 'STOP'):
+                block.succs = block.succs[-1:]
+        return changed
+
+    def _fold(self, instr: Instruction, state: Dict[str, int]) -> Optional[Instruction]:
+        """Rewrite one instruction under the constants reaching it (None = delete)"""
+        op, ops = instr.opcode, instr.operands
+        if op == 'MOVER' or op == 'COMP':
+            value = state.get(ops[1])
+            if value is not None and _literal(ops[1]) is None:
+                self.stats['constants_folded'] += 1
+                return replace(instr, operands=[ops[0], str(value)])
+        elif op in _ARITHMETIC:
+            lhs, rhs = state.get(ops[0]), self._value(ops[1], state)
+            if lhs is not None and rhs is not None:
+                self.stats['constants_folded'] += 1
+                result = _wrap32(_ARITHMETIC[op](lhs, rhs))
+                return replace(instr, opcode='MOVER', operands=[ops[0], str(result)])
+            if rhs is not None and _literal(ops[1]) is None:
+                self.stats['constants_folded'] += 1
+                return replace(instr, operands=[ops[0], str(rhs)])
+        elif op == 'BC':
+            taken = self._branch_taken(instr, state)
+            if taken is not None:
+                self.stats['branches_folded'] += 1
+                return replace(instr, operands=['ANY', ops[1]]) if taken else None
+        return instr
+
+    # -- reachability ------------------------------------------------------
+
+    def _remove_unreachable(self, blocks: List[_Block]) -> bool:
+        seen, stack = {0}, [0]
+        while stack:
+            for s in blocks[stack.pop()].succs:
+                if s != _EXIT and s not in seen:
+                    seen.add(s)
+                    stack.append(s)
+        changed = False
+        for n, block in enumerate(blocks):
+            if n not in seen and (block.instrs or block.labels):
+                self.stats['unreachable_removed'] += len(block.instrs)
+                block.instrs, block.labels, block.succs = [], [], []
+                changed = True
+        return changed
+
+    # -- liveness ------------------------------------------------------------
+
+    def _eliminate_dead_code(self, blocks: List[_Block]) -> bool:
+        live_in: Dict[int, Set[str]] = {n: set() for n in range(len(blocks))}
+        live_in[_EXIT] = set(self.memory)
+        changed = True
+        while changed:
+            changed = False
+            for n in range(len(blocks) - 1, -1, -1):
+                live = self._live_out(n, blocks[n], live_in)
+                for instr in reversed(blocks[n].instrs):
+                    defs, uses = _effects(instr)
+                    live = (live - defs) | uses
+                if live != live_in[n]:
+                    live_in[n] = live
+                    changed = True
+
+        removed = False
+        for n, block in enumerate(blocks):
+            live = self._live_out(n, block, live_in)
+            kept = []
+            for instr in reversed(block.instrs):
+                defs, uses = _effects(instr)
+                if instr.opcode in _PURE and not (defs & live):
+                    key = 'dead_stores' if instr.opcode == 'MOVEM' else 'dead_instructions'
+                    self.stats[key] += 1
+                    removed = True
+                    continue
+                live = (live - defs) | uses
+                kept.append(instr)
+            block.instrs = kept[::-1]
+        return removed
+
+    def _live_out(self, n: int, block: _Block, live_in) -> Set[str]:
+        # a back edge may never reach exit, so stores must be visible before it
+        live = set(self.memory) if any(0 <= s <= n for s in block.succs) else set()
+        for s in block.succs:
+            live |= live_in[s]
+        return live
+
+    # -- output ----------------------------------------------------------------
+
+    def _rebuild(self, ast: ClassicalAST, blocks: List[_Block]) -> ClassicalAST:
+        instructions: List[Instruction] = []
+        labels: Dict[str, int] = {}
+        for block in blocks:
+            for label in block.labels:
+                labels[label] = len(instructions)
+            for k, instr in enumerate(block.instrs):
+                label = block.labels[0] if k == 0 and block.labels else None
+                instructions.append(instr if instr.label == label else replace(instr, label=label))
+
+        # a jump to the very next instruction is a fallthrough
+        i = 0
+        while i < len(instructions):
+            instr = instructions[i]
+            if instr.opcode == 'BC' and instr.operands[0] == 'ANY' and labels.get(instr.operands[1]) == i + 1:
+                del instructions[i]
+                labels = {k: (v - 1 if v > i else v) for k, v in labels.items()}
+                self.stats['dead_instructions'] += 1
+                continue
+            i += 1
+
+        return ClassicalAST(instructions, dict(ast.data_definitions), labels, ast.start_address)
+
+
+def classical_dataflow_opt(ast: ClassicalAST) -> ClassicalAST:
+    """Run ClassicalOptimizer once with default settings"""
+    return ClassicalOptimizer().run(ast)
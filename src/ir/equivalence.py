@@ -0,0 +1,472 @@
+"""
+Equivalence checking of two QuantumASTs, e.g. a circuit before and after an
+optimization pass (used by --verify-passes).
+
+    result = check_equivalence(before, after)
+    result["equivalent"]    # True, False, or None when no method could decide
+    result["methods"]       # which checks decided it
+
+Both programs are flattened: for loops are unrolled, symbolic parameters
+get one shared random binding, and measurements and resets are deferred
+onto fresh ancilla qubits: the n-th measurement into a classical bit is a cx
+into that measurement's ancilla, the n-th reset of a qubit a swap with its
+ancilla. Barriers are dropped. Equality is up to global phase.
+
+The check never builds a 4^n unitary of the whole circuit:
+
+0. Passes can report the windows they rewrote (`windows`: pairs of original
+   and replacement nodes, see passes.consolidate_blocks). Each window is
+   checked on its own few qubits. If its replacement is a contiguous run of
+   `after`, the original gates are put back there: swapping a contiguous run
+   for an equal one keeps the program equal. What remains to compare is then
+   mostly the same gates in a different order, whatever the circuit width.
+1. Gates the two programs share at the start, and then at the end, are
+   stripped: gates that sit at the front (or back) of every wire they touch
+   in both programs. Only the differing middle is compared. That suffices,
+   since P A S == P B S exactly when A == B.
+2. The rest splits into independent groups of qubits (connected components
+   of the gates' interaction graph). Each group is checked on its own, by
+   the first of these that applies:
+   - Clifford tableaux (qiskit.quantum_info.Clifford), at any width
+   - the miter A * B^dagger as a unitary, up to UNITARY_MAX_QUBITS
+   - phase polynomials (ir.phase_poly), at any width, for groups of only cx,
+     swap and diagonal gates: equal polynomials and linear maps prove the
+     group equal, and different linear maps prove it differs
+   - the miter as a ZX diagram (ir.zx): if simplify() reduces it to plain
+     wires the group is proven equal. This scales to any width, but it
+     cannot prove a difference.
+   - random-state simulation of the miter on STIMULI states, up to
+     STATEVECTOR_MAX_QUBITS: |<psi| A^dagger B |psi>| = 1 for random psi
+     only if A == B up to phase
+   - light cones: the miter is the identity iff it preserves X and Z on
+     every qubit. The expectation of X_j and Z_j after the miter, on random
+     product states, only needs the gates in qubit j's backward light cone.
+     Each cone must fit in STATEVECTOR_MAX_QUBITS.
+"""
+import math
+import random
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from ..frontend.ast_nodes import (ForLoopNode, GateNode, IfNode, MeasureNode, QuantumAST, child_blocks,
+                                  resolve)
+
+UNITARY_MAX_QUBITS = 6
+STATEVECTOR_MAX_QUBITS = 16
+STIMULI = 3
+TOLERANCE = 1e-6
+
+# gates equal to their own operands swapped, for matching shared gates
+_SYMMETRIC = frozenset({'cz', 'swap', 'cp', 'cu1', 'rzz', 'rxx', 'ryy', 'iswap'})
+
+
+def check_equivalence(before, after, seed=0, windows=()):
+    """Compare two QuantumASTs up to global phase; returns a result dict (see module doc).
+
+    `windows`: (original nodes, replacement nodes) pairs the pass reported."""
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    symbols = {name: rng.uniform(0, 2 * math.pi)
+               for name in dict.fromkeys(before.parameters() + after.parameters())}
+    methods, restored = set(), 0
+    if windows:
+        after, methods, restored, failure = _restore_windows(after, windows, symbols, rng)
+        if failure is not None:
+            qubits, detail = failure
+            return _result(False, methods, started, reason=detail, qubits=qubits, windows=restored)
+    ancillas = {}
+    base = max(before.qubit_indices() + after.qubit_indices(), default=-1) + 1
+    try:
+        a = _flatten(before.nodes, dict(symbols), _Deferred(ancillas, base))
+        b = _flatten(after.nodes, dict(symbols), _Deferred(ancillas, base))
+    except ValueError as e:
+        return _result(None, methods, started, reason=str(e), windows=restored)
+    if a == b:
+        return _result(True, methods | {"identical"}, started, stripped=len(a), windows=restored)
+    a, b, stripped = _strip_shared(a, b)
+    if not (a or b):
+        return _result(True, methods | {"identical"}, started, stripped=stripped, windows=restored)
+    for qubits in _components(a + b):
+        ga = [op for op in a if op[1][0] in qubits]
+        gb = [op for op in b if op[1][0] in qubits]
+        equal, method, detail = _check_group(sorted(qubits), ga, gb, rng)
+        methods.add(method)
+        if not equal:
+            return _result(equal, methods, started, stripped=stripped, reason=detail,
+                           qubits=sorted(qubits), windows=restored)
+    return _result(True, methods, started, stripped=stripped, windows=restored)
+
+
+def _result(equivalent, methods, started, **extra):
+    return dict({"equivalent": equivalent, "methods": sorted(methods),
+                 "elapsed": time.perf_counter() - started}, **extra)
+
+
+# -- flattening ------------------------------------------------------------------------
+
+class _Deferred:
+    """Ancilla qubits for one program's measurements and resets. The n-th measurement
+    into a classical bit (or n-th reset of a qubit) gets the same ancilla in both
+    programs, so passes may reorder measurements on different qubits."""
+
+    def __init__(self, ancillas, base):
+        self.ancillas = ancillas  # shared: (kind, bit, n) -> qubit
+        self.base = base
+        self.seen = {}
+
+    def qubit(self, kind, bit):
+        n = self.seen[kind, bit] = self.seen.get((kind, bit), -1) + 1
+        key = (kind, bit, n)
+        if key not in self.ancillas:
+            self.ancillas[key] = self.base + len(self.ancillas)
+        return self.ancillas[key]
+
+
+def _flatten(nodes, env, deferred, out=None):
+    """[(name, qubits, params)] with loops unrolled and measurements/resets deferred"""
+    out = [] if out is None else out
+    for node in nodes:
+        if isinstance(node, ForLoopNode):
+            for value in node.iterations():
+                _flatten(node.body, dict(env, **{node.var: value}), deferred, out)
+        elif isinstance(node, MeasureNode):
+            q = int(resolve(node.qubit, env))
+            out.append(('cx', (q, deferred.qubit('measure', int(resolve(node.cbit, env)))), ()))
+        elif isinstance(node, GateNode):
+            qubits = tuple(int(resolve(q, env)) for q in node.qubits)
+            if node.name == 'barrier':
+                continue
+            if node.name == 'reset':
+                out.append(('swap', (qubits[0], deferred.qubit('reset', qubits[0])), ()))
+                continue
+            params = tuple(float(resolve(p, env)) for p in node.params)
+            if node.name in _SYMMETRIC:
+                qubits = tuple(sorted(qubits))
+            out.append((node.name, qubits, params))
+        else:
+            raise ValueError(f"cannot check {type(node).__name__} (data-dependent control flow)")
+    return out
+
+
+# -- reported windows --------------------------------------------------------------------
+
+def _restore_windows(ast, windows, symbols, rng):
+    """Check each window locally and put its original gates back in place of its
+    replacement. Returns (QuantumAST, methods, windows restored, failure), where
+    failure is None or (qubits, reason) for a window that changed the circuit.
+    Windows that cannot be decided or located are left for the global check."""
+    position = {}  # id(node) -> (statement list, index)
+
+    def index(nodes):
+        for k, node in enumerate(nodes):
+            position[id(node)] = (nodes, k)
+            for block in child_blocks(node):
+                index(block)
+
+    index(ast.nodes)
+    spans = {}  # id(statement list) -> {start: (stop, original nodes)}
+    used = set()
+    methods, memo = set(), {}
+    for originals, replacement in windows:
+        spots = [position.get(id(node)) for node in replacement]
+        if not spots or None in spots or any(nodes is not spots[0][0] for nodes, _ in spots):
+            continue
+        start = spots[0][1]
+        if [k for _, k in spots] != list(range(start, start + len(spots))):
+            continue
+        cells = {(id(spots[0][0]), k) for _, k in spots}
+        if not used.isdisjoint(cells):
+            continue
+        verdict = _check_window(originals, replacement, symbols, rng, memo)
+        if verdict is None:
+            continue
+        equal, method, detail, qubits = verdict
+        methods.add(method)
+        if not equal:
+            return ast, methods, len(used), (qubits, f"rewritten window differs: {detail}")
+        used |= cells
+        spans.setdefault(id(spots[0][0]), {})[start] = (start + len(spots), list(originals))
+
+    def rebuild(nodes):
+        own = spans.get(id(nodes), {})
+        out, k = [], 0
+        while k < len(nodes):
+            if k in own:
+                k, originals = own[k]
+                out.extend(originals)
+                continue
+            node = nodes[k]
+            if isinstance(node, IfNode):
+                node = replace(node, then_body=rebuild(node.then_body), else_body=rebuild(node.else_body))
+            elif child_blocks(node):
+                node = replace(node, body=rebuild(node.body))
+            out.append(node)
+            k += 1
+        return out
+
+    restored = sum(len(own) for own in spans.values())
+    return QuantumAST(rebuild(ast.nodes)), methods, restored, None
+
+
+def _check_window(originals, replacement, symbols, rng, memo):
+    """(equal, method, detail, qubits) for one window, or None if it cannot be decided"""
+    if any(not isinstance(node, GateNode) or node.name == 'reset' for node in originals + replacement):
+        return None  # deferral onto ancillas only makes sense for whole programs
+    try:
+        a = _flatten(originals, dict(symbols), None)
+        b = _flatten(replacement, dict(symbols), None)
+    except (ValueError, TypeError):
+        return None  # loop-indexed operands
+    qubits = sorted({q for _, qs, _ in a + b for q in qs})
+    local = {q: i for i, q in enumerate(qubits)}
+    key = tuple(tuple(_signature((name, tuple(local[q] for q in qs), ps)) for name, qs, ps in ops)
+                for ops in (a, b))
+    if key not in memo:
+        memo[key] = _check_group(qubits, a, b, rng)
+    equal, method, detail = memo[key]
+    return None if equal is None else (equal, method, detail, qubits)
+
+
+# -- shared prefix / suffix ------------------------------------------------------------
+
+class _Fronts:
+    """Gates at the front of every wire they touch, indexed by signature"""
+
+    def __init__(self, ops):
+        self.ops = ops
+        self.wires = {}
+        for i, (_, qubits, _) in enumerate(ops):
+            for q in qubits:
+                self.wires.setdefault(q, []).append(i)
+        self.heads = dict.fromkeys(self.wires, 0)
+        self.removed = set()
+        self.front = {}
+        for i in range(len(ops)):
+            self._offer(i)
+
+    def _offer(self, i):
+        qubits = self.ops[i][1]
+        if all(self.heads[q] < len(self.wires[q]) and self.wires[q][self.heads[q]] == i
+               for q in qubits):
+            self.front.setdefault(_signature(self.ops[i]), []).append(i)
+
+    def pop(self, key):
+        """Remove a front gate with this signature; the signatures that became fronts"""
+        i = self.front[key].pop()
+        if not self.front[key]:
+            del self.front[key]
+        self.removed.add(i)
+        qubits = self.ops[i][1]
+        for q in qubits:
+            self.heads[q] += 1
+        new = set()
+        for j in dict.fromkeys(self.wires[q][self.heads[q]] for q in qubits
+                               if self.heads[q] < len(self.wires[q])):
+            before = len(self.front.get(_signature(self.ops[j]), ()))
+            self._offer(j)
+            if len(self.front.get(_signature(self.ops[j]), ())) > before:
+                new.add(_signature(self.ops[j]))
+        return new
+
+    def rest(self):
+        return [op for i, op in enumerate(self.ops) if i not in self.removed]
+
+
+def _signature(op):
+    name, qubits, params = op
+    return (name, qubits, tuple(round(p, 12) for p in params))
+
+
+def _strip_one_side(a, b):
+    """Remove gates that both programs start with"""
+    fa, fb = _Fronts(a), _Fronts(b)
+    work = [key for key in fa.front if key in fb.front]
+    stripped = 0
+    while work:
+        key = work.pop()
+        while key in fa.front and key in fb.front:
+            work.extend(fa.pop(key) | fb.pop(key))
+            stripped += 1
+    return fa.rest(), fb.rest(), stripped
+
+
+def _strip_shared(a, b):
+    a, b, front = _strip_one_side(a, b)
+    ra, rb, back = _strip_one_side(a[::-1], b[::-1])
+    return ra[::-1], rb[::-1], front + back
+
+
+def _components(ops):
+    parent = {}
+
+    def find(q):
+        while parent.setdefault(q, q) != q:
+            parent[q] = parent[parent[q]]
+            q = parent[q]
+        return q
+
+    for _, qubits, _ in ops:
+        root = find(qubits[0])
+        for q in qubits[1:]:
+            parent[find(q)] = root
+    groups = {}
+    for q in list(parent):
+        groups.setdefault(find(q), set()).add(q)
+    return list(groups.values())
+
+
+# -- per-group checks --------------------------------------------------------------------
+
+def _check_group(qubits, a, b, rng):
+    """(equal or None, method, detail) for two gate lists on the same qubits"""
+    local = {q: i for i, q in enumerate(qubits)}
+    a = [(name, tuple(local[q] for q in qs), ps) for name, qs, ps in a]
+    b = [(name, tuple(local[q] for q in qs), ps) for name, qs, ps in b]
+    n = len(qubits)
+    equal = _tableau_equal(n, a, b)
+    if equal is not None:
+        return equal, "tableau", "Clifford tableaux differ"
+    def miter():
+        return _matrices(a) + [(m.conj().T, qs) for m, qs in reversed(_matrices(b))]
+    if n <= UNITARY_MAX_QUBITS:
+        u = _simulate(np.eye(2 ** n, dtype=complex), miter(), n)
+        phase = u[0, 0] / abs(u[0, 0]) if abs(u[0, 0]) > TOLERANCE else 1.0
+        diff = float(np.max(np.abs(u - phase * np.eye(2 ** n))))
+        return bool(diff < TOLERANCE), "unitary", f"miter differs from identity by {diff:.3g}"
+    equal = _phase_polynomial_equal(n, a, b)
+    if equal is not None:
+        return equal, "phase_polynomial", "linear maps differ"
+    if _zx_identity(n, a, b):
+        return True, "zx", ""
+    gates = miter()
+    if n <= STATEVECTOR_MAX_QUBITS:
+        for _ in range(STIMULI):
+            psi = _random_state(n, rng)
+            overlap = abs(np.vdot(psi, _simulate(psi, gates, n)))
+            if overlap < 1 - TOLERANCE:
+                return False, "random_states", f"stimulus fidelity {overlap:.6f}"
+        return True, "random_states", ""
+    return _light_cones(n, gates, rng)
+
+
+def _tableau_equal(n, a, b):
+    """Whether the Clifford tableaux agree, or None if either side is not Clifford"""
+    from qiskit.exceptions import QiskitError
+    from qiskit.quantum_info import Clifford
+    from ..backend.transpiler import ast_to_qiskit_circuit
+    from ..frontend.ast_nodes import QuantumAST
+
+    try:
+        tableaux = [Clifford(ast_to_qiskit_circuit(QuantumAST([GateNode(name, list(qs), list(ps))
+                                                               for name, qs, ps in ops]),
+                                                   num_qubits_hint=n))
+                    for ops in (a, b)]
+    except (QiskitError, ValueError):
+        return None
+    return bool(tableaux[0] == tableaux[1])
+
+
+def _phase_polynomial_equal(n, a, b):
+    """True if both sides have the same phase polynomial and linear map, False if the
+    linear maps differ, None otherwise (other gates, or phases that may still agree:
+    a phase function has more than one parity expansion modulo 2*pi)"""
+    from .phase_poly import LINEAR_GATES, PHASE_GATES, PhasePolynomial
+
+    if any(name not in LINEAR_GATES and name not in PHASE_GATES for name, _, _ in a + b):
+        return None
+    pa, pb = PhasePolynomial.from_gates(n, a), PhasePolynomial.from_gates(n, b)
+    if pa.rows != pb.rows:
+        return False
+    if pa.terms.keys() == pb.terms.keys() and all(
+            abs(math.remainder(pa.terms[p] - pb.terms[p], 2 * math.pi)) < TOLERANCE for p in pa.terms):
+        return True
+    return None
+
+
+def _zx_identity(n, a, b):
+    """True if the ZX diagram of a * b^dagger simplifies to plain wires"""
+    from ..backend.decompositions import get_translator
+    from .zx import SIMPLE, ZX_BASIS, ZXGraph
+
+    translator = get_translator(ZX_BASIS)
+    gates = []
+    for ops, sign in ((a, 1), (b, -1)):
+        part = []
+        for name, qubits, params in ops:
+            if not translator.supports(name):
+                return False
+            for gate, sel, ps in translator.translate(name, params):
+                part.append((gate, list(qubits) if sel is None else [qubits[i] for i in sel], list(ps)))
+        if sign < 0:
+            # inverse: reversed order, negated angles (h, cx and cz are self-inverse)
+            part = [(gate, qs, [-p for p in ps]) for gate, qs, ps in reversed(part)]
+        gates.extend(part)
+    graph = ZXGraph.from_gates(n, gates)
+    graph.simplify()
+    if graph.num_spiders():
+        return False
+    return all(graph.adj[i] == {o: SIMPLE} for i, o in zip(graph.inputs, graph.outputs))
+
+
+def _light_cones(n, miter, rng):
+    """Compare X_j and Z_j expectations before and after the miter on every qubit j"""
+    states = [[_random_state(1, rng) for _ in range(n)] for _ in range(STIMULI)]
+    for j in range(n):
+        cone, gates = {j}, []
+        for m, qs in reversed(miter):
+            if cone.intersection(qs):
+                cone.update(qs)
+                gates.append((m, qs))
+        if len(cone) > STATEVECTOR_MAX_QUBITS:
+            return None, "light_cones", f"light cone of qubit {j} spans {len(cone)} qubits"
+        wires = sorted(cone)
+        local = {q: i for i, q in enumerate(wires)}
+        gates = [(m, tuple(local[q] for q in qs)) for m, qs in reversed(gates)]
+        k = len(wires)
+        for product in states:
+            psi = np.ones(1, dtype=complex)
+            for q in reversed(wires):  # qubit 0 is the low bit
+                psi = np.kron(psi, product[q])
+            out = _simulate(psi, gates, k)
+            for pauli in (_X, _Z):
+                before = _expectation(psi, pauli, local[j], k)
+                after = _expectation(out, pauli, local[j], k)
+                if abs(before - after) > TOLERANCE:
+                    return False, "light_cones", f"qubit {j} expectation changes by {abs(before - after):.3g}"
+    return True, "light_cones", ""
+
+
+# -- dense simulation ------------------------------------------------------------------------
+
+_X = np.array([[0, 1], [1, 0]], dtype=complex)
+_Z = np.array([[1, 0], [0, -1]], dtype=complex)
+
+
+def _matrices(ops):
+    from .kak import gate_matrix
+    return [(gate_matrix(name, params), qubits) for name, qubits, params in ops]
+
+
+def _random_state(n, rng):
+    v = np.array([complex(rng.gauss(0, 1), rng.gauss(0, 1)) for _ in range(2 ** n)])
+    return v / np.linalg.norm(v)
+
+
+def _simulate(state, gates, n):
+    """Apply (matrix, qubits) gates to a state vector, or to each column of a matrix"""
+    batch = state.shape[1:]
+    psi = state.reshape([2] * n + list(batch))
+    for m, qubits in gates:
+        k = len(qubits)
+        # qiskit order: a gate's operand 0 is the low bit of its matrix index
+        axes = [n - 1 - q for q in reversed(qubits)]
+        psi = np.tensordot(m.reshape([2] * (2 * k)), psi, axes=(list(range(k, 2 * k)), axes))
+        psi = np.moveaxis(psi, list(range(k)), axes)
+    return psi.reshape(state.shape)
+
+
+def _expectation(state, pauli, q, n):
+    out = _simulate(state, [(pauli, (q,))], n)
+    return float(np.vdot(state, out).real)
@@ -0,0 +1,98 @@
+"""
+Two-qubit block resynthesis (used by passes.consolidate_blocks).
+
+    u = block_unitary([('h', [0], []), ('cx', [0, 1], []), ('rz', [1], [0.3])])
+    gates = synthesize(u)      # ((name, local qubits, params), ...) in rz/ry/cx
+
+synthesize() runs qiskit's TwoQubitBasisDecomposer, a KAK (Cartan)
+decomposition that reaches the minimal number of cx gates (0 to 3) for the
+unitary, with single-qubit layers as ZYZ Euler rotations. Results are kept
+in an LRU of CACHE_SIZE entries keyed by fingerprint: the unitary with its
+global phase removed, rounded to FINGERPRINT_DECIMALS. Repeated blocks, which
+are common in generated and layered circuits, are therefore synthesized once.
+
+The decomposer rounds unitaries within about 1e-9 infidelity of a cheaper
+class onto it (a cp(1e-4) block becomes two rz gates). synthesize() returns
+None when the gates miss u by more than EXACT_TOLERANCE in any entry.
+
+Matrices use qiskit's little-endian order: local qubit 0 is the low bit.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+FINGERPRINT_DECIMALS = 9
+CACHE_SIZE = 4096
+EXACT_TOLERANCE = 1e-9
+
+_MATRICES = {}                # name -> matrix of a parameterless gate
+_SYNTHESIZED = OrderedDict()  # fingerprint -> gates, least recently used first
+_DECOMPOSER = []              # built on first use (qiskit import)
+
+_SWAP = np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], dtype=complex)
+_I2 = np.eye(2, dtype=complex)
+
+
+def gate_matrix(name, params=()):
+    """Matrix of a qiskit standard gate; ValueError if there is none"""
+    matrix = None if params else _MATRICES.get(name)
+    if matrix is None:
+        from qiskit.circuit.library import get_standard_gate_name_mapping
+        gate = get_standard_gate_name_mapping().get(name)
+        if gate is None or name in ('measure', 'reset', 'barrier', 'delay'):
+            raise ValueError(f"gate '{name}' has no unitary matrix")
+        if params:
+            return type(gate)(*params).to_matrix()
+        matrix = _MATRICES[name] = gate.to_matrix()
+    return matrix
+
+
+def block_unitary(gates):
+    """4x4 unitary of gates (name, local qubits in {0, 1}, params), in circuit order"""
+    u = np.eye(4, dtype=complex)
+    for name, qubits, params in gates:
+        m = gate_matrix(name, params)
+        if len(qubits) == 1:
+            m = np.kron(_I2, m) if qubits[0] == 0 else np.kron(m, _I2)
+        elif qubits[0] == 1:
+            m = _SWAP @ m @ _SWAP
+        u = m @ u
+    return u
+
+
+def fingerprint(u):
+    """Hashable key for u up to global phase"""
+    row = u[0]
+    k = int(np.argmax(np.abs(row) > 0.25))  # a row of a unitary has an entry of size >= 1/2
+    u = u * (abs(row[k]) / row[k])
+    return np.round(u, FINGERPRINT_DECIMALS).tobytes()
+
+
+def synthesize(u):
+    """Gates (name, local qubits, params) equal to u up to global phase, with minimal cx
+    count; None if the decomposition is not exact"""
+    key = fingerprint(u)
+    if key in _SYNTHESIZED:
+        _SYNTHESIZED.move_to_end(key)
+        gates = _SYNTHESIZED[key]
+    else:
+        if not _DECOMPOSER:
+            from qiskit.circuit.library import CXGate
+            from qiskit.synthesis import TwoQubitBasisDecomposer
+            _DECOMPOSER.append(TwoQubitBasisDecomposer(CXGate(), euler_basis='ZYZ'))
+        circuit = _DECOMPOSER[0](u)
+        gates = tuple((inst.operation.name, tuple(circuit.find_bit(q).index for q in inst.qubits),
+                       tuple(float(p) for p in inst.operation.params))
+                      for inst in circuit.data)
+        v = block_unitary(gates)
+        k = int(np.argmax(np.abs(u)))
+        if np.max(np.abs(v - (v.flat[k] / u.flat[k]) * u)) > EXACT_TOLERANCE:
+            gates = None
+        _SYNTHESIZED[key] = gates
+        if len(_SYNTHESIZED) > CACHE_SIZE:
+            _SYNTHESIZED.popitem(last=False)
+    return gates
+
+
+def cache_info():
+    return {"unitaries": len(_SYNTHESIZED), "matrices": len(_MATRICES)}
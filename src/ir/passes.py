@@ -1,25 +1,63 @@
 """
 Optimization passes (stubs & small heuristics).
-- superposition_opt: naive pass to remove consecutive identical gates
+- superposition_opt: naive pass to remove consecutive identical gates and
+  merge consecutive rotations (parameters may be symbolic ParamExpr)
 - entanglement_aware_pass: analyzes AST to mark entangling gates
+- zx_simplify: optional ZX-calculus rewriting (see ir.zx) of straight-line
+  gate runs, kept only where it lowers the two-qubit gate and T counts
+- consolidate_blocks: resynthesize maximal runs on one qubit pair from their
+  4x4 unitary with the fewest cx gates (see ir.kak)
+- phase_polynomial_opt: merge the phases of CNOT + diagonal-gate regions and
+  resynthesize them with fewer cx (Gray-synth, see ir.phase_poly)
 """
 
+import math
 from collections import defaultdict
 
+from ..frontend.ast_nodes import GateNode, child_blocks, is_symbolic, walk
+
+# single-parameter rotations about a fixed axis: R(a) R(b) == R(a + b)
+ADDITIVE_ROTATIONS = frozenset({'rx', 'ry', 'rz', 'p', 'u1'})
+
+# single-qubit gates equal to their own inverse
+PAULI_HADAMARD = frozenset({'h', 'x', 'y', 'z'})
+
+# phase_polynomial_opt: the greedy synthesis is quadratic in the number of parities
+GREEDY_MAX_TERMS = 512
+
 def superposition_opt(ast):
-    """Naive removal of consecutive duplicate single-qubit gates on same qubit."""
+    """Naive removal of consecutive duplicate single-qubit gates on same qubit:
+    pairs of self-inverse gates (h, x, y, z) cancel.
+
+    Parametrized gates are only touched when they are consecutive rotations
+    about the same axis, which are merged by adding their (possibly symbolic)
+    angles. Loop and branch bodies are optimized on their own; nothing is
+    merged across a control-flow boundary.
+    """
+    ast.nodes = _superposition_opt_block(ast.nodes)
+    return ast
+
+def _superposition_opt_block(nodes):
     new_nodes = []
     prev = None
-    for node in ast.nodes:
+    for node in nodes:
+        for block in child_blocks(node):
+            block[:] = _superposition_opt_block(block)
         if prev and isinstance(prev, type(node)) and getattr(prev, 'name', None) == getattr(node, 'name', None):
             # if same gate and same target qubit(s) and single-qubit, remove the duplicate
             if hasattr(node, 'qubits') and hasattr(prev, 'qubits') and node.qubits == prev.qubits and len(node.qubits) == 1:
-                # skip duplicate
-                continue
+                if node.name in ADDITIVE_ROTATIONS:
+                    prev = GateNode(prev.name, list(prev.qubits), [prev.params[0] + node.params[0]])
+                    new_nodes[-1] = prev
+                    continue
+                if node.name in PAULI_HADAMARD:
+                    # the pair is the identity
+                    new_nodes.pop()
+                    prev = None
+                    continue
         new_nodes.append(node)
         prev = node
-    ast.nodes = new_nodes
-    return ast
+    return new_nodes
 
 def entanglement_aware_pass(ast):
     """
@@ -27,9 +65,307 @@ def entanglement_aware_pass(ast):
     Return metadata mapping qubit -> entanglement partners set
     """
     ent_map = defaultdict(set)
-    for node in ast.nodes:
+    for node in walk(ast.nodes):
         if hasattr(node, 'qubits') and len(node.qubits) >= 2:
             q0, q1 = node.qubits[0], node.qubits[1]
+            if is_symbolic(q0) or is_symbolic(q1):
+                continue  # loop-indexed pair: partners differ per iteration
             ent_map[q0].add(q1)
             ent_map[q1].add(q0)
     return dict(ent_map)
+
+def zx_simplify(ast):
+    """Rewrite each maximal run of concrete gates through a ZX diagram.
+
+    A run ends at a measurement, reset, barrier, control-flow node, or a gate
+    with a loop-indexed qubit or symbolic angle; loop and branch bodies are
+    simplified on their own. The run is translated into h/rz/rx/cx/cz, turned
+    into a graph-like ZX diagram (spiders fused as it is read), optionally
+    simplified further (local complementation, pivoting), extracted back into
+    h/rz/cx/cz/swap and peephole-cleaned. The best extraction replaces the
+    original only when it scores lower on (two-qubit gates, T-like rotations,
+    total gates), so the pass never makes a circuit worse by that measure.
+    """
+    from ..backend.decompositions import PASSTHROUGH, get_translator
+    from .zx import ZX_BASIS
+
+    translator = get_translator(ZX_BASIS)
+
+    def concrete(node):
+        return (isinstance(node, GateNode) and node.name not in PASSTHROUGH
+                and not any(is_symbolic(v) for v in node.qubits)
+                and not any(is_symbolic(v) for v in node.params)
+                and translator.supports(node.name))
+
+    def block(nodes):
+        out, run = [], []
+        for node in nodes:
+            if concrete(node):
+                run.append(node)
+                continue
+            if run:
+                out.extend(_zx_run(run, translator))
+                run = []
+            for body in child_blocks(node):
+                body[:] = block(body)
+            out.append(node)
+        if run:
+            out.extend(_zx_run(run, translator))
+        return out
+
+    ast.nodes = block(ast.nodes)
+    return ast
+
+def _zx_run(nodes, translator):
+    from .zx import ExtractionError, ZXGraph
+
+    wires = sorted({q for node in nodes for q in node.qubits})
+    local = {q: i for i, q in enumerate(wires)}
+    gates = []
+    for node in nodes:
+        qubits = [local[q] for q in node.qubits]
+        for gate, sel, params in translator.translate(node.name, node.params):
+            gates.append((gate, qubits if sel is None else [qubits[i] for i in sel], list(params)))
+    best, best_score = None, _zx_score(_cancel_adjacent(gates))
+    # full Clifford simplification can cost cx gates in extraction, so the diagram
+    # with only its spiders fused (done while reading it in) is a candidate too
+    for simplify in (False, True):
+        graph = ZXGraph.from_gates(len(wires), gates)
+        if simplify:
+            graph.simplify()
+        try:
+            extracted = _cancel_adjacent(graph.extract())
+        except ExtractionError:
+            continue
+        score = _zx_score(extracted)
+        if score < best_score:
+            best, best_score = extracted, score
+    if best is None:
+        return nodes
+    return [GateNode(name, [wires[q] for q in qubits], params) for name, qubits, params in best]
+
+def _zx_score(gates):
+    """(two-qubit gates with swap as 3 cx, non-Clifford rz, size) -- lower is better"""
+    two = t = 0
+    for name, qubits, params in gates:
+        if len(qubits) > 1:
+            two += 3 if name == 'swap' else 1
+        elif name == 'rz' and abs(params[0] / (math.pi / 2) - round(params[0] / (math.pi / 2))) > 1e-9:
+            t += 1
+    return (two, t, len(gates))
+
+# self-inverse gates; cz and swap are symmetric in their operands
+_SELF_INVERSE = {'h': False, 'x': False, 'cx': False, 'cz': True, 'swap': True}
+
+def _cancel_adjacent(gates):
+    """Cancel back-to-back self-inverse pairs, merge rz runs and fold h cz h into cx, per wire"""
+    out = []
+    stacks = defaultdict(list)  # qubit -> indices into out, latest last
+    for name, qubits, params in gates:
+        tops = {stacks[q][-1] if stacks[q] else None for q in qubits}
+        i = tops.pop() if len(tops) == 1 else None
+        prev = out[i] if i is not None else None
+        if prev is not None and prev[0] == name and len(prev[1]) == len(qubits):
+            same = (sorted(prev[1]) == sorted(qubits)) if _SELF_INVERSE.get(name) else prev[1] == qubits
+            if same and name in _SELF_INVERSE:
+                out[i] = None
+                for q in qubits:
+                    stacks[q].pop()
+                continue
+            if same and name == 'rz':
+                angle = math.remainder(prev[2][0] + params[0], 2 * math.pi)
+                if abs(angle) < 1e-12:
+                    out[i] = None
+                    stacks[qubits[0]].pop()
+                else:
+                    out[i] = (name, qubits, [angle])
+                continue
+        if name == 'h' and prev is not None and prev[0] == 'cz' and len(stacks[qubits[0]]) > 1:
+            q = qubits[0]
+            j = stacks[q][-2]
+            if out[j][0] == 'h':
+                # h(q) cz(p, q) h(q) == cx(p, q)
+                out[j] = None
+                out[i] = ('cx', [prev[1][0] if prev[1][1] == q else prev[1][1], q], [])
+                del stacks[q][-2]
+                continue
+        for q in qubits:
+            stacks[q].append(len(out))
+        out.append((name, list(qubits), list(params)))
+    return [gate for gate in out if gate is not None]
+
+def consolidate_blocks(ast, windows=None):
+    """Collect maximal blocks of gates acting on one qubit pair and resynthesize them.
+
+    A block is a run of two-qubit gates on the same pair together with the
+    single-qubit gates on those wires between and just before them. Each block
+    with two or more cx gates' worth of entangling gates is replaced by the
+    KAK synthesis of its unitary (at most 3 cx, with rz/ry layers) when that
+    takes fewer cx gates, or as many cx and fewer gates, and reproduces it exactly.
+    Gates on other qubits never break a block. Anything without a concrete
+    matrix (measure, reset, barrier, 3+ qubit gates, loop-indexed or symbolic
+    operands) closes the blocks on its qubits, and control flow closes all of
+    them; loop and branch bodies are consolidated on their own.
+
+    `windows`, if a list, receives (original nodes, replacement nodes) for every
+    resynthesized block, so check_equivalence can verify each one locally.
+    """
+    from ..backend.decompositions import PASSTHROUGH, get_translator
+    from .kak import block_unitary, synthesize
+
+    cost = get_translator(('rz', 'sx', 'x', 'cx'))  # cx count of the original gates
+
+    def cx_count(gates):
+        return sum(step[0] == 'cx' for name, _, params in gates for step in cost.translate(name, params))
+
+    def resynthesize(pair, nodes):
+        local = {q: i for i, q in enumerate(pair)}
+        gates = [(n.name, [local[q] for q in n.qubits], n.params) for n in nodes]
+        before = cx_count(gates)
+        if before < 2:
+            return nodes  # one cx is already minimal for an entangling block
+        new = synthesize(block_unitary(gates))
+        if new is None:
+            return nodes  # the decomposition would only approximate the block
+        after = sum(name == 'cx' for name, _, _ in new)
+        if (after, len(new)) >= (before, len(gates)):
+            return nodes
+        replacement = [GateNode(name, [pair[q] for q in qubits], list(params)) for name, qubits, params in new]
+        if windows is not None:
+            windows.append((nodes, replacement))
+        return replacement
+
+    def concrete(node):
+        return (isinstance(node, GateNode) and len(node.qubits) <= 2
+                and node.name not in PASSTHROUGH and cost.supports(node.name)
+                and not any(is_symbolic(v) for v in node.qubits)
+                and not any(is_symbolic(v) for v in node.params))
+
+    def block(nodes):
+        out = []
+        pending = defaultdict(list)  # qubit -> single-qubit gates not yet in a block
+        blocks = {}                  # qubit -> (pair, nodes) of its open block
+
+        def close(q):
+            if q in blocks:
+                pair, run = blocks[q]
+                for p in pair:
+                    del blocks[p]
+                out.extend(resynthesize(pair, run))
+            out.extend(pending.pop(q, ()))
+
+        for node in nodes:
+            if concrete(node) and len(node.qubits) == 1:
+                q = node.qubits[0]
+                (blocks[q][1] if q in blocks else pending[q]).append(node)
+                continue
+            if concrete(node):
+                a, b = node.qubits
+                if a in blocks and blocks[a] is blocks.get(b):
+                    blocks[a][1].append(node)
+                    continue
+                for q in (a, b):
+                    if q in blocks:
+                        close(q)
+                # the single-qubit gates waiting on a and b open the new block
+                blocks[a] = blocks[b] = ((a, b), pending.pop(a, []) + pending.pop(b, []) + [node])
+                continue
+            wires = _operand_qubits(node)
+            for q in sorted(set(blocks) | set(pending) if wires is None else wires):
+                close(q)
+            for body in child_blocks(node):
+                body[:] = block(body)
+            out.append(node)
+        for q in sorted(set(blocks) | set(pending)):
+            close(q)
+        return out
+
+    ast.nodes = block(ast.nodes)
+    return ast
+
+def _operand_qubits(node):
+    """Concrete qubits a gate or measurement acts on; None when unknown (loop-indexed
+    operands, control flow)"""
+    if child_blocks(node):
+        return None
+    qubits = list(node.qubits) if isinstance(node, GateNode) else [node.qubit]
+    return None if any(is_symbolic(q) for q in qubits) else set(qubits)
+
+def phase_polynomial_opt(ast, hardware_profile=None, windows=None):
+    """Resynthesize regions of cx/swap and diagonal gates from their phase polynomial.
+
+    A region grows over cx, swap and the diagonal gates of phase_poly.PHASE_GATES
+    (rz, p, z, s, t, cz, cp, rzz, ...) with concrete operands; any other gate
+    or measurement on one of its qubits closes it, while gates on other qubits
+    are passed through. Phases on equal parities are merged and the region is
+    rebuilt with Gray-synth and, up to GREEDY_MAX_TERMS distinct parities,
+    with the greedy parity walk as well. The best rebuild is kept when it
+    needs fewer cx, or as many cx and fewer non-Clifford rotations or gates.
+
+    With a hardware profile, cx counts are measured on its `topology`
+    (a cx between non-adjacent qubits is routed, see phase_poly.routed_cx)
+    and synthesis only uses coupled pairs; regions on qubits the topology
+    does not connect are left alone. `windows` works as in consolidate_blocks.
+    """
+    from .phase_poly import CX_COST, LINEAR_GATES, PHASE_GATES, Coupling, PhasePolynomial
+
+    coupling = None
+    if hardware_profile is not None and hardware_profile.get('topology'):
+        coupling = Coupling(hardware_profile['topology'])
+
+    def cost(gates):
+        two = rotations = 0
+        for name, qubits, params in gates:
+            if len(qubits) == 2:
+                route = 1 if coupling is None else coupling.cx_cost(*qubits)
+                if route is None:
+                    return None
+                two += CX_COST[name] * route
+            elif name in ('t', 'tdg') or params and abs(math.remainder(params[0], math.pi / 2)) > 1e-9:
+                rotations += 1
+        return (two, rotations, len(gates))
+
+    def resynthesize(region):
+        wires = sorted({q for node in region for q in node.qubits})
+        local = {q: i for i, q in enumerate(wires)}
+        gates = [(n.name, [local[q] for q in n.qubits], n.params) for n in region]
+        before = cost([(n.name, n.qubits, n.params) for n in region])
+        if before is None or len(region) < 2:
+            return region
+        poly = PhasePolynomial.from_gates(len(wires), gates)
+        methods = ('gray', 'greedy') if len(poly.terms) <= GREEDY_MAX_TERMS else ('gray',)
+        best, best_cost = region, before
+        for method in methods:
+            new = poly.synthesize(coupling, wires, method)
+            new_cost = cost(new)
+            if new_cost < best_cost:
+                best, best_cost = [GateNode(name, qubits, list(params)) for name, qubits, params in new], new_cost
+        if windows is not None and best is not region:
+            windows.append((region, best))
+        return best
+
+    def member(node):
+        return (isinstance(node, GateNode) and (node.name in LINEAR_GATES or node.name in PHASE_GATES)
+                and not any(is_symbolic(v) for v in node.qubits)
+                and not any(is_symbolic(v) for v in node.params))
+
+    def block(nodes):
+        out, region, qubits = [], [], set()
+        for node in nodes:
+            if member(node):
+                region.append(node)
+                qubits.update(node.qubits)
+                continue
+            wires = _operand_qubits(node)
+            if region and (wires is None or not qubits.isdisjoint(wires)):
+                out.extend(resynthesize(region))
+                region, qubits = [], set()
+            for body in child_blocks(node):
+                body[:] = block(body)
+            out.append(node)
+        if region:
+            out.extend(resynthesize(region))
+        return out
+
+    ast.nodes = block(ast.nodes)
+    return ast
@@ -0,0 +1,311 @@
+"""
+Phase-polynomial resynthesis of CNOT + diagonal-phase regions (used by
+passes.phase_polynomial_opt).
+
+A circuit of cx/swap and diagonal gates (rz, p, z, s, t, cz, cp, rzz, ...)
+acts as |x> -> exp(i * sum_k theta_k * f_k(x)) |A x>: a phase polynomial
+over parities f_k of the inputs plus a linear reversible map A. Parities are
+int bitmasks over the region's qubits, so merging equal parities is a dict
+update.
+
+    poly = PhasePolynomial.from_gates(num_qubits, gates)   # gates: (name, qubits, params)
+    gates = poly.synthesize(coupling)                      # cx + phase gates
+
+synthesize() follows Gray-synth (Amy, Azimzadeh and Mosca, 2018): it
+recursively splits the parity set on the qubit that best separates it, so
+that consecutive parities differ by one cx, and emits each phase as the
+parity appears on a wire. Gauss-Jordan elimination then restores A. With a
+Coupling, elimination prefers adjacent qubits, and any cx between
+non-adjacent qubits is routed along a shortest path. The routed cx leaves the
+intermediate qubits unchanged, and costs 4 * (distance - 1) cx.
+"""
+import math
+from collections import deque
+
+_EPS = 1e-9
+
+# diagonal gates: name -> params -> [(parity over the gate's operands, angle)] with
+# the gate equal to exp(i * sum angle * parity(x)) up to global phase
+_HALF_PI, _QUARTER_PI = math.pi / 2, math.pi / 4
+PHASE_GATES = {
+    'rz': lambda p: [(0b1, p[0])],
+    'p': lambda p: [(0b1, p[0])],
+    'u1': lambda p: [(0b1, p[0])],
+    'z': lambda p: [(0b1, math.pi)],
+    's': lambda p: [(0b1, _HALF_PI)],
+    'sdg': lambda p: [(0b1, -_HALF_PI)],
+    't': lambda p: [(0b1, _QUARTER_PI)],
+    'tdg': lambda p: [(0b1, -_QUARTER_PI)],
+    # x*y = (x + y - (x xor y)) / 2
+    'cz': lambda p: [(0b01, _HALF_PI), (0b10, _HALF_PI), (0b11, -_HALF_PI)],
+    'cp': lambda p: [(0b01, p[0] / 2), (0b10, p[0] / 2), (0b11, -p[0] / 2)],
+    'cu1': lambda p: [(0b01, p[0] / 2), (0b10, p[0] / 2), (0b11, -p[0] / 2)],
+    'rzz': lambda p: [(0b11, p[0])],
+}
+LINEAR_GATES = frozenset({'cx', 'swap'})
+
+# cx-equivalents of the two-qubit gates, for comparing a region with its resynthesis
+CX_COST = {'cx': 1, 'cz': 1, 'swap': 3, 'cp': 2, 'cu1': 2, 'rzz': 2}
+
+# exact angles that have a named gate
+_NAMED = ((math.pi, 'z'), (_HALF_PI, 's'), (-_HALF_PI, 'sdg'), (_QUARTER_PI, 't'), (-_QUARTER_PI, 'tdg'))
+
+
+def _wrap(angle):
+    """Angle in (-pi, pi]"""
+    angle = math.remainder(angle, 2 * math.pi)
+    return math.pi if abs(angle + math.pi) < _EPS else angle
+
+
+def phase_gate(qubit, angle):
+    """rz, or the named Clifford+T gate for that angle (equal up to global phase)"""
+    for value, name in _NAMED:
+        if abs(angle - value) < _EPS:
+            return (name, [qubit], [])
+    return ('rz', [qubit], [angle])
+
+
+class Coupling:
+    """Shortest paths over a hardware profile's `topology` edges"""
+
+    def __init__(self, edges):
+        self.adj = {}
+        for a, b in edges:
+            self.adj.setdefault(a, set()).add(b)
+            self.adj.setdefault(b, set()).add(a)
+        self._parents = {}
+
+    def _tree(self, source):
+        parents = self._parents.get(source)
+        if parents is None:
+            parents = {source: None}
+            queue = deque([source])
+            while queue:
+                v = queue.popleft()
+                for w in self.adj.get(v, ()):
+                    if w not in parents:
+                        parents[w] = v
+                        queue.append(w)
+            self._parents[source] = parents
+        return parents
+
+    def path(self, a, b):
+        """Qubits from a to b inclusive, or None when they are not connected"""
+        parents = self._tree(b)
+        if a not in parents:
+            return None
+        path = [a]
+        while path[-1] != b:
+            path.append(parents[path[-1]])
+        return path
+
+    def distance(self, a, b):
+        path = self.path(a, b)
+        return None if path is None else len(path) - 1
+
+    def cx_cost(self, a, b):
+        """cx gates for a cx from a to b (None if they are not connected)"""
+        d = self.distance(a, b)
+        return None if d is None else max(1, 4 * (d - 1))
+
+
+def routed_cx(path):
+    """cx gates on neighbouring qubits equal to cx(path[0], path[-1]); the qubits in
+    between end up unchanged"""
+    if len(path) == 2:
+        return [path]
+    chain = list(zip(path, path[1:]))               # each link adds its control into its target
+    tail = chain[1:]
+    # forward and back: the target gains path[0] .. path[-2], the middle is restored;
+    # the same again from path[1] removes path[1] .. path[-2] from the target
+    return chain + chain[-2::-1] + tail + tail[-2::-1]
+
+
+class PhasePolynomial:
+    def __init__(self, num_qubits, terms, rows):
+        self.num_qubits = num_qubits
+        self.terms = terms  # parity -> angle
+        self.rows = rows    # rows[q]: the parity that output wire q carries
+
+    @classmethod
+    def from_gates(cls, num_qubits, gates):
+        rows = [1 << q for q in range(num_qubits)]
+        terms = {}
+        for name, qubits, params in gates:
+            if name == 'cx':
+                c, t = qubits
+                rows[t] ^= rows[c]
+            elif name == 'swap':
+                a, b = qubits
+                rows[a], rows[b] = rows[b], rows[a]
+            else:
+                for local, angle in PHASE_GATES[name](params):
+                    parity = 0
+                    for k, q in enumerate(qubits):
+                        if local >> k & 1:
+                            parity ^= rows[q]
+                    terms[parity] = terms.get(parity, 0.0) + angle
+        terms = {p: _wrap(a) for p, a in terms.items()}
+        return cls(num_qubits, {p: a for p, a in terms.items() if abs(a) > _EPS}, rows)
+
+    def synthesize(self, coupling=None, wires=None, method='gray'):
+        """(name, qubits, params) gates with this polynomial and linear map, on `wires`
+        (the qubit each local qubit is, default 0..n-1). With a coupling, routed cx
+        gates may pass through qubits outside `wires`, which they leave unchanged.
+
+        method: 'gray' (Gray-synth) or 'greedy' (always build the pending parity
+        that is fewest cx away; often better for sparse, low-weight parities such
+        as QAOA cost layers)."""
+        synthesis = _Synthesis(self, coupling, wires)
+        for q in range(self.num_qubits):
+            synthesis.place(q)
+        if method == 'gray':
+            synthesis.gray()
+        elif method == 'greedy':
+            synthesis.greedy()
+        else:
+            raise ValueError(f"unknown synthesis method '{method}'")
+        synthesis.restore_linear_map()
+        if synthesis.pending:
+            raise RuntimeError("phase polynomial synthesis left parities unplaced")
+        return synthesis.gates
+
+
+class _Synthesis:
+    def __init__(self, poly, coupling, wires):
+        self.n = poly.num_qubits
+        self.poly = poly
+        self.coupling = coupling
+        self.wires = list(wires) if wires is not None else list(range(self.n))
+        self.state = [1 << q for q in range(self.n)]
+        self.pending = dict(poly.terms)
+        self.gates = []
+
+    # -- emission -------------------------------------------------------------------
+
+    def cx(self, c, t):
+        self.state[t] ^= self.state[c]
+        c, t = self.wires[c], self.wires[t]
+        if self.coupling is None:
+            self.gates.append(('cx', [c, t], []))
+        else:
+            self.gates.extend(('cx', list(pair), []) for pair in routed_cx(self.coupling.path(c, t)))
+
+    def place(self, q):
+        """Emit the phase of the parity wire q now carries, if it has one"""
+        angle = self.pending.pop(self.state[q], None)
+        if angle is not None:
+            self.gates.append(phase_gate(self.wires[q], angle))
+
+    def cost(self, c, t):
+        return 1 if self.coupling is None else self.coupling.cx_cost(self.wires[c], self.wires[t])
+
+    # -- Gray-synth -------------------------------------------------------------------
+
+    def gray(self):
+        # stack of [parities in current coordinates, unsplit qubits, target qubit]
+        stack = [[list(self.pending), list(range(self.n)), None]]
+        while stack:
+            entry = stack.pop()
+            columns, free, target = entry
+            if not columns:
+                continue
+            if target is not None:
+                while entry[0]:
+                    # a qubit set in every remaining parity is folded into the target
+                    everywhere = [j for j in range(self.n) if j != target
+                                  and all(c >> j & 1 for c in entry[0])]
+                    if not everywhere:
+                        break
+                    j = min(everywhere, key=lambda j: self.cost(j, target))
+                    self.cx(j, target)
+                    self.place(target)
+                    # parities are kept in coordinates of the current wires: after
+                    # wire target ^= wire j, coordinate j picks up coordinate target.
+                    # The parity now on the target wire has been placed.
+                    placed = 1 << target
+                    for other in stack + [entry]:
+                        other[0] = [c for c in (c ^ (1 << j) if c >> target & 1 else c for c in other[0])
+                                    if c != placed]
+                columns = entry[0]
+            if not free or not columns:
+                continue
+            j = max(free, key=lambda j: max(sum(c >> j & 1 for c in columns),
+                                            sum(not c >> j & 1 for c in columns)))
+            ones = [c for c in columns if c >> j & 1]
+            zeros = [c for c in columns if not c >> j & 1]
+            rest = [k for k in free if k != j]
+            stack.append([zeros, rest, target])
+            stack.append([ones, rest, j if target is None else target])
+
+    def greedy(self):
+        # parity -> its coordinates over the current wires
+        coords = {p: p for p in self.pending}
+        while coords:
+            best = None
+            for parity, c in coords.items():
+                support = _bits(c)
+                for t in support:
+                    cost = sum(self.cost(j, t) for j in support if j != t)
+                    if best is None or cost < best[0]:
+                        best = (cost, c, t)
+            _, c, t = best
+            for j in _bits(c):
+                if j == t:
+                    continue
+                self.cx(j, t)
+                self.place(t)
+                for parity, d in list(coords.items()):
+                    if d >> t & 1:
+                        d ^= 1 << j
+                    if parity in self.pending:
+                        coords[parity] = d
+                    else:
+                        del coords[parity]
+
+    def restore_linear_map(self):
+        """Gauss-Jordan: row ops (cx) taking the current wire parities to poly.rows"""
+        n = self.n
+        inverse = _invert(self.poly.rows)
+        # x[q]: current parity of wire q in the basis of the target rows
+        x = [_apply(inverse, s) for s in self.state]
+        for k in range(n):
+            if not x[k] >> k & 1:
+                # only rows below k keep the columns already reduced clean
+                r = min((r for r in range(k + 1, n) if x[r] >> k & 1), key=lambda r: self.cost(r, k))
+                self.cx(r, k)
+                x[k] ^= x[r]
+            for r in range(n):
+                if r != k and x[r] >> k & 1:
+                    self.cx(k, r)
+                    x[r] ^= x[k]
+
+
+def _bits(mask):
+    return [k for k in range(mask.bit_length()) if mask >> k & 1]
+
+
+def _apply(matrix, vector):
+    """vector (bitmask) times matrix (rows as bitmasks) over GF(2)"""
+    out = 0
+    while vector:
+        low = vector & -vector
+        out ^= matrix[low.bit_length() - 1]
+        vector ^= low
+    return out
+
+
+def _invert(rows):
+    n = len(rows)
+    a = list(rows)
+    inv = [1 << q for q in range(n)]
+    for k in range(n):
+        pivot = next(r for r in range(k, n) if a[r] >> k & 1)
+        if pivot != k:
+            a[k] ^= a[pivot]
+            inv[k] ^= inv[pivot]
+        for r in range(n):
+            if r != k and a[r] >> k & 1:
+                a[r] ^= a[k]
+                inv[r] ^= inv[k]
+    return inv
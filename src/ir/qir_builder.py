@@ -1,12 +1,57 @@
 """
 QIRBuilder: create a simple LLVM-like IR using llvmlite, with 'quantum intrinsics' as functions.
 This module produces a textual IR (llvmlite.Module) and keeps a qubit table.
+
+add_program() lowers a QuantumAST into a `void @main()` of QIR base-profile
+calls (`__quantum__qis__h__body(%Qubit*)`, ...), with static qubit/result
+handles (`inttoptr (i64 k to %Qubit*)`). Gates without an intrinsic (sx, p,
+u, ...) are lowered to rotations up to global phase. Control-flow nodes lower to real
+LLVM loops and branches on measurement results. src.execution.qir_runtime can
+JIT and run such modules.
 """
+import itertools
+import math
+
 from llvmlite import ir
 
+# AST gate -> (QIR intrinsic, number of double parameters)
+QIS_GATES = {
+    'h': ('__quantum__qis__h__body', 0),
+    'x': ('__quantum__qis__x__body', 0),
+    'y': ('__quantum__qis__y__body', 0),
+    'z': ('__quantum__qis__z__body', 0),
+    's': ('__quantum__qis__s__body', 0),
+    'sdg': ('__quantum__qis__s__adj', 0),
+    't': ('__quantum__qis__t__body', 0),
+    'tdg': ('__quantum__qis__t__adj', 0),
+    'rx': ('__quantum__qis__rx__body', 1),
+    'ry': ('__quantum__qis__ry__body', 1),
+    'rz': ('__quantum__qis__rz__body', 1),
+    'cx': ('__quantum__qis__cnot__body', 0),
+    'cz': ('__quantum__qis__cz__body', 0),
+    'swap': ('__quantum__qis__swap__body', 0),
+    'ccx': ('__quantum__qis__ccx__body', 0),
+    'reset': ('__quantum__qis__reset__body', 0),
+}
+
+# gates without a QIR intrinsic -> params -> [(gate in QIS_GATES, params)] on the same
+# qubit, equal up to global phase (which QIR programs cannot observe)
+QIS_EQUIVALENTS = {
+    'id': lambda p: [],
+    'sx': lambda p: [('rx', [math.pi / 2])],
+    'sxdg': lambda p: [('rx', [-math.pi / 2])],
+    'p': lambda p: [('rz', [p[0]])],
+    'u1': lambda p: [('rz', [p[0]])],
+    'u2': lambda p: [('rz', [p[1]]), ('ry', [math.pi / 2]), ('rz', [p[0]])],
+    'u': lambda p: [('rz', [p[2]]), ('ry', [p[0]]), ('rz', [p[1]])],
+    'u3': lambda p: [('rz', [p[2]]), ('ry', [p[0]]), ('rz', [p[1]])],
+}
+
 class QIRBuilder:
     def __init__(self, module_name="quantum_module"):
-        self.module = ir.Module(name=module_name)
+        # own context: identified types (%Qubit, %Result) would otherwise leak into
+        # every later module built on llvmlite's process-wide global context
+        self.module = ir.Module(name=module_name, context=ir.Context())
         self.qubit_count = 0
         self.qubits = {}  # name -> GlobalVariable (as placeholder)
 
@@ -46,5 +91,134 @@ class QIRBuilder:
         # We'll just return a tuple describing the call
         return (func_name, tuple(qubit_ids))
 
+    def add_program(self, ast, entry="main"):
+        """Define `void @<entry>()` applying the AST's gates and measurements as QIR calls.
+
+        For loops become counted LLVM loops (an i64 phi induction variable), and
+        while loops / if-else branch on `__quantum__qis__read_result__body`, so
+        the function body stays the size of the program text.
+        """
+        from ..frontend.ast_nodes import ForLoopNode, IfNode, WhileLoopNode, is_symbolic
+
+        ctx = self.module.context
+        qubit_ptr = ctx.get_identified_type("Qubit").as_pointer()
+        result_ptr = ctx.get_identified_type("Result").as_pointer()
+        double = ir.DoubleType()
+        i64 = ir.IntType(64)
+        fn = ir.Function(self.module, ir.FunctionType(ir.VoidType(), []), name=entry)
+        builder = ir.IRBuilder(fn.append_basic_block("entry"))
+        labels = itertools.count()
+
+        def declare(name, arg_types, ret=ir.VoidType()):
+            if name in self.module.globals:
+                return self.module.globals[name]
+            return ir.Function(self.module, ir.FunctionType(ret, arg_types), name=name)
+
+        def loop_terms(value, env, what):
+            """[(loop variable value, coeff)] of an affine index or angle"""
+            unbound = [name for name in value.parameters if name not in env]
+            if unbound:
+                raise ValueError(f"{what} has unbound symbolic parameters {unbound}")
+            return [(env[name], coeff) for name, coeff in value.terms]
+
+        def handle(index, ptr_type, env):
+            """Qubit/Result handle: a constant, or computed from loop variables"""
+            if not is_symbolic(index):
+                return ir.Constant(i64, index).inttoptr(ptr_type)
+            acc = None
+            for var, coeff in loop_terms(index, env, "qubit index"):
+                term = var if coeff == 1 else builder.mul(var, ir.Constant(i64, int(coeff)))
+                acc = term if acc is None else builder.add(acc, term)
+            if index.const:
+                acc = builder.add(acc, ir.Constant(i64, int(index.const)))
+            return builder.inttoptr(acc, ptr_type)
+
+        def angle(param, env, what):
+            if not is_symbolic(param):
+                return ir.Constant(double, float(param))
+            acc = None
+            for var, coeff in loop_terms(param, env, what):
+                term = builder.fmul(builder.sitofp(var, double), ir.Constant(double, coeff))
+                acc = term if acc is None else builder.fadd(acc, term)
+            return builder.fadd(acc, ir.Constant(double, param.const)) if param.const else acc
+
+        def condition(cond, env):
+            """i1 that is true when the tested bits equal cond.value (inverted if negate)"""
+            read = declare('__quantum__qis__read_result__body', [result_ptr], ir.IntType(1))
+            test = None
+            for k, c in enumerate(cond.cbits):
+                bit = builder.call(read, [handle(c, result_ptr, env)])
+                if not (cond.value >> k) & 1:
+                    bit = builder.not_(bit)
+                test = bit if test is None else builder.and_(test, bit)
+            return builder.not_(test) if cond.negate else test
+
+        def lower(nodes, env):
+            for node in nodes:
+                if isinstance(node, ForLoopNode):
+                    lower_for(node, env)
+                elif isinstance(node, WhileLoopNode):
+                    n = next(labels)
+                    head = fn.append_basic_block(f"while{n}.cond")
+                    body = fn.append_basic_block(f"while{n}.body")
+                    done = fn.append_basic_block(f"while{n}.end")
+                    builder.branch(head)
+                    builder.position_at_end(head)
+                    builder.cbranch(condition(node.condition, env), body, done)
+                    builder.position_at_end(body)
+                    lower(node.body, env)
+                    builder.branch(head)
+                    builder.position_at_end(done)
+                elif isinstance(node, IfNode):
+                    n = next(labels)
+                    then = fn.append_basic_block(f"if{n}.then")
+                    other = fn.append_basic_block(f"if{n}.else")
+                    done = fn.append_basic_block(f"if{n}.end")
+                    builder.cbranch(condition(node.condition, env), then, other)
+                    for block, statements in ((then, node.then_body), (other, node.else_body)):
+                        builder.position_at_end(block)
+                        lower(statements, env)
+                        builder.branch(done)
+                    builder.position_at_end(done)
+                elif not hasattr(node, 'name'):  # MeasureNode
+                    callee = declare('__quantum__qis__mz__body', [qubit_ptr, result_ptr])
+                    builder.call(callee, [handle(node.qubit, qubit_ptr, env),
+                                          handle(node.cbit, result_ptr, env)])
+                elif node.name != 'barrier':
+                    if node.name in QIS_EQUIVALENTS:
+                        gates = QIS_EQUIVALENTS[node.name](node.params)
+                    elif node.name in QIS_GATES:
+                        gates = [(node.name, node.params)]
+                    else:
+                        raise ValueError(f"no QIR intrinsic for gate '{node.name}'")
+                    qubits = [handle(q, qubit_ptr, env) for q in node.qubits]
+                    for gate, params in gates:
+                        name, nparams = QIS_GATES[gate]
+                        callee = declare(name, [double] * nparams + [qubit_ptr] * len(qubits))
+                        args = [angle(p, env, f"gate '{node.name}'") for p in params[:nparams]]
+                        builder.call(callee, args + qubits)
+
+        def lower_for(node, env):
+            if not node.iterations():
+                return
+            n = next(labels)
+            entry_block = builder.block
+            head = fn.append_basic_block(f"for{n}.body")
+            done = fn.append_basic_block(f"for{n}.end")
+            builder.branch(head)
+            builder.position_at_end(head)
+            var = builder.phi(i64, name=f"{node.var}.{n}")
+            var.add_incoming(ir.Constant(i64, node.start), entry_block)
+            lower(node.body, dict(env, **{node.var: var}))
+            step = builder.add(var, ir.Constant(i64, node.step))
+            more = builder.icmp_signed('<=' if node.step > 0 else '>=', step, ir.Constant(i64, node.stop))
+            var.add_incoming(step, builder.block)
+            builder.cbranch(more, head, done)
+            builder.position_at_end(done)
+
+        lower(ast.nodes, {})
+        builder.ret_void()
+        return fn
+
     def get_ir(self) -> str:
         return str(self.module)
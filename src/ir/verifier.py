@@ -2,25 +2,35 @@
 Lightweight verification: checks some simple invariants:
 - measurements target existing qubits
 - gate nodes reference valid qubit indices (non-negative)
+- inside loops, indices computed from the loop variable stay valid over the
+  whole iteration range
 """
+from ..frontend.ast_nodes import index_bounds, value_range
 
 def verify_ast(ast):
     valid = True
     errors = []
     # find max qubit index referenced
     max_q = -1
-    for node in ast.nodes:
-        if hasattr(node, 'qubits'):
-            for q in node.qubits:
-                if q is None or q < 0:
-                    valid = False
-                    errors.append(f"Invalid qubit index: {q}")
-                if q > max_q:
-                    max_q = q
+    for node, bounds in index_bounds(ast.nodes):
+        operands = list(getattr(node, 'qubits', ()))
         if hasattr(node, 'qubit'):
-            if node.qubit is None or node.qubit < 0:
+            operands.append(node.qubit)
+        for q in operands:
+            if q is None:
                 valid = False
-                errors.append(f"Invalid measurement qubit: {node.qubit}")
-            if node.qubit > max_q:
-                max_q = node.qubit
+                errors.append(f"Invalid qubit index: {q}")
+                continue
+            try:
+                lo, hi = value_range(q, bounds)
+            except KeyError as e:
+                valid = False
+                errors.append(f"Qubit index {q} uses {e} outside of a loop over it")
+                continue
+            if lo < 0:
+                valid = False
+                errors.append(f"Invalid {'measurement qubit' if hasattr(node, 'qubit') else 'qubit index'}: {q}"
+                              + (f" (reaches {lo})" if lo != q else ""))
+            if hi > max_q:
+                max_q = hi
     return valid, errors
@@ -0,0 +1,371 @@
+"""
+ZX-calculus graph rewriting for straight-line gate sequences (used by passes.zx_simplify).
+
+    graph = ZXGraph.from_gates(num_qubits, gates)   # gates: (name, qubits, params)
+    graph.simplify()                                # fusion, identities, lcomp, pivots
+    gates = graph.extract()                         # h / rz / cx / cz / swap
+
+The diagram is kept graph-like: every spider is a Z spider and spider-spider
+edges are Hadamard edges, so X spiders and H gates only toggle edge types as
+the circuit is read in. Adjacency is a dict of dicts (vertex -> {neighbour:
+edge type}), making an edge toggle O(1). Phases are floats in units of pi,
+modulo 2.
+
+simplify() runs the Clifford rules of Duncan, Kissinger, Perdrix and van de
+Wetering (2020) from a worklist: identity removal with spider fusion, local
+complementation of interior +-pi/2 spiders, and pivoting on adjacent interior
+Pauli (0 or pi) spiders. These rules keep a generalized flow, so extract()
+recovers a circuit: it peels gates off the outputs (frontier phases as rz,
+frontier-frontier edges as cz), and Gauss-Jordan elimination of the
+frontier's biadjacency matrix (rows as int bitsets) yields the cx gates that
+advance the frontier. The result equals the input up to a global phase.
+"""
+import math
+
+BOUNDARY, Z = 0, 1
+SIMPLE, HADAMARD = 1, 2
+
+# ZX-native gates; everything else is translated into these first
+ZX_BASIS = ('h', 'rz', 'rx', 'cx', 'cz')
+
+_EPS = 1e-9
+
+
+def _norm(phase):
+    """Phase (units of pi) in [0, 2), snapped to exact multiples of 1/2"""
+    phase %= 2.0
+    snapped = round(phase * 2) / 2
+    if abs(phase - snapped) < _EPS:
+        phase = snapped % 2.0
+    return phase
+
+
+def is_pauli(phase):
+    return phase in (0.0, 1.0)
+
+
+def is_proper_clifford(phase):
+    return phase in (0.5, 1.5)
+
+
+class ExtractionError(RuntimeError):
+    """The diagram has no flow the extractor can follow (never for simplify()'d circuits)"""
+
+
+class ZXGraph:
+    def __init__(self):
+        self.adj = {}
+        self.kind = {}
+        self.phase = {}
+        self.inputs = []
+        self.outputs = []
+        self._next = 0
+
+    def add_vertex(self, kind=Z, phase=0.0):
+        v = self._next
+        self._next += 1
+        self.adj[v] = {}
+        self.kind[v] = kind
+        self.phase[v] = phase
+        return v
+
+    def remove_vertex(self, v):
+        for w in self.adj.pop(v):
+            del self.adj[w][v]
+        del self.kind[v], self.phase[v]
+
+    def connect(self, u, v, etype):
+        self.adj[u][v] = self.adj[v][u] = etype
+
+    def disconnect(self, u, v):
+        del self.adj[u][v], self.adj[v][u]
+
+    def toggle(self, u, v):
+        """Add a Hadamard edge between Z spiders, or remove one (two parallel ones cancel)"""
+        if v in self.adj[u]:
+            self.disconnect(u, v)
+        else:
+            self.connect(u, v, HADAMARD)
+
+    def add_phase(self, v, phase):
+        self.phase[v] = _norm(self.phase[v] + phase)
+
+    def num_spiders(self):
+        return sum(kind == Z for kind in self.kind.values())
+
+    # -- circuit -> graph ------------------------------------------------------------
+
+    @classmethod
+    def from_gates(cls, num_qubits, gates):
+        """Graph-like diagram of gates in ZX_BASIS, fusing Z spiders as they are read"""
+        g = cls()
+        last = [g.add_vertex(BOUNDARY) for _ in range(num_qubits)]
+        g.inputs = list(last)
+        pending = [SIMPLE] * num_qubits  # type of the open edge leaving last[q]
+
+        def spider(q):
+            """A Z spider at the end of wire q (the last one when fusable)"""
+            v = last[q]
+            if g.kind[v] == Z and pending[q] == SIMPLE:
+                return v
+            w = g.add_vertex()
+            g.connect(v, w, pending[q])
+            last[q], pending[q] = w, SIMPLE
+            return w
+
+        def flip(q):
+            pending[q] = SIMPLE if pending[q] == HADAMARD else HADAMARD
+
+        for name, qubits, params in gates:
+            if name == 'h':
+                flip(qubits[0])
+            elif name == 'rz':
+                g.add_phase(spider(qubits[0]), params[0] / math.pi)
+            elif name == 'rx':
+                q = qubits[0]
+                flip(q)
+                g.add_phase(spider(q), params[0] / math.pi)
+                flip(q)
+            elif name in ('cx', 'cz'):
+                a, b = qubits
+                u = spider(a)
+                if name == 'cx':
+                    flip(b)
+                v = spider(b)
+                if name == 'cx':
+                    flip(b)
+                g.toggle(u, v)
+            else:
+                raise ValueError(f"gate '{name}' is not in the ZX basis")
+        for q in range(num_qubits):
+            out = g.add_vertex(BOUNDARY)
+            g.connect(last[q], out, pending[q])
+            g.outputs.append(out)
+        return g
+
+    # -- simplification ----------------------------------------------------------------
+
+    def _interior(self, v):
+        return self.adj[v].keys().isdisjoint(self._boundary)
+
+    def simplify(self):
+        """Apply identity removal, local complementation and pivoting until none applies"""
+        self._boundary = set(self.inputs) | set(self.outputs)
+        work = [v for v in self.adj if self.kind[v] == Z]
+        queued = set(work)
+        while work:
+            v = work.pop()
+            queued.discard(v)
+            if v not in self.adj:
+                continue
+            touched = self._rewrite(v)
+            for w in touched:
+                if w in self.adj and self.kind[w] == Z and w not in queued:
+                    queued.add(w)
+                    work.append(w)
+
+    def _rewrite(self, v):
+        """Try each rule at v; returns the vertices whose neighbourhood changed"""
+        adj, phase = self.adj, self.phase
+        if phase[v] == 0.0 and len(adj[v]) == 2:
+            return self._remove_identity(v)
+        if not self._interior(v):
+            return ()
+        if is_proper_clifford(phase[v]):
+            return self._lcomp(v)
+        if is_pauli(phase[v]):
+            for w in adj[v]:
+                if is_pauli(phase[w]) and self._interior(w):
+                    return self._pivot(v, w)
+        return ()
+
+    def _remove_identity(self, v):
+        (a, ea), (b, eb) = self.adj[v].items()
+        self.remove_vertex(v)
+        etype = SIMPLE if ea == eb else HADAMARD
+        if etype == HADAMARD and self.kind[a] == Z and self.kind[b] == Z:
+            self.toggle(a, b)
+        elif etype == SIMPLE and self.kind[a] == Z and self.kind[b] == Z:
+            return self._fuse(a, b)
+        elif b in self.adj[a]:
+            raise ExtractionError("parallel edges at a boundary")
+        else:
+            self.connect(a, b, etype)
+        return (a, b)
+
+    def _fuse(self, a, b):
+        """Merge Z spider b into a (they were joined by a plain wire)"""
+        self.add_phase(a, self.phase[b])
+        neighbours = list(self.adj[b].items())
+        self.remove_vertex(b)
+        if a in dict(neighbours):
+            # a Hadamard edge between fused spiders becomes a Hadamard self-loop: a pi phase
+            self.add_phase(a, 1.0)
+        for w, etype in neighbours:
+            if w == a:
+                continue
+            if self.kind[w] == Z and etype == HADAMARD:
+                self.toggle(a, w)
+            elif w in self.adj[a]:
+                raise ExtractionError("parallel edges at a boundary")
+            else:
+                self.connect(a, w, etype)
+        return [a] + [w for w, _ in neighbours if w != a]
+
+    def _lcomp(self, v):
+        alpha = self.phase[v]
+        neighbours = list(self.adj[v])
+        self.remove_vertex(v)
+        for i, a in enumerate(neighbours):
+            self.add_phase(a, -alpha)
+            for b in neighbours[i + 1:]:
+                self.toggle(a, b)
+        return neighbours
+
+    def _pivot(self, u, v):
+        a, b = self.phase[u], self.phase[v]
+        nu = set(self.adj[u]) - {v}
+        nv = set(self.adj[v]) - {u}
+        both = nu & nv
+        only_u, only_v = list(nu - both), list(nv - both)
+        both = list(both)
+        self.remove_vertex(u)
+        self.remove_vertex(v)
+        for w in only_u:
+            self.add_phase(w, b)
+        for w in only_v:
+            self.add_phase(w, a)
+        for w in both:
+            self.add_phase(w, a + b + 1.0)
+        for group, other in ((only_u, only_v), (only_u, both), (only_v, both)):
+            for x in group:
+                for y in other:
+                    self.toggle(x, y)
+        return only_u + only_v + both
+
+    # -- graph -> circuit ----------------------------------------------------------------
+
+    def _insert_spiders(self, boundary):
+        """Give `boundary` its own phase-0 spider: boundary -- s --H-- ... -- old neighbour"""
+        (v, etype), = self.adj[boundary].items()
+        self.disconnect(boundary, v)
+        s = self.add_vertex()
+        self.connect(boundary, s, SIMPLE)
+        if etype == SIMPLE:
+            # two Hadamard edges in a row compose to the original plain wire
+            t = self.add_vertex()
+            self.connect(s, t, HADAMARD)
+            s = t
+        if self.kind[v] == Z:
+            self.toggle(s, v)
+        else:
+            self.connect(s, v, HADAMARD)
+
+    def extract(self):
+        """Gates (name, qubits, params), in circuit order, equal to the diagram up to global phase"""
+        adj, kind, phase = self.adj, self.kind, self.phase
+        # every input gets a dedicated degree-2 spider, and every output a distinct neighbour
+        for i in self.inputs:
+            self._insert_spiders(i)
+        seen = set()
+        for o in self.outputs:
+            (v, _), = adj[o].items()
+            if kind[v] != Z or v in seen:
+                self._insert_spiders(o)
+                (v, _), = adj[o].items()
+            seen.add(v)
+        input_spider = {next(iter(adj[i])): q for q, i in enumerate(self.inputs)}
+
+        gates = []  # extracted from the outputs backwards
+        frontier = []
+        for q, o in enumerate(self.outputs):
+            (v, etype), = adj[o].items()
+            if etype == HADAMARD:
+                gates.append(('h', [q], []))
+                self.connect(o, v, SIMPLE)
+            frontier.append(v)
+
+        while True:
+            where = {v: q for q, v in enumerate(frontier)}
+            for q, v in enumerate(frontier):
+                if phase[v]:
+                    p = phase[v] if phase[v] <= 1.0 else phase[v] - 2.0
+                    gates.append(('rz', [q], [p * math.pi]))
+                    phase[v] = 0.0
+            for q, v in enumerate(frontier):
+                for w in [w for w in adj[v] if w in where and where[w] > q]:
+                    gates.append(('cz', [q, where[w]], []))
+                    self.disconnect(v, w)
+            rows = [q for q, v in enumerate(frontier) if v not in input_spider]
+            if not rows:
+                break
+            columns = {}
+            bits = {}
+            for q in rows:
+                row = 0
+                for w in adj[frontier[q]]:
+                    if kind[w] == Z:
+                        row |= 1 << columns.setdefault(w, len(columns))
+                if not row:
+                    raise ExtractionError("frontier spider with no path to an input")
+                bits[q] = row
+            if not any(_single(bits[q]) for q in rows):
+                self._eliminate(rows, bits, columns, frontier, gates)
+            vertex_of = {c: w for w, c in columns.items()}
+            taken = set()
+            for q in rows:
+                if _single(bits[q]):
+                    w = vertex_of[bits[q].bit_length() - 1]
+                    if w in taken:
+                        continue
+                    taken.add(w)
+                    self.remove_vertex(frontier[q])
+                    self.connect(w, self.outputs[q], SIMPLE)
+                    gates.append(('h', [q], []))
+                    frontier[q] = w
+            if not taken:
+                raise ExtractionError("no frontier spider could be advanced")
+
+        # what remains is a permutation: input input_spider[v] ends on output q
+        gates.extend(reversed(_permutation_swaps([input_spider[v] for v in frontier])))
+        gates.reverse()
+        return gates
+
+    def _eliminate(self, rows, bits, columns, frontier, gates):
+        """Gauss-Jordan on the frontier rows; each row addition is a cx and toggles edges"""
+        vertex_of = {c: w for w, c in columns.items()}
+        pivots = set()
+        for c in range(len(columns)):
+            mask = 1 << c
+            pivot = next((q for q in rows if q not in pivots and bits[q] & mask), None)
+            if pivot is None:
+                continue
+            pivots.add(pivot)
+            for q in rows:
+                if q != pivot and bits[q] & mask:
+                    # row q += row pivot: cx(q -> pivot) on the output side
+                    row = bits[pivot]
+                    bits[q] ^= row
+                    gates.append(('cx', [q, pivot], []))
+                    while row:
+                        low = row & -row
+                        self.toggle(frontier[q], vertex_of[low.bit_length() - 1])
+                        row ^= low
+
+
+def _single(row):
+    return row and not row & (row - 1)
+
+
+def _permutation_swaps(source):
+    """Swaps (in circuit order) moving the state of qubit source[q] onto qubit q"""
+    gates = []
+    current = list(range(len(source)))  # current[q]: which input's state qubit q holds
+    position = {s: q for q, s in enumerate(current)}
+    for q, s in enumerate(source):
+        p = position[s]
+        if p != q:
+            gates.append(('swap', [q, p], []))
+            position[current[q]], position[s] = p, q
+            current[p], current[q] = current[q], s
+    return gates
@@ -1,8 +1,22 @@
 """
 Hardware profile example.
 """
+import os
+
+from .helpers import parse_size
+
 DEFAULT_HW_PROFILE = {
     "num_qubits": 5,
     "error_rates": {0: 0.002, 1: 0.003, 2: 0.005, 3: 0.007, 4: 0.004},
-    "topology": [(0,1), (1,2), (2,3), (3,4), (0,2)]
+    "topology": [(0,1), (1,2), (2,3), (3,4), (0,2)],
+    # optional calibration data; src.execution.profiler derives defaults when absent
+    "edge_error_rates": {(0,1): 0.008, (1,2): 0.011, (2,3): 0.015, (3,4): 0.012, (0,2): 0.009},
+    "readout_errors": {0: 0.015, 1: 0.020, 2: 0.025, 3: 0.030, 4: 0.020},
+    "gate_times_ns": {"1q": 35, "2q": 300, "measure": 1000, "reset": 1000},
+    "t1_ns": {0: 110e3, 1: 95e3, 2: 80e3, 3: 70e3, 4: 100e3},
+    "t2_ns": {0: 90e3, 1: 85e3, 2: 60e3, 3: 50e3, 4: 95e3},
 }
+
+# Simulator memory cap in bytes (None = unlimited); override with QLLVM_MEMORY_CAP="8G".
+# HybridExecutor switches to an exact lower-memory method or refuses above it.
+SIMULATOR_MEMORY_CAP = parse_size(os.environ.get("QLLVM_MEMORY_CAP"))
@@ -1,6 +1,63 @@
+import os
+import re
+import tempfile
+
+# Read once: os.umask() is process-global, so don't toggle it per write.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
 def ensure_list(x):
     if x is None:
         return []
     if isinstance(x, (list, tuple)):
         return list(x)
     return [x]
+
+
+_SIZE_SUFFIXES = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text):
+    """Parse a byte size such as "512M", "8G" or "1048576"; None/"" -> None."""
+    if text is None or str(text).strip() == "":
+        return None
+    m = re.fullmatch(r"\s*([0-9.]+)\s*([KMGT]?)(?:I?B)?\s*", str(text).upper())
+    if not m:
+        raise ValueError(f"invalid size '{text}'")
+    return int(float(m.group(1)) * _SIZE_SUFFIXES[m.group(2)])
+
+
+def format_size(num_bytes):
+    """Human readable byte count (binary units)."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}" if unit != "B" else f"{num_bytes} B"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TiB"
+
+
+def atomic_write(path, data, buffering=1 << 20):
+    """Write text or bytes to `path` via a temp file in the same directory + rename.
+
+    Readers never observe a half-written file: the rename is atomic on POSIX,
+    so concurrent batch workers either see the old artifact or the new one.
+    `data` may also be an iterable of str chunks, written as they are produced.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = "wb" if isinstance(data, (bytes, bytearray, memoryview)) else "w"
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, mode, buffering=buffering) as f:
+            if isinstance(data, (str, bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                for chunk in data:
+                    f.write(chunk)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
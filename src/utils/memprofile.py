@@ -0,0 +1,95 @@
+"""
+Memory profiling on top of the span tracer.
+
+MemoryProfiler is a Tracer that also restarts tracemalloc's trace table at
+every top-level span (pipeline stage). For each stage it reports the peak
+traced memory, the memory the stage allocated and still held when it
+finished, and the source lines responsible. Process peak RSS comes from
+getrusage.
+"""
+import contextlib
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+from .helpers import format_size
+from . import tracing
+from .tracing import Tracer
+
+# the profiler's own bookkeeping would otherwise top every diff
+_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, tracing.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, contextlib.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"))
+
+
+class MemoryProfiler(Tracer):
+    """Tracer recording peak/retained memory and top allocation sites per stage"""
+
+    def __init__(self, top_sites=5, frames=1):
+        super().__init__(track_memory=True)
+        self.top_sites = top_sites
+        self.frames = frames
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def activate(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+        with super().activate():
+            yield self
+
+    @contextmanager
+    def span(self, name, **attrs):
+        top_level = not self._local.__dict__.get("stack")
+        if not top_level:
+            with super().span(name, **attrs) as record:
+                yield record
+            return
+        # forget earlier allocations: diffing whole-process snapshots is far
+        # too slow once qiskit is imported, and what survives the stage is
+        # exactly what it allocated and kept
+        tracemalloc.clear_traces()
+        with super().span(name, **attrs) as record:
+            yield record
+        retained = tracemalloc.get_traced_memory()[0]
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        sites = [(str(stat.traceback[0]), stat.size, stat.count)
+                 for stat in snapshot.statistics("lineno")[:self.top_sites]]
+        self.stages.append({"stage": name, "peak_bytes": record.peak_bytes,
+                            "retained_bytes": retained,
+                            "sites": sites, "attrs": dict(record.attrs)})
+
+    def format_report(self) -> str:
+        lines = [f"{'stage':<30} {'peak':>12} {'retained':>12}"]
+        for stage in self.stages:
+            lines.append(f"{stage['stage']:<30} {format_size(stage['peak_bytes'] or 0):>12} "
+                         f"{format_size(stage['retained_bytes']):>12}")
+        lines.append("")
+        lines.append("Top allocation sites retained per stage:")
+        for stage in self.stages:
+            if not stage["sites"]:
+                continue
+            lines.append(f"  {stage['stage']}:")
+            for where, size, count in stage["sites"]:
+                lines.append(f"    {format_size(size):>12} in {count:>7} blocks  {where}")
+        rss = peak_rss_bytes()
+        if rss is not None:
+            lines.append("")
+            lines.append(f"Process peak RSS: {format_size(rss)}")
+        return "\n".join(lines)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where getrusage is unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024  # Linux reports KiB
@@ -0,0 +1,189 @@
+"""
+Span tracer for compile-time instrumentation.
+
+    tracer = Tracer(track_memory=True)
+    with tracer.activate():
+        with span("parse") as s:
+            ast = parse_qasm_file(path)
+            s.set(nodes=len(ast.nodes))
+
+    @span("emit")
+    def emit(...): ...
+
+`span` is a no-op unless a tracer is active, so instrumented code costs a
+global lookup when nobody is listening. Each span records wall time,
+CPU time (thread), free-form attributes and, with track_memory, the peak
+tracemalloc usage inside the span. Export with write_chrome_trace() (load in
+chrome://tracing or Perfetto) or format_summary() for a per-stage table.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .helpers import atomic_write
+
+_ACTIVE: Optional['Tracer'] = None  # process-wide, so worker threads are traced too
+
+
+@dataclass
+class Span:
+    name: str
+    start_ns: int
+    depth: int
+    thread_id: int
+    wall_ns: int = 0
+    cpu_ns: int = 0
+    peak_bytes: Optional[int] = None
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attrs):
+        """Attach attributes (node counts, sizes, ...) to the span"""
+        self.attrs.update(attrs)
+        return self
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        return self
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Collects spans from every thread that runs while it is active."""
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin_ns = time.perf_counter_ns()
+        self._started_tracemalloc = False
+
+    @contextmanager
+    def activate(self):
+        """Route `span(...)` calls from every thread to this tracer"""
+        global _ACTIVE
+        previous, _ACTIVE = _ACTIVE, self
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        try:
+            yield self
+        finally:
+            _ACTIVE = previous
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._local.__dict__.setdefault("stack", [])
+        record = Span(name, time.perf_counter_ns() - self._origin_ns, len(stack),
+                      threading.get_ident(), attrs=dict(attrs))
+        memory = self.track_memory and tracemalloc.is_tracing()
+        if memory:
+            # fold the peak so far into the enclosing span before resetting it
+            if stack:
+                stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+; 3.8 keeps the process peak
+                tracemalloc.reset_peak()
+        entry = [record, 0]
+        stack.append(entry)
+        wall0, cpu0 = time.perf_counter_ns(), time.thread_time_ns()
+        try:
+            yield record
+        finally:
+            record.cpu_ns = time.thread_time_ns() - cpu0
+            record.wall_ns = time.perf_counter_ns() - wall0
+            stack.pop()
+            if memory:
+                record.peak_bytes = max(entry[1], tracemalloc.get_traced_memory()[1])
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], record.peak_bytes)
+            with self._lock:
+                self.spans.append(record)
+
+    # -- export ----------------------------------------------------------------
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace-event format: one complete ('X') event per span"""
+        pid = os.getpid()
+        events = []
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            args = dict(s.attrs, cpu_ms=round(s.cpu_ns / 1e6, 3))
+            if s.peak_bytes is not None:
+                args["peak_kb"] = round(s.peak_bytes / 1024, 1)
+            events.append({"name": s.name, "cat": "compile", "ph": "X", "pid": pid,
+                           "tid": s.thread_id, "ts": s.start_ns / 1000, "dur": s.wall_ns / 1000,
+                           "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        return atomic_write(path, json.dumps(self.to_chrome_trace()))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-stage totals in first-seen order"""
+        rows: Dict[str, Dict[str, Any]] = {}
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            row = rows.setdefault(s.name, {"stage": s.name, "depth": s.depth, "calls": 0,
+                                           "wall_ms": 0.0, "cpu_ms": 0.0, "peak_kb": None})
+            row["calls"] += 1
+            row["wall_ms"] += s.wall_ns / 1e6
+            row["cpu_ms"] += s.cpu_ns / 1e6
+            if s.peak_bytes is not None:
+                row["peak_kb"] = max(row["peak_kb"] or 0, s.peak_bytes / 1024)
+            for key in ("nodes", "gates", "qubits"):
+                if key in s.attrs:
+                    row[key] = s.attrs[key]
+        return list(rows.values())
+
+    def format_summary(self) -> str:
+        lines = [f"{'stage':<32} {'calls':>5} {'wall ms':>10} {'cpu ms':>10} {'peak KB':>10} {'nodes':>8}"]
+        for row in self.summary():
+            peak = f"{row['peak_kb']:.1f}" if row["peak_kb"] is not None else "-"
+            lines.append(f"{'  ' * row['depth'] + row['stage']:<32} {row['calls']:>5} "
+                         f"{row['wall_ms']:>10.2f} {row['cpu_ms']:>10.2f} {peak:>10} "
+                         f"{row.get('nodes', '-')!s:>8}")
+        return "\n".join(lines)
+
+
+def get_tracer() -> Optional[Tracer]:
+    """The active tracer, if any"""
+    return _ACTIVE
+
+
+class span:
+    """Record a span on the active tracer; works as a context manager or decorator"""
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self._cm = None
+
+    def __enter__(self):
+        tracer = get_tracer()
+        if tracer is None:
+            return _NULL_SPAN
+        self._cm = tracer.span(self.name, **self.attrs)
+        return self._cm.__enter__()
+
+    def __exit__(self, *exc):
+        cm, self._cm = self._cm, None
+        if cm is not None:
+            return cm.__exit__(*exc)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(self.name, **self.attrs):
+                return fn(*args, **kwargs)
+        return wrapper
@@ -18,3 +18,161 @@ def test_transpile_example(tmp_path):
     ast = parse_qasm_file(str(p))
     qc = ast_to_qiskit_circuit(ast)
     assert qc.num_qubits >= 1
+
+def test_emit_outputs_binary_formats(tmp_path):
+    from qiskit import QuantumCircuit
+    from src.backend.emitter import emit_outputs, read_circuit_binary
+    qc = QuantumCircuit(2, 1)
+    qc.h(0)
+    qc.rz(0.5, 1)
+    qc.cx(0, 1)
+    qc.measure(1, 0)
+    ir_text = 'define i32 @"main"()\n{\nentry:\n  ret i32 0\n}\n'
+    prefix = str(tmp_path / "out")
+    bcf, qcbf, jsonf = emit_outputs(ir_text, qc, outfile_prefix=prefix,
+                                    formats=('bc', 'qcb', 'json-compact'))
+    assert open(bcf, "rb").read(2) == b"BC"
+    decoded = read_circuit_binary(open(qcbf, "rb").read())
+    assert decoded["num_qubits"] == 2
+    assert decoded["ops"][1] == ("rz", [1], [], [0.5])
+    assert decoded["ops"][3] == ("measure", [1], [0], [])
+    assert " " not in open(jsonf).read()
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".tmp-")]
+
+    import pytest
+    from qiskit.circuit import Gate, Parameter
+    from src.backend.emitter import write_circuit_binary
+    long_name = QuantumCircuit(1)
+    long_name.append(Gate("g" * 300, 1, []), [0])
+    assert read_circuit_binary(write_circuit_binary(long_name))["ops"] == [("g" * 300, [0], [], [])]
+    symbolic = QuantumCircuit(1)
+    symbolic.rz(2 * Parameter("theta"), 0)
+    with pytest.raises(ValueError, match="bind symbolic parameters"):
+        write_circuit_binary(symbolic)
+
+def test_qasm_writer_streams_from_ast_with_metrics(tmp_path):
+    import io
+    import json
+    from qiskit import QuantumCircuit
+    from src.backend.emitter import emit_outputs
+    from src.backend.qasm_writer import QASMWriter
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+    from src.frontend.qasm3_parser import parse_qasm3
+
+    ast = QuantumAST([GateNode('h', [0]), GateNode('cx', [0, 2]), GateNode('rz', [1], [0.25]),
+                      GateNode('cx', [1, 2]), GateNode('x', [1]), MeasureNode(2, 1), MeasureNode(0, 0)])
+    qc = ast_to_qiskit_circuit(ast)
+    out = io.StringIO()
+    writer = QASMWriter(ast, chunk_lines=2)
+    metrics = writer.write(out)
+    text = out.getvalue()
+    assert text.startswith("OPENQASM 2.0;") and "rz(0.25) q[1];" in text
+    assert QuantumCircuit.from_qasm_str(text) == qc
+    assert metrics["depth"] == qc.depth()
+    assert metrics["two_qubit_depth"] == qc.depth(lambda instr: len(instr.qubits) == 2)
+    assert metrics["gate_counts"] == dict(qc.count_ops())
+
+    # control flow is written as rolled OpenQASM 3 and parses back to the same AST
+    looped = parse_qasm3("qubit[3] q; bit[3] c; for int i in [0:1] { cx q[i], q[i + 1]; }\n"
+                         "c[0] = measure q[0]; if (c[0] == 1 && c[1] == 0) { x q[2]; }")
+    writer = QASMWriter(looped)
+    assert writer.version == 3 and parse_qasm3(writer.text()) == looped
+    assert writer.metrics.result()["gate_counts"] == {"cx": 2, "if_else": 1, "measure": 1}
+
+    # emission needs no qiskit circuit when the AST is given
+    qasmf, jsonf = emit_outputs("", None, outfile_prefix=str(tmp_path / "ast"),
+                                formats=('qasm', 'json'), ast=ast)
+    assert open(qasmf).read() == text
+    assert json.load(open(jsonf)) == metrics
+
+def test_qasm_writer_defines_gates_missing_from_the_include(tmp_path):
+    import pytest
+    from qiskit import QuantumCircuit
+    from qiskit.quantum_info import Operator
+    from src.backend.emitter import emit_outputs
+    from src.backend.qasm_writer import QASMWriter
+    from src.frontend.ast_nodes import GateNode, QuantumAST
+
+    ast = QuantumAST([GateNode('sx', [0]), GateNode('iswap', [0, 1]), GateNode('ecr', [1, 2]),
+                      GateNode('ryy', [2, 0], [0.4]), GateNode('sxdg', [1]), GateNode('iswap', [2, 1])])
+    text = QASMWriter(ast).text()
+    assert text.count("gate iswap") == 1
+    # qiskit's loader treats sx/sxdg as qelib1 builtins; redefining them shifts its gate names
+    assert "gate sx" not in text
+    expected = Operator(ast_to_qiskit_circuit(ast))
+    assert Operator(QuantumCircuit.from_qasm_str(text)).equiv(expected)
+    (qasmf,) = emit_outputs("", None, outfile_prefix=str(tmp_path / "defs"), formats=('qasm',), ast=ast)
+    assert Operator(ast_to_qiskit_circuit(parse_qasm_file(qasmf))).equiv(expected)
+    with pytest.raises(ValueError, match="unknown gate 'foo'"):
+        QASMWriter(QuantumAST([GateNode('foo', [0])])).text()
+
+def test_collect_metrics_critical_path_and_idle_time():
+    from src.backend.metrics import collect_metrics
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+
+    ast = QuantumAST([GateNode('h', [0]), GateNode('h', [1]), GateNode('cx', [0, 1]),
+                      GateNode('z', [1]), GateNode('barrier', [0, 1, 2]), GateNode('x', [2]),
+                      MeasureNode(1, 0)])
+    qc = ast_to_qiskit_circuit(ast)
+    metrics = collect_metrics(ast)
+    assert metrics["depth"] == qc.depth() == 4
+    assert metrics["size"] == qc.size()
+    # h -> cx -> z -> measure; the barrier is not a dependency
+    assert metrics["critical_path"] == {"length": 4, "gate_counts": {"cx": 1, "h": 1, "measure": 1, "z": 1}}
+    assert metrics["idle_fraction"]["per_qubit"] == [0.5, 0.0, 0.75]
+    assert metrics["simulation_memory"]["statevector_bytes"] == 32 * 2 ** 3
+
+def test_basis_translation_is_exact_and_memoized():
+    import pytest
+    from qiskit.quantum_info import Operator
+    from src.backend import decompositions
+    from src.backend.decompositions import get_translator, translate_ast
+    from src.frontend.ast_nodes import GateNode, ParamExpr, QuantumAST
+
+    theta = ParamExpr.symbol('theta')
+    ast = QuantumAST([GateNode('u3', [0], [0.3, -0.2, 1.1]), GateNode('ccx', [2, 0, 1]),
+                      GateNode('cp', [1, 2], [2 * theta]), GateNode('swap', [0, 2]),
+                      GateNode('ryy', [1, 0], [0.4]), GateNode('t', [1])])
+    basis = ('rz', 'sx', 'x', 'cx')
+    native = ast_to_qiskit_circuit(ast)
+    translated = ast_to_qiskit_circuit(ast, basis=basis)
+    assert set(translated.count_ops()) <= set(basis)
+    assert Operator(translated.assign_parameters([0.7])).equiv(Operator(native.assign_parameters([0.7])))
+    assert {n.name for n in translate_ast(ast, basis).nodes} <= set(basis)
+
+    translator = get_translator(basis)
+    assert translator is get_translator(['cx', 'x', 'sx', 'rz'])
+    assert translator.translate('ccx') is translator.translate('ccx')
+    for k in range(decompositions.CACHE_SIZE + 10):
+        translator.translate('cp', [k * 1e-3])
+    assert len(translator._cache) == decompositions.CACHE_SIZE
+    with pytest.raises(ValueError, match="unknown gate 'foo'"):
+        ast_to_qiskit_circuit(QuantumAST([GateNode('foo', [0])]))
+    with pytest.raises(ValueError, match="cannot be expressed"):
+        get_translator(('rz', 'sx')).translate('cx')
+
+def test_timing_scheduler_asap_alap_layers_and_idle():
+    import math
+    from src.backend.scheduler import TimingScheduler
+    from src.execution.profiler import FidelityEstimator
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+
+    ast = QuantumAST([GateNode('h', [0]), GateNode('cx', [0, 1]), GateNode('x', [2]),
+                      GateNode('rz', [1], [0.3]), GateNode('cx', [1, 2]),
+                      MeasureNode(0, 0), MeasureNode(2, 1)])
+    hw = {"gate_times_ns": {"1q": 35, "2q": 300, "measure": 1000}}
+    scheduler = TimingScheduler(hw)
+    asap, alap = scheduler.schedule(ast), scheduler.schedule(ast, "alap")
+    assert asap["duration_ns"] == alap["duration_ns"] == 35 + 300 + 300 + 1000
+    assert asap["layers"] == [[0, 2], [1], [3, 5], [4], [6]]
+    assert alap["layers"] == [[0], [1], [2, 3], [4], [5, 6]]
+    # x on q2 waits until just before its cx, so q2 no longer idles
+    assert asap["ops"][2][2] == 0 and alap["ops"][2][2] == 300
+    assert asap["idle_ns"] == [300, 1000, 300] and alap["idle_ns"] == [300, 1000, 0]
+
+    # the fidelity estimator's ALAP idle term decays exactly these windows
+    qc = ast_to_qiskit_circuit(ast)
+    estimator = FidelityEstimator(dict(hw, num_qubits=3, topology=[(0, 1), (1, 2)]))
+    expected = math.exp(-sum(t * r for t, r in zip(alap["idle_ns"], estimator.idle_rates)))
+    assert abs(estimator.estimate(qc, schedule="alap")["idle_fidelity"] - expected) < 1e-12
+    assert estimator.estimate(qc)["idle_fidelity"] < expected
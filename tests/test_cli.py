@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time allowed for `main.py --list-examples`; a Qiskit
+# import alone costs several times this.
+STARTUP_BUDGET_MS = 300
+
+
+def _import_profile(*args):
+    import main
+    proc = subprocess.run([sys.executable, '-X', 'importtime', 'main.py', *args],
+                          cwd=ROOT, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    rows, _ = main.parse_importtime(proc.stderr)
+    return {name for name, *_ in rows}, sum(cum for _, _, cum, depth in rows if depth == 0) / 1000
+
+
+def test_list_examples_startup_budget():
+    modules, total_ms = _import_profile('--list-examples')
+    assert not {m.split('.')[0] for m in modules} & {'qiskit', 'qiskit_aer', 'llvmlite', 'numpy'}
+    assert total_ms < STARTUP_BUDGET_MS
+
+
+def test_classical_compile_does_not_import_qiskit(tmp_path):
+    src = tmp_path / "prog.asm"
+    src.write_text("MOVER AREG, X\nSTOP\nX DC 1\nEND\n")
+    modules, _ = _import_profile('classical', str(src), '-o', str(tmp_path / "prog.ll"))
+    top_level = {m.split('.')[0] for m in modules}
+    assert 'llvmlite' in top_level
+    assert not top_level & {'qiskit', 'qiskit_aer'}
@@ -9,3 +9,433 @@ def test_hybrid_run():
     res = exec.run(qc)
     assert 'counts' in res
     assert res['shots'] == 64
+
+def test_compile_server_stream_caches_results(tmp_path):
+    import io
+    import json
+    from src.execution.compile_server import CompileService, serve_stream
+    src = tmp_path / "prog.asm"
+    src.write_text("MOVER AREG, X\nADD AREG, X\nMOVEM AREG, Y\nSTOP\nX DC 2\nY DS 1\nEND\n")
+    req = {"op": "compile", "mode": "classical", "input": str(src), "inline": True}
+    lines = [json.dumps(dict(req, id=i)) for i in range(3)] + ['{"id": 9, "op": "shutdown"}']
+    out = io.StringIO()
+    service = CompileService()
+    serve_stream(service, io.StringIO("\n".join(lines) + "\n"), out, workers=2)
+    responses = {r["id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert sorted(responses) == [0, 1, 2, 9]
+    assert all(responses[i]["ok"] for i in range(3))
+    assert "@\"Y\" = internal global i32 0" in responses[0]["result"]["artifacts"]["ll"]
+    assert service.stats["cache_hits"] >= 1
+
+def test_compile_server_refuses_requests_after_shutdown(tmp_path):
+    import json
+    from src.execution.compile_server import CompileService, _Dispatcher
+    src = tmp_path / "prog.asm"
+    src.write_text("MOVER AREG, X\nSTOP\nX DC 2\nEND\n")
+    req = {"op": "compile", "mode": "classical", "input": str(src), "inline": True}
+    dispatcher = _Dispatcher(CompileService(), workers=1)
+    dispatcher.submit('{"id": 1, "op": "shutdown"}', lambda r: None)
+    dispatcher.close()
+    late = []
+    dispatcher.submit(json.dumps(dict(req, id=2)), late.append)
+    dispatcher.submit(json.dumps(dict(req, id=3)), late.append)
+    assert [r["ok"] for r in late] == [False, False] and dispatcher.slots.acquire(blocking=False)
+
+def test_compile_via_server_names_outputs_in_the_client_cwd(tmp_path, monkeypatch):
+    # the client names default outputs relative to its own cwd, not the server's
+    import argparse
+    import main
+    from src.execution import compile_server
+    from src.execution.compile_server import compile_with_fallback
+    src = tmp_path / "prog.asm"
+    src.write_text("MOVER AREG, X\nSTOP\nX DC 2\nEND\n")
+    sent = []
+    def record(request, path):
+        sent.append(request)
+        return compile_with_fallback(request, path=str(tmp_path / "none.sock"))
+    monkeypatch.setattr(compile_server, "compile_with_fallback", record)
+    monkeypatch.chdir(tmp_path)
+    args = argparse.Namespace(mode="classical", input_file=str(src), optimize=False, output=None,
+                              basis=None, zx=False, consolidate=False, phase_poly=False,
+                              server=None, stats=False)
+    assert main.compile_via_server(args) == 0
+    assert sent[0]["output"] == str(tmp_path / "output_final_classical.ll")
+    assert (tmp_path / "output_final_classical.ll").exists()
+
+def test_compile_client_falls_back_only_when_no_server_listens(tmp_path):
+    import socket
+    import pytest
+    from src.execution.compile_server import compile_with_fallback
+    req = {"id": 1, "op": "ping"}
+    response, served = compile_with_fallback(req, path=str(tmp_path / "none.sock"))
+    assert not served and response["ok"] and response["result"]["pong"]
+    path = str(tmp_path / "stale.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(path)
+    assert compile_with_fallback(req, path=path)[1] is False  # nobody listening: refused
+    # a server that accepts but never answers is an error, not a reason to compile here
+    path = str(tmp_path / "hung.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as hung:
+        hung.bind(path)
+        hung.listen()
+        with pytest.raises(TimeoutError):
+            compile_with_fallback(req, path=path, timeout=0.2)
+
+def test_server_flag_rejects_local_profiling_options(monkeypatch, capsys):
+    import sys
+    import pytest
+    import main
+    for flags in (["--trace", "t.json"], ["--memprofile"], ["--memory-cap", "1G"]):
+        monkeypatch.setattr(sys, "argv", ["main.py", "classical", "prog.asm", "--server", *flags])
+        with pytest.raises(SystemExit) as exc:
+            main.main()
+        assert exc.value.code == 2
+        assert f"--server cannot be combined with {flags[0]}" in capsys.readouterr().err
+
+def test_hybrid_run_many_async():
+    import asyncio
+    circuits = []
+    for n in (1, 2, 3):
+        qc = QuantumCircuit(n, n)
+        qc.x(range(n))
+        qc.measure(range(n), range(n))
+        circuits.append(qc)
+    async def main():
+        async with HybridExecutor(shots=32, max_concurrency=2) as executor:
+            results = await executor.run_many(circuits, timeout=60)
+            pool = executor._executor
+        return results, pool
+    results, pool = asyncio.run(main())
+    assert [r['counts'] for r in results] == [{'1': 32}, {'11': 32}, {'111': 32}]
+    assert pool._shutdown
+
+def test_hybrid_run_async_timeout_during_planning_submits_no_job(monkeypatch):
+    import asyncio
+    import threading
+    import pytest
+    from qiskit_aer import AerSimulator
+    submitted, release = [], threading.Event()
+    monkeypatch.setattr(AerSimulator, "run", lambda self, *a, **kw: submitted.append(a))
+    executor = HybridExecutor(shots=32, max_concurrency=1)
+    plan = executor._backend_for
+    def slow_plan(qc):
+        release.wait(5)
+        return plan(qc)
+    monkeypatch.setattr(executor, "_backend_for", slow_plan)
+    qc = QuantumCircuit(1, 1)
+    qc.measure(0, 0)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(executor.run_async(qc, timeout=0.05))
+    release.set()
+    executor.close()  # waits for the worker to finish planning
+    assert submitted == []
+
+def test_span_tracer_nesting_and_export():
+    from src.utils.tracing import Tracer, span
+
+    @span("inner")
+    def work():
+        return [0] * 100000
+
+    assert work() and span("idle").__enter__().set(x=1)  # no active tracer: no-op
+    tracer = Tracer(track_memory=True)
+    with tracer.activate():
+        with span("outer", nodes=3):
+            work()
+    names = [e["name"] for e in tracer.to_chrome_trace()["traceEvents"]]
+    assert names == ["outer", "inner"]
+    rows = {r["stage"]: r for r in tracer.summary()}
+    assert rows["outer"]["nodes"] == 3 and rows["inner"]["depth"] == 1
+    assert rows["outer"]["peak_kb"] >= rows["inner"]["peak_kb"] > 700
+
+def test_simulation_memory_plan_picks_a_method_that_fits():
+    import pytest
+    from src.execution.hybrid_executor import SimulationMemoryError, plan_simulation
+    from src.utils.helpers import parse_size
+
+    ghz = QuantumCircuit(40, 40)
+    ghz.h(0)
+    for q in range(39):
+        ghz.cx(q, q + 1)
+    ghz.measure(range(40), range(40))
+    assert plan_simulation(ghz, parse_size("64M"))["method"] == "stabilizer"
+    ghz.t(0)  # no longer Clifford; a linear chain still fits as an MPS
+    assert plan_simulation(ghz, parse_size("64M"))["method"] == "matrix_product_state"
+    dense = QuantumCircuit(30)
+    for _ in range(30):
+        for q in range(29):
+            dense.rx(0.1, q)
+            dense.cx(q, q + 1)
+    with pytest.raises(SimulationMemoryError):
+        plan_simulation(dense, parse_size("1G"))
+
+def test_memory_profiler_reports_retained_bytes_per_span():
+    from src.utils.memprofile import MemoryProfiler
+    from src.utils.tracing import span
+
+    profiler = MemoryProfiler()
+    with profiler.activate():
+        with span("alloc"):
+            kept = [bytearray(1024) for _ in range(100)]
+    stage, = profiler.stages
+    assert stage["stage"] == "alloc" and stage["retained_bytes"] >= 100 * 1024
+    assert kept and "test_execution.py" in stage["sites"][0][0]
+
+def test_fidelity_estimator_gates_routing_and_layouts():
+    import numpy as np
+    from src.execution.profiler import FidelityEstimator
+
+    hw = {"num_qubits": 3, "error_rates": {0: 0.01, 1: 0.02, 2: 0.03}, "topology": [(0, 1), (1, 2)],
+          "edge_error_rates": {(0, 1): 0.1, (1, 2): 0.1}, "readout_errors": {0: 0.0, 1: 0.0, 2: 0.0},
+          "gate_times_ns": {"1q": 10, "2q": 100}, "t1_ns": {}, "t2_ns": {}}
+    est = FidelityEstimator(hw)
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.rz(0.5, 1)  # virtual
+    qc.cx(0, 1)
+    r = est.estimate(qc)
+    assert r["duration_ns"] == 110 and r["critical_path"] == [0, 2]
+    assert abs(r["gate_fidelity"] - 0.99 * 0.9) < 1e-12
+    # qubits 0 and 2 are not adjacent: one SWAP (3 CX) plus the CX, 4x the time
+    routed = est.estimate(qc, layout=[0, 2])
+    assert routed["duration_ns"] == 410 and routed["gate_fidelity"] < r["gate_fidelity"]
+    layouts = np.array([[0, 1], [0, 2], [2, 1]])
+    scores = est.score_layouts(qc, layouts)
+    for layout, fidelity in zip(layouts, scores["fidelity"]):
+        assert abs(est.estimate(qc, layout)["fidelity"] - fidelity) < 1e-12
+
+def test_noisy_trajectory_simulation_reuses_patterns():
+    from src.execution.simulator import NoisySimulator, simulate_with_noise
+
+    qc = QuantumCircuit(3, 3)
+    qc.h(0)
+    qc.cx(0, 1)
+    qc.cx(1, 2)
+    qc.measure(range(3), range(3))
+    sim = NoisySimulator(seed=7)
+    noisy = sim.run(qc, shots=4000)
+    assert sum(noisy["counts"].values()) == 4000
+    assert noisy["trajectories"] < 200  # most shots share the error-free pattern
+    ideal = noisy["counts"]["000"] + noisy["counts"]["111"]
+    assert 0.85 * 4000 < ideal < 4000
+    sim.run(qc, shots=4000, noise_scale=0.5)
+    assert sim.stats["cache_hits"] > 0
+    assert sim.run(qc, shots=100, noise_scale=0.0)["counts"].keys() <= {"000", "111"}
+    aer = simulate_with_noise(qc, shots=4000, method="aer", seed=7)["counts"]
+    assert abs(aer["000"] + aer["111"] - ideal) < 200
+
+def test_parameter_sweep_compiles_once_and_binds_batches():
+    import numpy as np
+    from qiskit.circuit import Parameter
+    from qiskit.quantum_info import Statevector
+    from src.execution.sweep import ParameterSweep
+    from src.frontend.parser import circuit_to_ast
+    from src.ir.passes import superposition_opt
+
+    a, b = Parameter("a"), Parameter("b")
+    qc = QuantumCircuit(2, 2)
+    qc.ry(a, 0)
+    qc.rz(0.25, 1)
+    qc.rz(2 * b - 0.5, 1)  # merged with the previous rz by superposition_opt
+    qc.h(1)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    ast = superposition_opt(circuit_to_ast(qc))
+    assert ast.parameters() == ["a", "b"] and str(ast.nodes[1].params[0]) == "2.0*b - 0.25"
+
+    values = np.random.default_rng(1).uniform(0, np.pi, (300, 2))
+    sweep = ParameterSweep(qc, batch_size=64)
+    probs = sweep.probabilities(values)
+    assert probs.shape == (300, 4)
+    for point in (0, 299):
+        bound = qc.remove_final_measurements(inplace=False).assign_parameters(
+            {a: values[point, 0], b: values[point, 1]})
+        assert np.allclose(probs[point], Statevector(bound).probabilities())
+
+def test_parameter_sweep_aer_engine_binds_each_point():
+    import numpy as np
+    from qiskit.circuit import Parameter
+    from src.execution.sweep import ParameterSweep
+
+    a, b = Parameter("a"), Parameter("b")
+    qc = QuantumCircuit(2, 2)
+    qc.ry(a, 0)
+    qc.rz(b, 1)
+    qc.cx(0, 1)
+    qc.measure([0, 1], [0, 1])
+    aer = ParameterSweep(qc, engine="aer", seed=3).run({"a": [np.pi, 0.0], "b": [0.0, 0.0]}, shots=64)
+    assert [r["counts"].get("01", 0) + r["counts"].get("11", 0) for r in aer] == [64, 0]
+
+def test_parameter_sweep_keeps_one_row_per_point_without_parameters():
+    import numpy as np
+    from src.execution.sweep import ParameterSweep
+
+    qc = QuantumCircuit(1, 1)
+    qc.x(0)
+    qc.measure(0, 0)
+    sweep = ParameterSweep(qc)
+    assert sweep.bind_values(np.zeros((5, 0))) == ({}, 5)
+    assert np.allclose(sweep.probabilities(np.zeros((5, 0))), [[0, 1]] * 5)
+    assert sweep.probabilities(np.zeros((0, 0))).shape == (0, 2)
+    aer = ParameterSweep(qc, engine="aer", seed=3).run(np.zeros((3, 0)), shots=16)
+    assert [r["counts"] for r in aer] == [{"1": 16}] * 3
+
+def test_pauli_expectations_grouped_and_exact():
+    import numpy as np
+    from qiskit.quantum_info import SparsePauliOp, Statevector, random_statevector
+    from src.execution.estimator import expectation_values, group_qubit_wise_commuting
+
+    labels = ["ZZI", "ZIZ", "XXI", "IXX", "YIY", "XYZ", "IIZ"]
+    groups = group_qubit_wise_commuting(labels)
+    assert sorted(i for g in groups for i in g.members) == list(range(len(labels)))
+    assert len(groups) < len(labels)
+    states = np.array([random_statevector(8, seed=s).data for s in range(4)])
+    values = expectation_values(states, labels, groups)
+    for row, state in zip(values, states):
+        ref = [Statevector(state).expectation_value(SparsePauliOp(l)).real for l in labels]
+        assert np.allclose(row, ref)
+
+def test_hybrid_estimate_sums_weighted_observables():
+    bell = QuantumCircuit(2, 2)
+    bell.h(0)
+    bell.cx(0, 1)
+    bell.measure([0, 1], [0, 1])
+    result = HybridExecutor().estimate(bell, {"ZZ": 1.0, "XX": 0.5, "YY": 1.0, "ZI": 2.0})
+    assert result["groups"] == 3 and abs(result["value"] - 0.5) < 1e-9
+
+def test_expectation_values_reject_labels_of_the_wrong_width():
+    import numpy as np
+    import pytest
+    from src.execution.estimator import expectation_values
+
+    states = np.eye(8)[:2]  # |000> and |001>
+    assert np.allclose(expectation_values(states, ["IIZ", "ZII"]), [[1, 1], [-1, 1]])
+    for labels in (["ZZ"], ["ZZZZ"], ["IIZ", "ZZ"]):
+        with pytest.raises(ValueError, match="for 3 qubits"):
+            expectation_values(states, labels)
+    with pytest.raises(ValueError, match="not a power of two"):
+        expectation_values(np.ones(6), ["ZZ"])
+
+def test_qir_runtime_jit_matches_statevector():
+    import numpy as np
+    from qiskit.quantum_info import Statevector
+    from src.execution.qir_runtime import QIRRuntime
+    from src.frontend.parser import circuit_to_ast
+    from src.ir.qir_builder import QIRBuilder
+
+    qc = QuantumCircuit(3, 3)
+    qc.h(0)
+    qc.ry(0.7, 2)
+    qc.cx(0, 1)
+    qc.t(1)
+    qc.swap(1, 2)
+    qc.ccx(0, 2, 1)
+    qir = QIRBuilder()
+    qir.add_program(circuit_to_ast(qc))
+    runtime = QIRRuntime(seed=5)
+    assert np.allclose(runtime.statevector(qir.get_ir()), Statevector(qc).data)
+
+    # a gate after a measurement forces per-shot execution with collapse
+    bell = QuantumCircuit(2, 2)
+    bell.h(0)
+    bell.measure(0, 0)
+    bell.cx(0, 1)
+    bell.measure(1, 1)
+    qir = QIRBuilder()
+    qir.add_program(circuit_to_ast(bell))
+    result = runtime.run(qir.get_ir(), shots=200)
+    assert result["mode"] == "per-shot" and set(result["counts"]) <= {"00", "11"}
+
+    # resetting half of a Bell pair leaves the other half random on every shot
+    entangled = QuantumCircuit(2, 1)
+    entangled.h(0)
+    entangled.cx(0, 1)
+    entangled.reset(0)
+    entangled.measure(1, 0)
+    qir = QIRBuilder()
+    qir.add_program(circuit_to_ast(entangled))
+    result = QIRRuntime(seed=11).run(qir.get_ir(), shots=1000)
+    assert result["mode"] == "per-shot" and 400 < result["counts"].get("1", 0) < 600
+
+
+def test_qir_builder_lowers_basis_gates_in_its_own_context():
+    import numpy as np
+    from llvmlite import ir
+    from qiskit.quantum_info import Statevector
+    from src.backend.decompositions import translate_ast
+    from src.execution.qir_runtime import QIRRuntime
+    from src.frontend.parser import circuit_to_ast
+    from src.ir.qir_builder import QIRBuilder
+
+    qc = QuantumCircuit(2)
+    qc.h(0)
+    qc.p(0.3, 1)
+    qc.u(0.4, -0.2, 1.1, 1)
+    qc.sx(0)
+    qc.cx(0, 1)
+    qc.sxdg(1)
+    for ast in (circuit_to_ast(qc), translate_ast(circuit_to_ast(qc), ('rz', 'sx', 'x', 'cx'))):
+        qir = QIRBuilder()
+        qir.add_program(ast)
+        state = QIRRuntime(seed=1).statevector(qir.get_ir())
+        assert Statevector(state).equiv(Statevector(qc))
+    # %Qubit / %Result stay out of modules built later in the process
+    assert "Qubit" not in str(ir.Module(name="classical"))
+
+def test_qasm3_control_flow_lowers_to_llvm_loops_and_branches():
+    from qiskit import transpile
+    from qiskit_aer import AerSimulator
+    from src.backend.transpiler import ast_to_qiskit_circuit
+    from src.execution.qir_runtime import QIRRuntime
+    from src.frontend.qasm3_parser import parse_qasm3
+    from src.ir.qir_builder import QIRBuilder
+
+    def program(n):
+        return f"""
+        OPENQASM 3.0;
+        qubit[{n}] q;
+        bit[{n}] c;
+        bit flag;
+        h q[0];
+        for int i in [0:{n - 2}] {{ cx q[i], q[i + 1]; }}
+        for int i in [0:{n - 1}] {{ c[i] = measure q[i]; }}
+        if (c[0] == 1) {{ x q[0]; x q[1]; }}
+        for int i in [{n - 1}:-1:2] {{ reset q[i]; }}
+        for int i in [0:{n - 1}] {{ c[i] = measure q[i]; }}
+        // repeat until success: flag ends up 1 on every shot
+        flag = measure q[0];
+        while (flag == 0) {{ h q[0]; flag = measure q[0]; }}
+        """
+
+    def lower(ast):
+        qir = QIRBuilder()
+        qir.add_program(ast)
+        return qir.get_ir()
+
+    ir_text = lower(parse_qasm3(program(4)))
+    assert "phi" in ir_text and "__quantum__qis__read_result__body" in ir_text
+    # IR size follows the program text, not the trip count
+    assert len(lower(parse_qasm3(program(4000)))) < len(ir_text) + 100
+
+    result = QIRRuntime(seed=3).run(ir_text, shots=300)
+    assert result["mode"] == "per-shot"
+    assert result["counts"] == {"10000": 300}
+
+    qc = ast_to_qiskit_circuit(parse_qasm3(program(4)))
+    backend = AerSimulator(seed_simulator=3)
+    aer_counts = backend.run(transpile(qc, backend), shots=300).result().get_counts()
+    assert aer_counts == {"10000": 300}
+
+def test_noisy_simulation_methods_agree_on_three_qubit_gates():
+    from src.execution.simulator import simulate_with_noise
+
+    qc = QuantumCircuit(3, 3)
+    qc.x([0, 1])
+    for _ in range(4):
+        qc.ccx(0, 1, 2)
+    qc.measure(range(3), range(3))
+    trajectory = simulate_with_noise(qc, shots=4000, seed=3)["counts"]
+    aer = simulate_with_noise(qc, shots=4000, method="aer", seed=3)["counts"]
+    # each ccx costs six noisy cx, so both methods lose clearly more than readout alone
+    assert trajectory["011"] < 3700 and aer["011"] < 3700
+    assert abs(trajectory["011"] - aer["011"]) < 200
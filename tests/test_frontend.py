@@ -18,3 +18,178 @@ def test_parse_simple_qasm(tmp_path):
     assert isinstance(ast, QuantumAST)
     # at least 3 nodes
     assert len(ast.nodes) >= 3
+
+def test_qasm2_user_defined_gates_are_inlined(tmp_path):
+    from src.frontend.ast_nodes import GateNode, MeasureNode
+    qasm = """
+    OPENQASM 2.0;
+    include "qelib1.inc";
+    gate foo(theta) a,b { h a; cx a,b; rz(theta) b; }
+    gate bar a,b,c { foo(0.5) c,a; ccx a,b,c; }
+    qreg q[3];
+    creg c[2];
+    foo(0.25) q[0],q[1];
+    bar q[0],q[1],q[2];
+    measure q[0] -> c[1];
+    """
+    f = tmp_path / "custom.qasm"
+    f.write_text(qasm)
+    assert parse_qasm_file(str(f)).nodes == [
+        GateNode('h', [0]), GateNode('cx', [0, 1]), GateNode('rz', [1], [0.25]),
+        GateNode('h', [2]), GateNode('cx', [2, 0]), GateNode('rz', [0], [0.5]),
+        GateNode('ccx', [0, 1, 2]), MeasureNode(0, 1)]
+
+def test_parse_classical_assembly_spans_and_stream():
+    import io
+    import pytest
+    from src.frontend.classical_parser import ClassicalAssemblyParser, ClassicalParseError
+    src = "START 100 ; origin\nLOOP MOVER AREG, X ; load\n  BC ANY, LOOP\nSTOP\nX DC -5\nEND\n"
+    ast = ClassicalAssemblyParser().parse_stream(io.StringIO(src))
+    assert ast.start_address == 100
+    assert ast.labels == {'LOOP': 0}
+    assert ast.instructions[0].operands == ['AREG', 'X']
+    assert ast.instructions[1].span == (3, 4)
+    assert ast.data_definitions['X'].value == -5
+    with pytest.raises(ClassicalParseError) as exc:
+        ClassicalAssemblyParser().parse_text("MOVER AREG, X\n  DIVIDE AREG, X")
+    assert exc.value.line == 2 and exc.value.span == (3, 8)
+
+def test_nasm_typed_globals_and_indexed_memory():
+    from src.frontend.nasm_parser import NASMToLLVMCompiler
+    src = """
+section .data
+    msg db 'hi', 10, 0
+    msg_len equ $ - msg
+    nums dd 3, -5, 7
+section .bss
+    out resd 3
+section .text
+    xor rcx, rcx
+.next:
+    mov eax, [nums + rcx*4]
+    mov [out + rcx*4], eax
+    inc rcx
+    cmp rcx, 3
+    jl .next
+"""
+    compiler = NASMToLLVMCompiler()
+    program = compiler.parse_text(src)
+    assert program.constants['msg_len'] == 4
+    assert program.data_section['nums'].values == [3, -5, 7]
+    ir_text = compiler.generate_llvm_ir()
+    assert '@"msg" = internal global [4 x i8] c"hi\\0a\\00"' in ir_text
+    assert '@"nums" = internal global [3 x i32] [i32 3, i32 -5, i32 7]' in ir_text
+    assert '@"out" = internal global [3 x i32] zeroinitializer' in ir_text
+    assert 'getelementptr inbounds [3 x i32], [3 x i32]* @"nums", i64 0' in ir_text
+
+def test_nasm_symbol_operands_index_the_typed_global():
+    from src.frontend.nasm_parser import NASMToLLVMCompiler
+    src = """
+section .data
+    nums dd 3, -5, 7
+section .bss
+    out resd 3
+section .text
+    mov eax, [nums]
+    mov ebx, [nums + 8]
+    mov [out + 4], ebx
+    mov ecx, [nums + 2]
+"""
+    compiler = NASMToLLVMCompiler()
+    compiler.parse_text(src)
+    ir_text = compiler.generate_llvm_ir()
+    for array, index in (("nums", 0), ("nums", 2), ("out", 1)):
+        assert f'[3 x i32]* @"{array}", i64 0, i64 {index}' in ir_text
+    # only the unaligned access goes through an i8 pointer, and no index is scaled
+    assert ir_text.count('getelementptr i8') == 1 and ' mul ' not in ir_text
+
+def test_nasm_division_truncates_toward_zero():
+    # NASM '/' is unsigned and '//' signed, both truncating toward zero
+    import pytest
+    from src.frontend.nasm_parser import NASMParseError, evaluate_expression
+    assert evaluate_expression("-7 // 2", {}) == -3
+    assert evaluate_expression("7 // -2", {}) == -3
+    assert evaluate_expression("7 / 2", {}) == 3
+    assert evaluate_expression("-7 / 2", {}) == ((1 << 64) - 7) // 2
+    with pytest.raises(NASMParseError, match="division by zero"):
+        evaluate_expression("1 / (2 - 2)", {})
+
+def test_benchmark_generators_parse(tmp_path):
+    from benchmarks import generators
+    for name, source in [("ct", generators.clifford_t(4, 3)), ("qft", generators.qft(4)),
+                         ("grover", generators.grover(3)), ("brick", generators.brickwork(4, 2))]:
+        f = tmp_path / f"{name}.qasm"
+        f.write_text(source)
+        assert parse_qasm_file(str(f)).nodes
+
+def test_benchmark_compare_flags_regressions():
+    from benchmarks.run_benchmarks import compare
+    rows = compare({"a": {"best_s": 0.5}, "b": {"best_s": 0.1}},
+                   {"a": {"best_s": 0.1}, "b": {"best_s": 0.1}}, threshold=0.2, min_delta=0.001)
+    assert [r[4] for r in rows] == ["REGRESSION", "ok"]
+
+def test_native_qasm3_keeps_loops_rolled(tmp_path):
+    from src.frontend.ast_nodes import ForLoopNode, IfNode, ParamExpr, WhileLoopNode
+    from src.frontend.qasm3_parser import parse_qasm3
+    from src.ir.verifier import verify_ast
+
+    def program(n):
+        return f"""
+        OPENQASM 3.0;
+        include "stdgates.inc";
+        input float[64] theta;
+        qubit[{n}] q;
+        bit[2] c;
+        gate entangle(a) x, y {{ cx x, y; rz(a) y; }}
+        h q[0];
+        for int i in [0:{n - 2}] {{
+            entangle(theta + i * pi / 2) q[i], q[i + 1];
+        }}
+        c[0] = measure q[0];
+        if (c[0] == 1) {{ x q[1]; }} else {{ z q[1]; }}
+        while (c == 0) {{ h q[0]; measure q[0] -> c[0]; }}
+        """
+
+    ast = parse_qasm3(program(4))
+    f = tmp_path / "loops.qasm"
+    f.write_text(program(4))
+    assert parse_qasm_file(str(f)) == ast
+    loop = ast.nodes[1]
+    assert isinstance(loop, ForLoopNode) and list(loop.iterations()) == [0, 1, 2]
+    assert loop.body[0].qubits == [ParamExpr.symbol('i'), ParamExpr.symbol('i') + 1]
+    assert isinstance(ast.nodes[3], IfNode) and isinstance(ast.nodes[4], WhileLoopNode)
+    assert ast.nodes[4].condition.cbits == [0, 1] and ast.nodes[4].condition.value == 0
+    assert ast.parameters() == ['theta'] and ast.qubit_indices() == [0, 1, 2, 3]
+    assert verify_ast(ast) == (True, [])
+    # AST size follows the program text, not the trip count
+    assert len(parse_qasm3(program(4000)).nodes) == len(ast.nodes)
+
+def test_verify_ast_checks_rolled_loop_indices():
+    from src.frontend.ast_nodes import ForLoopNode, GateNode, ParamExpr
+    from src.ir.verifier import verify_ast
+
+    shifted = ForLoopNode('i', 0, 1, 1, [GateNode('h', [ParamExpr.symbol('i') - 1])])
+    ok, errors = verify_ast(QuantumAST([shifted]))
+    assert not ok and "reaches -1" in errors[0]
+
+def test_native_qasm3_errors_carry_the_line():
+    import pytest
+    from src.frontend.qasm3_parser import QASM3ParseError, parse_qasm3
+    with pytest.raises(QASM3ParseError) as exc:
+        parse_qasm3("qubit[2] q;\nrx(theta) q[0];")
+    assert exc.value.line == 2
+
+def test_native_qasm3_checks_loop_indices_and_gate_names():
+    import pytest
+    from src.frontend.qasm3_parser import QASM3ParseError, parse_qasm3
+
+    with pytest.raises(QASM3ParseError, match=r"takes values 0..2, out of range for 'a\[2\]'"):
+        parse_qasm3("qubit[2] a; qubit[2] b; for int i in [0:2] { x a[i]; }")
+    with pytest.raises(QASM3ParseError, match="takes values -1..0"):
+        parse_qasm3("qubit[2] q; for int i in [0:1] { h q[i - 1]; }")
+    # in-range loop indices and loops that never run are accepted
+    parse_qasm3("qubit[3] q; for int i in [2:-1:1] { cx q[i], q[i - 1]; } for int j in [3:2] { x q[j]; }")
+    with pytest.raises(QASM3ParseError, match="undefined gate 'foo'"):
+        parse_qasm3("qubit[1] q; foo q[0];")
+    with pytest.raises(QASM3ParseError, match="gate 'cx' takes 0 parameters and 2 qubits"):
+        parse_qasm3("qubit[1] q; cx q[0];")
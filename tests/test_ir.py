@@ -7,3 +7,295 @@ def test_qir_builder_alloc():
     assert n2 in b.qubits
     irt = b.get_ir()
     assert "quantum_module" in irt
+
+def test_classical_pipeline_lowers_conditional_branch():
+    import llvmlite.binding as llvm
+    from src.ir.classical_ir_builder import compile_classical_assembly
+    src = """START 1
+MOVER AREG, N
+LOOP SUB AREG, ONE
+COMP AREG, ONE
+BC GT, LOOP
+MOVEM AREG, RES
+STOP
+N DC 5
+ONE DC 1
+END"""
+    result = compile_classical_assembly(src)
+    assert result.stats['instructions'] == 6
+    assert 'icmp sgt' in result.ir
+    assert '@"RES" = internal global i32 0' in result.ir
+    llvm.parse_assembly(result.ir).verify()
+
+def test_classical_optimizer_folds_constants_and_dead_code():
+    from src.ir.classical_ir_builder import compile_classical_assembly
+    from src.ir.classical_passes import ClassicalOptimizer
+    src = """MOVER AREG, A
+ADD AREG, B
+MOVEM AREG, T
+MOVEM AREG, T
+COMP AREG, B
+BC GT, SKIP
+MULT AREG, B
+MOVEM AREG, T
+SKIP STOP
+A DC 2
+B DC 3
+T DS 1
+END"""
+    opt = ClassicalOptimizer()
+    result = compile_classical_assembly(src, passes=[opt])
+    ops = [(i.opcode, i.operands) for i in result.ast.instructions]
+    assert ops == [('MOVER', ['AREG', '5']), ('MOVEM', ['AREG', 'T']), ('STOP', [])]
+    assert result.ast.labels == {'SKIP': 2}
+    assert opt.stats['branches_folded'] == 1
+    assert opt.stats['dead_stores'] == 1
+    assert opt.stats['instructions_removed'] == 6
+
+def test_classical_optimizer_keeps_stores_in_programs_that_never_stop():
+    from src.ir.classical_ir_builder import compile_classical_assembly
+    from src.ir.classical_passes import ClassicalOptimizer
+    with open("examples/assembly/sample_assembly.asm") as f:
+        src = f.read()
+    opt = ClassicalOptimizer()
+    result = compile_classical_assembly(src, passes=[opt])
+    assert ('MOVEM', ['AREG', 'RESULT']) in [(i.opcode, i.operands) for i in result.ast.instructions]
+    assert opt.stats['dead_stores'] == 0
+    # a store overwritten before the back edge is still dead
+    src = """LOOP MOVEM AREG, T
+MOVEM AREG, T
+BC ANY, LOOP
+T DS 1
+END"""
+    opt = ClassicalOptimizer()
+    result = compile_classical_assembly(src, passes=[opt])
+    assert [i.opcode for i in result.ast.instructions] == ['MOVEM', 'BC']
+    assert opt.stats['dead_stores'] == 1
+
+def test_zx_simplify_preserves_unitary_and_reduces_t_and_cx():
+    import random
+    from qiskit.quantum_info import Operator
+    from src.backend.transpiler import ast_to_qiskit_circuit
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+    from src.ir.passes import zx_simplify
+    from src.ir.zx import ZXGraph
+
+    rng = random.Random(7)
+    for _ in range(25):
+        gates = []
+        for _ in range(30):
+            a, b = rng.sample(range(4), 2)
+            name = rng.choice(['h', 's', 't', 'tdg', 'x', 'rz', 'cx', 'cz', 'swap'])
+            if name in ('cx', 'cz', 'swap'):
+                gates.append(GateNode(name, [a, b]))
+            else:
+                gates.append(GateNode(name, [a], [rng.choice([0.3, 1.5707963267948966])] if name == 'rz' else []))
+        before = Operator(ast_to_qiskit_circuit(QuantumAST(list(gates))))
+        after = Operator(ast_to_qiskit_circuit(zx_simplify(QuantumAST(gates))))
+        assert after.equiv(before)
+
+    # the t gates commute through the cx controls and fuse; the cx pair then cancels
+    ast = QuantumAST([GateNode('t', [0]), GateNode('cx', [0, 1]), GateNode('t', [0]),
+                      GateNode('cx', [0, 1]), GateNode('t', [0]), MeasureNode(0, 0)])
+    reference = Operator(ast_to_qiskit_circuit(QuantumAST(ast.nodes[:-1])))
+    nodes = zx_simplify(ast).nodes
+    assert [n.name for n in nodes[:-1]] == ['rz'] and isinstance(nodes[-1], MeasureNode)
+    assert Operator(ast_to_qiskit_circuit(QuantumAST(nodes[:-1]), num_qubits_hint=2)).equiv(reference)
+
+    graph = ZXGraph.from_gates(2, [('h', [0], []), ('cz', [0, 1], []), ('h', [0], [])])
+    graph.simplify()
+    assert graph.num_spiders() == 2
+
+def test_consolidate_blocks_resynthesizes_pairs_with_cached_kak():
+    from qiskit.quantum_info import Operator
+    from src.backend.transpiler import ast_to_qiskit_circuit
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+    from src.ir import kak
+    from src.ir.passes import consolidate_blocks
+
+    def run(a, b):
+        return [GateNode('cx', [a, b]), GateNode('rz', [b], [0.4]), GateNode('cx', [a, b]),
+                GateNode('h', [a]), GateNode('cx', [b, a]), GateNode('cz', [a, b]),
+                GateNode('ry', [a], [1.1]), GateNode('cx', [a, b])]
+
+    # the same 5-cx block on two pairs, with a gate on another qubit and a measurement between
+    nodes = run(0, 1) + [GateNode('x', [4])] + run(2, 3) + [MeasureNode(0, 0), GateNode('cx', [0, 1])]
+    gates = [n for n in nodes if not isinstance(n, MeasureNode)]
+    reference = Operator(ast_to_qiskit_circuit(QuantumAST(gates), num_qubits_hint=5))
+    kak._SYNTHESIZED.clear()
+    out = consolidate_blocks(QuantumAST(list(nodes))).nodes
+    measure = next(i for i, n in enumerate(out) if isinstance(n, MeasureNode))
+    assert out[measure + 1:].count(GateNode('cx', [0, 1])) == 1
+    assert sum(n.name == 'cx' for n in out if isinstance(n, GateNode)) <= 7
+    assert kak.cache_info()["unitaries"] == 1
+    gates = [n for n in out if not isinstance(n, MeasureNode)]
+    assert Operator(ast_to_qiskit_circuit(QuantumAST(gates), num_qubits_hint=5)).equiv(reference)
+
+    # a lone cx with its single-qubit gates is left alone
+    single = [GateNode('h', [0]), GateNode('cx', [0, 1]), GateNode('rz', [1], [0.2])]
+    assert consolidate_blocks(QuantumAST(list(single))).nodes == single
+
+def test_consolidate_blocks_keeps_blocks_the_decomposer_only_approximates():
+    import math
+    from src.frontend.ast_nodes import GateNode, QuantumAST
+    from src.ir.kak import block_unitary, synthesize
+    from src.ir.passes import consolidate_blocks
+
+    # cp(pi / 2**15) as cx/rz, from a 32-qubit QFT: the KAK decomposer rounds it to two rz gates
+    eps = math.pi / 2 ** 16
+    tiny = [GateNode('cx', [1, 0]), GateNode('rz', [0], [-eps]), GateNode('cx', [1, 0]),
+            GateNode('rz', [0], [eps]), GateNode('rz', [1], [2 * eps])]
+    assert synthesize(block_unitary([(n.name, n.qubits, n.params) for n in tiny])) is None
+    assert consolidate_blocks(QuantumAST(list(tiny))).nodes == tiny
+
+def test_phase_polynomial_opt_merges_parities_and_respects_topology():
+    from qiskit.quantum_info import Operator
+    from src.backend.transpiler import ast_to_qiskit_circuit
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+    from src.ir.passes import phase_polynomial_opt
+
+    # a QAOA-style cost layer on a triangle: 6 cx, phases on q0^q1, q0^q2, q1^q2
+    layer = []
+    for a, b in ((0, 1), (0, 2), (1, 2)):
+        layer += [GateNode('cx', [a, b]), GateNode('rz', [b], [0.7]), GateNode('cx', [a, b])]
+    nodes = layer + [GateNode('t', [1]), GateNode('rzz', [0, 2], [0.2]), GateNode('t', [1]),
+                     GateNode('h', [0]), MeasureNode(0, 0)]
+    reference = Operator(ast_to_qiskit_circuit(QuantumAST(nodes[:-2])))
+    out = phase_polynomial_opt(QuantumAST(list(nodes))).nodes
+    assert out[-2:] == nodes[-2:]
+    region = out[:-2]
+    assert sum(n.name == 'cx' for n in region) < 8
+    # the two t gates merge into one s, the rzz into the q0^q2 phase
+    assert not {'t', 'rzz'} & {n.name for n in region}
+    assert Operator(ast_to_qiskit_circuit(QuantumAST(region))).equiv(reference)
+
+    # on a line 0-1-2 every cx must use a coupled pair
+    line = {'topology': [(0, 1), (1, 2)]}
+    region = phase_polynomial_opt(QuantumAST(list(nodes[:-2])), line).nodes
+    assert all(abs(n.qubits[0] - n.qubits[1]) == 1 for n in region if n.name == 'cx')
+    assert Operator(ast_to_qiskit_circuit(QuantumAST(region))).equiv(reference)
+
+def test_check_equivalence_verifies_passes():
+    import copy
+    from src.frontend.ast_nodes import GateNode, MeasureNode, ParamExpr, QuantumAST
+    from src.ir.equivalence import check_equivalence
+    from src.ir.passes import phase_polynomial_opt, superposition_opt, zx_simplify
+
+    # a pass's output, with measurements deferred onto ancillas and a symbolic angle
+    nodes = [GateNode('h', [0]), GateNode('t', [0]), GateNode('cx', [0, 1]), GateNode('t', [0]),
+             GateNode('cx', [0, 1]), GateNode('rz', [1], [ParamExpr.symbol('theta')]), GateNode('tdg', [2]),
+             GateNode('cx', [1, 2]), MeasureNode(0, 0), MeasureNode(2, 1)]
+    before = QuantumAST(nodes)
+    for opt in (zx_simplify, phase_polynomial_opt):
+        assert check_equivalence(before, opt(copy.deepcopy(before)))["equivalent"]
+    # h h is the identity, not h
+    pair = QuantumAST([GateNode('h', [0]), GateNode('h', [0]), GateNode('cx', [0, 1])])
+    result = check_equivalence(pair, superposition_opt(copy.deepcopy(pair)))
+    assert result["equivalent"] and len(superposition_opt(copy.deepcopy(pair)).nodes) == 1
+
+def test_check_equivalence_finds_differences():
+    from src.frontend.ast_nodes import GateNode, MeasureNode, QuantumAST
+    from src.ir.equivalence import check_equivalence
+
+    gates = [GateNode('h', [0]), GateNode('t', [0]), GateNode('cx', [0, 1]), GateNode('tdg', [2]),
+             GateNode('cx', [1, 2])]
+    before = QuantumAST(gates + [MeasureNode(0, 0), MeasureNode(2, 1)])
+    changed = QuantumAST(gates[:3] + [GateNode('rz', [2], [-0.7853])] + gates[4:] + before.nodes[-2:])
+    result = check_equivalence(before, changed)
+    assert result["equivalent"] is False and result["qubits"] == [2]
+    # measuring the other qubit of a cx pair is a different program
+    swapped = QuantumAST(gates + [MeasureNode(1, 0), MeasureNode(2, 1)])
+    assert check_equivalence(before, swapped)["equivalent"] is False
+
+def test_check_equivalence_unrolls_loops_and_leaves_branches_undecided():
+    from src.frontend.ast_nodes import Condition, ForLoopNode, GateNode, IfNode, ParamExpr, QuantumAST
+    from src.ir.equivalence import check_equivalence
+
+    loop = ForLoopNode('i', 0, 2, 1, [GateNode('h', [ParamExpr.symbol('i')])])
+    assert check_equivalence(QuantumAST([loop]), QuantumAST([GateNode('h', [q]) for q in range(3)]))["equivalent"]
+    branch = QuantumAST([IfNode(Condition([0]), [GateNode('x', [0])])])
+    assert check_equivalence(branch, branch)["equivalent"] is None
+
+def test_check_equivalence_decides_40_qubit_circuits():
+    from src.frontend.ast_nodes import GateNode, QuantumAST
+    from src.ir.equivalence import check_equivalence
+
+    # 40 qubits: a Clifford ladder against its cz form (tableau), and a chain of
+    # rzz interactions against cx rz cx (ZX, or light cones once an angle is off)
+    ladder = [GateNode('h', [0])] + [GateNode('cx', [q, q + 1]) for q in range(39)]
+    as_cz = [GateNode('h', [0])] + [g for q in range(39) for g in
+                                   (GateNode('h', [q + 1]), GateNode('cz', [q + 1, q]), GateNode('h', [q + 1]))]
+    result = check_equivalence(QuantumAST(ladder * 3), QuantumAST(as_cz * 3))
+    assert result["equivalent"] and result["methods"] == ["tableau"]
+    layers = [[GateNode('h', [q]) for q in range(40)] + [GateNode('rz', [q], [0.1 * q]) for q in range(40)]
+              for _ in range(3)]
+    chain = [[(q, q + 1) for q in range(k % 2, 39, 2)] for k in range(3)]
+    a = QuantumAST([g for k in range(3) for g in layers[k] + [g for q, r in chain[k] for g in
+                   (GateNode('cx', [q, r]), GateNode('rz', [r], [0.7]), GateNode('cx', [q, r]))]])
+    b = QuantumAST([g for k in range(3) for g in layers[k] + [GateNode('rzz', [q, r], [0.7]) for q, r in chain[k]]])
+    result = check_equivalence(a, b)
+    assert result["equivalent"] and result["elapsed"] < 10
+    b.nodes[-1] = GateNode('rzz', b.nodes[-1].qubits, [0.71])
+    result = check_equivalence(a, b)
+    assert result["equivalent"] is False and result["methods"] == ["light_cones"]
+
+def test_check_pass_fails_on_undecided_passes_unless_allowed():
+    import copy
+    from qiskit import QuantumCircuit
+    from benchmarks.generators import clifford_t
+    from scripts.run_quantum_compiler import check_pass
+    from src.frontend.parser import circuit_to_ast
+    from src.ir.equivalence import check_equivalence
+    from src.ir.passes import consolidate_blocks
+
+    # without the pass's windows, 24 qubits of resynthesized blocks are out of reach
+    deep = circuit_to_ast(QuantumCircuit.from_qasm_str(clifford_t(24, 20)))
+    shuffled = consolidate_blocks(copy.deepcopy(deep))
+    assert check_equivalence(deep, shuffled)["equivalent"] is None
+    assert not check_pass("consolidate_blocks", deep, shuffled)
+    assert check_pass("consolidate_blocks", deep, shuffled, allow_unverified=True)
+
+def test_check_equivalence_verifies_reported_windows_at_scale():
+    import copy
+    from qiskit import QuantumCircuit
+    from benchmarks.generators import clifford_t, qft
+    from src.backend.decompositions import translate_ast
+    from src.frontend.parser import circuit_to_ast
+    from src.ir.equivalence import check_equivalence
+    from src.ir.passes import consolidate_blocks, phase_polynomial_opt
+
+    def basis(ast, windows):
+        return translate_ast(ast, ('rz', 'sx', 'x', 'cx'), windows=windows)
+
+    for source, opt in [(clifford_t(30, 20), consolidate_blocks), (qft(32), phase_polynomial_opt),
+                        (qft(32), consolidate_blocks), (qft(32), basis)]:
+        before = circuit_to_ast(QuantumCircuit.from_qasm_str(source))
+        windows = []
+        after = opt(copy.deepcopy(before), windows=windows)
+        result = check_equivalence(before, after, windows=windows)
+        assert result["equivalent"] and result["windows"] > 0 and result["elapsed"] < 10
+
+def test_check_equivalence_windows_cannot_hide_changes():
+    import copy
+    from qiskit import QuantumCircuit
+    from benchmarks.generators import clifford_t
+    from src.frontend.ast_nodes import GateNode, QuantumAST
+    from src.frontend.parser import circuit_to_ast
+    from src.ir.equivalence import check_equivalence
+    from src.ir.passes import consolidate_blocks
+
+    # a rewritten block that no longer matches its original
+    before = circuit_to_ast(QuantumCircuit.from_qasm_str(clifford_t(24, 20)))
+    windows = []
+    after = consolidate_blocks(copy.deepcopy(before), windows=windows)
+    rotation = next(node for node in windows[0][1] if node.params)
+    rotation.params[0] += 0.1
+    result = check_equivalence(before, after, windows=windows)
+    assert result["equivalent"] is False and "rewritten window differs" in result["reason"]
+
+    # x x equals the h h it claims to replace, but is not a contiguous run of `after`
+    h_cx_h = QuantumAST([GateNode('h', [0]), GateNode('cx', [0, 1]), GateNode('h', [0])])
+    x_cx_x = QuantumAST([GateNode('x', [0]), GateNode('cx', [0, 1]), GateNode('x', [0])])
+    claimed = [(h_cx_h.nodes[::2], x_cx_x.nodes[::2])]
+    result = check_equivalence(h_cx_h, x_cx_x, windows=claimed)
+    assert result["equivalent"] is False and result["windows"] == 0